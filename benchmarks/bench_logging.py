@@ -0,0 +1,129 @@
+"""
+Custo do logging por mensagem, medido na thread de quem loga.
+
+Compara a configuração antiga (`basicConfig` com FileHandler + StreamHandler,
+formatação e escrita síncronas) com o handler em fila de
+`src.config.logging_config`, em texto e JSON, com e sem DEBUG amostrado.
+
+Cada "mensagem" emite o mesmo volume de linhas que um atendimento típico
+passando pelo grafo (INFO dos nós, DEBUG de previews e separadores).
+O console é redirecionado para /dev/null para não medir o terminal.
+
+Entre mensagens há uma pausa (`--intervalo-ms`, fora da medição), como
+entre webhooks reais; com `--intervalo-ms 0` a thread de escrita disputa o
+GIL com quem loga o tempo todo e o p99 da fila sobe.
+
+Uso:
+    python benchmarks/bench_logging.py [--mensagens 2000] [--intervalo-ms 2]
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.config.logging_config import FORMATO_TEXTO, configurar_logging, definir_mensagem_log, parar_logging
+
+logger = logging.getLogger("src.nodes.agent")
+
+RESPOSTA = "Olá! Temos horários disponíveis amanhã às 9h, 10h30 e 14h. " * 4
+HISTORICO = [{"role": "user", "content": "Quero agendar uma consulta"}] * 10
+
+
+def _simular_mensagem(indice: int) -> None:
+    """Linhas emitidas por uma mensagem ao longo do grafo."""
+    definir_mensagem_log(f"3EB0{indice:08d}")
+
+    for no in ("validar_webhook", "verificar_cliente", "processar_texto", "processar_agente",
+               "fragmentar_resposta", "enviar_respostas"):
+        logger.debug("=" * 60)
+        logger.info("Nó %s iniciado", no)
+        logger.debug("Estado parcial: %s", HISTORICO)
+        logger.info("Nó %s concluído", no)
+
+    for _ in range(3):
+        logger.info("Executando tool: %s", "consultar_horarios")
+        logger.debug("Resultado da tool: %s", RESPOSTA)
+
+    for fragmento in range(4):
+        logger.debug("Fragmento %d: %s", fragmento, RESPOSTA[:120])
+        logger.info("Fragmento %d enviado", fragmento)
+
+
+def _limpar_root() -> None:
+    parar_logging()
+    raiz = logging.getLogger()
+    for handler in list(raiz.handlers):
+        raiz.removeHandler(handler)
+        handler.close()
+
+
+def _basic_config(arquivo: str, nivel: str) -> None:
+    logging.basicConfig(
+        level=getattr(logging, nivel),
+        format=FORMATO_TEXTO,
+        handlers=[logging.FileHandler(arquivo), logging.StreamHandler()]
+    )
+
+
+def _medir(configurar: Callable[[str], None], mensagens: int, intervalo: float) -> Dict[str, float]:
+    with tempfile.TemporaryDirectory() as diretorio, open(os.devnull, "w") as nulo:
+        stdout, stderr = sys.stdout, sys.stderr
+        sys.stdout = sys.stderr = nulo
+        try:
+            configurar(os.path.join(diretorio, "bot.log"))
+            for indice in range(50):
+                _simular_mensagem(indice)
+
+            tempos: List[float] = []
+            for indice in range(mensagens):
+                inicio = time.perf_counter()
+                _simular_mensagem(indice)
+                tempos.append((time.perf_counter() - inicio) * 1_000_000)
+                if intervalo:
+                    time.sleep(intervalo)
+        finally:
+            _limpar_root()
+            sys.stdout, sys.stderr = stdout, stderr
+
+    tempos.sort()
+    return {
+        "media_us": statistics.fmean(tempos),
+        "p50_us": tempos[len(tempos) // 2],
+        "p99_us": tempos[int(len(tempos) * 0.99) - 1],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mensagens", type=int, default=2000)
+    parser.add_argument("--intervalo-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    cenarios = {
+        "basicConfig INFO (antigo)": lambda arquivo: _basic_config(arquivo, "INFO"),
+        "basicConfig DEBUG (antigo)": lambda arquivo: _basic_config(arquivo, "DEBUG"),
+        "fila texto INFO": lambda arquivo: configurar_logging("INFO", "texto", arquivo),
+        "fila json INFO": lambda arquivo: configurar_logging("INFO", "json", arquivo),
+        "fila json DEBUG": lambda arquivo: configurar_logging("DEBUG", "json", arquivo),
+        "fila json DEBUG 10%": lambda arquivo: configurar_logging("DEBUG", "json", arquivo, 0.1),
+    }
+
+    _limpar_root()
+    print(f"{'cenário':<28}{'média (µs)':>12}{'p50 (µs)':>12}{'p99 (µs)':>12}")
+    for nome, configurar in cenarios.items():
+        resultado = _medir(configurar, args.mensagens, args.intervalo_ms / 1000)
+        print(f"{nome:<28}{resultado['media_us']:>12.1f}{resultado['p50_us']:>12.1f}{resultado['p99_us']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,495 @@
+"""
+Gerador de carga: reproduz webhooks da Evolution API contra o app FastAPI.
+
+Sobe os stubs dos serviços externos (stubs.py) neste processo e o bot
+(`uvicorn src.main:app`) em um subprocesso apontado para eles, envia os
+webhooks em malha aberta na taxa pedida e mede:
+
+- aceite: tempo de resposta HTTP do POST /webhook/whatsapp;
+- ponta a ponta: do envio do webhook até o primeiro sendText com a
+  resposta chegar no stub da Evolution API;
+- vazão (respostas por segundo) e taxa de erro (HTTP != 2xx, falha de
+  conexão ou mensagem sem resposta dentro de --timeout-resposta).
+
+Cenários:
+    texto, audio, imagem   mensagens de --contatos contatos sorteados
+    misto                  70% texto, 15% áudio, 15% imagem
+    rajada                 um único contato, rajadas de --rajada mensagens
+                           com --intervalo-rajada-ms entre elas
+    muitos-contatos        cada mensagem de um contato novo (cadastro)
+    gravado                webhooks de --gravados (JSONL ou diretório), um contato novo
+                           por mensagem, a menos de --manter-numeros
+
+Exemplos:
+    python benchmarks/load_webhooks.py --cenario texto --taxa 5 --mensagens 200
+    python benchmarks/load_webhooks.py --cenario rajada --rajada 8 --taxa 4
+    python benchmarks/load_webhooks.py --cenario misto --latencia-openai 1500 --saida resultado.json
+    python benchmarks/load_webhooks.py --app-url http://127.0.0.1:8000 --porta-stubs 9100
+
+Com --app-url o bot não é iniciado: ele já deve estar rodando com
+OPENAI_BASE_URL, SUPABASE_URL, WHATSAPP_API_URL e
+GOOGLE_CALENDAR_API_ENDPOINT apontando para os stubs (ver
+`ambiente_bot`).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import httpx
+import uvicorn
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from payloads import (  # noqa: E402
+    carregar_gravados,
+    ciclo,
+    mensagem_sintetica,
+    nova_marca,
+    numero_contato,
+    reproduzir_gravado,
+)
+from stubs import adicionar_argumentos_latencia, config_dos_argumentos, criar_stubs  # noqa: E402
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+CENARIOS = ("texto", "audio", "imagem", "misto", "rajada", "muitos-contatos", "gravado")
+
+PESOS_MISTO = (("texto", 0.70), ("audio", 0.15), ("imagem", 0.15))
+
+
+@dataclass
+class Mensagem:
+    indice: int
+    tipo: str
+    numero: str
+    marca: Optional[str]
+    corpo: Dict[str, Any]
+    atraso: float
+    enviada_em: Optional[float] = None
+    aceite_ms: Optional[float] = None
+    status_http: Optional[int] = None
+    erro: Optional[str] = None
+    respondida_em: Optional[float] = None
+
+    @property
+    def ponta_a_ponta_ms(self) -> Optional[float]:
+        if self.enviada_em is None or self.respondida_em is None:
+            return None
+        return (self.respondida_em - self.enviada_em) * 1000
+
+
+# ==============================================
+# CENÁRIOS
+# ==============================================
+
+def gerar_mensagens(args: argparse.Namespace) -> List[Mensagem]:
+    """Mensagens do cenário, com o instante de envio relativo ao início (s)."""
+    rng = random.Random(args.semente)
+    gravados = None
+    if args.cenario == "gravado":
+        webhooks = carregar_gravados(args.gravados)
+        if not webhooks:
+            raise SystemExit(f"Nenhum webhook messages.upsert de cliente em {args.gravados}")
+        gravados = ciclo(webhooks)
+    mensagens = []
+
+    for indice in range(args.mensagens):
+        atraso = indice / args.taxa
+        marca: Optional[str] = nova_marca()
+
+        if args.cenario == "rajada":
+            rajada, posicao = divmod(indice, args.rajada)
+            atraso = rajada * args.rajada / args.taxa + posicao * args.intervalo_rajada_ms / 1000
+            tipo, numero = "texto", numero_contato(0)
+        elif args.cenario == "muitos-contatos":
+            tipo, numero = "texto", numero_contato(1000 + indice)
+        elif args.cenario == "misto":
+            tipo = rng.choices([t for t, _ in PESOS_MISTO], [p for _, p in PESOS_MISTO])[0]
+            numero = numero_contato(rng.randrange(args.contatos))
+        elif args.cenario == "gravado":
+            tipo, numero = "gravado", None if args.manter_numeros else numero_contato(100000 + indice)
+        else:
+            tipo, numero = args.cenario, numero_contato(rng.randrange(args.contatos))
+
+        if gravados is not None:
+            corpo = reproduzir_gravado(next(gravados), numero, marca)
+            mensagem = corpo["data"].get("message") or {}
+            if "conversation" not in mensagem and "extendedTextMessage" not in mensagem:
+                marca = None  # mídia gravada: correlação pelo número
+            numero = "".join(c for c in corpo["data"]["key"].get("remoteJid", "").split("@")[0] if c.isdigit())
+        else:
+            corpo = mensagem_sintetica(tipo, numero, marca, rng)
+
+        mensagens.append(Mensagem(indice, tipo, numero, marca, corpo, atraso))
+
+    return mensagens
+
+
+# ==============================================
+# CORRELAÇÃO DAS RESPOSTAS
+# ==============================================
+
+class Correlacionador:
+    """
+    Liga cada sendText recebido pelo stub à mensagem que ele responde.
+
+    Pela marca quando a resposta a traz (primeiro fragmento); senão, à
+    mensagem sem marca mais antiga ainda sem resposta do mesmo número.
+    Fragmentos seguintes de uma resposta marcada são ignorados.
+    """
+
+    def __init__(self) -> None:
+        self._por_marca: Dict[str, Mensagem] = {}
+        self._sem_marca: Dict[str, Deque[Mensagem]] = {}
+        self._pendentes = 0
+        self.todas_respondidas = asyncio.Event()
+
+    def aguardar(self, mensagem: Mensagem) -> None:
+        self._pendentes += 1
+        self.todas_respondidas.clear()
+        if mensagem.marca:
+            self._por_marca[mensagem.marca] = mensagem
+        else:
+            self._sem_marca.setdefault(mensagem.numero, deque()).append(mensagem)
+
+    def desistir(self, mensagem: Mensagem) -> None:
+        """Mensagem que falhou no envio: não espera mais resposta."""
+        if mensagem.marca:
+            self._por_marca.pop(mensagem.marca, None)
+        elif mensagem in self._sem_marca.get(mensagem.numero, ()):
+            self._sem_marca[mensagem.numero].remove(mensagem)
+        self._baixar()
+
+    def envio(self, numero: str, marca: Optional[str], instante: float) -> None:
+        mensagem = self._por_marca.pop(marca, None) if marca else None
+        if mensagem is None and not marca and self._sem_marca.get(numero):
+            mensagem = self._sem_marca[numero].popleft()
+        if mensagem is not None and mensagem.respondida_em is None:
+            mensagem.respondida_em = instante
+            self._baixar()
+
+    def _baixar(self) -> None:
+        self._pendentes -= 1
+        if self._pendentes <= 0:
+            self.todas_respondidas.set()
+
+
+# ==============================================
+# PROCESSOS
+# ==============================================
+
+def porta_livre() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _credenciais_google(diretorio: Path, url_stubs: str) -> Path:
+    """Service account descartável cujo token_uri é o stub."""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    chave = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = chave.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+
+    arquivo = diretorio / "credentials.json"
+    arquivo.write_text(json.dumps({
+        "type": "service_account",
+        "project_id": "bench",
+        "private_key_id": "bench",
+        "private_key": pem,
+        "client_email": "bench@bench.iam.gserviceaccount.com",
+        "client_id": "0",
+        "token_uri": f"{url_stubs}/google/token",
+    }))
+    return arquivo
+
+
+def ambiente_bot(url_stubs: str, credenciais: Path, nivel_log: str) -> Dict[str, str]:
+    """Variáveis de ambiente do bot apontando para os stubs."""
+    ambiente = dict(os.environ)
+    ambiente.update({
+        "OPENAI_API_KEY": "sk-bench-00000000000000000000",
+        "OPENAI_BASE_URL": f"{url_stubs}/openai/v1",
+        "SUPABASE_URL": f"{url_stubs}/supabase",
+        # formato de JWT: o cliente do Supabase valida a chave
+        "SUPABASE_KEY": "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYmVuY2gifQ.YmVuY2g",
+        "WHATSAPP_API_URL": f"{url_stubs}/evolution",
+        "WHATSAPP_API_KEY": "bench-key-0000",
+        "WHATSAPP_INSTANCE": "bench",
+        "POSTGRES_CONNECTION_STRING": "postgresql://bench",
+        "GOOGLE_CALENDAR_CREDENTIALS_FILE": str(credenciais),
+        "GOOGLE_CALENDAR_API_ENDPOINT": f"{url_stubs}/google/calendar/v3/",
+        "CALENDAR_SYNC_ENABLED": "false",
+        "TRACING_ENABLED": "false",
+        "LANGCHAIN_TRACING_V2": "false",
+        "LANGSMITH_TRACING": "false",
+        "LOG_LEVEL": nivel_log,
+        "LOG_FILE": "",
+    })
+    return ambiente
+
+
+async def _aguardar_saude(cliente: httpx.AsyncClient, url: str, processo: Optional[subprocess.Popen], limite: float) -> None:
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        if processo is not None and processo.poll() is not None:
+            raise RuntimeError(f"O bot encerrou na inicialização (código {processo.returncode})")
+        try:
+            if (await cliente.get(f"{url}/health")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError(f"O bot não respondeu em {url}/health após {limite:.0f}s")
+
+
+# ==============================================
+# CARGA
+# ==============================================
+
+async def _enviar(cliente: httpx.AsyncClient, url: str, mensagem: Mensagem, correlacionador: Correlacionador) -> None:
+    correlacionador.aguardar(mensagem)
+    mensagem.enviada_em = time.perf_counter()
+    try:
+        resposta = await cliente.post(f"{url}/webhook/whatsapp", json=mensagem.corpo)
+        mensagem.status_http = resposta.status_code
+        if resposta.status_code >= 300 or resposta.json().get("status") in ("ignored", "error"):
+            mensagem.erro = f"HTTP {resposta.status_code}: {resposta.text[:200]}"
+    except (httpx.HTTPError, ValueError) as e:
+        mensagem.erro = f"{type(e).__name__}: {e}"
+    finally:
+        mensagem.aceite_ms = (time.perf_counter() - mensagem.enviada_em) * 1000
+
+    if mensagem.erro:
+        correlacionador.desistir(mensagem)
+
+
+async def executar_carga(
+    cliente: httpx.AsyncClient,
+    url: str,
+    mensagens: List[Mensagem],
+    correlacionador: Correlacionador,
+    timeout_resposta: float
+) -> Tuple[float, float]:
+    """
+    Envia as mensagens em malha aberta (no instante previsto, sem esperar as anteriores).
+
+    Returns:
+        Tuple[float, float]: (início, fim) em time.perf_counter()
+    """
+    inicio = time.perf_counter()
+    tarefas = []
+    for mensagem in mensagens:
+        espera = inicio + mensagem.atraso - time.perf_counter()
+        if espera > 0:
+            await asyncio.sleep(espera)
+        tarefas.append(asyncio.create_task(_enviar(cliente, url, mensagem, correlacionador)))
+
+    await asyncio.gather(*tarefas)
+    try:
+        await asyncio.wait_for(correlacionador.todas_respondidas.wait(), timeout_resposta)
+    except asyncio.TimeoutError:
+        pass
+
+    respondidas = [m.respondida_em for m in mensagens if m.respondida_em is not None]
+    return inicio, max(respondidas, default=time.perf_counter())
+
+
+# ==============================================
+# RELATÓRIO
+# ==============================================
+
+def _percentil(ordenadas: List[float], p: float) -> float:
+    if not ordenadas:
+        return 0.0
+    indice = min(len(ordenadas) - 1, max(0, round(p / 100 * len(ordenadas)) - 1))
+    return ordenadas[indice]
+
+
+def _distribuicao(valores: List[float]) -> Dict[str, float]:
+    ordenados = sorted(valores)
+    return {
+        "p50_ms": round(_percentil(ordenados, 50), 1),
+        "p95_ms": round(_percentil(ordenados, 95), 1),
+        "p99_ms": round(_percentil(ordenados, 99), 1),
+        "max_ms": round(ordenados[-1], 1) if ordenados else 0.0,
+    }
+
+
+def resumir(args: argparse.Namespace, mensagens: List[Mensagem], inicio: float, fim: float) -> Dict[str, Any]:
+    enviadas = len(mensagens)
+    erros_http = [m for m in mensagens if m.erro]
+    respondidas = [m for m in mensagens if m.respondida_em is not None]
+    sem_resposta = enviadas - len(erros_http) - len(respondidas)
+    duracao = max(fim - inicio, 1e-9)
+
+    por_tipo = {}
+    for tipo in sorted({m.tipo for m in mensagens}):
+        do_tipo = [m.ponta_a_ponta_ms for m in respondidas if m.tipo == tipo]
+        por_tipo[tipo] = dict(_distribuicao(do_tipo), respondidas=len(do_tipo))
+
+    return {
+        "cenario": args.cenario,
+        "taxa_alvo": args.taxa,
+        "mensagens": enviadas,
+        "duracao_s": round(duracao, 2),
+        "vazao_respostas_s": round(len(respondidas) / duracao, 3),
+        "aceite": _distribuicao([m.aceite_ms for m in mensagens if m.aceite_ms is not None]),
+        "ponta_a_ponta": _distribuicao([m.ponta_a_ponta_ms for m in respondidas]),
+        "ponta_a_ponta_por_tipo": por_tipo,
+        "erros_http": len(erros_http),
+        "sem_resposta": sem_resposta,
+        "taxa_erro": round((len(erros_http) + sem_resposta) / enviadas, 4) if enviadas else 0.0,
+        "exemplos_erro": [m.erro for m in erros_http[:5]],
+    }
+
+
+def imprimir(resultado: Dict[str, Any]) -> None:
+    print()
+    print(f"Cenário {resultado['cenario']}: {resultado['mensagens']} mensagens a {resultado['taxa_alvo']}/s "
+          f"em {resultado['duracao_s']}s")
+    print(f"  vazão:          {resultado['vazao_respostas_s']} respostas/s")
+    print(f"  taxa de erro:   {resultado['taxa_erro'] * 100:.2f}% "
+          f"({resultado['erros_http']} HTTP, {resultado['sem_resposta']} sem resposta)")
+    print(f"  {'':<22}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}  (ms)")
+    linhas = [("aceite do webhook", resultado["aceite"]), ("ponta a ponta", resultado["ponta_a_ponta"])]
+    linhas += [(f"  {tipo}", valores) for tipo, valores in resultado["ponta_a_ponta_por_tipo"].items()]
+    for nome, valores in linhas:
+        print(f"  {nome:<22}{valores['p50_ms']:>10}{valores['p95_ms']:>10}{valores['p99_ms']:>10}{valores['max_ms']:>10}")
+
+    nos = resultado.get("nos") or {}
+    if nos:
+        print(f"  {'nó (p95 ms)':<22}")
+        for nome, dados in sorted(nos.items(), key=lambda item: -item[1]["p95_ms"]):
+            print(f"    {nome:<20}{dados['p95_ms']:>10}   ({dados['execucoes']} execuções, {dados['erros']} erros)")
+    for exemplo in resultado["exemplos_erro"]:
+        print(f"  erro: {exemplo}")
+
+
+# ==============================================
+# MAIN
+# ==============================================
+
+async def rodar(args: argparse.Namespace) -> Dict[str, Any]:
+    mensagens = gerar_mensagens(args)
+    correlacionador = Correlacionador()
+
+    stubs = criar_stubs(config_dos_argumentos(args))
+    stubs.envios.ouvinte = correlacionador.envio
+    porta_stubs = args.porta_stubs or porta_livre()
+    url_stubs = f"http://127.0.0.1:{porta_stubs}"
+    servidor = uvicorn.Server(uvicorn.Config(stubs.app, host="127.0.0.1", port=porta_stubs, log_level="warning"))
+    tarefa_stubs = asyncio.create_task(servidor.serve())
+
+    processo = None
+    diretorio = Path(tempfile.mkdtemp(prefix="bench-webhooks-"))
+    log_bot = diretorio / "bot.log"
+    limites = httpx.Limits(max_connections=500, max_keepalive_connections=100)
+
+    try:
+        while not servidor.started:
+            await asyncio.sleep(0.05)
+
+        url = args.app_url
+        if url is None:
+            porta_bot = porta_livre()
+            url = f"http://127.0.0.1:{porta_bot}"
+            with open(log_bot, "wb") as saida:
+                processo = subprocess.Popen(
+                    [sys.executable, "-m", "uvicorn", "src.main:app", "--host", "127.0.0.1",
+                     "--port", str(porta_bot), "--log-level", "warning"],
+                    cwd=RAIZ, env=ambiente_bot(url_stubs, _credenciais_google(diretorio, url_stubs), args.log_nivel),
+                    stdout=saida, stderr=subprocess.STDOUT,
+                )
+        print(f"Stubs em {url_stubs}; bot em {url}" + (f" (log: {log_bot})" if processo else ""))
+
+        async with httpx.AsyncClient(timeout=30.0, limits=limites) as cliente:
+            await _aguardar_saude(cliente, url, processo, args.timeout_inicio)
+
+            if args.aquecimento:
+                aquecimento = gerar_mensagens(argparse.Namespace(**dict(vars(args), mensagens=args.aquecimento)))
+                await executar_carga(cliente, url, aquecimento, correlacionador, args.timeout_resposta)
+                correlacionador = Correlacionador()
+                stubs.envios.ouvinte = correlacionador.envio
+                stubs.contadores.chamadas.clear()
+                stubs.contadores.erros.clear()
+
+            inicio, fim = await executar_carga(cliente, url, mensagens, correlacionador, args.timeout_resposta)
+            resultado = resumir(args, mensagens, inicio, fim)
+            resultado["stubs"] = {"chamadas": stubs.contadores.chamadas, "erros_injetados": stubs.contadores.erros}
+
+            try:
+                resultado["nos"] = (await cliente.get(f"{url}/metrics/nos")).json().get("nos", {})
+            except (httpx.HTTPError, ValueError):
+                resultado["nos"] = {}
+
+        return resultado
+
+    finally:
+        if processo is not None:
+            processo.terminate()
+            try:
+                processo.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                processo.kill()
+        servidor.should_exit = True
+        await tarefa_stubs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Reproduz webhooks da Evolution API contra o bot e mede latência, vazão e erros",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--cenario", choices=CENARIOS, default="texto")
+    parser.add_argument("--taxa", type=float, default=2.0, help="mensagens por segundo")
+    parser.add_argument("--mensagens", type=int, default=50)
+    parser.add_argument("--contatos", type=int, default=20, help="contatos sorteados (texto, audio, imagem, misto)")
+    parser.add_argument("--rajada", type=int, default=5, help="mensagens por rajada (cenário rajada)")
+    parser.add_argument("--intervalo-rajada-ms", type=float, default=150.0)
+    parser.add_argument("--gravados", type=Path, help="JSONL ou diretório com webhooks gravados (cenário gravado)")
+    parser.add_argument("--manter-numeros", action="store_true", help="não troca o número dos gravados")
+    parser.add_argument("--aquecimento", type=int, default=3, help="mensagens enviadas antes da medição")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--timeout-resposta", type=float, default=90.0,
+                        help="espera (s) pelas respostas após o último envio")
+    parser.add_argument("--timeout-inicio", type=float, default=60.0)
+    parser.add_argument("--app-url", help="bot já em execução (não inicia o subprocesso)")
+    parser.add_argument("--porta-stubs", type=int, default=0)
+    parser.add_argument("--log-nivel", default="WARNING", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    parser.add_argument("--saida", type=Path, help="grava o resultado em JSON")
+    adicionar_argumentos_latencia(parser)
+    args = parser.parse_args()
+
+    if args.cenario == "gravado" and not args.gravados:
+        parser.error("o cenário gravado exige --gravados")
+    if args.taxa <= 0 or args.mensagens <= 0:
+        parser.error("--taxa e --mensagens devem ser positivos")
+
+    resultado = asyncio.run(rodar(args))
+    imprimir(resultado)
+
+    if args.saida:
+        args.saida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False))
+        print(f"\nResultado gravado em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
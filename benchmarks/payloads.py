@@ -0,0 +1,164 @@
+"""
+Webhooks da Evolution API (messages.upsert) para o gerador de carga.
+
+Sintéticos (texto, áudio e imagem com mídia inline em base64, como a
+Evolution envia com WEBHOOK_BASE64=true) ou gravados: um JSON por linha,
+com o corpo do webhook (ou `{"body": {...}}`, como em raw_webhook_data),
+ou um diretório com os arquivos salvos por /webhook/debug.
+
+Cada mensagem sintética carrega uma marca `ref<hex>` (no texto, nos bytes
+do áudio ou no comentário do JPEG) que volta na resposta do bot; ver
+stubs.py.
+"""
+
+from __future__ import annotations
+
+import base64
+import io
+import json
+import os
+import random
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+NUMERO_BASE = 556290000000
+
+TEXTOS = [
+    "Oi, boa tarde! Vocês fazem forro de gesso?",
+    "Quanto fica o metro quadrado de drywall?",
+    "Queria agendar uma visita para amanhã à tarde",
+    "Vocês atendem em Aparecida de Goiânia?",
+    "Preciso de uma divisória para o escritório, 12 metros",
+    "Tem horário na sexta de manhã?",
+]
+
+
+def nova_marca() -> str:
+    """Marca de correlação (ver stubs.PADRAO_MARCA)."""
+    return f"ref{uuid.uuid4().hex[:10]}"
+
+
+def numero_contato(indice: int) -> str:
+    """Número de WhatsApp do contato sintético `indice`."""
+    return str(NUMERO_BASE + indice)
+
+
+def _webhook(numero: str, tipo: str, mensagem: Dict[str, Any], nome: str) -> Dict[str, Any]:
+    # "event" e "fromMe" primeiro: o pré-filtro do endpoint lê só o início do corpo
+    return {
+        "event": "messages.upsert",
+        "instance": "bench",
+        "data": {
+            "key": {
+                "fromMe": False,
+                "remoteJid": f"{numero}@s.whatsapp.net",
+                "id": uuid.uuid4().hex[:20].upper(),
+            },
+            "pushName": nome,
+            "message": mensagem,
+            "messageType": tipo,
+            "messageTimestamp": int(time.time()),
+        },
+        "destination": "http://127.0.0.1/webhook/whatsapp",
+        "date_time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "sender": "556200000000@s.whatsapp.net",
+    }
+
+
+def webhook_texto(numero: str, texto: str, nome: str = "Cliente Bench") -> Dict[str, Any]:
+    return _webhook(numero, "conversation", {"conversation": texto}, nome)
+
+
+def webhook_audio(numero: str, audio: bytes, nome: str = "Cliente Bench") -> Dict[str, Any]:
+    return _webhook(numero, "audioMessage", {
+        "audioMessage": {"mimetype": "audio/ogg; codecs=opus", "seconds": 6, "ptt": True},
+        "base64": base64.b64encode(audio).decode(),
+    }, nome)
+
+
+def webhook_imagem(numero: str, imagem: bytes, nome: str = "Cliente Bench") -> Dict[str, Any]:
+    return _webhook(numero, "imageMessage", {
+        "imageMessage": {"mimetype": "image/jpeg", "caption": ""},
+        "base64": base64.b64encode(imagem).decode(),
+    }, nome)
+
+
+def audio_sintetico(marca: str, tamanho_kb: int = 24) -> bytes:
+    """Bytes de um "áudio" OGG com a marca no fim (o stub do Whisper a procura)."""
+    return b"OggS" + os.urandom(tamanho_kb * 1024) + marca.encode()
+
+
+def imagem_sintetica(marca: str, lado: int = 96) -> bytes:
+    """JPEG de ruído (hash perceptual diferente a cada chamada) com a marca no comentário."""
+    from PIL import Image
+
+    imagem = Image.frombytes("L", (lado, lado), os.urandom(lado * lado)).convert("RGB")
+    saida = io.BytesIO()
+    imagem.save(saida, format="JPEG", quality=80, comment=marca.encode())
+    return saida.getvalue()
+
+
+def mensagem_sintetica(tipo: str, numero: str, marca: str, rng: random.Random) -> Dict[str, Any]:
+    """Webhook sintético do tipo pedido (texto, audio ou imagem)."""
+    if tipo == "audio":
+        return webhook_audio(numero, audio_sintetico(marca))
+    if tipo == "imagem":
+        return webhook_imagem(numero, imagem_sintetica(marca))
+    return webhook_texto(numero, f"{rng.choice(TEXTOS)} {marca}")
+
+
+# ==============================================
+# GRAVADOS
+# ==============================================
+
+def carregar_gravados(caminho: Path) -> List[Dict[str, Any]]:
+    """
+    Webhooks gravados, só os eventos messages.upsert de clientes.
+
+    Args:
+        caminho: Arquivo JSONL (um webhook por linha) ou diretório com os
+            `webhook_debug_*.json` salvos por /webhook/debug
+    """
+    if caminho.is_dir():
+        corpos = [json.loads(arquivo.read_text(encoding="utf-8")) for arquivo in sorted(caminho.glob("*.json"))]
+    else:
+        with open(caminho, encoding="utf-8") as arquivo:
+            corpos = [json.loads(linha) for linha in arquivo if linha.strip()]
+
+    webhooks = []
+    for corpo in corpos:
+        corpo = corpo.get("body", corpo)
+        if corpo.get("event") == "messages.upsert" and not corpo.get("data", {}).get("key", {}).get("fromMe"):
+            webhooks.append(corpo)
+    return webhooks
+
+
+def reproduzir_gravado(webhook: Dict[str, Any], numero: Optional[str], marca: str) -> Dict[str, Any]:
+    """
+    Cópia de um webhook gravado com id novo e, se possível, a marca no texto.
+
+    Args:
+        webhook: Corpo gravado
+        numero: Novo número do contato (None mantém o original)
+        marca: Marca de correlação (só entra em mensagens de texto)
+    """
+    copia = json.loads(json.dumps(webhook))
+    data = copia.setdefault("data", {})
+    key = data.setdefault("key", {})
+    key["id"] = uuid.uuid4().hex[:20].upper()
+    if numero:
+        key["remoteJid"] = f"{numero}@s.whatsapp.net"
+
+    mensagem = data.get("message") or {}
+    if "conversation" in mensagem:
+        mensagem["conversation"] = f"{mensagem['conversation']} {marca}"
+    elif "text" in mensagem.get("extendedTextMessage", {}):
+        mensagem["extendedTextMessage"]["text"] = f"{mensagem['extendedTextMessage']['text']} {marca}"
+    return copia
+
+
+def ciclo(itens: List[Any]) -> Iterator[Any]:
+    while True:
+        yield from itens
@@ -0,0 +1,672 @@
+"""
+Servidores stub dos serviços externos, com latência configurável.
+
+Um único app FastAPI responde, por prefixo, no lugar de:
+
+- /openai      API da OpenAI (chat com e sem streaming, tool calls,
+               Whisper e embeddings);
+- /supabase    PostgREST do Supabase (tabelas em memória com filtros
+               eq/neq/gt/gte/lt/lte, order, limit, upsert e as funções RPC
+               usadas pelo bot);
+- /evolution   Evolution API (envio de texto, presença, mídia em base64);
+- /google      Google Calendar v3 (eventos em memória, freeBusy) e o
+               endpoint de token OAuth da service account.
+
+Cada serviço tem latência (média e desvio, em ms) e taxa de erro (HTTP 500)
+próprias. As respostas enviadas ao cliente (`sendText`) são registradas com
+o instante de chegada, para o gerador de carga medir a latência ponta a
+ponta.
+
+Correlação: o texto (ou o áudio/imagem) de cada mensagem sintética carrega
+uma marca `ref<10 hex>`; o stub do chat devolve a mesma marca no início da
+resposta, e ela chega intacta no primeiro fragmento enviado.
+
+Uso isolado (bot rodando à parte, apontado para os stubs):
+    python benchmarks/stubs.py --porta 9100 --latencia-openai 800
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import json
+import random
+import re
+import struct
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+PADRAO_MARCA = re.compile(rb"ref[0-9a-f]{10}")
+
+RESPOSTA_PADRAO = (
+    "Olá! Obrigada pela mensagem. Trabalhamos com drywall, gesso, forros e divisórias. "
+    "Posso agendar uma visita técnica para avaliar o seu ambiente? "
+    "Me diga o melhor dia e período para você."
+)
+
+DOCUMENTOS_RAG = [
+    {"id": 1, "content": "Instalação de drywall com visita técnica gratuita.", "metadata": {}, "similarity": 0.82},
+    {"id": 2, "content": "Forros de gesso e PVC, orçamento em até 48h.", "metadata": {}, "similarity": 0.77},
+]
+
+DIMENSAO_EMBEDDING = 1536
+
+
+def extrair_marca(conteudo: bytes) -> Optional[str]:
+    """
+    Última marca `ref<hex>` encontrada nos bytes (None se não houver).
+
+    A última porque o agente manda o histórico e a mensagem atual no mesmo
+    texto, com a mensagem atual no fim.
+    """
+    encontradas = PADRAO_MARCA.findall(conteudo)
+    return encontradas[-1].decode() if encontradas else None
+
+
+# ==============================================
+# CONFIGURAÇÃO
+# ==============================================
+
+@dataclass
+class LatenciaStub:
+    """Latência (ms) e taxa de erro de um serviço stub."""
+
+    media_ms: float = 0.0
+    desvio_ms: float = 0.0
+    taxa_erro: float = 0.0
+
+    async def aguardar(self) -> None:
+        atraso = max(0.0, random.gauss(self.media_ms, self.desvio_ms)) if self.desvio_ms else self.media_ms
+        if atraso:
+            await asyncio.sleep(atraso / 1000)
+
+    def falhar(self) -> bool:
+        return self.taxa_erro > 0 and random.random() < self.taxa_erro
+
+
+@dataclass
+class ConfigStubs:
+    """
+    Latências dos stubs (valores próximos aos de produção por padrão).
+
+    Attributes:
+        taxa_tools: Fração das respostas do agente que pedem o agendamento_tool
+            (exercita o Google Calendar)
+    """
+
+    openai: LatenciaStub = field(default_factory=lambda: LatenciaStub(800, 200))
+    whisper: LatenciaStub = field(default_factory=lambda: LatenciaStub(1200, 300))
+    embeddings: LatenciaStub = field(default_factory=lambda: LatenciaStub(150, 40))
+    supabase: LatenciaStub = field(default_factory=lambda: LatenciaStub(40, 10))
+    evolution: LatenciaStub = field(default_factory=lambda: LatenciaStub(120, 30))
+    calendar: LatenciaStub = field(default_factory=lambda: LatenciaStub(250, 60))
+    taxa_tools: float = 0.2
+
+
+# ==============================================
+# REGISTRO DE ENVIOS
+# ==============================================
+
+class RegistroEnvios:
+    """
+    Mensagens que o bot enviou aos clientes (POST sendText no stub).
+
+    `ouvinte` é chamado a cada envio com (numero, marca, instante), onde
+    instante é `time.perf_counter()` no processo dos stubs.
+    """
+
+    def __init__(self) -> None:
+        self.ouvinte: Optional[Callable[[str, Optional[str], float], None]] = None
+        self.total = 0
+
+    def registrar(self, numero: str, texto: str) -> None:
+        self.total += 1
+        if self.ouvinte is not None:
+            self.ouvinte(numero, extrair_marca(texto.encode()), time.perf_counter())
+
+
+@dataclass
+class ContadoresStubs:
+    """Chamadas recebidas e erros injetados, por serviço."""
+
+    chamadas: Dict[str, int] = field(default_factory=dict)
+    erros: Dict[str, int] = field(default_factory=dict)
+
+    def contar(self, servico: str, erro: bool = False) -> None:
+        self.chamadas[servico] = self.chamadas.get(servico, 0) + 1
+        if erro:
+            self.erros[servico] = self.erros.get(servico, 0) + 1
+
+
+async def _passar_por(servico: str, latencia: LatenciaStub, contadores: ContadoresStubs) -> Optional[Response]:
+    """Aplica a latência; devolve uma resposta de erro se a falha for sorteada."""
+    await latencia.aguardar()
+    falhou = latencia.falhar()
+    contadores.contar(servico, falhou)
+    if falhou:
+        return JSONResponse({"error": {"message": f"erro injetado ({servico})"}}, status_code=500)
+    return None
+
+
+# ==============================================
+# OPENAI
+# ==============================================
+
+def _marca_da_conversa(mensagens: List[Dict[str, Any]]) -> Optional[str]:
+    """Marca da última mensagem do usuário (texto ou imagem em data URL)."""
+    for mensagem in reversed(mensagens):
+        if mensagem.get("role") != "user":
+            continue
+        conteudo = mensagem.get("content")
+        partes = conteudo if isinstance(conteudo, list) else [{"type": "text", "text": conteudo or ""}]
+        for parte in partes:
+            if parte.get("type") == "text":
+                marca = extrair_marca(str(parte.get("text", "")).encode())
+            elif parte.get("type") == "image_url":
+                url = (parte.get("image_url") or {}).get("url", "")
+                marca = extrair_marca(base64.b64decode(url.split(",", 1)[-1])) if url.startswith("data:") else None
+            else:
+                marca = None
+            if marca:
+                return marca
+        return None
+    return None
+
+
+def _resposta_chat(corpo: Dict[str, Any], taxa_tools: float) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """(texto, tool_call) que o modelo stub devolve para a requisição."""
+    mensagens = corpo.get("messages") or []
+    sistema = " ".join(str(m.get("content", "")) for m in mensagens if m.get("role") == "system")
+
+    # Classificador do roteador: sempre manda para o agente
+    if "TRIVIAL" in sistema and "AGENTE" in sistema:
+        return "AGENTE", None
+
+    nomes_tools = {
+        tool.get("function", {}).get("name") for tool in corpo.get("tools") or []
+    }
+    ultima = mensagens[-1] if mensagens else {}
+    if "agendamento_tool" in nomes_tools and ultima.get("role") == "user" and random.random() < taxa_tools:
+        amanha = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+        return "", {
+            "id": f"call_{uuid.uuid4().hex[:12]}",
+            "type": "function",
+            "function": {
+                "name": "agendamento_tool",
+                "arguments": json.dumps({
+                    "nome_cliente": "Cliente Bench",
+                    "telefone_cliente": "62900000000",
+                    "email_cliente": "sememail@gmail.com",
+                    "data_consulta_reuniao": amanha,
+                    "intencao": "consultar",
+                    "informacao_extra": "período da tarde",
+                }),
+            },
+        }
+
+    marca = _marca_da_conversa(mensagens)
+    return (f"{marca} {RESPOSTA_PADRAO}" if marca else RESPOSTA_PADRAO), None
+
+
+def _uso(corpo: Dict[str, Any], texto: str) -> Dict[str, int]:
+    entrada = len(json.dumps(corpo.get("messages") or [])) // 4
+    saida = max(1, len(texto) // 4)
+    return {"prompt_tokens": entrada, "completion_tokens": saida, "total_tokens": entrada + saida}
+
+
+def _eventos_stream(corpo: Dict[str, Any], texto: str, tool_call: Optional[Dict[str, Any]]):
+    base = {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": corpo.get("model", "stub"),
+    }
+
+    def evento(delta: Dict[str, Any], fim: Optional[str] = None, **extra: Any) -> bytes:
+        pedaco = dict(base, choices=[{"index": 0, "delta": delta, "finish_reason": fim}], **extra)
+        return f"data: {json.dumps(pedaco)}\n\n".encode()
+
+    yield evento({"role": "assistant", "content": ""})
+    if tool_call:
+        yield evento({"tool_calls": [dict(tool_call, index=0)]})
+    else:
+        palavras = texto.split(" ")
+        for inicio in range(0, len(palavras), 8):
+            yield evento({"content": " ".join(palavras[inicio:inicio + 8]) + " "})
+    yield evento({}, "tool_calls" if tool_call else "stop")
+
+    if (corpo.get("stream_options") or {}).get("include_usage"):
+        final = dict(base, choices=[], usage=_uso(corpo, texto))
+        yield f"data: {json.dumps(final)}\n\n".encode()
+    yield b"data: [DONE]\n\n"
+
+
+def criar_router_openai(config: ConfigStubs, contadores: ContadoresStubs) -> APIRouter:
+    router = APIRouter()
+
+    @router.post("/v1/chat/completions")
+    async def chat(request: Request):
+        corpo = await request.json()
+        erro = await _passar_por("openai", config.openai, contadores)
+        if erro:
+            return erro
+
+        texto, tool_call = _resposta_chat(corpo, config.taxa_tools)
+        if corpo.get("stream"):
+            return StreamingResponse(_eventos_stream(corpo, texto, tool_call), media_type="text/event-stream")
+
+        mensagem: Dict[str, Any] = {"role": "assistant", "content": texto or None}
+        if tool_call:
+            mensagem["tool_calls"] = [tool_call]
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": corpo.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": mensagem,
+                "finish_reason": "tool_calls" if tool_call else "stop",
+            }],
+            "usage": _uso(corpo, texto),
+        }
+
+    @router.post("/v1/audio/transcriptions")
+    async def transcricao(request: Request):
+        # Multipart lido cru: a marca vem dentro dos bytes do áudio
+        bruto = await request.body()
+        erro = await _passar_por("whisper", config.whisper, contadores)
+        if erro:
+            return erro
+
+        marca = extrair_marca(bruto)
+        texto = "Oi, queria um orçamento de forro de gesso para a sala"
+        return {"text": f"{texto} {marca}" if marca else texto}
+
+    @router.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        corpo = await request.json()
+        erro = await _passar_por("embeddings", config.embeddings, contadores)
+        if erro:
+            return erro
+
+        entradas = corpo.get("input")
+        quantidade = len(entradas) if isinstance(entradas, list) and entradas and not isinstance(entradas[0], int) else 1
+        vetor = [random.uniform(-0.05, 0.05) for _ in range(DIMENSAO_EMBEDDING)]
+        if corpo.get("encoding_format") == "base64":
+            valor: Any = base64.b64encode(struct.pack(f"{DIMENSAO_EMBEDDING}f", *vetor)).decode()
+        else:
+            valor = vetor
+        return {
+            "object": "list",
+            "data": [{"object": "embedding", "index": i, "embedding": valor} for i in range(quantidade)],
+            "model": corpo.get("model", "stub"),
+            "usage": {"prompt_tokens": 8 * quantidade, "total_tokens": 8 * quantidade},
+        }
+
+    return router
+
+
+# ==============================================
+# SUPABASE (PostgREST em memória)
+# ==============================================
+
+_OPERADORES: Dict[str, Callable[[Any, Any], bool]] = {
+    "eq": lambda a, b: a == b,
+    "neq": lambda a, b: a != b,
+    "gt": lambda a, b: a is not None and a > b,
+    "gte": lambda a, b: a is not None and a >= b,
+    "lt": lambda a, b: a is not None and a < b,
+    "lte": lambda a, b: a is not None and a <= b,
+}
+
+_PARAMETROS_RESERVADOS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+def _converter(valor_linha: Any, texto: str) -> Any:
+    """Converte o valor do filtro para o tipo da coluna."""
+    if isinstance(valor_linha, bool):
+        return texto == "true"
+    if isinstance(valor_linha, int):
+        try:
+            return int(texto)
+        except ValueError:
+            return texto
+    if isinstance(valor_linha, float):
+        return float(texto)
+    return texto
+
+
+class BancoMemoria:
+    """Tabelas do PostgREST em memória (id sequencial, created_at automático)."""
+
+    def __init__(self) -> None:
+        self.tabelas: Dict[str, List[Dict[str, Any]]] = {}
+        self._ids: Dict[str, int] = {}
+
+    def _filtrar(self, tabela: str, parametros: Dict[str, str]) -> List[Dict[str, Any]]:
+        linhas = self.tabelas.get(tabela, [])
+        for coluna, expressao in parametros.items():
+            if coluna in _PARAMETROS_RESERVADOS or "." not in expressao:
+                continue
+            operador, valor = expressao.split(".", 1)
+            comparar = _OPERADORES.get(operador)
+            if operador == "is":
+                linhas = [l for l in linhas if (l.get(coluna) is None) == (valor == "null")]
+            elif comparar is not None:
+                linhas = [l for l in linhas if comparar(l.get(coluna), _converter(l.get(coluna), valor))]
+        return linhas
+
+    def selecionar(self, tabela: str, parametros: Dict[str, str]) -> List[Dict[str, Any]]:
+        linhas = list(self._filtrar(tabela, parametros))
+
+        for criterio in reversed([c for c in parametros.get("order", "").split(",") if c]):
+            coluna, _, direcao = criterio.partition(".")
+            linhas.sort(key=lambda l: (l.get(coluna) is None, l.get(coluna)), reverse=direcao.startswith("desc"))
+
+        inicio = int(parametros.get("offset", 0))
+        limite = parametros.get("limit")
+        return linhas[inicio:inicio + int(limite)] if limite else linhas[inicio:]
+
+    def inserir(self, tabela: str, registros: List[Dict[str, Any]], conflito: Optional[str] = None) -> List[Dict[str, Any]]:
+        linhas = self.tabelas.setdefault(tabela, [])
+        resultado = []
+        for registro in registros:
+            existente = None
+            if conflito:
+                chaves = conflito.split(",")
+                existente = next(
+                    (l for l in linhas if all(l.get(c) == registro.get(c) for c in chaves)), None
+                )
+            if existente is not None:
+                existente.update(registro)
+                resultado.append(existente)
+                continue
+
+            self._ids[tabela] = self._ids.get(tabela, 0) + 1
+            linha = {"id": self._ids[tabela], "created_at": datetime.now(timezone.utc).isoformat()}
+            linha.update(registro)
+            linhas.append(linha)
+            resultado.append(linha)
+        return resultado
+
+    def atualizar(self, tabela: str, parametros: Dict[str, str], dados: Dict[str, Any]) -> List[Dict[str, Any]]:
+        linhas = self._filtrar(tabela, parametros)
+        for linha in linhas:
+            linha.update(dados)
+        return linhas
+
+    def remover(self, tabela: str, parametros: Dict[str, str]) -> List[Dict[str, Any]]:
+        removidas = self._filtrar(tabela, parametros)
+        self.tabelas[tabela] = [l for l in self.tabelas.get(tabela, []) if l not in removidas]
+        return removidas
+
+    def contexto_conversa(self, session_id: str, limite: int) -> Dict[str, Any]:
+        """Resultado da função `carregar_contexto_conversa`."""
+        mensagens = [
+            l for tabela, linhas in self.tabelas.items() if tabela != "conversation_summaries"
+            for l in linhas if l.get("session_id") == session_id and "message" in l
+        ]
+        mensagens.sort(key=lambda l: l["id"])
+        resumo = next(
+            (l for l in self.tabelas.get("conversation_summaries", []) if l.get("session_id") == session_id), {}
+        )
+        return {"resumo": resumo.get("resumo"), "mensagens": [l["message"] for l in mensagens[-limite:]]}
+
+
+def criar_router_supabase(config: ConfigStubs, contadores: ContadoresStubs, banco: BancoMemoria) -> APIRouter:
+    router = APIRouter()
+
+    def _representacao(request: Request, linhas: List[Dict[str, Any]], status: int) -> Response:
+        if "return=representation" in request.headers.get("prefer", ""):
+            return JSONResponse(linhas, status_code=status)
+        return Response(status_code=204)
+
+    @router.post("/rest/v1/rpc/{funcao}")
+    async def rpc(funcao: str, request: Request):
+        corpo = await request.json()
+        erro = await _passar_por("supabase", config.supabase, contadores)
+        if erro:
+            return erro
+
+        if funcao == "match_documents":
+            return DOCUMENTOS_RAG[:corpo.get("match_count", len(DOCUMENTOS_RAG))]
+        if funcao == "carregar_contexto_conversa":
+            return banco.contexto_conversa(corpo.get("p_session_id"), corpo.get("p_limite", 10))
+        return []
+
+    @router.get("/rest/v1/{tabela}")
+    async def selecionar(tabela: str, request: Request):
+        erro = await _passar_por("supabase", config.supabase, contadores)
+        return erro or banco.selecionar(tabela, dict(request.query_params))
+
+    @router.post("/rest/v1/{tabela}")
+    async def inserir(tabela: str, request: Request):
+        corpo = await request.json()
+        erro = await _passar_por("supabase", config.supabase, contadores)
+        if erro:
+            return erro
+
+        registros = corpo if isinstance(corpo, list) else [corpo]
+        conflito = request.query_params.get("on_conflict")
+        if conflito is None and "merge-duplicates" in request.headers.get("prefer", ""):
+            # Upsert sem on_conflict usa a chave primária (session_id em conversation_summaries)
+            conflito = "session_id"
+        return _representacao(request, banco.inserir(tabela, registros, conflito), 201)
+
+    @router.patch("/rest/v1/{tabela}")
+    async def atualizar(tabela: str, request: Request):
+        corpo = await request.json()
+        erro = await _passar_por("supabase", config.supabase, contadores)
+        return erro or _representacao(request, banco.atualizar(tabela, dict(request.query_params), corpo), 200)
+
+    @router.delete("/rest/v1/{tabela}")
+    async def remover(tabela: str, request: Request):
+        erro = await _passar_por("supabase", config.supabase, contadores)
+        return erro or _representacao(request, banco.remover(tabela, dict(request.query_params)), 200)
+
+    return router
+
+
+# ==============================================
+# EVOLUTION API
+# ==============================================
+
+def criar_router_evolution(config: ConfigStubs, contadores: ContadoresStubs, envios: RegistroEnvios) -> APIRouter:
+    router = APIRouter()
+
+    @router.post("/message/sendText/{instancia}")
+    async def enviar_texto(instancia: str, request: Request):
+        corpo = await request.json()
+        erro = await _passar_por("evolution", config.evolution, contadores)
+        if erro:
+            return erro
+
+        numero = "".join(c for c in str(corpo.get("number", "")) if c.isdigit())
+        envios.registrar(numero, str(corpo.get("text", "")))
+        return JSONResponse({
+            "key": {"remoteJid": f"{numero}@s.whatsapp.net", "fromMe": True, "id": uuid.uuid4().hex[:20].upper()},
+            "message": {"conversation": corpo.get("text")},
+            "status": "PENDING",
+        }, status_code=201)
+
+    @router.get("/message/media-base64/{instancia}/{mensagem_id}")
+    async def midia(instancia: str, mensagem_id: str):
+        erro = await _passar_por("evolution", config.evolution, contadores)
+        if erro:
+            return erro
+        return {"mimetype": "audio/ogg", "base64": base64.b64encode(b"OggS" + bytes(2048)).decode()}
+
+    @router.api_route("/{caminho:path}", methods=["GET", "POST", "PUT", "DELETE"])
+    async def outros(caminho: str):
+        # sendPresence, markMessageAsRead, checkNumber, fetchProfile...
+        erro = await _passar_por("evolution", config.evolution, contadores)
+        return erro or {"status": "ok"}
+
+    return router
+
+
+# ==============================================
+# GOOGLE CALENDAR
+# ==============================================
+
+def _intervalo(evento: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    return (evento.get("start") or {}).get("dateTime"), (evento.get("end") or {}).get("dateTime")
+
+
+def criar_router_google(config: ConfigStubs, contadores: ContadoresStubs) -> APIRouter:
+    router = APIRouter()
+    eventos: Dict[str, Dict[str, Any]] = {}
+
+    @router.post("/token")
+    async def token():
+        # Token OAuth da service account (token_uri das credenciais geradas)
+        return {"access_token": "stub-token", "expires_in": 3600, "token_type": "Bearer"}
+
+    @router.get("/calendar/v3/calendars/{calendario}/events")
+    async def listar(calendario: str):
+        erro = await _passar_por("calendar", config.calendar, contadores)
+        return erro or {
+            "kind": "calendar#events",
+            "items": list(eventos.values()),
+            "nextSyncToken": uuid.uuid4().hex,
+        }
+
+    @router.post("/calendar/v3/calendars/{calendario}/events")
+    async def inserir(calendario: str, request: Request):
+        corpo = await request.json()
+        erro = await _passar_por("calendar", config.calendar, contadores)
+        if erro:
+            return erro
+        evento = dict(corpo, id=corpo.get("id") or uuid.uuid4().hex, status="confirmed")
+        eventos[evento["id"]] = evento
+        return evento
+
+    @router.api_route("/calendar/v3/calendars/{calendario}/events/{evento_id}", methods=["GET", "PATCH", "PUT", "DELETE"])
+    async def evento(calendario: str, evento_id: str, request: Request):
+        erro = await _passar_por("calendar", config.calendar, contadores)
+        if erro:
+            return erro
+        if evento_id not in eventos:
+            return JSONResponse({"error": {"code": 404, "message": "Not Found"}}, status_code=404)
+        if request.method == "DELETE":
+            eventos.pop(evento_id)
+            return Response(status_code=204)
+        if request.method in ("PATCH", "PUT"):
+            eventos[evento_id].update(await request.json())
+        return eventos[evento_id]
+
+    @router.post("/calendar/v3/freeBusy")
+    async def freebusy(request: Request):
+        corpo = await request.json()
+        erro = await _passar_por("calendar", config.calendar, contadores)
+        if erro:
+            return erro
+        ocupados = [
+            {"start": inicio, "end": fim}
+            for inicio, fim in map(_intervalo, eventos.values()) if inicio and fim
+        ]
+        return {
+            "kind": "calendar#freeBusy",
+            "timeMin": corpo.get("timeMin"),
+            "timeMax": corpo.get("timeMax"),
+            "calendars": {item["id"]: {"busy": ocupados} for item in corpo.get("items") or []},
+        }
+
+    @router.post("/calendar/v3/calendars/{calendario}/events/watch")
+    async def watch(calendario: str):
+        return {"kind": "api#channel", "id": uuid.uuid4().hex, "resourceId": uuid.uuid4().hex}
+
+    return router
+
+
+# ==============================================
+# APP
+# ==============================================
+
+@dataclass
+class Stubs:
+    """App dos stubs e o estado compartilhado com o gerador de carga."""
+
+    app: FastAPI
+    config: ConfigStubs
+    envios: RegistroEnvios
+    contadores: ContadoresStubs
+    banco: BancoMemoria
+
+
+def criar_stubs(config: Optional[ConfigStubs] = None) -> Stubs:
+    """
+    Cria o app com os quatro serviços stub.
+
+    Example:
+        >>> stubs = criar_stubs(ConfigStubs(openai=LatenciaStub(500, 100)))
+        >>> stubs.envios.ouvinte = lambda numero, marca, instante: ...
+    """
+    config = config or ConfigStubs()
+    envios = RegistroEnvios()
+    contadores = ContadoresStubs()
+    banco = BancoMemoria()
+
+    app = FastAPI(title="Stubs de benchmark", docs_url=None, redoc_url=None)
+    app.include_router(criar_router_openai(config, contadores), prefix="/openai")
+    app.include_router(criar_router_supabase(config, contadores, banco), prefix="/supabase")
+    app.include_router(criar_router_google(config, contadores), prefix="/google")
+    app.include_router(criar_router_evolution(config, contadores, envios), prefix="/evolution")
+
+    @app.get("/stats")
+    async def stats():
+        return {"envios": envios.total, "chamadas": contadores.chamadas, "erros": contadores.erros}
+
+    return Stubs(app, config, envios, contadores, banco)
+
+
+def adicionar_argumentos_latencia(parser: argparse.ArgumentParser) -> None:
+    """Opções de latência/erro por serviço (compartilhadas com load_webhooks.py)."""
+    padrao = ConfigStubs()
+    grupo = parser.add_argument_group("stubs (latência em ms)")
+    for servico in ("openai", "whisper", "embeddings", "supabase", "evolution", "calendar"):
+        latencia: LatenciaStub = getattr(padrao, servico)
+        grupo.add_argument(f"--latencia-{servico}", type=float, default=latencia.media_ms)
+        grupo.add_argument(f"--desvio-{servico}", type=float, default=latencia.desvio_ms)
+        grupo.add_argument(f"--erro-{servico}", type=float, default=0.0, help="fração de respostas HTTP 500")
+    grupo.add_argument("--taxa-tools", type=float, default=padrao.taxa_tools,
+                       help="fração das respostas do agente que chamam o agendamento_tool")
+
+
+def config_dos_argumentos(args: argparse.Namespace) -> ConfigStubs:
+    """ConfigStubs a partir das opções de `adicionar_argumentos_latencia`."""
+    valores = vars(args)
+    return ConfigStubs(
+        **{
+            servico: LatenciaStub(
+                valores[f"latencia_{servico}"], valores[f"desvio_{servico}"], valores[f"erro_{servico}"]
+            )
+            for servico in ("openai", "whisper", "embeddings", "supabase", "evolution", "calendar")
+        },
+        taxa_tools=args.taxa_tools,
+    )
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Stubs dos serviços externos do bot")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=9100)
+    adicionar_argumentos_latencia(parser)
+    args = parser.parse_args()
+
+    stubs = criar_stubs(config_dos_argumentos(args))
+    uvicorn.run(stubs.app, host=args.host, port=args.porta, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
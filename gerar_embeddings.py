@@ -11,8 +11,8 @@ Execute após rodar o setup_rag_supabase.sql
 
 import asyncio
 import logging
-from openai import OpenAI
 from src.clients.supabase_client import criar_supabase_client
+from src.clients.openai_client import get_openai_sync_client
 from src.config.settings import get_settings
 
 logging.basicConfig(level=logging.INFO)
@@ -25,7 +25,7 @@ async def gerar_embeddings():
     # Inicializar clientes
     settings = get_settings()
     supabase = criar_supabase_client(settings.supabase_url, settings.supabase_key)
-    openai_client = OpenAI(api_key=settings.openai_api_key)
+    openai_client = get_openai_sync_client()
 
     print("\n" + "="*60)
     print("GERANDO EMBEDDINGS DOS DOCUMENTOS")
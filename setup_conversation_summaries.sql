@@ -0,0 +1,53 @@
+-- ============================================================
+-- RESUMO INCREMENTAL DAS CONVERSAS
+-- Execute este script no SQL Editor do Supabase
+-- (depois de criar message_history - ver CRIAR_TABELA_SUPABASE.md)
+-- ============================================================
+
+-- ============================================================
+-- PASSO 1: TABELA DE RESUMOS (uma linha por sessão)
+-- ============================================================
+CREATE TABLE IF NOT EXISTS public.conversation_summaries (
+    session_id TEXT PRIMARY KEY,
+    resumo TEXT NOT NULL DEFAULT '',
+    ultima_mensagem_id BIGINT NOT NULL DEFAULT 0,  -- último message_history.id já resumido
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Busca das últimas mensagens da sessão por id
+CREATE INDEX IF NOT EXISTS idx_message_history_session_id_id
+ON public.message_history(session_id, id DESC);
+
+
+-- ============================================================
+-- PASSO 2: RESUMO + ÚLTIMAS N MENSAGENS EM UMA CONSULTA
+-- ============================================================
+CREATE OR REPLACE FUNCTION public.carregar_contexto_conversa(
+    p_session_id TEXT,
+    p_limite INT DEFAULT 10
+)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT jsonb_build_object(
+        'resumo', (
+            SELECT s.resumo
+            FROM public.conversation_summaries s
+            WHERE s.session_id = p_session_id
+        ),
+        'mensagens', COALESCE((
+            SELECT jsonb_agg(m.message ORDER BY m.id)
+            FROM (
+                SELECT id, message
+                FROM public.message_history
+                WHERE session_id = p_session_id
+                ORDER BY id DESC
+                LIMIT p_limite
+            ) m
+        ), '[]'::jsonb)
+    );
+$$;
+
+-- Verificar
+SELECT public.carregar_contexto_conversa('556299999999', 10);
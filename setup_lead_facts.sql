@@ -0,0 +1,12 @@
+-- ============================================================
+-- FATOS ESTRUTURADOS DO CLIENTE
+-- Execute este script no SQL Editor do Supabase
+-- ============================================================
+
+-- Registro por lead: nome, endereco, email, periodo_preferido, tipo_servico.
+-- Atualizado pelo bot depois de cada resposta e injetado no prompt do agente.
+ALTER TABLE public.leads
+ADD COLUMN IF NOT EXISTS fatos JSONB NOT NULL DEFAULT '{}'::jsonb;
+
+-- Verificar
+SELECT phone_numero, fatos FROM public.leads LIMIT 5;
@@ -0,0 +1,22 @@
+"""
+Módulo de caches em memória.
+"""
+
+from .image_cache import (
+    ImageDescriptionCache,
+    calcular_chave_imagem,
+    distancia_hamming,
+    get_image_cache,
+)
+from .media_store import EscritaMidia, MediaStore, eh_referencia_midia, get_media_store
+
+__all__ = [
+    "ImageDescriptionCache",
+    "calcular_chave_imagem",
+    "distancia_hamming",
+    "get_image_cache",
+    "MediaStore",
+    "EscritaMidia",
+    "eh_referencia_midia",
+    "get_media_store",
+]
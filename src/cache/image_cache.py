@@ -0,0 +1,316 @@
+"""
+Cache de descrições de imagens por hash perceptual.
+
+Clientes reenviam a mesma foto com frequência (ou encaminham uma imagem que
+outro lead já mandou). Este módulo evita uma nova chamada ao GPT-4o Vision
+nesses casos, reaproveitando a descrição "te enviei uma imagem que..." já gerada.
+
+A chave do cache é um dHash de 64 bits da imagem decodificada, de modo que
+recompressões e redimensionamentos da mesma foto também acertam o cache.
+Buscas exatas são O(1) (dicionário); buscas aproximadas usam uma BK-tree
+pequena por distância de Hamming.
+
+Se o Pillow não estiver instalado, o cache degrada para SHA-256 dos bytes
+(apenas reenvios idênticos acertam).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - depende do ambiente
+    Image = None
+
+ChaveImagem = Union[int, str]
+
+# Dimensões do dHash: 9x8 pixels geram 8x8 = 64 comparações
+_DHASH_LARGURA = 9
+_DHASH_ALTURA = 8
+
+
+# ==============================================
+# HASH PERCEPTUAL
+# ==============================================
+
+def distancia_hamming(a: int, b: int) -> int:
+    """
+    Calcula a distância de Hamming entre dois hashes de 64 bits.
+
+    Example:
+        >>> distancia_hamming(0b1011, 0b0011)
+        1
+    """
+    return (a ^ b).bit_count()
+
+
+def _calcular_dhash(image_bytes: bytes) -> int:
+    """
+    Calcula o dHash (difference hash) de 64 bits de uma imagem.
+
+    Raises:
+        Exception: Se os bytes não forem uma imagem válida
+    """
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        # draft() permite que o decoder JPEG reduza a imagem durante a
+        # decodificação, evitando descompactar a foto em resolução total
+        img.draft("L", (_DHASH_LARGURA * 8, _DHASH_ALTURA * 8))
+        reduzida = img.convert("L").resize(
+            (_DHASH_LARGURA, _DHASH_ALTURA),
+            Image.Resampling.BILINEAR
+        )
+        pixels = reduzida.tobytes()
+
+    valor = 0
+    for linha in range(_DHASH_ALTURA):
+        base = linha * _DHASH_LARGURA
+        for coluna in range(_DHASH_LARGURA - 1):
+            valor = (valor << 1) | (pixels[base + coluna] > pixels[base + coluna + 1])
+
+    return valor
+
+
+def calcular_chave_imagem(image_bytes: bytes) -> ChaveImagem:
+    """
+    Calcula a chave de cache de uma imagem decodificada.
+
+    Args:
+        image_bytes: Bytes da imagem (JPEG, PNG, WebP...)
+
+    Returns:
+        int com o hash perceptual de 64 bits, ou str "sha256:..." quando
+        o Pillow não está disponível ou a imagem não pôde ser decodificada
+
+    Example:
+        >>> chave = calcular_chave_imagem(base64.b64decode(base64_data))
+    """
+    if Image is not None:
+        try:
+            return _calcular_dhash(image_bytes)
+        except Exception as e:
+            logger.warning(f"Nao foi possivel calcular hash perceptual da imagem: {e}")
+
+    return "sha256:" + hashlib.sha256(image_bytes).hexdigest()
+
+
+# ==============================================
+# BK-TREE
+# ==============================================
+
+class _BKTree:
+    """
+    BK-tree para busca de hashes por distância de Hamming.
+
+    Cada nó é uma lista [hash, {distancia: filho}]. A árvore não suporta
+    remoção; entradas removidas do cache são ignoradas na busca e a árvore
+    é reconstruída quando acumula muitas entradas mortas.
+    """
+
+    def __init__(self) -> None:
+        self._raiz: Optional[list] = None
+
+    def inserir(self, valor: int) -> None:
+        if self._raiz is None:
+            self._raiz = [valor, {}]
+            return
+
+        no = self._raiz
+        while True:
+            distancia = distancia_hamming(valor, no[0])
+            if distancia == 0:
+                return
+
+            filho = no[1].get(distancia)
+            if filho is None:
+                no[1][distancia] = [valor, {}]
+                return
+
+            no = filho
+
+    def buscar(self, valor: int, max_distancia: int) -> List[Tuple[int, int]]:
+        """Retorna [(distancia, hash)] ordenado do mais próximo ao mais distante."""
+        if self._raiz is None:
+            return []
+
+        resultados = []
+        pilha = [self._raiz]
+
+        while pilha:
+            no = pilha.pop()
+            distancia = distancia_hamming(valor, no[0])
+
+            if distancia <= max_distancia:
+                resultados.append((distancia, no[0]))
+
+            for distancia_filho, filho in no[1].items():
+                if distancia - max_distancia <= distancia_filho <= distancia + max_distancia:
+                    pilha.append(filho)
+
+        resultados.sort()
+        return resultados
+
+
+# ==============================================
+# CACHE
+# ==============================================
+
+class ImageDescriptionCache:
+    """
+    Cache em memória (por processo) de descrições de imagem com TTL.
+
+    Attributes:
+        ttl: Tempo de vida de cada descrição (segundos)
+        max_entries: Número máximo de entradas mantidas
+        max_distance: Distância de Hamming máxima para considerar a mesma imagem
+    """
+
+    def __init__(self, ttl: int = 86400, max_entries: int = 1000, max_distance: int = 6) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+
+        # Ordem de inserção == ordem de expiração (TTL fixo)
+        self._entradas: "OrderedDict[ChaveImagem, Tuple[str, float]]" = OrderedDict()
+        self._arvore = _BKTree()
+        self._removidos_da_arvore = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def buscar(self, chave: ChaveImagem) -> Optional[str]:
+        """
+        Busca a descrição de uma imagem igual ou perceptualmente próxima.
+
+        Args:
+            chave: Chave calculada por calcular_chave_imagem()
+
+        Returns:
+            Descrição em cache ou None
+        """
+        self._expirar()
+
+        entrada = self._entradas.get(chave)
+
+        if entrada is None and isinstance(chave, int) and self.max_distance > 0:
+            for distancia, candidato in self._arvore.buscar(chave, self.max_distance):
+                entrada = self._entradas.get(candidato)
+                if entrada is not None:
+                    logger.info(f"Cache de imagem: hash proximo encontrado (distancia {distancia})")
+                    break
+
+        if entrada is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entrada[0]
+
+    def armazenar(self, chave: ChaveImagem, descricao: str) -> None:
+        """
+        Armazena a descrição gerada para uma imagem.
+
+        Args:
+            chave: Chave calculada por calcular_chave_imagem()
+            descricao: Descrição gerada pelo modelo de visão
+        """
+        if not descricao:
+            return
+
+        self._expirar()
+
+        if chave in self._entradas:
+            del self._entradas[chave]
+        elif isinstance(chave, int):
+            self._arvore.inserir(chave)
+
+        self._entradas[chave] = (descricao, time.monotonic() + self.ttl)
+
+        while len(self._entradas) > self.max_entries:
+            chave_antiga, _ = self._entradas.popitem(last=False)
+            self._marcar_removido(chave_antiga)
+
+    def limpar(self) -> None:
+        """Remove todas as entradas do cache."""
+        self._entradas.clear()
+        self._arvore = _BKTree()
+        self._removidos_da_arvore = 0
+
+    def estatisticas(self) -> Dict[str, int]:
+        """Retorna contadores de uso do cache."""
+        return {
+            "entradas": len(self._entradas),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _expirar(self) -> None:
+        agora = time.monotonic()
+        while self._entradas:
+            chave, (_, expira_em) = next(iter(self._entradas.items()))
+            if expira_em > agora:
+                break
+            del self._entradas[chave]
+            self._marcar_removido(chave)
+
+    def _marcar_removido(self, chave: ChaveImagem) -> None:
+        if not isinstance(chave, int):
+            return
+
+        self._removidos_da_arvore += 1
+
+        # Reconstruir quando metade da árvore for de entradas mortas
+        if self._removidos_da_arvore > max(len(self._entradas), 32):
+            self._arvore = _BKTree()
+            for chave_viva in self._entradas:
+                if isinstance(chave_viva, int):
+                    self._arvore.inserir(chave_viva)
+            self._removidos_da_arvore = 0
+
+
+# ========== SINGLETON ==========
+
+_image_cache: Optional[ImageDescriptionCache] = None
+
+
+def get_image_cache() -> ImageDescriptionCache:
+    """
+    Retorna a instância singleton do cache de descrições de imagem.
+
+    Example:
+        >>> cache = get_image_cache()
+        >>> descricao = cache.buscar(calcular_chave_imagem(image_bytes))
+    """
+    global _image_cache
+
+    if _image_cache is None:
+        from src.config.settings import get_settings
+
+        settings = get_settings()
+        _image_cache = ImageDescriptionCache(
+            ttl=settings.image_cache_ttl,
+            max_entries=settings.image_cache_max_entries,
+            max_distance=settings.image_cache_max_distance
+        )
+
+        if Image is None:
+            logger.warning("Pillow nao instalado - cache de imagens usara apenas SHA-256")
+
+    return _image_cache
+
+
+# ========== EXPORTAÇÕES ==========
+
+__all__ = [
+    "ImageDescriptionCache",
+    "calcular_chave_imagem",
+    "distancia_hamming",
+    "get_image_cache",
+]
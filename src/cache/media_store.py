@@ -0,0 +1,378 @@
+"""
+Armazenamento temporário de mídias recebidas pelo webhook.
+
+O webhook da Evolution API entrega áudios e imagens em base64 (vários MB).
+Se esse payload ficasse no AgentState, ele seria copiado entre todos os nós
+do LangGraph e ainda duplicado em raw_webhook_data. Em vez disso, o nó
+validar_webhook extrai a mídia uma única vez para este store e guarda no
+estado apenas a referência (mensagem_media_ref). Os bytes só são
+materializados em processar_audio/processar_imagem.
+
+O store mantém as mídias decodificadas em memória até um limite total de
+bytes; acima disso, as entradas mais antigas são despejadas para arquivos
+em disco. Entradas não consumidas expiram após o TTL.
+"""
+
+from __future__ import annotations
+
+import base64
+import logging
+import os
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_PREFIXO_REF = "media:"
+
+
+@dataclass
+class _EntradaMidia:
+    """Mídia armazenada (em memória ou em disco)."""
+
+    mimetype: Optional[str]
+    tamanho: int
+    expira_em: float
+    dados: Optional[bytes] = None
+    caminho: Optional[str] = None
+
+
+# ==============================================
+# STORE DE MÍDIAS
+# ==============================================
+
+class MediaStore:
+    """
+    Store de mídias com limite de memória e despejo para disco.
+
+    Args:
+        max_memory_bytes: Total de bytes mantidos em memória
+        spill_dir: Diretório para mídias despejadas (padrão: diretório temporário do sistema)
+        ttl: Tempo de vida (segundos) de uma mídia não consumida
+
+    Example:
+        >>> store = MediaStore(max_memory_bytes=64 * 1024 * 1024)
+        >>> ref = store.armazenar_base64(base64_audio, "audio/ogg")
+        >>> audio_bytes, mimetype = store.obter(ref)
+        >>> store.remover(ref)
+    """
+
+    def __init__(
+        self,
+        max_memory_bytes: int = 64 * 1024 * 1024,
+        spill_dir: Optional[str] = None,
+        ttl: int = 600
+    ) -> None:
+        self.max_memory_bytes = max_memory_bytes
+        self.spill_dir = spill_dir or os.path.join(tempfile.gettempdir(), "whatsapp-bot-media")
+        self.ttl = ttl
+
+        self._entradas: "OrderedDict[str, _EntradaMidia]" = OrderedDict()
+        self._bytes_em_memoria = 0
+        self._despejos = 0
+
+    def armazenar(self, dados: bytes, mimetype: Optional[str] = None) -> str:
+        """
+        Armazena bytes de uma mídia e retorna a referência para o estado.
+
+        Args:
+            dados: Bytes da mídia
+            mimetype: Mimetype informado pelo WhatsApp
+
+        Returns:
+            str: Referência no formato "media:<uuid>"
+        """
+        self._expirar()
+
+        ref = _novo_ref()
+        entrada = _EntradaMidia(
+            mimetype=mimetype,
+            tamanho=len(dados),
+            expira_em=time.monotonic() + self.ttl
+        )
+        self._entradas[ref] = entrada
+
+        if entrada.tamanho > self.max_memory_bytes:
+            # Mídia maior que o limite inteiro vai direto para disco
+            self._gravar_em_disco(ref, entrada, dados)
+        else:
+            entrada.dados = dados
+            self._bytes_em_memoria += entrada.tamanho
+            self._liberar_memoria()
+
+        logger.info(f"Midia armazenada: {ref} ({entrada.tamanho} bytes, {mimetype})")
+        return ref
+
+    def criar_escrita(self, mimetype: Optional[str] = None) -> "EscritaMidia":
+        """
+        Abre uma escrita incremental (bytes chegam em pedaços).
+
+        Usada pelo parser de webhook em streaming, que decodifica o base64
+        à medida que o corpo da requisição chega.
+
+        Args:
+            mimetype: Mimetype, se já conhecido
+
+        Returns:
+            EscritaMidia: Escrita a ser concluída com concluir() ou descartar()
+        """
+        return EscritaMidia(self, mimetype)
+
+    def definir_mimetype(self, ref: str, mimetype: Optional[str]) -> None:
+        """Define o mimetype de uma mídia gravada antes de ele ser conhecido."""
+        entrada = self._entradas.get(ref)
+        if entrada is not None and mimetype:
+            entrada.mimetype = mimetype
+
+    def armazenar_base64(self, base64_data: str, mimetype: Optional[str] = None) -> str:
+        """
+        Decodifica um payload base64 e armazena os bytes.
+
+        Args:
+            base64_data: Mídia em base64 (como entregue pelo webhook)
+            mimetype: Mimetype informado pelo WhatsApp
+
+        Returns:
+            str: Referência da mídia
+        """
+        return self.armazenar(base64.b64decode(base64_data), mimetype)
+
+    def obter(self, ref: str) -> Optional[Tuple[bytes, Optional[str]]]:
+        """
+        Materializa os bytes de uma mídia.
+
+        Args:
+            ref: Referência retornada por armazenar()
+
+        Returns:
+            Tupla (bytes, mimetype) ou None se a mídia não existe ou expirou
+        """
+        entrada = self._entradas.get(ref)
+
+        if entrada is None:
+            return None
+
+        if entrada.expira_em <= time.monotonic():
+            self.remover(ref)
+            return None
+
+        if entrada.dados is not None:
+            return entrada.dados, entrada.mimetype
+
+        try:
+            with open(entrada.caminho, "rb") as arquivo:
+                return arquivo.read(), entrada.mimetype
+        except OSError as e:
+            logger.error(f"Erro ao ler midia despejada {ref}: {e}")
+            self.remover(ref)
+            return None
+
+    def remover(self, ref: str) -> None:
+        """Remove uma mídia já consumida (memória e disco)."""
+        entrada = self._entradas.pop(ref, None)
+
+        if entrada is None:
+            return
+
+        if entrada.dados is not None:
+            self._bytes_em_memoria -= entrada.tamanho
+
+        if entrada.caminho:
+            try:
+                os.unlink(entrada.caminho)
+            except OSError:
+                pass
+
+    def limpar(self) -> None:
+        """Remove todas as mídias."""
+        for ref in list(self._entradas):
+            self.remover(ref)
+
+    def estatisticas(self) -> Dict[str, int]:
+        """Retorna contadores do store."""
+        em_disco = sum(1 for e in self._entradas.values() if e.caminho)
+        return {
+            "entradas": len(self._entradas),
+            "em_disco": em_disco,
+            "bytes_em_memoria": self._bytes_em_memoria,
+            "despejos": self._despejos,
+        }
+
+    def _liberar_memoria(self) -> None:
+        """Despeja as mídias mais antigas para disco até caber no limite."""
+        for ref, entrada in list(self._entradas.items()):
+            if self._bytes_em_memoria <= self.max_memory_bytes:
+                break
+            if entrada.dados is None:
+                continue
+
+            dados = entrada.dados
+            entrada.dados = None
+            self._bytes_em_memoria -= entrada.tamanho
+            self._gravar_em_disco(ref, entrada, dados)
+
+    def _gravar_em_disco(self, ref: str, entrada: _EntradaMidia, dados: bytes) -> None:
+        """Grava uma mídia no diretório de despejo."""
+        caminho = self._caminho_despejo(ref)
+
+        with open(caminho, "wb") as arquivo:
+            arquivo.write(dados)
+
+        entrada.caminho = caminho
+        self._despejos += 1
+        logger.info(f"Midia despejada para disco: {ref} ({entrada.tamanho} bytes)")
+
+    def _caminho_despejo(self, ref: str) -> str:
+        """Caminho do arquivo de despejo de uma referência."""
+        os.makedirs(self.spill_dir, exist_ok=True)
+        return os.path.join(self.spill_dir, ref[len(_PREFIXO_REF):])
+
+    def _registrar_arquivo(self, ref: str, caminho: str, tamanho: int, mimetype: Optional[str]) -> None:
+        """Registra uma mídia que já foi escrita diretamente em disco."""
+        self._expirar()
+        self._entradas[ref] = _EntradaMidia(
+            mimetype=mimetype,
+            tamanho=tamanho,
+            expira_em=time.monotonic() + self.ttl,
+            caminho=caminho
+        )
+        self._despejos += 1
+        logger.info(f"Midia armazenada em disco: {ref} ({tamanho} bytes, {mimetype})")
+
+    def _expirar(self) -> None:
+        """Remove mídias que nunca foram consumidas."""
+        agora = time.monotonic()
+        for ref in [r for r, e in self._entradas.items() if e.expira_em <= agora]:
+            logger.warning(f"Midia expirada sem ser processada: {ref}")
+            self.remover(ref)
+
+
+class EscritaMidia:
+    """
+    Escrita incremental de uma mídia no store.
+
+    Os bytes ficam em memória até ultrapassar o limite do store; a partir
+    daí a escrita continua direto em arquivo, sem montar a mídia inteira.
+    """
+
+    def __init__(self, store: MediaStore, mimetype: Optional[str] = None) -> None:
+        self.mimetype = mimetype
+        self.tamanho = 0
+
+        self._store = store
+        self._ref = _novo_ref()
+        self._buffer = bytearray()
+        self._arquivo = None
+        self._caminho: Optional[str] = None
+
+    def escrever(self, dados: bytes) -> None:
+        """Acrescenta bytes à mídia."""
+        if not dados:
+            return
+
+        self.tamanho += len(dados)
+
+        if self._arquivo is not None:
+            self._arquivo.write(dados)
+            return
+
+        self._buffer += dados
+
+        if len(self._buffer) > self._store.max_memory_bytes:
+            self._caminho = self._store._caminho_despejo(self._ref)
+            self._arquivo = open(self._caminho, "wb")
+            self._arquivo.write(self._buffer)
+            self._buffer = bytearray()
+
+    def concluir(self) -> Optional[str]:
+        """
+        Finaliza a escrita e registra a mídia no store.
+
+        Returns:
+            Referência da mídia, ou None se nenhum byte foi escrito
+        """
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+            self._store._registrar_arquivo(self._ref, self._caminho, self.tamanho, self.mimetype)
+            return self._ref
+
+        if not self._buffer:
+            return None
+
+        dados = bytes(self._buffer)
+        self._buffer = bytearray()
+        return self._store.armazenar(dados, self.mimetype)
+
+    def descartar(self) -> None:
+        """Abandona a escrita (ex: corpo do webhook inválido)."""
+        self._buffer = bytearray()
+
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+            try:
+                os.unlink(self._caminho)
+            except OSError:
+                pass
+
+
+def _novo_ref() -> str:
+    """Gera uma nova referência de mídia."""
+    return f"{_PREFIXO_REF}{uuid.uuid4().hex}"
+
+
+def eh_referencia_midia(valor: object) -> bool:
+    """
+    Verifica se um valor é uma referência do media store (e não base64).
+
+    Example:
+        >>> eh_referencia_midia("media:0123456789abcdef0123456789abcdef")
+        True
+    """
+    return (
+        isinstance(valor, str)
+        and valor.startswith(_PREFIXO_REF)
+        and len(valor) == len(_PREFIXO_REF) + 32
+    )
+
+
+# ========== SINGLETON ==========
+
+_media_store: Optional[MediaStore] = None
+
+
+def get_media_store() -> MediaStore:
+    """
+    Retorna a instância singleton do store de mídias.
+
+    Example:
+        >>> ref = get_media_store().armazenar_base64(base64_data, "image/jpeg")
+    """
+    global _media_store
+
+    if _media_store is None:
+        from src.config.settings import get_settings
+
+        settings = get_settings()
+        _media_store = MediaStore(
+            max_memory_bytes=settings.media_store_max_memory_mb * 1024 * 1024,
+            spill_dir=settings.media_store_spill_dir or None,
+            ttl=settings.media_store_ttl
+        )
+
+    return _media_store
+
+
+# ========== EXPORTAÇÕES ==========
+
+__all__ = [
+    "MediaStore",
+    "EscritaMidia",
+    "eh_referencia_midia",
+    "get_media_store",
+]
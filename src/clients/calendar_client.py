@@ -0,0 +1,303 @@
+"""
+Cliente Google Calendar compartilhado pelo processo.
+
+As credenciais da Service Account são lidas uma única vez e reaproveitadas
+(o google-auth renova o token de acesso automaticamente quando expira).
+O serviço é construído com o documento de discovery embutido na biblioteca
+(static_discovery=True), sem buscar nem reparsear o discovery a cada chamada.
+
+A googleapiclient faz I/O síncrono (httplib2). O CalendarGateway executa as
+requisições em um pool de threads limitado, com timeout, para que as tools
+assíncronas de agendamento nunca bloqueiem o event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import httplib2
+from google.oauth2 import service_account
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build
+from googleapiclient.http import HttpRequest
+
+from src.config.settings import get_settings
+from src.monitoring import SERVICO_CALENDAR, medir_chamada
+
+logger = logging.getLogger(__name__)
+
+SCOPES = ['https://www.googleapis.com/auth/calendar']
+
+_lock = threading.Lock()
+_credenciais: Dict[str, service_account.Credentials] = {}
+_servicos: Dict[Tuple[str, Tuple[str, ...]], Any] = {}
+
+
+def get_calendar_credentials(
+    arquivo_credenciais: Optional[str] = None,
+    scopes: Optional[List[str]] = None
+) -> service_account.Credentials:
+    """
+    Retorna as credenciais da Service Account (carregadas uma vez por arquivo).
+
+    Args:
+        arquivo_credenciais: Caminho do JSON da Service Account
+            (padrão: settings.google_calendar_credentials_file)
+        scopes: Escopos OAuth (padrão: calendar)
+
+    Returns:
+        service_account.Credentials: Credenciais com renovação automática de token
+
+    Raises:
+        FileNotFoundError: Se o arquivo de credenciais não for encontrado
+    """
+    arquivo = arquivo_credenciais or get_settings().google_calendar_credentials_file
+    credenciais = _credenciais.get(arquivo)
+
+    if credenciais is None:
+        if not os.path.exists(arquivo):
+            raise FileNotFoundError(
+                f"Arquivo de credenciais da Service Account não encontrado: {arquivo}"
+            )
+
+        with _lock:
+            credenciais = _credenciais.get(arquivo)
+            if credenciais is None:
+                credenciais = service_account.Credentials.from_service_account_file(
+                    arquivo,
+                    scopes=scopes or SCOPES
+                )
+                _credenciais[arquivo] = credenciais
+                logger.info("Service Account carregada com sucesso")
+
+    return credenciais
+
+
+def _opcoes_cliente() -> Optional[Dict[str, str]]:
+    """client_options do discovery (endpoint alternativo, se configurado)."""
+    endpoint = get_settings().google_calendar_api_endpoint
+    return {"api_endpoint": endpoint} if endpoint else None
+
+
+def get_calendar_service(
+    arquivo_credenciais: Optional[str] = None,
+    scopes: Optional[List[str]] = None
+) -> Any:
+    """
+    Retorna o serviço do Google Calendar singleton.
+
+    Args:
+        arquivo_credenciais: Caminho do JSON da Service Account
+        scopes: Escopos OAuth (padrão: calendar)
+
+    Returns:
+        Resource: Serviço do Google Calendar v3
+
+    Raises:
+        FileNotFoundError: Se o arquivo de credenciais não for encontrado
+
+    Example:
+        >>> service = get_calendar_service()
+        >>> service.events().list(calendarId=CALENDAR_ID).execute()
+    """
+    arquivo = arquivo_credenciais or get_settings().google_calendar_credentials_file
+    chave = (arquivo, tuple(scopes or SCOPES))
+    servico = _servicos.get(chave)
+
+    if servico is None:
+        credenciais = get_calendar_credentials(arquivo, scopes)
+
+        with _lock:
+            servico = _servicos.get(chave)
+            if servico is None:
+                servico = build(
+                    'calendar',
+                    'v3',
+                    credentials=credenciais,
+                    static_discovery=True,
+                    cache_discovery=False,
+                    client_options=_opcoes_cliente()
+                )
+                _servicos[chave] = servico
+                logger.info("Serviço do Google Calendar inicializado (discovery estático)")
+
+    return servico
+
+
+def aquecer_calendar_service() -> bool:
+    """
+    Constrói o serviço na inicialização da aplicação.
+
+    Returns:
+        bool: True se o serviço ficou pronto, False se as credenciais
+        não estão disponíveis (o agendamento reporta o erro na primeira chamada)
+    """
+    try:
+        get_calendar_service()
+        return True
+    except Exception as e:
+        logger.warning(f"Google Calendar não inicializado no startup: {e}")
+        return False
+
+
+def limpar_calendar_service() -> None:
+    """Descarta credenciais e serviços em cache (ex: após trocar o arquivo)."""
+    with _lock:
+        _credenciais.clear()
+        _servicos.clear()
+
+
+# ==============================================
+# GATEWAY ASSÍNCRONO
+# ==============================================
+
+class CalendarTimeoutError(TimeoutError):
+    """O Google Calendar não respondeu dentro do timeout configurado."""
+
+
+class CalendarGateway:
+    """
+    Executa requisições do Google Calendar fora do event loop.
+
+    Cada thread do pool tem seu próprio httplib2.Http autorizado (o Http
+    não é thread-safe); o serviço e as credenciais são compartilhados.
+
+    Args:
+        arquivo_credenciais: Caminho do JSON da Service Account
+        scopes: Escopos OAuth (padrão: calendar)
+        max_workers: Máximo de requisições simultâneas ao Calendar
+        timeout: Timeout (segundos) por requisição, incluindo a espera no pool
+
+    Example:
+        >>> gateway = get_calendar_gateway()
+        >>> service = gateway.service
+        >>> eventos = await gateway.executar(service.events().list(calendarId=CALENDAR_ID))
+    """
+
+    def __init__(
+        self,
+        arquivo_credenciais: Optional[str] = None,
+        scopes: Optional[List[str]] = None,
+        max_workers: int = 4,
+        timeout: float = 15.0
+    ) -> None:
+        self.arquivo_credenciais = arquivo_credenciais
+        self.scopes = scopes
+        self.timeout = timeout
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="calendar")
+        self._local = threading.local()
+
+    @property
+    def service(self) -> Any:
+        """Serviço do Google Calendar (usado apenas para montar requisições)."""
+        return get_calendar_service(self.arquivo_credenciais, self.scopes)
+
+    async def executar(self, requisicao: HttpRequest) -> Dict[str, Any]:
+        """
+        Executa uma requisição montada com service.events().<método>(...).
+
+        Args:
+            requisicao: Requisição da googleapiclient (ainda não executada)
+
+        Returns:
+            Dict: Resposta da API (vazio para DELETE)
+
+        Raises:
+            CalendarTimeoutError: Se o Calendar não responder a tempo
+            HttpError: Erros da API do Google Calendar
+        """
+        operacao = getattr(requisicao, "methodId", None) or "desconhecida"
+
+        with medir_chamada(SERVICO_CALENDAR, operacao):
+            future = self._executor.submit(self._executar_na_thread, requisicao)
+
+            try:
+                resultado = await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                # A thread termina sozinha pelo timeout do httplib2
+                future.cancel()
+                raise CalendarTimeoutError(
+                    f"Google Calendar não respondeu em {self.timeout:.0f}s"
+                ) from None
+
+        return resultado or {}
+
+    def fechar(self) -> None:
+        """Encerra o pool de threads (requisições pendentes são canceladas)."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _executar_na_thread(self, requisicao: HttpRequest) -> Any:
+        """Executa a requisição com o Http autorizado da thread atual."""
+        return requisicao.execute(http=self._http_da_thread())
+
+    def _http_da_thread(self) -> AuthorizedHttp:
+        """Http autorizado exclusivo da thread do pool."""
+        http = getattr(self._local, "http", None)
+
+        if http is None:
+            credenciais = get_calendar_credentials(self.arquivo_credenciais, self.scopes)
+            http = AuthorizedHttp(credenciais, http=httplib2.Http(timeout=self.timeout))
+            self._local.http = http
+
+        return http
+
+
+_gateway: Optional[CalendarGateway] = None
+
+
+def get_calendar_gateway(
+    arquivo_credenciais: Optional[str] = None,
+    scopes: Optional[List[str]] = None
+) -> CalendarGateway:
+    """
+    Retorna o gateway assíncrono singleton do Google Calendar.
+
+    Args:
+        arquivo_credenciais: Caminho do JSON da Service Account (usado na criação)
+        scopes: Escopos OAuth (usados na criação)
+
+    Returns:
+        CalendarGateway: Gateway com pool de threads limitado
+    """
+    global _gateway
+
+    if _gateway is None:
+        settings = get_settings()
+        _gateway = CalendarGateway(
+            arquivo_credenciais=arquivo_credenciais,
+            scopes=scopes,
+            max_workers=settings.google_calendar_max_workers,
+            timeout=settings.google_calendar_timeout
+        )
+
+    return _gateway
+
+
+def fechar_calendar_gateway() -> None:
+    """Encerra o pool do gateway (chamado no shutdown da aplicação)."""
+    global _gateway
+
+    if _gateway is not None:
+        _gateway.fechar()
+        _gateway = None
+
+
+# ========== EXPORTAÇÕES ==========
+
+__all__ = [
+    "SCOPES",
+    "get_calendar_credentials",
+    "get_calendar_service",
+    "aquecer_calendar_service",
+    "limpar_calendar_service",
+    "CalendarTimeoutError",
+    "CalendarGateway",
+    "get_calendar_gateway",
+    "fechar_calendar_gateway",
+]
@@ -0,0 +1,272 @@
+"""
+Registro de clientes OpenAI compartilhados pelo processo.
+
+Os nós de mídia, o agente e o código de embeddings usam os mesmos pools de
+conexão HTTP com api.openai.com, evitando um novo handshake TLS a cada
+mensagem. Limites de pool, keep-alive, timeouts e retries são definidos
+aqui, a partir das configurações, e não em cada chamada.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Dict, Optional, Tuple
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+from src.config.settings import get_settings
+from src.monitoring.prometheus_metrics import CallbackMetricasLLM
+from src.monitoring.tracing import CallbackTracingLLM
+
+logger = logging.getLogger(__name__)
+
+
+# ========== POOLS HTTP ==========
+
+_http_async_client: Optional[httpx.AsyncClient] = None
+_http_sync_client: Optional[httpx.Client] = None
+
+_async_client: Optional[AsyncOpenAI] = None
+_sync_client: Optional[OpenAI] = None
+
+_chat_models: Dict[Tuple[str, float, bool, Optional[float]], ChatOpenAI] = {}
+_embeddings: Dict[str, OpenAIEmbeddings] = {}
+
+
+def _criar_limites() -> Tuple[httpx.Limits, httpx.Timeout]:
+    """Monta limites de pool e timeout a partir das configurações."""
+    settings = get_settings()
+
+    limites = httpx.Limits(
+        max_connections=settings.openai_max_connections,
+        max_keepalive_connections=settings.openai_max_keepalive_connections,
+        keepalive_expiry=settings.openai_keepalive_expiry
+    )
+    timeout = httpx.Timeout(settings.openai_timeout, connect=10.0)
+
+    return limites, timeout
+
+
+def get_http_async_client() -> httpx.AsyncClient:
+    """
+    Retorna o pool HTTP assíncrono compartilhado para a OpenAI.
+
+    Returns:
+        httpx.AsyncClient: Cliente HTTP com keep-alive
+    """
+    global _http_async_client, _async_client
+
+    if _http_async_client is None or _http_async_client.is_closed:
+        limites, timeout = _criar_limites()
+        _http_async_client = httpx.AsyncClient(limits=limites, timeout=timeout)
+
+        # Clientes que apontavam para o pool antigo precisam ser recriados
+        _async_client = None
+        _chat_models.clear()
+        _embeddings.clear()
+        logger.info(
+            f"Pool HTTP OpenAI (async) criado: max_connections={limites.max_connections}, "
+            f"keepalive={limites.max_keepalive_connections}"
+        )
+
+    return _http_async_client
+
+
+def get_http_sync_client() -> httpx.Client:
+    """
+    Retorna o pool HTTP síncrono compartilhado para a OpenAI.
+
+    Usado por integrações LangChain que ainda fazem chamadas síncronas
+    (ex: embeddings do SupabaseVectorStore).
+
+    Returns:
+        httpx.Client: Cliente HTTP com keep-alive
+    """
+    global _http_sync_client, _sync_client
+
+    if _http_sync_client is None or _http_sync_client.is_closed:
+        limites, timeout = _criar_limites()
+        _http_sync_client = httpx.Client(limits=limites, timeout=timeout)
+
+        _sync_client = None
+        _chat_models.clear()
+        _embeddings.clear()
+        logger.info("Pool HTTP OpenAI (sync) criado")
+
+    return _http_sync_client
+
+
+# ========== CLIENTES OPENAI ==========
+
+def get_openai_client() -> AsyncOpenAI:
+    """
+    Retorna o cliente AsyncOpenAI singleton.
+
+    Returns:
+        AsyncOpenAI: Cliente com timeout e retries centralizados
+
+    Example:
+        >>> client = get_openai_client()
+        >>> transcript = await client.audio.transcriptions.create(...)
+    """
+    global _async_client
+
+    http_client = get_http_async_client()
+
+    if _async_client is None:
+        settings = get_settings()
+        _async_client = AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            base_url=settings.openai_base_url,
+            timeout=settings.openai_timeout,
+            max_retries=settings.max_retries,
+            http_client=http_client
+        )
+
+    return _async_client
+
+
+def get_openai_sync_client() -> OpenAI:
+    """
+    Retorna o cliente OpenAI síncrono singleton (scripts e tarefas em lote).
+
+    Returns:
+        OpenAI: Cliente com timeout e retries centralizados
+    """
+    global _sync_client
+
+    http_client = get_http_sync_client()
+
+    if _sync_client is None:
+        settings = get_settings()
+        _sync_client = OpenAI(
+            api_key=settings.openai_api_key,
+            base_url=settings.openai_base_url,
+            timeout=settings.openai_timeout,
+            max_retries=settings.max_retries,
+            http_client=http_client
+        )
+
+    return _sync_client
+
+
+def get_chat_model(
+    model: str = "gpt-4o-2024-11-20",
+    temperature: float = 0.7,
+    streaming: bool = False,
+    timeout: Optional[float] = None
+) -> ChatOpenAI:
+    """
+    Retorna um ChatOpenAI reaproveitável que usa os pools compartilhados.
+
+    Instâncias são cacheadas por (model, temperature, streaming, timeout). Latência
+    e tokens de cada chamada vão para as métricas Prometheus e para o span
+    da chamada.
+
+    Args:
+        model: Nome do modelo
+        temperature: Temperatura de amostragem
+        streaming: Se deve usar streaming
+        timeout: Timeout (segundos) de cada chamada; padrão OPENAI_TIMEOUT
+
+    Returns:
+        ChatOpenAI: Modelo configurado
+
+    Example:
+        >>> llm = get_chat_model("gpt-4o-2024-11-20", temperature=0.9, streaming=True)
+    """
+    http_async_client = get_http_async_client()
+    http_client = get_http_sync_client()
+
+    chave = (model, temperature, streaming, timeout)
+    llm = _chat_models.get(chave)
+
+    if llm is None:
+        settings = get_settings()
+        llm = ChatOpenAI(
+            model=model,
+            temperature=temperature,
+            streaming=streaming,
+            stream_usage=True,
+            timeout=timeout or settings.openai_timeout,
+            max_retries=settings.max_retries,
+            api_key=settings.openai_api_key,
+            base_url=settings.openai_base_url,
+            http_client=http_client,
+            http_async_client=http_async_client,
+            callbacks=[CallbackMetricasLLM(model), CallbackTracingLLM(model)]
+        )
+        _chat_models[chave] = llm
+        logger.info(f"ChatOpenAI registrado: {model} (temperatura {temperature})")
+
+    return llm
+
+
+def get_embeddings(model: str = "text-embedding-3-small") -> OpenAIEmbeddings:
+    """
+    Retorna um OpenAIEmbeddings reaproveitável que usa os pools compartilhados.
+
+    Args:
+        model: Nome do modelo de embeddings
+
+    Returns:
+        OpenAIEmbeddings: Embeddings configurados
+    """
+    http_async_client = get_http_async_client()
+    http_client = get_http_sync_client()
+
+    embeddings = _embeddings.get(model)
+
+    if embeddings is None:
+        settings = get_settings()
+        embeddings = OpenAIEmbeddings(
+            model=model,
+            timeout=settings.openai_timeout,
+            max_retries=settings.max_retries,
+            api_key=settings.openai_api_key,
+            base_url=settings.openai_base_url,
+            http_client=http_client,
+            http_async_client=http_async_client
+        )
+        _embeddings[model] = embeddings
+        logger.info(f"OpenAIEmbeddings registrado: {model}")
+
+    return embeddings
+
+
+async def fechar_clientes_openai() -> None:
+    """
+    Fecha os pools HTTP compartilhados (chamado no shutdown da aplicação).
+    """
+    global _http_async_client, _http_sync_client, _async_client, _sync_client
+
+    try:
+        if _http_async_client is not None:
+            await _http_async_client.aclose()
+        if _http_sync_client is not None:
+            _http_sync_client.close()
+        logger.info("Pools HTTP OpenAI fechados")
+    except Exception as e:
+        logger.error(f"Erro ao fechar pools HTTP OpenAI: {e}")
+    finally:
+        _http_async_client = None
+        _http_sync_client = None
+        _async_client = None
+        _sync_client = None
+        _chat_models.clear()
+        _embeddings.clear()
+
+
+# ========== EXPORTAÇÕES ==========
+
+__all__ = [
+    "get_http_async_client",
+    "get_http_sync_client",
+    "get_openai_client",
+    "get_openai_sync_client",
+    "get_chat_model",
+    "get_embeddings",
+    "fechar_clientes_openai",
+]
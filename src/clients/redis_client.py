@@ -427,10 +427,55 @@ async def criar_redis_queue_from_url(url: str) -> RedisQueue:
         raise
 
 
+# ========== CLIENTE COMPARTILHADO ==========
+
+_redis_compartilhado: Optional[Redis] = None
+
+
+def get_redis_compartilhado() -> Redis:
+    """
+    Retorna o cliente Redis assíncrono do processo (um único pool).
+
+    Usado pelas reservas de horário e pelo outbox de notificações; as
+    respostas vêm decodificadas (decode_responses=True). O pool é fechado
+    no shutdown da aplicação por fechar_redis_compartilhado.
+
+    Returns:
+        Redis: Cliente apontado para REDIS_URL
+    """
+    global _redis_compartilhado
+
+    if _redis_compartilhado is None:
+        from src.config.settings import get_settings
+
+        _redis_compartilhado = aioredis.from_url(get_settings().redis_url, decode_responses=True)
+        logger.info("Cliente Redis compartilhado criado")
+
+    return _redis_compartilhado
+
+
+async def fechar_redis_compartilhado() -> None:
+    """Fecha o pool do cliente compartilhado (chamado no shutdown da aplicação)."""
+    global _redis_compartilhado
+
+    if _redis_compartilhado is None:
+        return
+
+    try:
+        await _redis_compartilhado.close()
+        logger.info("Cliente Redis compartilhado fechado")
+    except Exception as e:
+        logger.error(f"Erro ao fechar cliente Redis compartilhado: {e}")
+    finally:
+        _redis_compartilhado = None
+
+
 # ========== EXPORTAÇÕES ==========
 
 __all__ = [
     "RedisQueue",
     "criar_redis_queue",
     "criar_redis_queue_from_url",
+    "get_redis_compartilhado",
+    "fechar_redis_compartilhado",
 ]
@@ -13,6 +13,8 @@ from typing import Optional, Dict, Any, List
 from supabase import create_client, Client
 from supabase.lib.client_options import ClientOptions
 
+from src.monitoring import instrumentar_supabase
+
 logger = logging.getLogger(__name__)
 
 
@@ -53,7 +55,7 @@ class SupabaseClient:
         self.key = key
 
         try:
-            self.client: Client = create_client(url, key)
+            self.client: Client = instrumentar_supabase(create_client(url, key))
             logger.info(f"Cliente Supabase inicializado: {url}")
         except Exception as e:
             logger.error(f"Erro ao inicializar cliente Supabase: {e}")
@@ -372,10 +374,10 @@ def get_supabase_client() -> Client:
         if not settings.supabase_url or not settings.supabase_key:
             raise ValueError("SUPABASE_URL e SUPABASE_KEY devem estar configurados")
 
-        _supabase_client = create_client(
+        _supabase_client = instrumentar_supabase(create_client(
             settings.supabase_url,
             settings.supabase_key
-        )
+        ))
 
         logger.info(f"Cliente Supabase singleton inicializado: {settings.supabase_url}")
 
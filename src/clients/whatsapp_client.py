@@ -15,6 +15,8 @@ from urllib.parse import quote_plus
 import httpx
 from httpx import AsyncClient, HTTPError, TimeoutException
 
+from src.monitoring import SERVICO_EVOLUTION, medir_chamada, operacao_evolution
+
 logger = logging.getLogger(__name__)
 
 
@@ -103,11 +105,15 @@ class WhatsAppClient:
             HTTPError: Se todas as tentativas falharem
         """
         last_exception = None
+        operacao = operacao_evolution(url)
 
         for attempt in range(self.max_retries):
             try:
-                response = await self.client.request(method, url, **kwargs)
-                response.raise_for_status()
+                # Cada tentativa é medida (e vira um span) separadamente
+                with medir_chamada(SERVICO_EVOLUTION, operacao, tentativa=attempt + 1) as span:
+                    response = await self.client.request(method, url, **kwargs)
+                    span.set_attribute("http.response.status_code", response.status_code)
+                    response.raise_for_status()
                 return response
 
             except (HTTPError, TimeoutException) as e:
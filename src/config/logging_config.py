@@ -0,0 +1,210 @@
+"""
+Configuração de logging do bot (texto ou JSON estruturado), sem bloquear o event loop.
+
+Os nós, o agente e o webhook registram dezenas de linhas por mensagem.
+Com `FileHandler` + `StreamHandler` direto no root logger, cada linha era
+formatada e escrita (I/O síncrono) dentro do event loop. Aqui:
+
+- o root logger tem só um `QueueHandler` que enfileira o `LogRecord` sem
+  formatá-lo; a formatação (`record.getMessage()`, JSON) e a escrita em
+  stdout/arquivo acontecem na thread do `QueueListener`;
+- chamadas no formato `logger.info("... %s", valor)` só montam a string
+  nessa thread (ou nunca, se o nível estiver desligado);
+- cada linha leva o `mensagem_id` da mensagem em processamento (contextvar
+  definida em `processar_mensagem`) e, com tracing ligado, o `trace_id`;
+- linhas DEBUG podem ser amostradas por mensagem (`log_debug_sample_rate`):
+  uma mensagem amostrada tem todas as suas linhas DEBUG, as outras nenhuma.
+
+`LOG_FORMAT=json` gera um objeto JSON por linha (para Loki/ELK/CloudWatch).
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, List, Optional
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # pragma: no cover - depende do ambiente
+    otel_trace = None
+
+FORMATO_TEXTO = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+_mensagem_atual: ContextVar[Optional[str]] = ContextVar("mensagem_log", default=None)
+
+_listener: Optional[QueueListener] = None
+
+
+# ==============================================
+# CORRELAÇÃO
+# ==============================================
+
+def definir_mensagem_log(mensagem_id: Optional[str]) -> None:
+    """
+    Associa as próximas linhas de log (neste contexto) a uma mensagem.
+
+    Tarefas criadas depois (nós do grafo, tools) herdam o valor.
+    """
+    _mensagem_atual.set(mensagem_id or None)
+
+
+def _trace_id_atual() -> Optional[str]:
+    if otel_trace is None:
+        return None
+
+    contexto = otel_trace.get_current_span().get_span_context()
+    return format(contexto.trace_id, "032x") if contexto.is_valid else None
+
+
+class FiltroCorrelacao(logging.Filter):
+    """Adiciona `mensagem_id` e `trace_id` ao registro (roda na thread de quem loga)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.mensagem_id = _mensagem_atual.get()
+        record.trace_id = _trace_id_atual()
+        return True
+
+
+class FiltroAmostragemDebug(logging.Filter):
+    """
+    Mantém só uma fração das linhas DEBUG, decidida por mensagem.
+
+    Args:
+        taxa: Fração das mensagens com DEBUG (1.0 = todas, 0.0 = nenhuma)
+    """
+
+    def __init__(self, taxa: float) -> None:
+        super().__init__()
+        self.taxa = taxa
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.taxa >= 1.0:
+            return True
+        if self.taxa <= 0.0:
+            return False
+
+        mensagem_id = getattr(record, "mensagem_id", None) or _mensagem_atual.get()
+        if mensagem_id:
+            return zlib.crc32(mensagem_id.encode()) % 10000 < self.taxa * 10000
+        return random.random() < self.taxa
+
+
+# ==============================================
+# FORMATAÇÃO
+# ==============================================
+
+class FormatadorJSON(logging.Formatter):
+    """Um objeto JSON por linha, com os campos de correlação."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        registro: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+
+        mensagem_id = getattr(record, "mensagem_id", None)
+        if mensagem_id:
+            registro["mensagem_id"] = mensagem_id
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            registro["trace_id"] = trace_id
+        if record.exc_info:
+            registro["exc"] = self.formatException(record.exc_info)
+
+        return json.dumps(registro, ensure_ascii=False, default=str)
+
+
+class _QueueHandlerSemFormatacao(QueueHandler):
+    """
+    Enfileira o próprio LogRecord, sem formatar na thread de quem loga.
+
+    O `QueueHandler` padrão chama `format()` em `prepare()`; aqui a
+    formatação fica para os handlers do listener. Os argumentos do
+    registro são formatados depois, então não devem ser mutados após o log
+    (no código do bot eles são strings, números e cópias).
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+# ==============================================
+# CONFIGURAÇÃO
+# ==============================================
+
+def configurar_logging(
+    nivel: str = "INFO",
+    formato: str = "texto",
+    arquivo: Optional[str] = "bot.log",
+    taxa_debug: float = 1.0
+) -> None:
+    """
+    Configura o root logger com um handler em fila (não bloqueante).
+
+    Como `logging.basicConfig`, não faz nada se o root logger já tiver
+    handlers (ex: configurado pelo pytest ou chamado duas vezes).
+
+    Args:
+        nivel: Nível do root logger (DEBUG, INFO, ...)
+        formato: "texto" (formato clássico) ou "json" (uma linha JSON por registro)
+        arquivo: Arquivo de log adicional ao stdout (None/"" desativa)
+        taxa_debug: Fração das mensagens cujas linhas DEBUG são mantidas
+    """
+    global _listener
+
+    raiz = logging.getLogger()
+    if raiz.handlers:
+        return
+
+    formatador = FormatadorJSON() if formato == "json" else logging.Formatter(FORMATO_TEXTO)
+
+    destinos: List[logging.Handler] = [logging.StreamHandler(sys.stdout if formato == "json" else None)]
+    if arquivo:
+        destinos.append(logging.FileHandler(arquivo, encoding="utf-8"))
+    for destino in destinos:
+        destino.setFormatter(formatador)
+
+    fila: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    handler = _QueueHandlerSemFormatacao(fila)
+    handler.addFilter(FiltroCorrelacao())
+    handler.addFilter(FiltroAmostragemDebug(taxa_debug))
+
+    _listener = QueueListener(fila, *destinos, respect_handler_level=True)
+    _listener.start()
+    atexit.register(parar_logging)
+
+    raiz.setLevel(getattr(logging, nivel))
+    raiz.addHandler(handler)
+
+
+def parar_logging() -> None:
+    """Esvazia a fila e para a thread de escrita (chamado no encerramento)."""
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+# ========== EXPORTAÇÕES ==========
+
+__all__ = [
+    "FORMATO_TEXTO",
+    "definir_mensagem_log",
+    "FiltroCorrelacao",
+    "FiltroAmostragemDebug",
+    "FormatadorJSON",
+    "configurar_logging",
+    "parar_logging",
+]
@@ -31,11 +31,43 @@ class Settings(BaseSettings):
         min_length=20
     )
 
+    openai_base_url: Optional[str] = Field(
+        default=None,
+        description="URL base da API da OpenAI (proxy, gateway ou servidor stub dos benchmarks)"
+    )
+
+    openai_timeout: float = Field(
+        default=60.0,
+        description="Timeout em segundos para chamadas à API da OpenAI",
+        gt=0,
+        le=300
+    )
+
+    openai_max_connections: int = Field(
+        default=20,
+        description="Máximo de conexões HTTP simultâneas com a API da OpenAI",
+        ge=1,
+        le=200
+    )
+
+    openai_max_keepalive_connections: int = Field(
+        default=10,
+        description="Máximo de conexões keep-alive ociosas mantidas com a API da OpenAI",
+        ge=0,
+        le=200
+    )
+
+    openai_keepalive_expiry: float = Field(
+        default=60.0,
+        description="Tempo em segundos que uma conexão ociosa com a OpenAI é mantida aberta",
+        ge=0
+    )
+
     # ========== SUPABASE ==========
     supabase_url: str = Field(
         ...,
-        description="URL do projeto Supabase",
-        pattern=r"^https://.*\.supabase\.co$"
+        description="URL do projeto Supabase (ou de uma instância local/self-hosted)",
+        pattern=r"^https?://.+"
     )
 
     supabase_key: str = Field(
@@ -111,6 +143,86 @@ class Settings(BaseSettings):
         description="Timezone para o Google Calendar"
     )
 
+    google_calendar_api_endpoint: Optional[str] = Field(
+        default=None,
+        description="Endpoint alternativo da API do Google Calendar (ex: servidor stub dos benchmarks)"
+    )
+
+    google_calendar_timeout: float = Field(
+        default=15.0,
+        description="Timeout em segundos para cada chamada ao Google Calendar",
+        gt=0,
+        le=120
+    )
+
+    google_calendar_max_workers: int = Field(
+        default=4,
+        description="Máximo de chamadas simultâneas ao Google Calendar (threads do gateway)",
+        ge=1,
+        le=32
+    )
+
+    calendar_cache_ttl: int = Field(
+        default=60,
+        description="Tempo de vida (segundos) do cache de horários ocupados por dia",
+        ge=0,
+        le=3600
+    )
+
+    calendar_sync_enabled: bool = Field(
+        default=False,
+        description="Manter índice local da agenda via sincronização incremental (syncToken)"
+    )
+
+    calendar_sync_interval: int = Field(
+        default=30,
+        description="Intervalo (segundos) entre sincronizações incrementais da agenda",
+        ge=5,
+        le=3600
+    )
+
+    calendar_webhook_url: Optional[str] = Field(
+        default=None,
+        description="URL pública HTTPS de /webhook/calendar para notificações push do Calendar"
+    )
+
+    calendar_webhook_token: Optional[str] = Field(
+        default=None,
+        description="Token de validação do canal de push (header X-Goog-Channel-Token)"
+    )
+
+    slot_reservation_backend: str = Field(
+        default="memoria",
+        description="Onde ficam as reservas de horário durante o agendamento (memoria ou redis)",
+        pattern=r"^(memoria|redis)$"
+    )
+
+    slot_reservation_ttl: int = Field(
+        default=30,
+        description="Duração máxima (segundos) da reserva de um horário",
+        ge=5,
+        le=300
+    )
+
+    # ========== OUTBOX DE NOTIFICAÇÕES ==========
+    outbox_backend: str = Field(
+        default="memoria",
+        description="Onde fica a fila de notificações aos técnicos (memoria ou redis)",
+        pattern=r"^(memoria|redis)$"
+    )
+
+    outbox_stream: str = Field(
+        default="outbox:notificacoes",
+        description="Nome do Redis Stream do outbox de notificações",
+        min_length=1
+    )
+
+    outbox_idempotency_ttl: int = Field(
+        default=604800,
+        description="Tempo (segundos) que as chaves de idempotência do outbox são lembradas",
+        ge=60
+    )
+
     # ========== CONFIGURAÇÕES DO BOT ==========
     bot_phone_number: str = Field(
         default="555195877046",
@@ -147,11 +259,98 @@ class Settings(BaseSettings):
         le=10
     )
 
+    agent_context_max_tokens: int = Field(
+        default=8000,
+        description="Orçamento de tokens do prompt do agente (system + histórico + RAG + tools)",
+        ge=1000,
+        le=128000
+    )
+
     enable_memory_persistence: bool = Field(
         default=True,
         description="Habilitar persistência de memória no PostgreSQL"
     )
 
+    conversation_summary_enabled: bool = Field(
+        default=True,
+        description="Manter resumo incremental da conversa em conversation_summaries"
+    )
+
+    summary_model: str = Field(
+        default="gpt-4o-mini",
+        description="Modelo usado para atualizar o resumo das conversas"
+    )
+
+    router_enabled: bool = Field(
+        default=True,
+        description="Responder saudações e agradecimentos com o modelo pequeno, sem o agente completo"
+    )
+
+    router_model: str = Field(
+        default="gpt-4o-mini",
+        description="Modelo pequeno usado pelo roteador (classificação e respostas triviais)"
+    )
+
+    # ========== CACHE DE IMAGENS ==========
+    image_cache_ttl: int = Field(
+        default=86400,
+        description="Tempo de vida (segundos) das descrições de imagem em cache",
+        ge=60
+    )
+
+    image_cache_max_entries: int = Field(
+        default=1000,
+        description="Número máximo de descrições de imagem mantidas em cache",
+        ge=10
+    )
+
+    image_cache_max_distance: int = Field(
+        default=6,
+        description="Distância de Hamming máxima entre hashes perceptuais para considerar a mesma imagem",
+        ge=0,
+        le=16
+    )
+
+    # ========== STORE DE MÍDIAS ==========
+    media_store_max_memory_mb: int = Field(
+        default=64,
+        description="Memória máxima (MB) para mídias aguardando processamento; o excedente vai para disco",
+        ge=1
+    )
+
+    media_store_spill_dir: str = Field(
+        default="",
+        description="Diretório para mídias despejadas da memória (vazio = diretório temporário do sistema)"
+    )
+
+    media_store_ttl: int = Field(
+        default=600,
+        description="Tempo de vida (segundos) de uma mídia que não foi processada",
+        ge=30
+    )
+
+    # ========== MONITORAMENTO ==========
+    tracing_enabled: bool = Field(
+        default=False,
+        description="Exporta traces OpenTelemetry (webhook -> grafo -> chamadas externas)"
+    )
+
+    tracing_exporter: str = Field(
+        default="console",
+        description="Destino dos spans (console, arquivo ou otlp)",
+        pattern=r"^(console|arquivo|otlp)$"
+    )
+
+    tracing_file: str = Field(
+        default="traces.jsonl",
+        description="Arquivo dos spans (um JSON por linha) quando tracing_exporter=arquivo"
+    )
+
+    tracing_otlp_endpoint: Optional[str] = Field(
+        default=None,
+        description="Endpoint OTLP/HTTP do coletor (padrão do exportador: http://localhost:4318/v1/traces)"
+    )
+
     # ========== APLICAÇÃO ==========
     environment: str = Field(
         default="development",
@@ -177,6 +376,24 @@ class Settings(BaseSettings):
         pattern=r"^(DEBUG|INFO|WARNING|ERROR|CRITICAL)$"
     )
 
+    log_format: str = Field(
+        default="texto",
+        description="Formato do log: texto ou json (um objeto por linha, com mensagem_id e trace_id)",
+        pattern=r"^(texto|json)$"
+    )
+
+    log_file: Optional[str] = Field(
+        default="bot.log",
+        description="Arquivo de log além do console (vazio desativa)"
+    )
+
+    log_debug_sample_rate: float = Field(
+        default=1.0,
+        description="Fração das mensagens cujas linhas DEBUG são mantidas (amostragem por mensagem)",
+        ge=0.0,
+        le=1.0
+    )
+
     # ========== SEGURANÇA ==========
     secret_key: Optional[str] = Field(
         default=None,
@@ -233,14 +450,14 @@ class Settings(BaseSettings):
         return v.rstrip("/")
 
     def configure_logging(self) -> None:
-        """Configura o sistema de logging"""
-        logging.basicConfig(
-            level=getattr(logging, self.log_level),
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('bot.log'),
-                logging.StreamHandler()
-            ]
+        """Configura o sistema de logging (handler em fila, texto ou JSON)"""
+        from src.config.logging_config import configurar_logging
+
+        configurar_logging(
+            nivel=self.log_level,
+            formato=self.log_format,
+            arquivo=self.log_file,
+            taxa_debug=self.log_debug_sample_rate
         )
 
     def model_post_init(self, __context) -> None:
@@ -15,7 +15,8 @@ from typing import Any, Dict
 from langgraph.graph import StateGraph, END
 
 from src.models.state import AgentState, AcaoFluxo
-from src.nodes import webhook, media, response, agent
+from src.nodes import webhook, media, response, agent, router
+from src.monitoring import instrumentar_no
 
 # Configuração de logging
 logger = logging.getLogger(__name__)
@@ -33,7 +34,8 @@ def criar_grafo_atendimento():
     1. Validação de webhook
     2. Verificação/cadastro de cliente
     3. Processamento de mídia (texto, áudio, imagem)
-    4. Processamento com agente de IA (quando implementado)
+    4. Roteamento: mensagens triviais respondidas pelo modelo pequeno,
+       o resto pelo agente de IA
     5. Fragmentação de resposta
     6. Envio sequencial ao WhatsApp
 
@@ -54,13 +56,14 @@ def criar_grafo_atendimento():
     workflow = StateGraph(AgentState)
 
     # ========== ADICIONAR NÓS ==========
+    # Todos os nós são instrumentados (latência por etapa em /metrics)
 
     logger.info("Adicionando nós ao grafo...")
 
     # Fase 1: Recepção e Cadastro
-    workflow.add_node("validar_webhook", webhook.validar_webhook)
-    workflow.add_node("verificar_cliente", webhook.verificar_cliente)
-    workflow.add_node("cadastrar_cliente", webhook.cadastrar_cliente)
+    workflow.add_node("validar_webhook", instrumentar_no("validar_webhook", webhook.validar_webhook))
+    workflow.add_node("verificar_cliente", instrumentar_no("verificar_cliente", webhook.verificar_cliente))
+    workflow.add_node("cadastrar_cliente", instrumentar_no("cadastrar_cliente", webhook.cadastrar_cliente))
     logger.info("  [OK] Nós de webhook adicionados")
 
     # Fase 2: Processamento de Mídia
@@ -69,19 +72,20 @@ def criar_grafo_atendimento():
         """Nó virtual que apenas passa o estado para o roteador."""
         return state
 
-    workflow.add_node("processar_midia", processar_midia_router)
-    workflow.add_node("processar_audio", media.processar_audio)
-    workflow.add_node("processar_imagem", media.processar_imagem)
-    workflow.add_node("processar_texto", media.processar_texto)
+    workflow.add_node("processar_midia", instrumentar_no("processar_midia", processar_midia_router))
+    workflow.add_node("processar_audio", instrumentar_no("processar_audio", media.processar_audio))
+    workflow.add_node("processar_imagem", instrumentar_no("processar_imagem", media.processar_imagem))
+    workflow.add_node("processar_texto", instrumentar_no("processar_texto", media.processar_texto))
     logger.info("  [OK] Nós de mídia adicionados")
 
-    # Fase 3: Agente de IA
-    workflow.add_node("processar_agente", agent.processar_agente)
-    logger.info("  [OK] Nó de agente adicionado")
+    # Fase 3: Roteamento e Agente de IA
+    workflow.add_node("rotear_mensagem", instrumentar_no("rotear_mensagem", router.rotear_mensagem))
+    workflow.add_node("processar_agente", instrumentar_no("processar_agente", agent.processar_agente))
+    logger.info("  [OK] Nós de roteamento e agente adicionados")
 
     # Fase 4: Envio de Resposta
-    workflow.add_node("fragmentar_resposta", response.fragmentar_resposta)
-    workflow.add_node("enviar_respostas", response.enviar_respostas)
+    workflow.add_node("fragmentar_resposta", instrumentar_no("fragmentar_resposta", response.fragmentar_resposta))
+    workflow.add_node("enviar_respostas", instrumentar_no("enviar_respostas", response.enviar_respostas))
     logger.info("  [OK] Nós de resposta adicionados")
 
     # ========== DEFINIR ENTRY POINT ==========
@@ -138,11 +142,22 @@ def criar_grafo_atendimento():
     )
     logger.info("  [OK] Edge: processar_midia -> [audio | imagem | texto]")
 
-    # Todos os processadores de mídia -> processar_agente
-    workflow.add_edge("processar_audio", "processar_agente")
-    workflow.add_edge("processar_imagem", "processar_agente")
-    workflow.add_edge("processar_texto", "processar_agente")
-    logger.info("  [OK] Edge: [processadores de mídia] -> processar_agente")
+    # Todos os processadores de mídia -> rotear_mensagem
+    workflow.add_edge("processar_audio", "rotear_mensagem")
+    workflow.add_edge("processar_imagem", "rotear_mensagem")
+    workflow.add_edge("processar_texto", "rotear_mensagem")
+    logger.info("  [OK] Edge: [processadores de mídia] -> rotear_mensagem")
+
+    # Roteador -> agente completo ou direto para a fragmentação (mensagem trivial)
+    workflow.add_conditional_edges(
+        "rotear_mensagem",
+        lambda state: state.get("next_action", AcaoFluxo.PROCESSAR_AGENTE.value),
+        {
+            AcaoFluxo.PROCESSAR_AGENTE.value: "processar_agente",
+            AcaoFluxo.FRAGMENTAR_RESPOSTA.value: "fragmentar_resposta"
+        }
+    )
+    logger.info("  [OK] Edge: rotear_mensagem -> processar_agente | fragmentar_resposta")
 
     # Processar agente -> fragmentar resposta
     workflow.add_edge("processar_agente", "fragmentar_resposta")
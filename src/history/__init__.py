@@ -3,5 +3,6 @@ Módulo de histórico de mensagens.
 """
 
 from .supabase_history import SupabaseChatMessageHistory
+from .summarizer import ResumidorConversas, get_resumidor_conversas
 
-__all__ = ["SupabaseChatMessageHistory"]
+__all__ = ["SupabaseChatMessageHistory", "ResumidorConversas", "get_resumidor_conversas"]
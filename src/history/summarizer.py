@@ -0,0 +1,249 @@
+"""
+Resumo incremental da conversa, atualizado em background.
+
+O agente recebe só as últimas mensagens da conversa; fatos ditos antes
+disso (endereço, serviço, medidas, horário combinado) se perdiam e a Carol
+precisava perguntar de novo. Aqui cada sessão tem um resumo compacto em
+`conversation_summaries`, ao lado de `message_history`.
+
+Depois de cada turno o agente chama `agendar(session_id)`, que retorna na
+hora. Em background, as mensagens que já saíram da janela recente são
+incorporadas ao resumo pelo modelo pequeno (resumo anterior + mensagens
+novas -> resumo novo). O prompt do agente fica com tamanho constante:
+resumo + últimas N mensagens.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+from src.history.supabase_history import SupabaseChatMessageHistory
+
+logger = logging.getLogger(__name__)
+
+# Mensagens mais recentes que ficam fora do resumo
+JANELA_MENSAGENS = 6
+
+# Só chama o modelo quando há pelo menos isso de mensagens para incorporar.
+# Ficam sem resumo no máximo JANELA_MENSAGENS + LOTE_MINIMO - 1 mensagens,
+# que o agente precisa carregar cruas (MAX_MENSAGENS_HISTORICO em agent.py)
+LOTE_MINIMO = 4
+
+# Máximo de mensagens por chamada ao modelo: uma conversa longa ainda sem
+# resumo é incorporada em várias rodadas, cada uma salva ao terminar
+LOTE_MAXIMO = 50
+
+_PROMPT_RESUMO = (
+    "Você mantém o resumo de uma conversa de WhatsApp entre um cliente e Carol, "
+    "atendente de uma empresa de drywall, gesso, forros e divisórias. "
+    "Atualize o resumo anterior com as mensagens novas. Preserve fatos úteis para "
+    "o atendimento: nome, endereço, serviço desejado, ambientes e medidas, "
+    "orçamentos e valores informados, horários agendados/cancelados, preferências "
+    "e pendências. Descarte saudações e conversa sem informação. Escreva em "
+    "português, em tópicos curtos, com no máximo 150 palavras."
+)
+
+# (resumo anterior, mensagens novas) -> resumo novo
+FuncaoResumo = Callable[[str, List[BaseMessage]], Awaitable[str]]
+
+
+def _formatar_mensagens(mensagens: List[BaseMessage]) -> str:
+    return "\n".join(
+        f"{'Cliente' if m.type == 'human' else 'Carol'}: {m.content}" for m in mensagens
+    )
+
+
+async def resumir_com_llm(resumo_anterior: str, mensagens: List[BaseMessage]) -> str:
+    """
+    Incorpora mensagens ao resumo usando o modelo pequeno.
+
+    Args:
+        resumo_anterior: Resumo atual ("" se ainda não existe)
+        mensagens: Mensagens que saíram da janela recente
+
+    Returns:
+        str: Resumo atualizado
+    """
+    from src.clients.openai_client import get_chat_model
+    from src.config.settings import get_settings
+
+    llm = get_chat_model(get_settings().summary_model, temperature=0.0)
+    resposta = await llm.ainvoke([
+        SystemMessage(content=_PROMPT_RESUMO),
+        HumanMessage(content=(
+            f"RESUMO ANTERIOR:\n{resumo_anterior or '(vazio)'}\n\n"
+            f"MENSAGENS NOVAS:\n{_formatar_mensagens(mensagens)}"
+        ))
+    ])
+
+    return str(resposta.content).strip()
+
+
+class ResumidorConversas:
+    """
+    Atualiza os resumos das conversas fora do caminho crítico.
+
+    Uma atualização por sessão de cada vez; pedidos que chegam durante uma
+    atualização são agrupados em uma nova rodada.
+
+    Args:
+        criar_historico: Cria o histórico de uma sessão
+        resumir: Função que gera o novo resumo (padrão: modelo pequeno)
+        janela: Mensagens recentes que ficam fora do resumo
+        lote_minimo: Mínimo de mensagens para atualizar o resumo
+        lote_maximo: Máximo de mensagens incorporadas por chamada ao modelo
+
+    Example:
+        >>> resumidor = get_resumidor_conversas()
+        >>> resumidor.agendar("5562999990001")  # retorna imediatamente
+    """
+
+    def __init__(
+        self,
+        criar_historico: Callable[[str], SupabaseChatMessageHistory],
+        resumir: Optional[FuncaoResumo] = None,
+        janela: int = JANELA_MENSAGENS,
+        lote_minimo: int = LOTE_MINIMO,
+        lote_maximo: int = LOTE_MAXIMO
+    ) -> None:
+        self._criar_historico = criar_historico
+        self._resumir = resumir or resumir_com_llm
+        self.janela = janela
+        self.lote_minimo = lote_minimo
+        self.lote_maximo = lote_maximo
+
+        self._tarefas: Dict[str, asyncio.Task] = {}
+        self._repetir: Set[str] = set()
+
+    @property
+    def pendentes(self) -> int:
+        """Sessões com atualização de resumo em andamento."""
+        return len(self._tarefas)
+
+    def agendar(self, session_id: str) -> None:
+        """Pede a atualização do resumo da sessão (não bloqueia)."""
+        if not session_id:
+            return
+
+        if session_id in self._tarefas:
+            self._repetir.add(session_id)
+            return
+
+        self._tarefas[session_id] = asyncio.create_task(self._executar(session_id))
+
+    async def _executar(self, session_id: str) -> None:
+        try:
+            while True:
+                self._repetir.discard(session_id)
+                try:
+                    await self.atualizar(session_id)
+                except Exception as e:
+                    logger.error(f"Erro ao atualizar resumo da conversa {session_id}: {e}")
+
+                if session_id not in self._repetir:
+                    return
+        finally:
+            # Sem await entre a checagem acima e a remoção: nenhum pedido se perde
+            self._tarefas.pop(session_id, None)
+
+    async def atualizar(self, session_id: str) -> bool:
+        """
+        Incorpora ao resumo as mensagens que saíram da janela recente.
+
+        Cada rodada lê no máximo `lote_maximo + janela` mensagens a partir
+        do resumo e salva o avanço; um atraso grande é vencido aos poucos,
+        e uma falha no meio não faz reler a conversa inteira.
+
+        Returns:
+            bool: True se o resumo foi atualizado
+        """
+        historico = self._criar_historico(session_id)
+        limite = self.lote_maximo + self.janela
+        atualizado = False
+
+        resumo, ultima_id = await asyncio.to_thread(historico.obter_resumo)
+
+        while True:
+            novas = await asyncio.to_thread(historico.mensagens_desde, ultima_id, limite)
+
+            # As últimas `janela` mensagens lidas continuam cruas no contexto
+            fora_da_janela = novas[:-self.janela] if self.janela else novas
+            if len(fora_da_janela) < self.lote_minimo:
+                return atualizado
+
+            novo_resumo = await self._resumir(resumo, [m for _, m in fora_da_janela])
+            if not novo_resumo:
+                return atualizado
+
+            resumo, ultima_id = novo_resumo, fora_da_janela[-1][0]
+            await asyncio.to_thread(historico.salvar_resumo, resumo, ultima_id)
+            atualizado = True
+
+            logger.info(
+                f"Resumo da conversa {session_id} atualizado com {len(fora_da_janela)} mensagens "
+                f"({len(novo_resumo)} caracteres)"
+            )
+
+            # Leitura incompleta: não há mais atraso além desta rodada
+            if len(novas) < limite:
+                return True
+
+    async def aguardar(self) -> None:
+        """Espera as atualizações em andamento terminarem."""
+        while self._tarefas:
+            await asyncio.gather(*list(self._tarefas.values()), return_exceptions=True)
+
+    async def parar(self) -> None:
+        """Cancela as atualizações em andamento (resumo é refeito no próximo turno)."""
+        for tarefa in list(self._tarefas.values()):
+            tarefa.cancel()
+        await asyncio.gather(*list(self._tarefas.values()), return_exceptions=True)
+        self._tarefas.clear()
+
+
+# ========== SINGLETON ==========
+
+_resumidor: Optional[ResumidorConversas] = None
+
+
+def get_resumidor_conversas() -> ResumidorConversas:
+    """Retorna o resumidor de conversas do processo."""
+    global _resumidor
+
+    if _resumidor is None:
+        from src.config.settings import get_settings
+
+        settings = get_settings()
+
+        def criar_historico(session_id: str) -> SupabaseChatMessageHistory:
+            return SupabaseChatMessageHistory(
+                supabase_url=settings.supabase_url,
+                supabase_key=settings.supabase_key,
+                session_id=session_id,
+                table_name="message_history"
+            )
+
+        _resumidor = ResumidorConversas(criar_historico)
+
+    return _resumidor
+
+
+async def fechar_resumidor_conversas() -> None:
+    """Encerra as atualizações pendentes (chamado no shutdown da aplicação)."""
+    if _resumidor is not None:
+        await _resumidor.parar()
+
+
+# ========== EXPORTAÇÕES ==========
+
+__all__ = [
+    "JANELA_MENSAGENS",
+    "resumir_com_llm",
+    "ResumidorConversas",
+    "get_resumidor_conversas",
+    "fechar_resumidor_conversas",
+]
@@ -5,18 +5,29 @@ Este módulo implementa um histórico de chat compatível com LangChain
 usando a API REST do Supabase em vez de conexão PostgreSQL direta.
 """
 
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
 import json
 from datetime import datetime
 
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 from supabase import create_client, Client
 
+from src.monitoring import instrumentar_supabase
+
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def _converter_mensagem(message_data: Dict[str, Any]) -> Optional[BaseMessage]:
+    """Converte o JSON salvo em message_history para BaseMessage."""
+    if message_data.get("type") == "human":
+        return HumanMessage(content=message_data.get("data", {}).get("content", ""))
+    if message_data.get("type") == "ai":
+        return AIMessage(content=message_data.get("data", {}).get("content", ""))
+    return None
+
+
 class SupabaseChatMessageHistory:
     """
     Histórico de mensagens usando Supabase REST API.
@@ -29,7 +40,8 @@ class SupabaseChatMessageHistory:
         supabase_url: str,
         supabase_key: str,
         session_id: str,
-        table_name: str = "message_history"
+        table_name: str = "message_history",
+        summary_table_name: str = "conversation_summaries"
     ):
         """
         Inicializa o histórico de mensagens.
@@ -39,10 +51,12 @@ class SupabaseChatMessageHistory:
             supabase_key: Chave de API do Supabase
             session_id: ID da sessão (número do telefone)
             table_name: Nome da tabela (padrão: message_history)
+            summary_table_name: Tabela do resumo da conversa (padrão: conversation_summaries)
         """
-        self.supabase: Client = create_client(supabase_url, supabase_key)
+        self.supabase: Client = instrumentar_supabase(create_client(supabase_url, supabase_key))
         self.session_id = session_id
         self.table_name = table_name
+        self.summary_table_name = summary_table_name
 
         logger.info(f"SupabaseChatMessageHistory inicializado para sessão: {session_id}")
 
@@ -64,13 +78,10 @@ class SupabaseChatMessageHistory:
 
             messages = []
             for row in response.data:
-                message_data = row["message"]
-
                 # Converter de JSON para BaseMessage
-                if message_data.get("type") == "human":
-                    messages.append(HumanMessage(content=message_data.get("data", {}).get("content", "")))
-                elif message_data.get("type") == "ai":
-                    messages.append(AIMessage(content=message_data.get("data", {}).get("content", "")))
+                message = _converter_mensagem(row["message"])
+                if message is not None:
+                    messages.append(message)
 
             logger.debug(f"Carregadas {len(messages)} mensagens do histórico")
             return messages
@@ -79,6 +90,117 @@ class SupabaseChatMessageHistory:
             logger.error(f"Erro ao carregar mensagens: {e}")
             return []
 
+    def carregar_contexto(self, limite: int = 10) -> Tuple[str, List[BaseMessage]]:
+        """
+        Carrega o resumo da conversa e as últimas mensagens em uma consulta.
+
+        Usa a função SQL `carregar_contexto_conversa`; se ela ainda não
+        existir no banco, faz as duas consultas separadas.
+
+        Args:
+            limite: Quantidade de mensagens recentes
+
+        Returns:
+            Tuple[str, List[BaseMessage]]: (resumo ou "", mensagens em ordem cronológica)
+        """
+        try:
+            response = self.supabase.rpc(
+                "carregar_contexto_conversa",
+                {"p_session_id": self.session_id, "p_limite": limite}
+            ).execute()
+
+            dados = response.data or {}
+            mensagens = [_converter_mensagem(m) for m in dados.get("mensagens") or []]
+            return dados.get("resumo") or "", [m for m in mensagens if m is not None]
+
+        except Exception as e:
+            logger.warning(f"carregar_contexto_conversa indisponível, usando consultas separadas: {e}")
+
+        mensagens = [m for _, m in self.mensagens_recentes(limite)]
+        resumo, _ = self.obter_resumo()
+        return resumo, mensagens
+
+    def mensagens_recentes(self, limite: int) -> List[Tuple[int, BaseMessage]]:
+        """
+        Últimas `limite` mensagens com o id da linha, em ordem cronológica.
+        """
+        try:
+            response = self.supabase.table(self.table_name)\
+                .select("id, message")\
+                .eq("session_id", self.session_id)\
+                .order("id", desc=True)\
+                .limit(limite)\
+                .execute()
+
+            linhas = [(row["id"], _converter_mensagem(row["message"])) for row in reversed(response.data)]
+            return [(linha_id, m) for linha_id, m in linhas if m is not None]
+
+        except Exception as e:
+            logger.error(f"Erro ao carregar mensagens recentes: {e}")
+            return []
+
+    def mensagens_desde(
+        self,
+        ultima_mensagem_id: int,
+        limite: Optional[int] = None
+    ) -> List[Tuple[int, BaseMessage]]:
+        """
+        Mensagens com id maior que `ultima_mensagem_id`, em ordem cronológica.
+
+        Com `limite`, só as `limite` mais antigas delas.
+        """
+        consulta = self.supabase.table(self.table_name)\
+            .select("id, message")\
+            .eq("session_id", self.session_id)\
+            .gt("id", ultima_mensagem_id)\
+            .order("id", desc=False)
+        if limite is not None:
+            consulta = consulta.limit(limite)
+        response = consulta.execute()
+
+        linhas = [(row["id"], _converter_mensagem(row["message"])) for row in response.data]
+        return [(linha_id, m) for linha_id, m in linhas if m is not None]
+
+    def obter_resumo(self) -> Tuple[str, int]:
+        """
+        Resumo atual da conversa.
+
+        Returns:
+            Tuple[str, int]: (resumo ou "", id da última mensagem já resumida ou 0)
+        """
+        try:
+            response = self.supabase.table(self.summary_table_name)\
+                .select("resumo, ultima_mensagem_id")\
+                .eq("session_id", self.session_id)\
+                .limit(1)\
+                .execute()
+
+            if response.data:
+                linha = response.data[0]
+                return linha.get("resumo") or "", linha.get("ultima_mensagem_id") or 0
+
+        except Exception as e:
+            logger.warning(f"Erro ao carregar resumo da conversa: {e}")
+
+        return "", 0
+
+    def salvar_resumo(self, resumo: str, ultima_mensagem_id: int) -> None:
+        """
+        Grava (upsert) o resumo da conversa.
+
+        Args:
+            resumo: Texto do resumo
+            ultima_mensagem_id: id da mensagem mais recente incluída no resumo
+        """
+        self.supabase.table(self.summary_table_name).upsert({
+            "session_id": self.session_id,
+            "resumo": resumo,
+            "ultima_mensagem_id": ultima_mensagem_id,
+            "updated_at": datetime.now().isoformat()
+        }).execute()
+
+        logger.debug(f"Resumo da conversa salvo para sessão: {self.session_id}")
+
     def add_user_message(self, message: str) -> None:
         """
         Adiciona mensagem do usuário ao histórico.
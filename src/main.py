@@ -7,17 +7,52 @@ da Evolution API e processa mensagens através do sistema de bot.
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import logging
 import asyncio
+import time
 from datetime import datetime
-from typing import Dict, Any
+from typing import Any, Iterable, Optional, Sequence
 import json
+from contextlib import asynccontextmanager
 
 # Imports do projeto
 from src.config.settings import get_settings
+from src.config.logging_config import definir_mensagem_log
 from src.models.state import AgentState
 from src.graph.workflow import criar_grafo_atendimento
+from src.clients.openai_client import fechar_clientes_openai
+from src.clients.calendar_client import aquecer_calendar_service, fechar_calendar_gateway
+from src.clients.redis_client import fechar_redis_compartilhado
+from src.cache.media_store import get_media_store
+from src.tools.calendar_sync import get_sincronizador_calendario
+from src.tools.prefetch import obter_contadores_prefetch
+from src.nodes.router import obter_estatisticas_roteador
+from src.utils.notification_outbox import get_outbox_notificacoes, fechar_outbox_notificacoes
+from src.history.summarizer import fechar_resumidor_conversas, get_resumidor_conversas
+from src.monitoring import (
+    CONTENT_TYPE_LATEST,
+    GRAFOS_EM_ANDAMENTO,
+    SpanKind,
+    configurar_tracing,
+    contexto_atual,
+    fechar_tracing,
+    gerar_metricas,
+    get_metricas_nos,
+    iniciar_span,
+    registrar_fila,
+)
+from src.utils.context_assembler import carregar_codificador
+from src.utils.customer_facts import gravacoes_pendentes
+from src.utils.webhook_stream import parsear_webhook_streaming
+from src.utils.webhook_filter import (
+    EVENTO_MENSAGEM,
+    MOTIVO_EVENTO,
+    MOTIVO_FROM_ME,
+    pre_filtrar_webhook,
+    registrar_evento,
+    obter_contadores_eventos,
+)
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -31,13 +66,54 @@ logger.info("Criando grafo de atendimento...")
 grafo_atendimento = criar_grafo_atendimento()
 logger.info("Grafo criado e pronto!")
 
+# Filas em background expostas em /metrics (calculadas só na coleta)
+registrar_fila("notificacoes_tecnico", lambda: get_outbox_notificacoes().resumo()["em_andamento"])
+registrar_fila("resumos_conversa", lambda: get_resumidor_conversas().pendentes)
+registrar_fila("fatos_cliente", gravacoes_pendentes)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Ciclo de vida da aplicação: aquece clientes no startup e libera pools no encerramento."""
+    configurar_tracing(settings)
+    aquecer_calendar_service()
+    await asyncio.to_thread(carregar_codificador)
+    get_outbox_notificacoes().iniciar()
+
+    tarefa_sync = None
+    if settings.calendar_sync_enabled:
+        sincronizador = get_sincronizador_calendario()
+        tarefa_sync = asyncio.create_task(sincronizador.executar_periodicamente(
+            endereco_canal=settings.calendar_webhook_url,
+            token=settings.calendar_webhook_token
+        ))
+        logger.info("Sincronização da agenda iniciada")
+
+    yield
+
+    if tarefa_sync is not None:
+        tarefa_sync.cancel()
+        try:
+            await tarefa_sync
+        except asyncio.CancelledError:
+            pass
+
+    await fechar_outbox_notificacoes()
+    await fechar_resumidor_conversas()
+    await fechar_redis_compartilhado()
+    await fechar_clientes_openai()
+    fechar_calendar_gateway()
+    fechar_tracing()
+
+
 # Criar aplicação FastAPI
 app = FastAPI(
     title="WhatsApp Bot LangGraph",
     description="Bot inteligente de WhatsApp com processamento de múltiplas mídias",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Configurar CORS
@@ -86,18 +162,36 @@ async def health_check():
         )
 
 
-async def processar_mensagem(state: AgentState):
+async def processar_mensagem(
+    state: AgentState,
+    contexto_trace: Optional[Any] = None,
+    referencias_midia: Sequence[str] = ()
+):
     """
     Processa a mensagem através do grafo LangGraph.
     Executado em background.
+
+    Ao final (com sucesso ou erro) as mídias da mensagem saem do media
+    store: só os nós de áudio e imagem as consomem, e vídeo, documento
+    e figurinha ficariam ocupando memória/disco até o TTL.
+
+    Args:
+        state: Estado inicial do grafo
+        contexto_trace: Contexto OpenTelemetry do webhook (continua o mesmo trace)
+        referencias_midia: Mídias desviadas para o media store pelo endpoint
     """
+    key = state.get("raw_webhook_data", {}).get("body", {}).get("data", {}).get("key", {})
+    definir_mensagem_log(key.get("id"))
+    final_state = {}
+
     try:
-        logger.info("=" * 60)
-        logger.info("Iniciando processamento da mensagem via GRAFO")
-        logger.info("=" * 60)
+        logger.debug("=" * 60)
+        logger.debug("Iniciando processamento da mensagem via GRAFO")
+        logger.debug("=" * 60)
 
         # Executar grafo
-        final_state = await grafo_atendimento.ainvoke(state)
+        with GRAFOS_EM_ANDAMENTO.track_inprogress(), iniciar_span("processar_mensagem", contexto=contexto_trace):
+            final_state = await grafo_atendimento.ainvoke(state)
 
         # Logging do resultado
         if final_state.get("erro"):
@@ -107,11 +201,14 @@ async def processar_mensagem(state: AgentState):
             logger.info(f"Cliente: {final_state.get('cliente_nome')}")
             logger.info(f"Respostas enviadas: {len(final_state.get('respostas_fragmentadas', []))}")
 
-        logger.info("=" * 60)
+        logger.debug("=" * 60)
 
     except Exception as e:
         logger.error(f"Erro ao processar mensagem: {str(e)}", exc_info=True)
 
+    finally:
+        _descartar_midias([*referencias_midia, *filter(None, [final_state.get("mensagem_media_ref")])])
+
 
 @app.get("/webhook/whatsapp")
 async def webhook_whatsapp_get():
@@ -124,87 +221,144 @@ async def webhook_whatsapp_get():
 @app.post("/webhook/whatsapp")
 async def webhook_whatsapp(
     request: Request,
-    background_tasks: BackgroundTasks,
-    webhook_data: Dict[str, Any] = None
+    background_tasks: BackgroundTasks
 ):
     """
     Endpoint principal para receber webhooks da Evolution API.
 
     Este endpoint recebe as mensagens enviadas para o bot via WhatsApp
     e processa em background para não bloquear a resposta.
-    """
-    try:
-        # Se não veio no body, pegar do request
-        if webhook_data is None:
-            webhook_data = await request.json()
-            
-        logger.info("📨 Webhook recebido!")
-        logger.info(f"Event: {webhook_data.get('event', 'unknown')}")
-        logger.info(f"Instance: {webhook_data.get('instance', 'unknown')}")
-
-        # DEBUG: Verificar se base64 está presente
-        data = webhook_data.get("data", {})
-        message = data.get("message", {})
-        message_type = data.get("messageType", "")
 
-        if message_type == "audioMessage" and "audioMessage" in message:
-            audio = message["audioMessage"]
-            has_base64 = "base64" in audio or "media" in audio
-            logger.info(f"🎵 AUDIO DETECTADO - Base64 presente: {has_base64}")
-            if has_base64:
-                base64_key = "base64" if "base64" in audio else "media"
-                logger.info(f"✅ Base64 encontrado em audioMessage.{base64_key} (tamanho: {len(audio[base64_key])} chars)")
-            else:
-                logger.warning("⚠️ Base64 NAO encontrado no audioMessage!")
-                logger.info(f"Keys disponiveis em audioMessage: {list(audio.keys())}")
-
-        # Filtrar apenas eventos de mensagem
-        event = webhook_data.get("event", "")
-        if event != "messages.upsert":
-            logger.info(f"⏭️  Evento ignorado: {event}")
-            return {"status": "ignored", "reason": f"Event {event} not processed"}
+    O corpo é lido em streaming: mídias inline (base64) são decodificadas
+    direto para o media store e não viram uma str gigante em memória.
+    Eventos que não são mensagens (e mensagens do próprio bot) são
+    descartados olhando só o início do corpo, antes de qualquer parse.
+    """
+    recebido_em = time.perf_counter()
+
+    with iniciar_span("webhook_whatsapp", SpanKind.SERVER) as span:
+        referencias_midia = []
+
+        try:
+            corpo = request.stream()
+            primeiro_pedaco = b""
+            async for pedaco in corpo:
+                if pedaco:
+                    primeiro_pedaco = pedaco
+                    break
+
+            # Pré-filtro: apenas "event" e "fromMe" no início do corpo
+            evento, motivo = pre_filtrar_webhook(primeiro_pedaco)
+            span.set_attribute("webhook.evento", evento or "")
+            if motivo == MOTIVO_EVENTO:
+                registrar_evento(evento, motivo)
+                logger.debug(f"⏭️  Evento ignorado no pré-filtro: {evento}")
+                return {"status": "ignored", "reason": f"Event {evento} not processed"}
+            if motivo == MOTIVO_FROM_ME:
+                registrar_evento(evento, motivo)
+                logger.debug("⏭️  Mensagem do próprio bot ignorada no pré-filtro")
+                return {"status": "ignored", "reason": "Message from bot itself"}
+
+            webhook_data, referencias_midia = await parsear_webhook_streaming(corpo, prefixo=primeiro_pedaco)
+
+            logger.info("📨 Webhook recebido!")
+            logger.debug("Event: %s", webhook_data.get('event', 'unknown'))
+            logger.debug("Instance: %s", webhook_data.get('instance', 'unknown'))
+
+            if referencias_midia:
+                logger.info(f"📎 Midia desviada para o media store: {', '.join(referencias_midia)}")
+
+            # Filtrar apenas eventos de mensagem
+            event = webhook_data.get("event", "")
+            if event != EVENTO_MENSAGEM:
+                logger.info(f"⏭️  Evento ignorado: {event}")
+                registrar_evento(event, MOTIVO_EVENTO)
+                _descartar_midias(referencias_midia)
+                return {"status": "ignored", "reason": f"Event {event} not processed"}
         
-        # Verificar se tem dados
-        data = webhook_data.get("data", {})
-        if not data:
-            logger.warning("⚠️  Webhook sem dados")
-            return {"status": "ignored", "reason": "No data in webhook"}
+            # Verificar se tem dados
+            data = webhook_data.get("data", {})
+            if not data:
+                logger.warning("⚠️  Webhook sem dados")
+                registrar_evento(event, "sem_dados")
+                _descartar_midias(referencias_midia)
+                return {"status": "ignored", "reason": "No data in webhook"}
         
-        # Verificar se não é mensagem do próprio bot
-        key = data.get("key", {})
-        from_me = key.get("fromMe", False)
-        if from_me:
-            logger.info("⏭️  Mensagem do próprio bot ignorada")
-            return {"status": "ignored", "reason": "Message from bot itself"}
+            # Verificar se não é mensagem do próprio bot
+            key = data.get("key", {})
+            from_me = key.get("fromMe", False)
+            span.set_attribute("mensagem_id", key.get("id") or "")
+            definir_mensagem_log(key.get("id"))
+            if from_me:
+                logger.info("⏭️  Mensagem do próprio bot ignorada")
+                registrar_evento(event, MOTIVO_FROM_ME)
+                _descartar_midias(referencias_midia)
+                return {"status": "ignored", "reason": "Message from bot itself"}
         
-        # Preparar estado inicial
-        initial_state: AgentState = {
-            "raw_webhook_data": {"body": webhook_data},
-            "next_action": ""
-        }
+            # Preparar estado inicial
+            initial_state: AgentState = {
+                "raw_webhook_data": {"body": webhook_data},
+                "recebido_em": recebido_em,
+                "next_action": ""
+            }
 
-        # Processar em background (não bloqueia a resposta)
-        background_tasks.add_task(processar_mensagem, initial_state)
+            # Processar em background (não bloqueia a resposta), no mesmo trace
+            background_tasks.add_task(processar_mensagem, initial_state, contexto_atual(), referencias_midia)
+            registrar_evento(event, "processado")
 
-        logger.info("✅ Mensagem adicionada à fila de processamento - respondendo imediatamente")
+            logger.info("✅ Mensagem adicionada à fila de processamento - respondendo imediatamente")
 
-        # IMPORTANTE: Retornar imediatamente para evitar timeout do ngrok/túnel
-        return JSONResponse(
-            status_code=200,
-            content={
-                "status": "received",
-                "message": "Webhook received and queued for processing",
-                "timestamp": datetime.now().isoformat()
-            }
-        )
+            # IMPORTANTE: Retornar imediatamente para evitar timeout do ngrok/túnel
+            return JSONResponse(
+                status_code=200,
+                content={
+                    "status": "received",
+                    "message": "Webhook received and queued for processing",
+                    "timestamp": datetime.now().isoformat()
+                }
+            )
         
-    except json.JSONDecodeError:
-        logger.error("❌ JSON inválido no webhook")
-        raise HTTPException(status_code=400, detail="Invalid JSON")
+        except json.JSONDecodeError:
+            logger.error("❌ JSON inválido no webhook")
+            raise HTTPException(status_code=400, detail="Invalid JSON")
         
-    except Exception as e:
-        logger.error(f"❌ Erro no webhook: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+        except Exception as e:
+            logger.error(f"❌ Erro no webhook: {e}", exc_info=True)
+            _descartar_midias(referencias_midia)
+            raise HTTPException(status_code=500, detail=str(e))
+
+
+def _descartar_midias(referencias: Iterable[str]) -> None:
+    """Libera do media store as mídias de um webhook (não processado ou já processado)."""
+    media_store = get_media_store()
+    for ref in referencias:
+        media_store.remover(ref)
+
+
+@app.post("/webhook/calendar")
+async def webhook_calendar(request: Request, background_tasks: BackgroundTasks):
+    """
+    Recebe notificações push do Google Calendar (canal criado com events.watch).
+
+    A notificação não traz os eventos alterados: apenas dispara uma
+    sincronização incremental do índice local da agenda.
+    """
+    if not settings.calendar_sync_enabled:
+        raise HTTPException(status_code=404, detail="Sincronização da agenda desativada")
+
+    token = request.headers.get("X-Goog-Channel-Token")
+    if settings.calendar_webhook_token and token != settings.calendar_webhook_token:
+        logger.warning("Notificação do Calendar com token inválido")
+        raise HTTPException(status_code=403, detail="Token inválido")
+
+    estado = request.headers.get("X-Goog-Resource-State", "")
+    logger.debug(f"Notificação do Calendar recebida: {estado}")
+
+    # "sync" é só a confirmação da criação do canal
+    if estado != "sync":
+        background_tasks.add_task(get_sincronizador_calendario().sincronizar_com_log)
+
+    return {"status": "ok"}
 
 
 @app.post("/test/message")
@@ -272,10 +426,39 @@ async def get_status():
             "whatsapp": settings.whatsapp_api_url,
             "supabase": settings.supabase_url
         },
+        "webhook_eventos": obter_contadores_eventos(),
+        "notificacoes_tecnico": get_outbox_notificacoes().resumo(),
+        "prefetch": obter_contadores_prefetch(),
+        "roteador": obter_estatisticas_roteador(),
         "timestamp": datetime.now().isoformat()
     }
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Métricas no formato Prometheus: latência até a primeira resposta, nós do
+    grafo, LLM (latência e tokens), chamadas externas, grafos em andamento
+    e filas em background.
+    """
+    return Response(content=gerar_metricas(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/metrics/nos")
+async def get_metrics_nos(mensagem_id: Optional[str] = None):
+    """
+    Latência por etapa do grafo (p50/p95/p99 por nó) e rastro das últimas mensagens.
+
+    Com `?mensagem_id=...`, retorna só a sequência de nós daquela mensagem.
+    """
+    metricas = get_metricas_nos()
+
+    if mensagem_id:
+        return {"mensagem_id": mensagem_id, "etapas": metricas.rastro(mensagem_id)}
+
+    return {**metricas.resumo(), "timestamp": datetime.now().isoformat()}
+
+
 @app.post("/webhook/debug")
 async def webhook_debug(request: Request):
     """
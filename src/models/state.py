@@ -56,6 +56,7 @@ class AcaoFluxo(str, Enum):
     AGUARDAR_MENSAGENS = "aguardar_mensagens"
 
     # Fase de agente
+    ROTEAR_MENSAGEM = "rotear_mensagem"
     PROCESSAR_AGENTE = "processar_agente"
 
     # Fase de resposta
@@ -101,6 +102,7 @@ class AgentState(TypedDict, total=False):
     Attributes:
         # Dados do webhook
         raw_webhook_data: Dados brutos recebidos do webhook Evolution API
+        recebido_em: Instante do recebimento do webhook (time.perf_counter)
 
         # Dados do cliente
         cliente_numero: Número do cliente (sem @s.whatsapp.net)
@@ -108,11 +110,13 @@ class AgentState(TypedDict, total=False):
         cliente_id: ID do cliente no banco Supabase
         cliente_existe: Se o cliente já está cadastrado
         cliente_ultima_mensagem: Timestamp da última mensagem
+        cliente_fatos: Fatos já informados pelo cliente (nome, endereço, email...)
 
         # Dados da mensagem
         mensagem_tipo: Tipo da mensagem (audio, imagem, texto, etc)
         mensagem_conteudo: Conteúdo processado da mensagem
-        mensagem_base64: Dados em base64 (para mídia)
+        mensagem_base64: Texto da mensagem ou metadados da mídia (sem o payload)
+        mensagem_media_ref: Referência da mídia no media store (bytes fora do estado)
         mensagem_transcrita: Texto transcrito de áudio ou descrição de imagem
         texto_processado: Texto final pronto para o agente (vindo de qualquer mídia)
         mensagem_id: ID único da mensagem
@@ -125,6 +129,7 @@ class AgentState(TypedDict, total=False):
 
         # Processamento do agente (LangChain)
         messages: Histórico de mensagens do agente (com reducer operator.add)
+        contexto_tokens: Tokens do prompt por segmento na última chamada ao LLM
 
         # Resposta
         resposta_agente: Resposta completa gerada pelo agente
@@ -143,6 +148,7 @@ class AgentState(TypedDict, total=False):
 
     # ========== DADOS DO WEBHOOK ==========
     raw_webhook_data: Dict[str, Any]
+    recebido_em: Optional[float]
 
     # ========== DADOS DO CLIENTE ==========
     cliente_numero: str
@@ -150,11 +156,13 @@ class AgentState(TypedDict, total=False):
     cliente_id: Optional[str]
     cliente_existe: bool
     cliente_ultima_mensagem: Optional[str]
+    cliente_fatos: Optional[Dict[str, Any]]
 
     # ========== DADOS DA MENSAGEM ==========
     mensagem_tipo: str
     mensagem_conteudo: str
     mensagem_base64: Optional[str]
+    mensagem_media_ref: Optional[str]
     mensagem_transcrita: Optional[str]
     texto_processado: str  # Texto pronto para o agente (de texto/áudio/imagem)
     mensagem_id: str
@@ -168,6 +176,7 @@ class AgentState(TypedDict, total=False):
     # ========== PROCESSAMENTO DO AGENTE ==========
     # Annotated com operator.add permite acumular mensagens
     messages: Annotated[Sequence[BaseMessage], operator.add]
+    contexto_tokens: Optional[Dict[str, Any]]
 
     # ========== RESPOSTA ==========
     resposta_agente: str
@@ -202,14 +211,17 @@ def criar_estado_inicial() -> AgentState:
     """
     return AgentState(
         raw_webhook_data={},
+        recebido_em=None,
         cliente_numero="",
         cliente_nome="",
         cliente_id=None,
         cliente_existe=False,
         cliente_ultima_mensagem=None,
+        cliente_fatos=None,
         mensagem_tipo=TipoMensagem.OUTROS.value,
         mensagem_conteudo="",
         mensagem_base64=None,
+        mensagem_media_ref=None,
         mensagem_transcrita=None,
         texto_processado="",
         mensagem_id="",
@@ -0,0 +1,62 @@
+"""
+Monitoramento do atendimento (latência por etapa do grafo, métricas
+Prometheus e tracing OpenTelemetry).
+"""
+
+from .node_metrics import MetricasNos, get_metricas_nos, instrumentar_no
+from .prometheus_metrics import (
+    CONTENT_TYPE_LATEST,
+    GRAFOS_EM_ANDAMENTO,
+    SERVICO_OPENAI,
+    SERVICO_SUPABASE,
+    SERVICO_EVOLUTION,
+    SERVICO_CALENDAR,
+    observar_chamada,
+    medir_chamada,
+    operacao_evolution,
+    instrumentar_supabase,
+    CallbackMetricasLLM,
+    observar_no,
+    observar_primeira_resposta,
+    registrar_fila,
+    gerar_metricas,
+)
+from .tracing import (
+    SpanKind,
+    configurar_tracing,
+    fechar_tracing,
+    iniciar_span,
+    abrir_span,
+    fechar_span,
+    contexto_atual,
+    CallbackTracingLLM,
+)
+
+__all__ = [
+    "MetricasNos",
+    "get_metricas_nos",
+    "instrumentar_no",
+    "CONTENT_TYPE_LATEST",
+    "GRAFOS_EM_ANDAMENTO",
+    "SERVICO_OPENAI",
+    "SERVICO_SUPABASE",
+    "SERVICO_EVOLUTION",
+    "SERVICO_CALENDAR",
+    "observar_chamada",
+    "medir_chamada",
+    "operacao_evolution",
+    "instrumentar_supabase",
+    "CallbackMetricasLLM",
+    "observar_no",
+    "observar_primeira_resposta",
+    "registrar_fila",
+    "gerar_metricas",
+    "SpanKind",
+    "configurar_tracing",
+    "fechar_tracing",
+    "iniciar_span",
+    "abrir_span",
+    "fechar_span",
+    "contexto_atual",
+    "CallbackTracingLLM",
+]
@@ -0,0 +1,276 @@
+"""
+Latência por etapa do grafo de atendimento.
+
+Cada nó registrado em `criar_grafo_atendimento` é envolvido por
+`instrumentar_no`, que mede a duração com relógio monotônico
+(`time.perf_counter`), o resultado (ok/erro) e o tamanho dos campos do
+estado que o nó escreveu. As medições ficam em memória:
+
+- agregados por nó (execuções, erros, média, p50/p95/p99, máximo, bytes);
+- o rastro das últimas mensagens, por `mensagem_id`, com a sequência de
+  nós e o tempo de cada um.
+
+Os agregados e rastros ficam em `/metrics/nos`; a duração de cada nó
+também vai para o histograma Prometheus de `/metrics` e cada execução vira
+um span OpenTelemetry.
+"""
+
+from __future__ import annotations
+
+import functools
+import inspect
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from src.monitoring.prometheus_metrics import observar_no
+from src.monitoring.tracing import Span, Status, StatusCode, iniciar_span
+
+logger = logging.getLogger(__name__)
+
+# Amostras guardadas por nó para os percentis
+MAX_AMOSTRAS_NO = 500
+
+# Mensagens com rastro guardado (as mais antigas saem primeiro)
+MAX_RASTROS = 200
+
+RESULTADO_OK = "ok"
+RESULTADO_ERRO = "erro"
+
+
+def _percentil(ordenadas: List[float], p: float) -> float:
+    if not ordenadas:
+        return 0.0
+    indice = min(len(ordenadas) - 1, max(0, round(p / 100 * len(ordenadas)) - 1))
+    return ordenadas[indice]
+
+
+def _tamanho(valor: Any) -> int:
+    """Tamanho aproximado em bytes de um valor do estado."""
+    if valor is None:
+        return 0
+    if isinstance(valor, (str, bytes)):
+        return len(valor)
+    try:
+        return len(json.dumps(valor, default=str, ensure_ascii=False))
+    except (TypeError, ValueError):
+        return len(str(valor))
+
+
+@dataclass
+class _EstatisticasNo:
+    execucoes: int = 0
+    erros: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    bytes_saida: int = 0
+    amostras: Deque[float] = field(default_factory=lambda: deque(maxlen=MAX_AMOSTRAS_NO))
+
+    def resumo(self) -> Dict[str, Any]:
+        ordenadas = sorted(self.amostras)
+        return {
+            "execucoes": self.execucoes,
+            "erros": self.erros,
+            "media_ms": round(self.total_ms / self.execucoes, 2) if self.execucoes else 0.0,
+            "p50_ms": round(_percentil(ordenadas, 50), 2),
+            "p95_ms": round(_percentil(ordenadas, 95), 2),
+            "p99_ms": round(_percentil(ordenadas, 99), 2),
+            "max_ms": round(self.max_ms, 2),
+            "bytes_saida_medio": self.bytes_saida // self.execucoes if self.execucoes else 0,
+        }
+
+
+class MetricasNos:
+    """
+    Medições por nó do grafo e rastro por mensagem.
+
+    Example:
+        >>> metricas = get_metricas_nos()
+        >>> metricas.registrar("processar_agente", 1234.5, "ok", 800, "3EB0...")
+        >>> metricas.resumo()["nos"]["processar_agente"]["p95_ms"]
+        1234.5
+    """
+
+    def __init__(self, max_rastros: int = MAX_RASTROS) -> None:
+        self.max_rastros = max_rastros
+        self._nos: Dict[str, _EstatisticasNo] = {}
+        self._rastros: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+
+    def registrar(
+        self,
+        no: str,
+        duracao_ms: float,
+        resultado: str,
+        bytes_saida: int = 0,
+        mensagem_id: Optional[str] = None
+    ) -> None:
+        """Registra uma execução de nó."""
+        estatisticas = self._nos.setdefault(no, _EstatisticasNo())
+        estatisticas.execucoes += 1
+        estatisticas.total_ms += duracao_ms
+        estatisticas.max_ms = max(estatisticas.max_ms, duracao_ms)
+        estatisticas.bytes_saida += bytes_saida
+        estatisticas.amostras.append(duracao_ms)
+        if resultado != RESULTADO_OK:
+            estatisticas.erros += 1
+
+        if not mensagem_id:
+            return
+
+        rastro = self._rastros.get(mensagem_id)
+        if rastro is None:
+            rastro = self._rastros[mensagem_id] = []
+            while len(self._rastros) > self.max_rastros:
+                self._rastros.popitem(last=False)
+
+        rastro.append({
+            "no": no,
+            "duracao_ms": round(duracao_ms, 2),
+            "resultado": resultado,
+            "bytes_saida": bytes_saida,
+        })
+
+    def rastro(self, mensagem_id: str) -> List[Dict[str, Any]]:
+        """Sequência de nós executados para uma mensagem ([] se desconhecida)."""
+        return list(self._rastros.get(mensagem_id, []))
+
+    def resumo(self, ultimos_rastros: int = 20) -> Dict[str, Any]:
+        """Agregados por nó e rastro das últimas mensagens."""
+        recentes = list(self._rastros.items())[-ultimos_rastros:] if ultimos_rastros else []
+        return {
+            "nos": {nome: estatisticas.resumo() for nome, estatisticas in self._nos.items()},
+            "mensagens": [
+                {
+                    "mensagem_id": mensagem_id,
+                    "total_ms": round(sum(etapa["duracao_ms"] for etapa in etapas), 2),
+                    "etapas": list(etapas),
+                }
+                for mensagem_id, etapas in reversed(recentes)
+            ],
+        }
+
+    def zerar(self) -> None:
+        """Descarta todas as medições (útil em testes)."""
+        self._nos.clear()
+        self._rastros.clear()
+
+
+# ========== SINGLETON ==========
+
+_metricas: Optional[MetricasNos] = None
+
+
+def get_metricas_nos() -> MetricasNos:
+    """Retorna as métricas de nós do processo."""
+    global _metricas
+
+    if _metricas is None:
+        _metricas = MetricasNos()
+
+    return _metricas
+
+
+# ==============================================
+# INSTRUMENTAÇÃO DOS NÓS
+# ==============================================
+
+def _registrar_execucao(
+    nome: str,
+    inicio: float,
+    antes: Dict[str, Any],
+    resultado: Any,
+    erro: Optional[BaseException],
+    span: Span
+) -> None:
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+
+    try:
+        saida = resultado if isinstance(resultado, dict) else {}
+
+        # Nós do repo alteram o estado e o devolvem: compara com a cópia rasa de antes
+        bytes_saida = sum(
+            _tamanho(valor) for chave, valor in saida.items()
+            if chave not in antes or antes[chave] is not valor
+        )
+
+        falhou = erro is not None or (bool(saida.get("erro")) and saida.get("erro") != antes.get("erro"))
+        mensagem_id = saida.get("mensagem_id") or antes.get("mensagem_id")
+        resultado_no = RESULTADO_ERRO if falhou else RESULTADO_OK
+
+        get_metricas_nos().registrar(nome, duracao_ms, resultado_no, bytes_saida, mensagem_id)
+        observar_no(nome, duracao_ms / 1000, resultado_no)
+
+        if span.is_recording():
+            span.set_attributes({"mensagem_id": mensagem_id or "", "bytes_saida": bytes_saida})
+            if falhou and erro is None:
+                span.set_status(Status(StatusCode.ERROR, str(saida.get("erro"))))
+    except Exception as e:
+        # Instrumentação nunca derruba o fluxo
+        logger.debug(f"Falha ao registrar métricas do nó {nome}: {e}")
+
+
+def instrumentar_no(nome: str, funcao: Callable) -> Callable:
+    """
+    Envolve um nó do grafo medindo duração, resultado e tamanho da saída.
+
+    Cada execução também vira um span (filho do trace da mensagem).
+
+    Funções síncronas continuam síncronas (o LangGraph as executa em
+    thread); corrotinas continuam corrotinas.
+
+    Args:
+        nome: Nome do nó no grafo
+        funcao: Função do nó (recebe e devolve o estado)
+
+    Returns:
+        Callable: Nó instrumentado
+
+    Example:
+        >>> workflow.add_node("processar_agente", instrumentar_no("processar_agente", agent.processar_agente))
+    """
+    if inspect.iscoroutinefunction(funcao):
+        @functools.wraps(funcao)
+        async def no_assincrono(state, *args, **kwargs):
+            antes = dict(state)
+            with iniciar_span(nome, **{"langgraph.node": nome}) as span:
+                inicio = time.perf_counter()
+                resultado, erro = None, None
+                try:
+                    resultado = await funcao(state, *args, **kwargs)
+                    return resultado
+                except BaseException as e:
+                    erro = e
+                    raise
+                finally:
+                    _registrar_execucao(nome, inicio, antes, resultado, erro, span)
+
+        return no_assincrono
+
+    @functools.wraps(funcao)
+    def no_sincrono(state, *args, **kwargs):
+        antes = dict(state)
+        with iniciar_span(nome, **{"langgraph.node": nome}) as span:
+            inicio = time.perf_counter()
+            resultado, erro = None, None
+            try:
+                resultado = funcao(state, *args, **kwargs)
+                return resultado
+            except BaseException as e:
+                erro = e
+                raise
+            finally:
+                _registrar_execucao(nome, inicio, antes, resultado, erro, span)
+
+    return no_sincrono
+
+
+# ========== EXPORTAÇÕES ==========
+
+__all__ = [
+    "MetricasNos",
+    "get_metricas_nos",
+    "instrumentar_no",
+]
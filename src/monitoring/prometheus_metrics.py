@@ -0,0 +1,321 @@
+"""
+Métricas Prometheus do atendimento (expostas em `/metrics`).
+
+Histogramas e contadores para:
+- latência do webhook até a primeira resposta enviada ao cliente;
+- duração de cada nó do grafo;
+- latência e tokens das chamadas ao LLM (callback do LangChain registrado
+  em `get_chat_model`, vale para agente, roteador, resumo e imagens);
+- latência e erros das chamadas externas: Whisper, Supabase (event hooks
+  do httpx do PostgREST), Evolution API (cada tentativa de
+  `_request_with_retry`) e Google Calendar (`CalendarGateway.executar`);
+- grafos em andamento e profundidade das filas em background (gauges
+  calculados só na coleta).
+
+Tudo fica em um registro próprio, sem as métricas de processo do
+prometheus_client. Registrar uma observação custa poucos microssegundos e
+não faz I/O: nada pesa no caminho crítico.
+
+`medir_chamada` e os hooks do Supabase também abrem o span da chamada
+(ver tracing.py), para que métricas e traces usem os mesmos pontos.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+from urllib.parse import urlparse
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+from src.monitoring.tracing import Span, SpanKind, abrir_span, fechar_span, iniciar_span, uso_tokens
+
+logger = logging.getLogger(__name__)
+
+REGISTRO = CollectorRegistry(auto_describe=True)
+
+# Buckets (segundos): chamadas externas vão de dezenas de ms a dezenas de s
+BUCKETS_CHAMADAS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0)
+BUCKETS_PRIMEIRA_RESPOSTA = (1.0, 2.0, 5.0, 10.0, 15.0, 20.0, 30.0, 45.0, 60.0, 120.0)
+BUCKETS_TOKENS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+PRIMEIRA_RESPOSTA = Histogram(
+    "atendimento_primeira_resposta_segundos",
+    "Tempo entre o recebimento do webhook e o envio do primeiro fragmento da resposta",
+    buckets=BUCKETS_PRIMEIRA_RESPOSTA,
+    registry=REGISTRO,
+)
+NO_DURACAO = Histogram(
+    "atendimento_no_duracao_segundos",
+    "Duração de cada nó do grafo de atendimento",
+    ["no", "resultado"],
+    buckets=BUCKETS_CHAMADAS,
+    registry=REGISTRO,
+)
+LLM_DURACAO = Histogram(
+    "atendimento_llm_duracao_segundos",
+    "Latência das chamadas ao modelo de chat",
+    ["modelo"],
+    buckets=BUCKETS_CHAMADAS,
+    registry=REGISTRO,
+)
+LLM_TOKENS = Histogram(
+    "atendimento_llm_tokens",
+    "Tokens por chamada ao modelo de chat",
+    ["modelo", "tipo"],
+    buckets=BUCKETS_TOKENS,
+    registry=REGISTRO,
+)
+LLM_ERROS = Counter(
+    "atendimento_llm_erros_total",
+    "Chamadas ao modelo de chat que falharam",
+    ["modelo"],
+    registry=REGISTRO,
+)
+CHAMADA_DURACAO = Histogram(
+    "atendimento_chamada_externa_duracao_segundos",
+    "Latência das chamadas a serviços externos (Whisper, Supabase, Evolution API, Google Calendar)",
+    ["servico", "operacao"],
+    buckets=BUCKETS_CHAMADAS,
+    registry=REGISTRO,
+)
+CHAMADA_ERROS = Counter(
+    "atendimento_chamada_externa_erros_total",
+    "Chamadas a serviços externos que falharam (exceção ou HTTP >= 400)",
+    ["servico", "operacao"],
+    registry=REGISTRO,
+)
+GRAFOS_EM_ANDAMENTO = Gauge(
+    "atendimento_grafos_em_andamento",
+    "Mensagens sendo processadas pelo grafo neste momento",
+    registry=REGISTRO,
+)
+FILA_BACKGROUND = Gauge(
+    "atendimento_fila_background",
+    "Tarefas pendentes nas filas em background",
+    ["fila"],
+    registry=REGISTRO,
+)
+
+# Serviços externos
+SERVICO_OPENAI = "openai"
+SERVICO_SUPABASE = "supabase"
+SERVICO_EVOLUTION = "evolution"
+SERVICO_CALENDAR = "calendar"
+
+
+# ==============================================
+# CHAMADAS EXTERNAS
+# ==============================================
+
+def observar_chamada(servico: str, operacao: str, duracao: float, erro: bool = False) -> None:
+    """Registra a duração (segundos) de uma chamada externa."""
+    CHAMADA_DURACAO.labels(servico, operacao).observe(duracao)
+    if erro:
+        CHAMADA_ERROS.labels(servico, operacao).inc()
+
+
+@contextmanager
+def medir_chamada(servico: str, operacao: str, **atributos: Any) -> Iterator[Span]:
+    """
+    Mede uma chamada externa e abre o span dela; exceções contam como erro e são propagadas.
+
+    Args:
+        servico: Serviço externo (SERVICO_*)
+        operacao: Operação (rótulo da métrica e nome do span)
+        **atributos: Atributos extras do span
+
+    Example:
+        >>> with medir_chamada(SERVICO_OPENAI, "whisper"):
+        ...     transcript = await client.audio.transcriptions.create(...)
+    """
+    inicio = time.perf_counter()
+    erro = False
+    with iniciar_span(f"{servico} {operacao}", SpanKind.CLIENT, servico=servico, **atributos) as span:
+        try:
+            yield span
+        except BaseException:
+            erro = True
+            raise
+        finally:
+            observar_chamada(servico, operacao, time.perf_counter() - inicio, erro)
+
+
+def operacao_evolution(url: str) -> str:
+    """
+    Endpoint da Evolution API sem a instância ("message/sendText").
+
+    Example:
+        >>> operacao_evolution("https://api.exemplo.com/message/sendText/minha-instancia")
+        'message/sendText'
+    """
+    partes = [parte for parte in urlparse(url).path.split("/") if parte]
+    return "/".join(partes[:2]) or "desconhecida"
+
+
+def _operacao_supabase(url: Any) -> str:
+    """Tabela ou função RPC de uma URL do PostgREST (/rest/v1/leads, /rest/v1/rpc/f)."""
+    partes = [parte for parte in url.path.split("/") if parte]
+    if "v1" in partes:
+        partes = partes[partes.index("v1") + 1:]
+    return "/".join(partes[:2]) if partes[:1] == ["rpc"] else (partes[0] if partes else "desconhecida")
+
+
+def instrumentar_supabase(cliente: Any) -> Any:
+    """
+    Mede as requisições de um cliente Supabase (event hooks do httpx do PostgREST).
+
+    Cada requisição também vira um span filho do span atual.
+
+    A operação é `<MÉTODO> <tabela>` (ou `<MÉTODO> rpc/<função>`). Falhas de
+    conexão não passam pelo hook de resposta; elas aparecem como erro do
+    nó que fez a consulta.
+
+    Args:
+        cliente: supabase.Client já criado
+
+    Returns:
+        O mesmo cliente
+    """
+    try:
+        sessao = cliente.postgrest.session
+    except Exception as e:
+        logger.debug(f"Cliente Supabase sem sessão PostgREST para instrumentar: {e}")
+        return cliente
+
+    def antes(requisicao) -> None:
+        operacao = f"{requisicao.method} {_operacao_supabase(requisicao.url)}"
+        requisicao.extensions["metricas_operacao"] = operacao
+        requisicao.extensions["metricas_span"] = abrir_span(
+            f"{SERVICO_SUPABASE} {operacao}", **{"db.system": "postgresql", "servico": SERVICO_SUPABASE}
+        )
+        requisicao.extensions["metricas_inicio"] = time.perf_counter()
+
+    def depois(resposta) -> None:
+        requisicao = resposta.request
+        inicio = requisicao.extensions.get("metricas_inicio")
+        if inicio is None:
+            return
+        falhou = resposta.status_code >= 400
+        observar_chamada(
+            SERVICO_SUPABASE, requisicao.extensions["metricas_operacao"], time.perf_counter() - inicio, falhou
+        )
+        fechar_span(
+            requisicao.extensions["metricas_span"], falhou=falhou,
+            **{"http.response.status_code": resposta.status_code}
+        )
+
+    sessao.event_hooks["request"].append(antes)
+    sessao.event_hooks["response"].append(depois)
+
+    return cliente
+
+
+# ==============================================
+# LLM
+# ==============================================
+
+class CallbackMetricasLLM(BaseCallbackHandler):
+    """
+    Callback do LangChain que mede latência e tokens de um modelo de chat.
+
+    Executa inline (sem thread extra) e só guarda o instante de início de
+    cada execução até o fim dela.
+
+    Args:
+        modelo: Nome do modelo (rótulo das métricas)
+    """
+
+    run_inline = True
+
+    def __init__(self, modelo: str) -> None:
+        self.modelo = modelo
+        self._inicios: Dict[UUID, float] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any) -> None:
+        self._inicios[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs: Any) -> None:
+        self._inicios[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        inicio = self._inicios.pop(run_id, None)
+        if inicio is not None:
+            LLM_DURACAO.labels(self.modelo).observe(time.perf_counter() - inicio)
+
+        uso = uso_tokens(response)
+        if uso:
+            LLM_TOKENS.labels(self.modelo, "entrada").observe(uso.get("input_tokens", 0))
+            LLM_TOKENS.labels(self.modelo, "saida").observe(uso.get("output_tokens", 0))
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._inicios.pop(run_id, None)
+        LLM_ERROS.labels(self.modelo).inc()
+
+
+# ==============================================
+# ATENDIMENTO
+# ==============================================
+
+def observar_no(no: str, duracao: float, resultado: str) -> None:
+    """Registra a duração (segundos) de um nó do grafo."""
+    NO_DURACAO.labels(no, resultado).observe(duracao)
+
+
+def observar_primeira_resposta(recebido_em: Optional[float]) -> None:
+    """
+    Registra o tempo desde o recebimento do webhook (time.perf_counter()).
+
+    Args:
+        recebido_em: Instante do recebimento (state["recebido_em"]); None é ignorado
+    """
+    if recebido_em is not None:
+        PRIMEIRA_RESPOSTA.observe(time.perf_counter() - recebido_em)
+
+
+def registrar_fila(nome: str, tamanho: Callable[[], float]) -> None:
+    """
+    Expõe a profundidade de uma fila em background, calculada na coleta.
+
+    Example:
+        >>> registrar_fila("resumos", lambda: len(get_resumidor_conversas()._tarefas))
+    """
+    FILA_BACKGROUND.labels(nome).set_function(tamanho)
+
+
+def gerar_metricas() -> bytes:
+    """Métricas no formato de exposição do Prometheus."""
+    return generate_latest(REGISTRO)
+
+
+# ========== EXPORTAÇÕES ==========
+
+__all__ = [
+    "CONTENT_TYPE_LATEST",
+    "GRAFOS_EM_ANDAMENTO",
+    "SERVICO_OPENAI",
+    "SERVICO_SUPABASE",
+    "SERVICO_EVOLUTION",
+    "SERVICO_CALENDAR",
+    "observar_chamada",
+    "medir_chamada",
+    "operacao_evolution",
+    "instrumentar_supabase",
+    "CallbackMetricasLLM",
+    "observar_no",
+    "observar_primeira_resposta",
+    "registrar_fila",
+    "gerar_metricas",
+]
@@ -0,0 +1,266 @@
+"""
+Tracing distribuído (OpenTelemetry) do atendimento.
+
+Um trace por mensagem recebida:
+
+    webhook_whatsapp                      (span SERVER, responde na hora)
+    └── processar_mensagem                (grafo em background)
+        ├── validar_webhook, verificar_cliente, ... (um span por nó)
+        │   ├── supabase GET leads        (event hooks do PostgREST)
+        │   ├── openai chat gpt-4o-...    (tokens de entrada/saída)
+        │   ├── openai whisper
+        │   ├── evolution message/sendText (um span por tentativa)
+        │   └── calendar calendar.events.list
+
+Sem `tracing_enabled` (ou sem o opentelemetry-sdk instalado) o tracer é o
+no-op da API: criar um span não aloca nada além de um objeto vazio, e o
+caminho crítico não muda. Com tracing ligado, os spans são exportados em
+lote por uma thread do SDK (`BatchSpanProcessor`):
+
+- console: imprime os spans (testes locais);
+- arquivo: um span JSON por linha em `tracing_file` (offline, fácil de
+  filtrar com jq);
+- otlp: envia para um coletor OTLP/HTTP (requer
+  opentelemetry-exporter-otlp-proto-http).
+"""
+
+from __future__ import annotations
+
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from opentelemetry import context as otel_context
+from opentelemetry import trace
+from opentelemetry.trace import Span, SpanKind, Status, StatusCode
+
+logger = logging.getLogger(__name__)
+
+NOME_SERVICO = "whatsapp-bot-langgraph"
+
+# ProxyTracer: passa a usar o provider do SDK assim que `configurar_tracing` roda
+_tracer = trace.get_tracer("src.monitoring")
+
+_provider: Optional[Any] = None
+
+
+# ==============================================
+# CONFIGURAÇÃO
+# ==============================================
+
+def _criar_exportador(settings: Any) -> Any:
+    """Exportador conforme `tracing_exporter` (console, arquivo ou otlp)."""
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+    if settings.tracing_exporter == "arquivo":
+        arquivo = open(settings.tracing_file, "a", encoding="utf-8")
+        return ConsoleSpanExporter(
+            out=arquivo,
+            formatter=lambda span: span.to_json(indent=None) + "\n"
+        )
+
+    if settings.tracing_exporter == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            logger.warning(
+                "opentelemetry-exporter-otlp-proto-http não instalado; usando exportador de console"
+            )
+            return ConsoleSpanExporter()
+
+        if settings.tracing_otlp_endpoint:
+            return OTLPSpanExporter(endpoint=settings.tracing_otlp_endpoint)
+        return OTLPSpanExporter()
+
+    return ConsoleSpanExporter()
+
+
+def configurar_tracing(settings: Optional[Any] = None) -> bool:
+    """
+    Liga o tracing conforme as configurações (chamado uma vez, no startup).
+
+    Returns:
+        bool: True se os spans passaram a ser exportados
+    """
+    global _provider
+
+    if settings is None:
+        from src.config.settings import get_settings
+        settings = get_settings()
+
+    if not settings.tracing_enabled or _provider is not None:
+        return _provider is not None
+
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning("opentelemetry-sdk não instalado: tracing desativado (no-op)")
+        return False
+
+    provider = TracerProvider(resource=Resource.create({
+        "service.name": NOME_SERVICO,
+        "deployment.environment": settings.environment,
+    }))
+    provider.add_span_processor(BatchSpanProcessor(_criar_exportador(settings)))
+    trace.set_tracer_provider(provider)
+    _provider = provider
+
+    logger.info(f"Tracing OpenTelemetry ativo (exportador: {settings.tracing_exporter})")
+    return True
+
+
+def fechar_tracing() -> None:
+    """Exporta os spans pendentes e encerra o provider (shutdown da aplicação)."""
+    global _provider
+
+    if _provider is not None:
+        try:
+            _provider.shutdown()
+        except Exception as e:
+            logger.error(f"Erro ao encerrar tracing: {e}")
+        _provider = None
+
+
+# ==============================================
+# SPANS
+# ==============================================
+
+def _atributos(atributos: Dict[str, Any]) -> Dict[str, Any]:
+    return {chave: valor for chave, valor in atributos.items() if valor is not None}
+
+
+@contextmanager
+def iniciar_span(
+    nome: str,
+    tipo: SpanKind = SpanKind.INTERNAL,
+    contexto: Optional[otel_context.Context] = None,
+    **atributos: Any
+) -> Iterator[Span]:
+    """
+    Abre um span como span atual; exceções são registradas e propagadas.
+
+    Args:
+        nome: Nome do span
+        tipo: SpanKind (SERVER, CLIENT, INTERNAL)
+        contexto: Contexto pai explícito (ex: trace do webhook no background)
+        **atributos: Atributos do span (None é ignorado)
+
+    Example:
+        >>> with iniciar_span("processar_mensagem", contexto=contexto_webhook):
+        ...     await grafo.ainvoke(state)
+    """
+    with _tracer.start_as_current_span(
+        nome, context=contexto, kind=tipo, attributes=_atributos(atributos)
+    ) as span:
+        yield span
+
+
+def abrir_span(nome: str, tipo: SpanKind = SpanKind.CLIENT, **atributos: Any) -> Span:
+    """Abre um span filho do atual sem torná-lo atual (fechar com `fechar_span`)."""
+    return _tracer.start_span(nome, kind=tipo, attributes=_atributos(atributos))
+
+
+def fechar_span(span: Span, erro: Optional[BaseException] = None, falhou: bool = False, **atributos: Any) -> None:
+    """Finaliza um span aberto com `abrir_span`, marcando erro se houver."""
+    if atributos:
+        span.set_attributes(_atributos(atributos))
+    if erro is not None:
+        span.record_exception(erro)
+    if erro is not None or falhou:
+        span.set_status(Status(StatusCode.ERROR, str(erro) if erro else None))
+    span.end()
+
+
+def contexto_atual() -> otel_context.Context:
+    """Contexto atual, para continuar o trace em uma tarefa em background."""
+    return otel_context.get_current()
+
+
+# ==============================================
+# LLM
+# ==============================================
+
+def uso_tokens(response: LLMResult) -> Optional[Dict[str, int]]:
+    """Tokens de entrada/saída da resposta (usage_metadata ou llm_output)."""
+    for geracoes in response.generations:
+        for geracao in geracoes:
+            uso = getattr(getattr(geracao, "message", None), "usage_metadata", None)
+            if uso:
+                return uso
+
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    if token_usage:
+        return {
+            "input_tokens": token_usage.get("prompt_tokens", 0),
+            "output_tokens": token_usage.get("completion_tokens", 0),
+        }
+    return None
+
+
+class CallbackTracingLLM(BaseCallbackHandler):
+    """
+    Callback do LangChain que abre um span por chamada ao modelo de chat.
+
+    O span é filho do nó que fez a chamada e recebe os tokens de entrada e
+    saída (convenções `gen_ai.*`).
+
+    Args:
+        modelo: Nome do modelo
+    """
+
+    run_inline = True
+
+    def __init__(self, modelo: str) -> None:
+        self.modelo = modelo
+        self._spans: Dict[UUID, Span] = {}
+
+    def _abrir(self, run_id: UUID) -> None:
+        self._spans[run_id] = abrir_span(
+            f"openai chat {self.modelo}",
+            **{"gen_ai.system": "openai", "gen_ai.request.model": self.modelo}
+        )
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any) -> None:
+        self._abrir(run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs: Any) -> None:
+        self._abrir(run_id)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        span = self._spans.pop(run_id, None)
+        if span is None:
+            return
+
+        uso = uso_tokens(response) or {}
+        fechar_span(span, **{
+            "gen_ai.usage.input_tokens": uso.get("input_tokens"),
+            "gen_ai.usage.output_tokens": uso.get("output_tokens"),
+        })
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        span = self._spans.pop(run_id, None)
+        if span is not None:
+            fechar_span(span, erro=error)
+
+
+# ========== EXPORTAÇÕES ==========
+
+__all__ = [
+    "Span",
+    "SpanKind",
+    "Status",
+    "StatusCode",
+    "configurar_tracing",
+    "fechar_tracing",
+    "iniciar_span",
+    "abrir_span",
+    "fechar_span",
+    "contexto_atual",
+    "uso_tokens",
+    "CallbackTracingLLM",
+]
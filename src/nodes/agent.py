@@ -11,11 +11,13 @@ Data: 2025-10-21
 
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+from zoneinfo import ZoneInfo
 import asyncio
 
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from langchain_openai import ChatOpenAI
 from src.history.supabase_history import SupabaseChatMessageHistory
+from src.history.summarizer import get_resumidor_conversas
 from langchain_community.vectorstores import SupabaseVectorStore
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
@@ -26,8 +28,38 @@ from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from src.models.state import AgentState, AcaoFluxo
 from src.config.settings import get_settings
 from src.clients.supabase_client import get_supabase_client
-from src.tools.scheduling import agendamento_tool
+from src.clients.openai_client import get_chat_model, get_embeddings
+from src.tools.scheduling import TIMEZONE, agendamento_tool, consultar_horarios
+from src.tools.date_parser import ReferenciaData, formatar_dicas_datas, resolver_datas
+from src.tools.prefetch import (
+    INTENCAO_AGENDA,
+    INTENCAO_CONHECIMENTO,
+    PrefetchEspeculativo,
+    busca_corresponde,
+    detectar_intencoes,
+)
 from src.tools.contact_tech import contatar_tecnico_tool
+from src.utils.idempotency import (
+    definir_lead_atual,
+    definir_mensagem_atual,
+    resetar_lead_atual,
+    resetar_mensagem_atual,
+)
+from src.utils.customer_facts import (
+    extrair_fatos_ferramenta,
+    extrair_fatos_texto,
+    formatar_fatos,
+    mesclar_fatos,
+    salvar_fatos,
+)
+from src.utils.context_assembler import (
+    PRIORIDADE_FERRAMENTAS,
+    PRIORIDADE_HISTORICO,
+    PRIORIDADE_MENSAGEM,
+    PRIORIDADE_RAG,
+    MontadorContexto,
+    resumir_resultado,
+)
 
 # Configuração de logging
 logger = logging.getLogger(__name__)
@@ -53,14 +85,8 @@ def _get_llm() -> ChatOpenAI:
     if not settings.openai_api_key:
         raise ValueError("OPENAI_API_KEY não configurada")
 
-    llm = ChatOpenAI(
-        model="gpt-4o-2024-11-20",
-        temperature=0.9,
-        streaming=True,
-        timeout=settings.agent_timeout,
-        max_retries=settings.max_retries,
-        api_key=settings.openai_api_key
-    )
+    # AGENT_TIMEOUT vale para cada chamada do agente (não o OPENAI_TIMEOUT padrão)
+    llm = get_chat_model("gpt-4o-2024-11-20", temperature=0.9, streaming=True, timeout=settings.agent_timeout)
 
     logger.info(f"LLM configurado: {llm.model_name}, temperatura: {llm.temperature}")
     return llm
@@ -117,11 +143,8 @@ def _create_retriever_tool() -> Any:
         # Cliente Supabase
         supabase_client = get_supabase_client()
 
-        # Embeddings OpenAI
-        embeddings = OpenAIEmbeddings(
-            model="text-embedding-3-small",
-            api_key=settings.openai_api_key
-        )
+        # Embeddings OpenAI (pool HTTP compartilhado)
+        embeddings = get_embeddings("text-embedding-3-small")
 
         # Vector Store
         vectorstore = SupabaseVectorStore(
@@ -164,6 +187,23 @@ def _create_retriever_tool() -> Any:
         return None
 
 
+_retriever_tool: Optional[Any] = None
+
+
+def _get_retriever_tool() -> Optional[Any]:
+    """
+    Retorna a ferramenta RAG do processo (criada uma vez).
+
+    Se a criação falhar, tenta de novo na próxima chamada.
+    """
+    global _retriever_tool
+
+    if _retriever_tool is None:
+        _retriever_tool = _create_retriever_tool()
+
+    return _retriever_tool
+
+
 # ==============================================
 # SYSTEM PROMPT
 # ==============================================
@@ -187,11 +227,11 @@ def _get_system_prompt(cliente_nome: str = "Cliente", telefone_cliente: str = ""
     ][agora.weekday()]
 
     # LOG TEMPORÁRIO PARA DEBUG
-    logger.info("━" * 60)
-    logger.info("🔍 DEBUG: Dados injetados no system prompt:")
-    logger.info(f"   cliente_nome = '{cliente_nome}'")
-    logger.info(f"   telefone_cliente = '{telefone_cliente}'")
-    logger.info("━" * 60)
+    logger.debug("━" * 60)
+    logger.debug("🔍 DEBUG: Dados injetados no system prompt:")
+    logger.debug("   cliente_nome = '%s'", cliente_nome)
+    logger.debug("   telefone_cliente = '%s'", telefone_cliente)
+    logger.debug("━" * 60)
 
     system_prompt = f"""
 <quem_voce_eh>
@@ -262,13 +302,9 @@ telefone_cliente="Número não fornecido"
 </suas_funcoes>
 
 <instrucoes_comportamento>
-1. **USE O HISTÓRICO DA CONVERSA - REGRA CRÍTICA**:
-   - ⚠️ ANTES de perguntar QUALQUER informação, SEMPRE verifique o histórico da conversa
-   - Se o cliente já forneceu nome, email, telefone, endereço ou qualquer outra informação, NÃO PERGUNTE NOVAMENTE
-   - Lembre-se do contexto completo da conversa (o que o cliente já perguntou e o que você respondeu)
-   - Seja coerente com as respostas anteriores
-   - Exemplo: Se o cliente já disse "Viniciushann@gmail.com", NÃO pergunte "Qual seu email?" novamente
-   - Exemplo: Se o cliente já informou o endereço, NÃO peça o endereço de novo
+1. **NÃO PERGUNTE O QUE O CLIENTE JÁ INFORMOU - REGRA CRÍTICA**:
+   - Nome, endereço, email, período preferido e serviço já informados aparecem no bloco "DADOS JÁ INFORMADOS PELO CLIENTE": use-os direto (inclusive nos argumentos das ferramentas)
+   - Para o resto, use o resumo e o histórico da conversa e seja coerente com as respostas anteriores
 
 2. **SEMPRE** consulte a base de conhecimento quando o cliente perguntar sobre:
    - Serviços ("Vocês fazem...?", "Tem...?")
@@ -298,7 +334,7 @@ telefone_cliente="Número não fornecido"
    ⚠️ NÃO PEÇA EMAIL se o cliente não mencionar! Apenas nome, endereço e horário!
 
    Passos:
-   1. Verifique o histórico - que dados JÁ TEM?
+   1. Veja em "DADOS JÁ INFORMADOS PELO CLIENTE" o que já tem
    2. Peça APENAS o que falta (nome, endereço, dia/período)
    3. Consulte disponibilidade: intencao="consultar"
    4. Agende: intencao="agendar", email_cliente="sememail@gmail.com" (se não fornecido)
@@ -355,6 +391,8 @@ telefone_cliente="Número não fornecido"
 4. **Data e hora atuais**: {data_hora_atual} ({dia_semana})
    - Para "amanhã": calcule como {(agora + timedelta(days=1)).strftime('%d/%m/%Y')}
    - Para "semana que vem": calcule a partir de {(agora + timedelta(days=7)).strftime('%d/%m/%Y')}
+   - Se a mensagem trouxer o bloco "DATAS JÁ CALCULADAS", use exatamente essas datas
+   - Se trouxer "HORÁRIOS DISPONÍVEIS JÁ CONSULTADOS", responda com eles sem chamar a consulta de novo
 
 5. **Seja natural e humanizada**:
    - Use linguagem calorosa e amigável, como se estivesse conversando pessoalmente
@@ -486,13 +524,18 @@ Lembre-se: Você representa a empresa. Seja profissional, prestativa e eficiente
 # CRIAÇÃO DO AGENTE
 # ==============================================
 
-async def _create_agent(cliente_nome: str = "Cliente", telefone_cliente: str = ""):
+async def _create_agent(
+    cliente_nome: str = "Cliente",
+    telefone_cliente: str = "",
+    system_prompt: Optional[str] = None
+):
     """
     Cria e configura o agente ReAct com todas as ferramentas e contexto do cliente.
     
     Args:
         cliente_nome: Nome do cliente para injetar no contexto
         telefone_cliente: Telefone do cliente para injetar no contexto
+        system_prompt: Prompt já montado (padrão: _get_system_prompt do cliente)
     
     Returns:
         RunnableWithMessageHistory: Agente configurado com dados do cliente
@@ -508,7 +551,7 @@ async def _create_agent(cliente_nome: str = "Cliente", telefone_cliente: str = "
         tools = []
 
         # Adiciona retriever RAG (se disponível)
-        retriever_tool = _create_retriever_tool()
+        retriever_tool = _get_retriever_tool()
         if retriever_tool:
             tools.append(retriever_tool)
         else:
@@ -523,10 +566,11 @@ async def _create_agent(cliente_nome: str = "Cliente", telefone_cliente: str = "
         logger.info(f"Agente configurado com {len(tools)} ferramentas: {[t.name for t in tools]}")
 
         # System prompt COM dados do cliente atual
-        system_prompt = _get_system_prompt(
-            cliente_nome=cliente_nome,
-            telefone_cliente=telefone_cliente
-        )
+        if system_prompt is None:
+            system_prompt = _get_system_prompt(
+                cliente_nome=cliente_nome,
+                telefone_cliente=telefone_cliente
+            )
         
         logger.info(f"✅ Agente configurado com contexto do cliente: {cliente_nome}")
 
@@ -552,6 +596,112 @@ async def _create_agent(cliente_nome: str = "Cliente", telefone_cliente: str = "
         raise
 
 
+# ==============================================
+# ORÇAMENTO DO CONTEXTO
+# ==============================================
+
+# Mensagens do histórico candidatas ao contexto (as mais antigas saem primeiro).
+# Cobre as mensagens que ainda não entraram no resumo da conversa
+MAX_MENSAGENS_HISTORICO = 10
+
+# Limite do resumo da conversa
+MAX_TOKENS_RESUMO = 400
+
+# Limite por documento do RAG e por resultado de tool
+MAX_TOKENS_DOCUMENTO_RAG = 400
+MAX_TOKENS_RESULTADO_TOOL = 800
+
+
+# ==============================================
+# DATAS E CONSULTA ANTECIPADA DA AGENDA
+# ==============================================
+
+# Tempo máximo (segundos) esperando a consulta antecipada antes do LLM
+ESPERA_CONSULTA_ANTECIPADA = 1.5
+
+# Máximo de horários listados por dia nas dicas para o LLM
+MAX_HORARIOS_DICA = 8
+
+def _iniciar_consulta_antecipada(
+    referencias: List[ReferenciaData],
+    agora: datetime,
+    prefetch: PrefetchEspeculativo
+) -> Optional[ReferenciaData]:
+    """
+    Dispara em background a consulta de horários da primeira data mencionada.
+
+    Roda enquanto o agente é montado e o histórico é carregado; se o LLM
+    pedir a mesma consulta, o resultado já está pronto.
+
+    Returns:
+        ReferenciaData: Data consultada, ou None se não há data na mensagem
+    """
+    if not referencias:
+        return None
+
+    referencia = referencias[0]
+
+    # Para hoje, consultar a partir de agora (meia-noite já passou)
+    if referencia.data == agora.date():
+        data_referencia = (agora + timedelta(minutes=1)).strftime("%d/%m/%Y %H:%M")
+    else:
+        data_referencia = referencia.data.strftime("%d/%m/%Y")
+
+    informacao_extra = ""
+    if referencia.periodo == "tarde":
+        informacao_extra = "período da tarde"
+    elif referencia.periodo == "manha":
+        informacao_extra = "período da manhã"
+
+    prefetch.iniciar(
+        "agendamento_tool",
+        consultar_horarios(
+            data_referencia=data_referencia,
+            informacao_extra=informacao_extra,
+            dias=referencia.dias
+        ),
+        corresponde=lambda argumentos: _consulta_corresponde(argumentos, referencia)
+    )
+    logger.info(f"Consulta antecipada de horários: {data_referencia} ({referencia.dias} dia(s))")
+    return referencia
+
+
+def _consulta_corresponde(tool_args: Dict[str, Any], referencia: ReferenciaData) -> bool:
+    """True se a chamada consultar do LLM pede o mesmo que a consulta antecipada."""
+    if tool_args.get("intencao") != "consultar":
+        return False
+
+    data_pedida = str(tool_args.get("data_consulta_reuniao", "")).strip()[:10]
+    if data_pedida not in (referencia.data.strftime("%d/%m/%Y"), referencia.data.isoformat()):
+        return False
+
+    informacao = str(tool_args.get("informacao_extra", "")).lower()
+    periodo = "tarde" if "tarde" in informacao else "manha" if ("manha" in informacao or "manhã" in informacao) else None
+    dias = 7 if "semana" in informacao else 1
+
+    return periodo == referencia.periodo and dias == referencia.dias
+
+
+def _formatar_consulta_antecipada(referencia: ReferenciaData, resultado: Dict[str, Any]) -> str:
+    """Resume o resultado da consulta antecipada para o contexto do LLM."""
+    dados = resultado.get("dados", {})
+    por_dia = dados.get("horarios_por_dia") or {dados.get("data_referencia", ""): dados.get("horarios", [])}
+
+    linhas = [
+        f"=== HORÁRIOS DISPONÍVEIS JÁ CONSULTADOS para '{referencia.expressao}' "
+        f"(resultado de agendamento_tool consultar; não é preciso consultar de novo) ==="
+    ]
+    for dia, horarios in por_dia.items():
+        inicios = [datetime.fromisoformat(h["inicio"]).strftime("%H:%M") for h in horarios[:MAX_HORARIOS_DICA]]
+        linhas.append(f"- {dia}: {', '.join(inicios) if inicios else 'sem horários livres'}")
+
+    if dados.get("proximo_horario"):
+        proximo = datetime.fromisoformat(dados["proximo_horario"]["inicio"])
+        linhas.append(f"- Próximo horário livre: {proximo.strftime('%d/%m/%Y às %H:%M')}")
+
+    return "\n".join(linhas)
+
+
 # ==============================================
 # FUNÇÃO PRINCIPAL: PROCESSAR AGENTE
 # ==============================================
@@ -576,11 +726,12 @@ async def processar_agente(state: AgentState) -> AgentState:
     Raises:
         Exception: Erros são capturados e tratados graciosamente
     """
-    logger.info("=" * 60)
-    logger.info("INICIANDO PROCESSAMENTO DO AGENTE")
-    logger.info("=" * 60)
+    logger.debug("=" * 60)
+    logger.debug("INICIANDO PROCESSAMENTO DO AGENTE")
+    logger.debug("=" * 60)
 
     inicio = datetime.now()
+    prefetch = PrefetchEspeculativo()
 
     try:
         # ==============================================
@@ -609,7 +760,7 @@ async def processar_agente(state: AgentState) -> AgentState:
         if texto_processado:
             # Usar texto já processado pelos nós de mídia
             entrada_usuario = texto_processado
-            logger.info(f"Usando texto processado: {entrada_usuario[:100]}...")
+            logger.debug("Usando texto processado: %s...", entrada_usuario[:100])
         else:
             # Fallback: concatenar mensagens da fila
             logger.info(f"Mensagens na fila: {len(state['fila_mensagens'])}")
@@ -635,33 +786,72 @@ async def processar_agente(state: AgentState) -> AgentState:
 
             entrada_usuario = "\n\n".join(mensagens_concatenadas)
 
-        logger.info(f"Entrada do usuário (primeiros 200 chars): {entrada_usuario[:200]}...")
+        logger.debug("Entrada do usuário (primeiros 200 chars): %s...", entrada_usuario[:200])
+
+        # Datas mencionadas resolvidas sem LLM
+        agora = datetime.now(ZoneInfo(TIMEZONE))
+        referencias_data = resolver_datas(entrada_usuario, agora)
+
+        # Fatos do cliente: registro do lead + o que veio nesta mensagem
+        # (o nome tirado por regex não substitui um nome já registrado)
+        fatos_originais = state.get("cliente_fatos") or {}
+        fatos_cliente, _ = mesclar_fatos(
+            fatos_originais, extrair_fatos_texto(entrada_usuario), preservar=("nome",)
+        )
+
+        # Prefetch especulativo: agenda e base de conhecimento começam a ser
+        # consultadas agora, em paralelo com a montagem do agente e o LLM
+        intencoes = detectar_intencoes(entrada_usuario, tem_data=bool(referencias_data))
+        referencia_consulta = None
+
+        if INTENCAO_AGENDA in intencoes:
+            referencia_consulta = _iniciar_consulta_antecipada(referencias_data, agora, prefetch)
+
+        if INTENCAO_CONHECIMENTO in intencoes:
+            retriever_tool = _get_retriever_tool()
+            if retriever_tool is not None:
+                prefetch.iniciar(
+                    "buscar_base_conhecimento",
+                    retriever_tool.ainvoke(entrada_usuario),
+                    corresponde=lambda argumentos: busca_corresponde(entrada_usuario, argumentos)
+                )
 
         # ==============================================
         # 3. CRIAR AGENTE COM DADOS DO CLIENTE
         # ==============================================
-        agent = await _create_agent(
+        system_prompt = _get_system_prompt(
             cliente_nome=cliente_nome,
             telefone_cliente=cliente_numero
         )
+        agent = await _create_agent(
+            cliente_nome=cliente_nome,
+            telefone_cliente=cliente_numero,
+            system_prompt=system_prompt
+        )
         
-        logger.info("✅ Agente criado com dados do cliente injetados:")
-        logger.info(f"   - Nome: {cliente_nome}")
-        logger.info(f"   - Telefone: {cliente_numero}")
+        logger.debug("✅ Agente criado com dados do cliente injetados:")
+        logger.debug("   - Nome: %s", cliente_nome)
+        logger.debug("   - Telefone: %s", cliente_numero)
 
         # ==============================================
         # 4. CARREGAR HISTÓRICO (se memória estiver habilitada)
         # ==============================================
         mensagens_historico = []
+        resumo_conversa = ""
 
         if settings.enable_memory_persistence:
             try:
                 history = _get_message_history(cliente_numero)
 
-                # Recupera últimas N mensagens do histórico
-                mensagens_historico = history.messages[-10:]  # Últimas 10 mensagens
+                # Resumo da conversa + últimas N mensagens em uma consulta
+                resumo_conversa, mensagens_historico = await asyncio.to_thread(
+                    history.carregar_contexto, MAX_MENSAGENS_HISTORICO
+                )
 
-                logger.info(f"Histórico carregado: {len(mensagens_historico)} mensagens")
+                logger.info(
+                    f"Histórico carregado: {len(mensagens_historico)} mensagens"
+                    f"{' + resumo' if resumo_conversa else ''}"
+                )
 
             except Exception as e:
                 logger.warning(f"Não foi possível carregar histórico: {e}")
@@ -673,27 +863,77 @@ async def processar_agente(state: AgentState) -> AgentState:
         logger.info("Invocando agente...")
 
         try:
-            # Preparar entrada com histórico (se disponível)
+            # Contexto com orçamento de tokens: mensagem atual nunca é cortada;
+            # histórico perde as mensagens mais antigas; RAG e resultados de
+            # tools são compactados e truncados
+            montador = MontadorContexto(settings.agent_context_max_tokens)
+            montador.reservar("sistema", system_prompt)
+
+            if fatos_cliente:
+                montador.adicionar("fatos", PRIORIDADE_MENSAGEM, [formatar_fatos(fatos_cliente)])
+
+            if resumo_conversa:
+                montador.adicionar(
+                    "resumo",
+                    PRIORIDADE_HISTORICO,
+                    [resumo_conversa],
+                    cabecalho="=== RESUMO DA CONVERSA ATÉ AQUI ===",
+                    max_tokens_item=MAX_TOKENS_RESUMO
+                )
+
             if mensagens_historico:
-                # Incluir resumo do histórico recente no contexto
-                historico_texto = "\n\n=== HISTÓRICO DA CONVERSA ===\n"
-                for msg in mensagens_historico[-6:]:  # Últimas 6 mensagens (3 trocas)
-                    if hasattr(msg, 'type'):
-                        role = "Cliente" if msg.type == "human" else "Carol"
-                        historico_texto += f"{role}: {msg.content}\n"
-
-                # Adicionar histórico antes da mensagem atual
-                entrada_com_historico = f"{historico_texto}\n=== MENSAGEM ATUAL ===\n{entrada_usuario}"
-                logger.info(f"Incluindo {len(mensagens_historico)} mensagens do histórico no contexto")
-            else:
-                entrada_com_historico = entrada_usuario
+                montador.adicionar(
+                    "historico",
+                    PRIORIDADE_HISTORICO,
+                    [
+                        f"{'Cliente' if msg.type == 'human' else 'Carol'}: {msg.content}"
+                        for msg in mensagens_historico if hasattr(msg, 'type')
+                    ],
+                    cabecalho="=== HISTÓRICO DA CONVERSA ===",
+                    manter_recentes=True
+                )
+                logger.info(f"Incluindo até {len(mensagens_historico)} mensagens do histórico no contexto")
+
+            montador.adicionar(
+                "mensagem",
+                PRIORIDADE_MENSAGEM,
+                [entrada_usuario],
+                cabecalho="=== MENSAGEM ATUAL ===" if (mensagens_historico or resumo_conversa) else "",
+                obrigatorio=True
+            )
+
+            if referencias_data:
+                montador.adicionar("datas", PRIORIDADE_MENSAGEM, [formatar_dicas_datas(referencias_data)])
+
+            if referencia_consulta is not None:
+                await asyncio.wait({prefetch.tarefa("agendamento_tool")}, timeout=ESPERA_CONSULTA_ANTECIPADA)
+
+                resultado_consulta = prefetch.consumir("agendamento_tool")
+                if resultado_consulta and resultado_consulta.get("sucesso"):
+                    montador.adicionar(
+                        "horarios_consultados",
+                        PRIORIDADE_MENSAGEM,
+                        [_formatar_consulta_antecipada(referencia_consulta, resultado_consulta)]
+                    )
+
+            # Segmentos das tools criados já na ordem em que aparecem no texto
+            montador.adicionar(
+                "rag", PRIORIDADE_RAG, [],
+                cabecalho="[Resultado de buscar_base_conhecimento]:",
+                max_tokens_item=MAX_TOKENS_DOCUMENTO_RAG
+            )
+            montador.adicionar(
+                "ferramentas", PRIORIDADE_FERRAMENTAS, [],
+                max_tokens_item=MAX_TOKENS_RESULTADO_TOOL
+            )
 
             # Invocar agente com loop ReAct para tool calls
             # Pegar as tools para executar
-            retriever_tool = _create_retriever_tool()
+            retriever_tool = _get_retriever_tool()
             tools_dict = {
                 "buscar_base_conhecimento": retriever_tool,
-                "agendamento_tool": agendamento_tool
+                "agendamento_tool": agendamento_tool,
+                "contatar_tecnico_tool": contatar_tecnico_tool
             }
 
             # Loop ReAct: invocar LLM, executar tools, invocar novamente
@@ -705,10 +945,17 @@ async def processar_agente(state: AgentState) -> AgentState:
                 iteration += 1
                 logger.info(f"ReAct iteration {iteration}/{max_iterations}")
 
+                contexto = montador.montar()
+                state["contexto_tokens"] = contexto.resumo()
+                logger.info(
+                    f"Contexto: {contexto.total}/{contexto.orcamento} tokens "
+                    f"{contexto.tokens} (cortados: {contexto.cortados or 'nenhum'})"
+                )
+
                 # Invocar agente
                 result = await asyncio.wait_for(
                     agent.ainvoke({
-                        "input": entrada_com_historico
+                        "input": contexto.texto
                     }),
                     timeout=settings.agent_timeout
                 )
@@ -726,21 +973,44 @@ async def processar_agente(state: AgentState) -> AgentState:
                         tool_name = tool_call.get('name')
                         tool_args = tool_call.get('args', {})
 
-                        logger.info(f"Executando tool: {tool_name} com args: {tool_args}")
+                        logger.info("Executando tool: %s com args: %s", tool_name, tool_args)
+
+                        fatos_cliente, _ = mesclar_fatos(
+                            fatos_cliente, extrair_fatos_ferramenta(tool_name, tool_args)
+                        )
 
                         # Buscar a tool
                         if tool_name in tools_dict:
                             tool = tools_dict[tool_name]
                             try:
-                                # Executar a tool
-                                tool_result = await tool.ainvoke(tool_args)
-                                logger.info(f"Tool {tool_name} retornou: {str(tool_result)[:200]}...")
+                                # Executar a tool (mensagem_id em contexto para
+                                # as chaves de idempotência dos efeitos colaterais,
+                                # cliente_id para o lead gravado no agendamento)
+                                token_mensagem = definir_mensagem_atual(state.get("mensagem_id"))
+                                token_lead = definir_lead_atual(state.get("cliente_id"))
+                                try:
+                                    # Resultado do prefetch, se a busca já foi antecipada
+                                    encontrado, tool_result = await prefetch.obter(tool_name, tool_args)
+                                    if not encontrado:
+                                        tool_result = await tool.ainvoke(tool_args)
+                                finally:
+                                    resetar_lead_atual(token_lead)
+                                    resetar_mensagem_atual(token_mensagem)
+                                logger.debug("Tool %s retornou: %s...", tool_name, str(tool_result)[:200])
 
                                 # Adicionar resultado ao contexto para próxima iteração
-                                entrada_com_historico += f"\n\n[Resultado de {tool_name}]: {tool_result}"
+                                if tool_name == "buscar_base_conhecimento":
+                                    montador.adicionar("rag", PRIORIDADE_RAG, resumir_resultado(tool_result))
+                                else:
+                                    montador.adicionar("ferramentas", PRIORIDADE_FERRAMENTAS, [
+                                        f"[Resultado de {tool_name}]: {item}"
+                                        for item in resumir_resultado(tool_result)
+                                    ])
                             except Exception as e:
                                 logger.error(f"Erro ao executar tool {tool_name}: {e}")
-                                entrada_com_historico += f"\n\n[Erro em {tool_name}]: {str(e)}"
+                                montador.adicionar("ferramentas", PRIORIDADE_FERRAMENTAS, [
+                                    f"[Erro em {tool_name}]: {str(e)}"
+                                ])
                         else:
                             logger.warning(f"Tool {tool_name} não encontrada")
 
@@ -790,7 +1060,7 @@ async def processar_agente(state: AgentState) -> AgentState:
             # Remover espaços em branco no início e fim
             resposta_agente = resposta_agente.strip()
 
-            logger.info(f"Resposta do agente (primeiros 200 chars): {resposta_agente[:200]}...")
+            logger.debug("Resposta do agente (primeiros 200 chars): %s...", resposta_agente[:200])
 
             # ==============================================
             # 6. SALVAR NO ESTADO
@@ -803,6 +1073,11 @@ async def processar_agente(state: AgentState) -> AgentState:
             ]
             state["next_action"] = AcaoFluxo.FRAGMENTAR_RESPOSTA.value
 
+            # Registro de fatos do lead gravado em background
+            if fatos_cliente != fatos_originais:
+                state["cliente_fatos"] = fatos_cliente
+                salvar_fatos(state.get("cliente_id"), fatos_cliente)
+
             # ==============================================
             # 7. PERSISTIR HISTÓRICO
             # ==============================================
@@ -818,6 +1093,10 @@ async def processar_agente(state: AgentState) -> AgentState:
 
                     logger.info("Histórico salvo com sucesso")
 
+                    # Resumo atualizado em background, fora do caminho crítico
+                    if settings.conversation_summary_enabled:
+                        get_resumidor_conversas().agendar(cliente_numero)
+
                 except Exception as e:
                     logger.error(f"Erro ao salvar histórico: {e}")
                     # Não falha o fluxo se salvar histórico der erro
@@ -828,7 +1107,7 @@ async def processar_agente(state: AgentState) -> AgentState:
             tempo_processamento = (datetime.now() - inicio).total_seconds()
 
             logger.info(f"Processamento concluído em {tempo_processamento:.2f}s")
-            logger.info("=" * 60)
+            logger.debug("=" * 60)
 
             return state
 
@@ -840,10 +1119,16 @@ async def processar_agente(state: AgentState) -> AgentState:
             logger.error(f"Erro ao invocar agente: {e}")
             raise
 
+        finally:
+            # Prefetches que o LLM não usou são cancelados e contados
+            prefetch.encerrar()
+
     except Exception as e:
         # ==============================================
         # TRATAMENTO DE ERROS
         # ==============================================
+        prefetch.encerrar()
+
         logger.error("=" * 60)
         logger.error(f"ERRO NO PROCESSAMENTO DO AGENTE: {e}")
         logger.error("=" * 60)
@@ -16,13 +16,15 @@ from __future__ import annotations
 
 import base64
 import logging
-import tempfile
-import os
 from typing import Dict, Any
 
 from src.models.state import AgentState, AcaoFluxo
 from src.clients.whatsapp_client import criar_whatsapp_client
+from src.clients.openai_client import get_openai_client, get_chat_model
 from src.config.settings import get_settings
+from src.cache.image_cache import get_image_cache, calcular_chave_imagem
+from src.cache.media_store import get_media_store, eh_referencia_midia
+from src.monitoring import SERVICO_OPENAI, medir_chamada
 
 logger = logging.getLogger(__name__)
 
@@ -46,9 +48,9 @@ def rotear_tipo_mensagem(state: AgentState) -> str:
         "processar_audio"
     """
     try:
-        logger.info("=" * 60)
-        logger.info("Roteando tipo de mensagem")
-        logger.info("=" * 60)
+        logger.debug("=" * 60)
+        logger.debug("Roteando tipo de mensagem")
+        logger.debug("=" * 60)
         
         mensagem_tipo = state.get("mensagem_tipo", "")
         logger.info(f"Tipo de mensagem detectado: {mensagem_tipo}")
@@ -71,15 +73,24 @@ def rotear_tipo_mensagem(state: AgentState) -> str:
         return "processar_texto"
 
 
-def _extrair_base64_do_webhook(webhook_data: Dict[str, Any], tipo_mensagem: str) -> tuple[str | None, str | None]:
+def _extrair_base64_do_webhook(
+    webhook_data: Dict[str, Any],
+    tipo_mensagem: str,
+    remover: bool = False
+) -> tuple[str | None, str | None]:
     """
     Função auxiliar para extrair base64 do webhook da Evolution API.
     
     Tenta múltiplas localizações possíveis onde o base64 pode estar.
+    Quando o corpo foi lido pelo parser em streaming do endpoint, o valor
+    encontrado é a referência do media store ("media:<uuid>") em vez do
+    base64; use eh_referencia_midia() para distinguir.
     
     Args:
         webhook_data: Dados completos do webhook
         tipo_mensagem: Tipo da mensagem (audioMessage, imageMessage, etc)
+        remover: Se True, retira o payload do webhook após extraí-lo (evita
+            manter uma segunda cópia em raw_webhook_data)
         
     Returns:
         Tupla (base64_data, mimetype) ou (None, None) se não encontrado
@@ -93,14 +104,15 @@ def _extrair_base64_do_webhook(webhook_data: Dict[str, Any], tipo_mensagem: str)
         tipo_key = tipo_mensagem
         media_msg = message_obj.get(tipo_key, {})
         
-        logger.info(f"=== EXTRAINDO BASE64 DO WEBHOOK ===")
-        logger.info(f"Tipo mensagem: {tipo_mensagem}")
-        logger.info(f"Keys no {tipo_key}: {list(media_msg.keys())}")
-        logger.info(f"Keys no message: {list(message_obj.keys())}")
-        logger.info(f"Keys no data: {list(data.keys())}")
+        logger.debug("=== EXTRAINDO BASE64 DO WEBHOOK ===")
+        logger.debug("Tipo mensagem: %s", tipo_mensagem)
+        logger.debug("Keys no %s: %s", tipo_key, list(media_msg.keys()))
+        logger.debug("Keys no message: %s", list(message_obj.keys()))
+        logger.debug("Keys no data: %s", list(data.keys()))
         
         base64_data = None
         mimetype = None
+        origem = None  # (dicionário, chave) de onde o payload foi lido
         
         # PRIORIDADE 1: Dentro do objeto específico da mídia (mais comum)
         # Ex: data.message.audioMessage.media ou .base64
@@ -111,12 +123,14 @@ def _extrair_base64_do_webhook(webhook_data: Dict[str, Any], tipo_mensagem: str)
             if isinstance(media_obj, dict) and "media" in media_obj:
                 base64_data = media_obj["media"]
                 mimetype = media_obj.get("mimetype")
+                origem = (media_obj, "media")
                 logger.info(f"[OK] Base64 encontrado em message.{tipo_key}.media")
                 
             # Tentar "base64"
             elif isinstance(media_obj, dict) and "base64" in media_obj:
                 base64_data = media_obj["base64"]
                 mimetype = media_obj.get("mimetype")
+                origem = (media_obj, "base64")
                 logger.info(f"[OK] Base64 encontrado em message.{tipo_key}.base64")
         
         # PRIORIDADE 2: Diretamente no message
@@ -124,11 +138,13 @@ def _extrair_base64_do_webhook(webhook_data: Dict[str, Any], tipo_mensagem: str)
             if "media" in message_obj:
                 base64_data = message_obj["media"]
                 mimetype = message_obj.get("mimetype")
+                origem = (message_obj, "media")
                 logger.info("[OK] Base64 encontrado em message.media")
                 
             elif "base64" in message_obj:
                 base64_data = message_obj["base64"]
                 mimetype = message_obj.get("mimetype")
+                origem = (message_obj, "base64")
                 logger.info("[OK] Base64 encontrado em message.base64")
         
         # PRIORIDADE 3: No data
@@ -136,30 +152,39 @@ def _extrair_base64_do_webhook(webhook_data: Dict[str, Any], tipo_mensagem: str)
             if "media" in data:
                 base64_data = data["media"]
                 mimetype = data.get("mimetype")
+                origem = (data, "media")
                 logger.info("[OK] Base64 encontrado em data.media")
                 
             elif "base64" in data:
                 base64_data = data["base64"]
                 mimetype = data.get("mimetype")
+                origem = (data, "base64")
                 logger.info("[OK] Base64 encontrado em data.base64")
         
         # PRIORIDADE 4: Verificar se está em "mediaData" (algumas versões da Evolution)
         if not base64_data and "mediaData" in data:
             base64_data = data["mediaData"]
             mimetype = data.get("mimetype")
+            origem = (data, "mediaData")
             logger.info("[OK] Base64 encontrado em data.mediaData")
         
         if base64_data:
-            logger.info(f"Base64 extraido com sucesso (tamanho: {len(base64_data) if base64_data else 0} chars)")
-            logger.info(f"Mimetype: {mimetype}")
+            if eh_referencia_midia(base64_data):
+                logger.info(f"Midia ja esta no media store: {base64_data}")
+            else:
+                logger.debug("Base64 extraido com sucesso (tamanho: %s chars)", len(base64_data))
+            logger.debug("Mimetype: %s", mimetype)
+
+            if remover and origem:
+                origem[0].pop(origem[1], None)
         else:
             logger.warning("[AVISO] Base64 NAO encontrado no webhook")
-            logger.info("Estrutura completa do webhook para debug:")
-            logger.info(f"Body keys: {list(body.keys())}")
-            logger.info(f"Data keys: {list(data.keys())}")
-            logger.info(f"Message keys: {list(message_obj.keys())}")
+            logger.debug("Estrutura completa do webhook para debug:")
+            logger.debug("Body keys: %s", list(body.keys()))
+            logger.debug("Data keys: %s", list(data.keys()))
+            logger.debug("Message keys: %s", list(message_obj.keys()))
             if tipo_key in message_obj:
-                logger.info(f"{tipo_key} keys: {list(message_obj[tipo_key].keys())}")
+                logger.debug("%s keys: %s", tipo_key, list(message_obj[tipo_key].keys()))
         
         return base64_data, mimetype
         
@@ -168,12 +193,48 @@ def _extrair_base64_do_webhook(webhook_data: Dict[str, Any], tipo_mensagem: str)
         return None, None
 
 
+def _materializar_midia(state: AgentState, tipo_mensagem: str) -> tuple[bytes | None, str | None]:
+    """
+    Materializa os bytes da mídia referenciada no estado.
+
+    O nó validar_webhook guarda a mídia no media store e deixa no estado
+    apenas mensagem_media_ref. Estados montados sem passar por ele (testes,
+    endpoints de debug) ainda podem trazer o base64 em raw_webhook_data.
+
+    Args:
+        state: Estado atual do agente
+        tipo_mensagem: Tipo da mensagem (audioMessage, imageMessage)
+
+    Returns:
+        Tupla (bytes, mimetype) ou (None, None) se a mídia não está disponível
+    """
+    media_ref = state.get("mensagem_media_ref")
+
+    if media_ref:
+        midia = get_media_store().obter(media_ref)
+        if midia:
+            logger.info(f"Midia obtida do media store: {media_ref}")
+            return midia
+        logger.warning(f"Midia {media_ref} nao encontrada no media store (expirada?)")
+
+    base64_data, mimetype = _extrair_base64_do_webhook(state.get("raw_webhook_data", {}), tipo_mensagem)
+
+    if eh_referencia_midia(base64_data):
+        midia = get_media_store().obter(base64_data)
+        if midia:
+            return midia[0], midia[1] or mimetype
+    elif base64_data:
+        return base64.b64decode(base64_data), mimetype
+
+    return None, None
+
+
 async def processar_audio(state: AgentState) -> AgentState:
     """
     Processa mensagens de áudio usando OpenAI Whisper.
     
-    Baixa o áudio do WhatsApp, salva temporariamente e usa o Whisper
-    para fazer a transcrição do áudio para texto.
+    Materializa o áudio do media store (ou busca na API do WhatsApp) e usa
+    o Whisper para fazer a transcrição do áudio para texto.
     
     Args:
         state: Estado atual do agente contendo raw_webhook_data
@@ -190,12 +251,10 @@ async def processar_audio(state: AgentState) -> AgentState:
         >>> print(state["mensagem_conteudo"])
         "Olá, gostaria de agendar uma consulta"
     """
-    temp_file = None
-    
     try:
-        logger.info("=" * 60)
-        logger.info("Processando audio com Whisper")
-        logger.info("=" * 60)
+        logger.debug("=" * 60)
+        logger.debug("Processando audio com Whisper")
+        logger.debug("=" * 60)
         
         # Carregar configurações
         settings = get_settings()
@@ -203,18 +262,11 @@ async def processar_audio(state: AgentState) -> AgentState:
         # Extrair dados do webhook
         webhook_data = state.get("raw_webhook_data", {})
         
-        # PASSO 1: Tentar extrair base64 do webhook
-        base64_audio, mimetype = _extrair_base64_do_webhook(webhook_data, "audioMessage")
+        # PASSO 1: Materializar a mídia guardada pelo validar_webhook
+        audio_bytes, mimetype = _materializar_midia(state, "audioMessage")
         
-        media = None
-        
-        if base64_audio:
-            # Base64 encontrado no webhook
-            media = {
-                "base64": base64_audio,
-                "mimetype": mimetype or "audio/ogg"
-            }
-            logger.info("Usando base64 do webhook")
+        if audio_bytes is not None:
+            logger.info("Usando midia recebida no webhook")
             
         else:
             # PASSO 2: Tentar buscar via API (fallback)
@@ -265,37 +317,31 @@ async def processar_audio(state: AgentState) -> AgentState:
 
                 logger.error("Falha ao obter audio - usando mensagem de fallback")
                 return state
+       
+            if not media or "base64" not in media:
+                logger.error("Falha ao obter midia em base64")
+                raise ValueError("Midia nao encontrada no webhook nem via API")
+
+            audio_bytes = base64.b64decode(media["base64"])
+            mimetype = media.get("mimetype")
+
+        logger.info(f"Audio obtido: {len(audio_bytes)} bytes")
         
-        if not media or "base64" not in media:
-            logger.error("Falha ao obter midia em base64")
-            raise ValueError("Midia nao encontrada no webhook nem via API")
-            
-        # Converter base64 para bytes
-        audio_bytes = base64.b64decode(media["base64"])
-        logger.info(f"Audio decodificado: {len(audio_bytes)} bytes")
-        
-        # Criar arquivo temporário
-        with tempfile.NamedTemporaryFile(suffix=".ogg", delete=False) as temp:
-            temp_file = temp.name
-            temp.write(audio_bytes)
-            
-        logger.info(f"Arquivo temporario criado: {temp_file}")
-        
-        # Usar OpenAI Whisper para transcrever
-        from openai import AsyncOpenAI
-        client = AsyncOpenAI(api_key=settings.openai_api_key)
+        # Usar OpenAI Whisper para transcrever (cliente compartilhado do processo).
+        # Os bytes vão direto na requisição, sem arquivo temporário.
+        client = get_openai_client()
         
         logger.info("Iniciando transcricao com Whisper...")
         
-        with open(temp_file, "rb") as audio_file:
+        with medir_chamada(SERVICO_OPENAI, "whisper"):
             transcript = await client.audio.transcriptions.create(
                 model="whisper-1",
-                file=audio_file,
+                file=("audio.ogg", audio_bytes, mimetype or "audio/ogg"),
                 language="pt"  # Português
             )
             
         texto_transcrito = transcript.text
-        logger.info(f"Transcricao concluida: {texto_transcrito[:100]}...")
+        logger.debug("Transcricao concluida: %s...", texto_transcrito[:100])
 
         # Atualizar estado
         state["mensagem_transcrita"] = texto_transcrito
@@ -320,15 +366,11 @@ async def processar_audio(state: AgentState) -> AgentState:
         logger.info("Usando mensagem de erro amigavel para o cliente")
         
         return state
-        
+       
     finally:
-        # Limpar arquivo temporário
-        if temp_file and os.path.exists(temp_file):
-            try:
-                os.unlink(temp_file)
-                logger.info("Arquivo temporario removido")
-            except Exception as e:
-                logger.warning(f"Erro ao remover arquivo temporario: {e}")
+        # Liberar a mídia do store (já consumida ou com erro)
+        if state.get("mensagem_media_ref"):
+            get_media_store().remover(state["mensagem_media_ref"])
 
 
 async def processar_imagem(state: AgentState) -> AgentState:
@@ -354,9 +396,9 @@ async def processar_imagem(state: AgentState) -> AgentState:
         "te enviei uma imagem que mostra..."
     """
     try:
-        logger.info("=" * 60)
-        logger.info("Processando imagem com GPT-4 Vision")
-        logger.info("=" * 60)
+        logger.debug("=" * 60)
+        logger.debug("Processando imagem com GPT-4 Vision")
+        logger.debug("=" * 60)
         
         # Carregar configurações
         settings = get_settings()
@@ -364,18 +406,11 @@ async def processar_imagem(state: AgentState) -> AgentState:
         # Extrair dados do webhook
         webhook_data = state.get("raw_webhook_data", {})
         
-        # PASSO 1: Tentar extrair base64 do webhook
-        base64_image, mimetype = _extrair_base64_do_webhook(webhook_data, "imageMessage")
+        # PASSO 1: Materializar a mídia guardada pelo validar_webhook
+        image_bytes, mimetype = _materializar_midia(state, "imageMessage")
         
-        media = None
-        
-        if base64_image:
-            # Base64 encontrado no webhook
-            media = {
-                "base64": base64_image,
-                "mimetype": mimetype or "image/jpeg"
-            }
-            logger.info("Usando base64 do webhook")
+        if image_bytes is not None:
+            logger.info("Usando midia recebida no webhook")
             
         else:
             # PASSO 2: Tentar buscar via API (fallback)
@@ -414,22 +449,30 @@ async def processar_imagem(state: AgentState) -> AgentState:
                 
                 logger.error("Falha ao obter imagem - usando mensagem de fallback")
                 return state
-        
-        if not media or "base64" not in media:
-            logger.error("Falha ao obter midia em base64")
-            raise ValueError("Midia nao encontrada no webhook nem via API")
 
-        base64_data = media["base64"]
-        logger.info(f"Imagem obtida: {len(base64_data)} caracteres base64")
+            if not media or "base64" not in media:
+                logger.error("Falha ao obter midia em base64")
+                raise ValueError("Midia nao encontrada no webhook nem via API")
+
+            image_bytes = base64.b64decode(media["base64"])
+            mimetype = media.get("mimetype")
+
+        logger.info(f"Imagem obtida: {len(image_bytes)} bytes")
+
+        # Consultar cache por hash perceptual antes de chamar o modelo de visão
+        image_cache = get_image_cache()
+        chave_imagem = calcular_chave_imagem(image_bytes)
+        descricao_cache = image_cache.buscar(chave_imagem)
+
+        if descricao_cache:
+            logger.info("Descricao da imagem obtida do cache (GPT-4 Vision nao chamado)")
+            state["mensagem_transcrita"] = descricao_cache
+            state["mensagem_conteudo"] = descricao_cache
+            state["texto_processado"] = descricao_cache
+            return state
         
         # Usar GPT-4 Vision para descrever
-        from langchain_openai import ChatOpenAI
-        
-        llm = ChatOpenAI(
-            model="gpt-4o-2024-11-20",
-            api_key=settings.openai_api_key,
-            temperature=0.7
-        )
+        llm = get_chat_model("gpt-4o-2024-11-20", temperature=0.7)
         
         prompt = """O que há nessa imagem? Me dê a resposta como se fosse um cliente 
         descrevendo a imagem. Comece dizendo: "te enviei uma imagem que..." 
@@ -440,6 +483,8 @@ async def processar_imagem(state: AgentState) -> AgentState:
         conversando via WhatsApp."""
         
         logger.info("Iniciando analise da imagem com GPT-4 Vision...")
+
+        base64_data = base64.b64encode(image_bytes).decode("ascii")
         
         messages = [
             {
@@ -449,7 +494,7 @@ async def processar_imagem(state: AgentState) -> AgentState:
             {
                 "type": "image_url", 
                 "image_url": {
-                    "url": f"data:image/jpeg;base64,{base64_data}"
+                    "url": f"data:{mimetype or 'image/jpeg'};base64,{base64_data}"
                 }
             }
         ]
@@ -457,7 +502,9 @@ async def processar_imagem(state: AgentState) -> AgentState:
         response = await llm.ainvoke(messages)
         descricao_imagem = response.content
         
-        logger.info(f"Analise da imagem concluida: {descricao_imagem[:100]}...")
+        logger.debug("Analise da imagem concluida: %s...", descricao_imagem[:100])
+
+        image_cache.armazenar(chave_imagem, descricao_imagem)
 
         # Atualizar estado
         state["mensagem_transcrita"] = descricao_imagem
@@ -483,6 +530,11 @@ async def processar_imagem(state: AgentState) -> AgentState:
 
         return state
 
+    finally:
+        # Liberar a mídia do store (já consumida ou com erro)
+        if state.get("mensagem_media_ref"):
+            get_media_store().remover(state["mensagem_media_ref"])
+
 
 async def processar_texto(state: AgentState) -> AgentState:
     """
@@ -507,9 +559,9 @@ async def processar_texto(state: AgentState) -> AgentState:
         "Olá, preciso de ajuda"
     """
     try:
-        logger.info("=" * 60)
-        logger.info("Processando mensagem de texto")
-        logger.info("=" * 60)
+        logger.debug("=" * 60)
+        logger.debug("Processando mensagem de texto")
+        logger.debug("=" * 60)
         
         mensagem_base64 = state.get("mensagem_base64", "")
         
@@ -520,7 +572,7 @@ async def processar_texto(state: AgentState) -> AgentState:
             # Se for um objeto (outras mídias), converter para string
             conteudo = str(mensagem_base64)
             
-        logger.info(f"Texto processado: {conteudo[:100]}...")
+        logger.debug("Texto processado: %s...", conteudo[:100])
 
         # Atualizar estado
         state["mensagem_conteudo"] = conteudo
@@ -17,6 +17,7 @@ from typing import List
 from src.models.state import AgentState, AcaoFluxo
 from src.config.settings import get_settings
 from src.clients.whatsapp_client import WhatsAppClient
+from src.monitoring import observar_primeira_resposta
 
 # Configuração de logging
 logger = logging.getLogger(__name__)
@@ -145,9 +146,9 @@ def fragmentar_resposta(state: AgentState) -> AgentState:
         >>> print(state["respostas_fragmentadas"])
         ['Olá!', 'Como posso ajudar?']
     """
-    logger.info("=" * 60)
-    logger.info("INICIANDO FRAGMENTAÇÃO DE RESPOSTA")
-    logger.info("=" * 60)
+    logger.debug("=" * 60)
+    logger.debug("INICIANDO FRAGMENTAÇÃO DE RESPOSTA")
+    logger.debug("=" * 60)
 
     inicio = datetime.now()
 
@@ -163,8 +164,8 @@ def fragmentar_resposta(state: AgentState) -> AgentState:
             state["next_action"] = AcaoFluxo.ERRO.value
             return state
 
-        logger.info(f"Resposta do agente ({len(resposta_agente)} chars):")
-        logger.info(f"{resposta_agente[:200]}...")
+        logger.debug("Resposta do agente (%s chars):", len(resposta_agente))
+        logger.debug("%s...", resposta_agente[:200])
 
         # ==============================================
         # 2. OBTER MAX_FRAGMENT_SIZE
@@ -187,7 +188,7 @@ def fragmentar_resposta(state: AgentState) -> AgentState:
 
         # Log de cada fragmento
         for i, fragmento in enumerate(fragmentos, 1):
-            logger.info(f"  Fragmento {i}/{len(fragmentos)} ({len(fragmento)} chars): {fragmento[:50]}...")
+            logger.debug("  Fragmento %s/%s (%s chars): %s...", i, len(fragmentos), len(fragmento), fragmento[:50])
 
         # ==============================================
         # 4. SALVAR NO ESTADO
@@ -201,7 +202,7 @@ def fragmentar_resposta(state: AgentState) -> AgentState:
         tempo_processamento = (datetime.now() - inicio).total_seconds()
 
         logger.info(f"Fragmentação concluída em {tempo_processamento:.3f}s")
-        logger.info("=" * 60)
+        logger.debug("=" * 60)
 
         return state
 
@@ -282,9 +283,9 @@ async def enviar_respostas(state: AgentState) -> AgentState:
     Raises:
         Exception: Erros são capturados e logados, mas não interrompem o fluxo
     """
-    logger.info("=" * 60)
-    logger.info("INICIANDO ENVIO DE RESPOSTAS")
-    logger.info("=" * 60)
+    logger.debug("=" * 60)
+    logger.debug("INICIANDO ENVIO DE RESPOSTAS")
+    logger.debug("=" * 60)
 
     inicio = datetime.now()
 
@@ -334,17 +335,17 @@ async def enviar_respostas(state: AgentState) -> AgentState:
         intervalo_entre_mensagens = 1.5  # segundos
 
         for i, fragmento in enumerate(fragmentos, 1):
-            logger.info("-" * 40)
-            logger.info(f"Fragmento {i}/{total_fragmentos}")
-            logger.info(f"Tamanho: {len(fragmento)} chars")
-            logger.info(f"Preview: {fragmento[:100]}...")
+            logger.debug("-" * 40)
+            logger.debug("Fragmento %s/%s", i, total_fragmentos)
+            logger.debug("Tamanho: %s chars", len(fragmento))
+            logger.debug("Preview: %s...", fragmento[:100])
 
             # ==============================================
             # 3.1 ENVIAR STATUS "DIGITANDO"
             # ==============================================
             try:
                 await whatsapp.enviar_status_typing(cliente_numero)
-                logger.info("✅ Status 'digitando' enviado")
+                logger.debug("✅ Status 'digitando' enviado")
             except Exception as e:
                 logger.warning(f"Erro ao enviar status digitando: {e}")
                 # Não é crítico, continua
@@ -368,7 +369,7 @@ async def enviar_respostas(state: AgentState) -> AgentState:
                 tentativa += 1
 
                 try:
-                    logger.info(f"Tentativa {tentativa}/{max_tentativas} de envio...")
+                    logger.debug("Tentativa %s/%s de envio...", tentativa, max_tentativas)
 
                     resultado = await whatsapp.enviar_mensagem(
                         telefone=cliente_numero,
@@ -380,6 +381,9 @@ async def enviar_respostas(state: AgentState) -> AgentState:
                         logger.info(f"[OK] Fragmento {i}/{total_fragmentos} enviado com sucesso!")
                         enviados_sucesso += 1
                         enviado = True
+
+                        if enviados_sucesso == 1:
+                            observar_primeira_resposta(state.get("recebido_em"))
                     else:
                         logger.warning(f"[AVISO] Resposta vazia da API")
 
@@ -412,15 +416,15 @@ async def enviar_respostas(state: AgentState) -> AgentState:
         # ==============================================
         tempo_total = (datetime.now() - inicio).total_seconds()
 
-        logger.info("=" * 60)
-        logger.info("ESTATÍSTICAS DE ENVIO")
-        logger.info("=" * 60)
+        logger.debug("=" * 60)
+        logger.debug("ESTATÍSTICAS DE ENVIO")
+        logger.debug("=" * 60)
         logger.info(f"Total de fragmentos: {total_fragmentos}")
         logger.info(f"Enviados com sucesso: {enviados_sucesso}")
         logger.info(f"Erros: {enviados_erro}")
         logger.info(f"Taxa de sucesso: {(enviados_sucesso/total_fragmentos)*100:.1f}%")
         logger.info(f"Tempo total: {tempo_total:.2f}s")
-        logger.info("=" * 60)
+        logger.debug("=" * 60)
 
         # ==============================================
         # 5. ATUALIZAR ESTADO
@@ -0,0 +1,376 @@
+"""
+Nó roteador - Separa mensagens triviais do agente completo.
+
+Boa parte das mensagens recebidas é "ok", "obrigado", "bom dia" ou só
+emojis. Elas não precisam do GPT-4o com todas as tools, RAG e histórico:
+este nó as responde com um modelo pequeno e um prompt curto, sem tools,
+e encaminha todo o resto para `processar_agente`.
+
+A decisão é feita em duas etapas:
+1. Regras (sem custo): saudações/agradecimentos conhecidos e mensagens só
+   com emojis são triviais; perguntas, números, datas e intenções de
+   agenda/base de conhecimento vão direto para o agente.
+2. Mensagens curtas que as regras não decidem são classificadas pelo
+   modelo pequeno (TRIVIAL ou AGENTE).
+
+Cada decisão é registrada com latência e custo estimado por rota
+(contadores em /status).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from src.clients.openai_client import get_chat_model
+from src.config.settings import get_settings
+from src.models.state import AgentState, AcaoFluxo
+from src.tools.date_parser import normalizar_texto, resolver_datas
+from src.tools.prefetch import detectar_intencoes
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Instância global das configurações
+settings = get_settings()
+
+# Rotas possíveis
+ROTA_TRIVIAL = "trivial"
+ROTA_AGENTE = "agente"
+
+# Mensagens mais longas que isso nunca são tratadas como triviais
+MAX_CARACTERES_TRIVIAL = 60
+
+# Mensagens até esse tamanho que as regras não decidem vão para o classificador
+MAX_CARACTERES_CLASSIFICADOR = 30
+
+# Preço em USD por 1 milhão de tokens (entrada, saída)
+PRECOS_MODELOS: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o-2024-11-20": (2.50, 10.00),
+}
+
+
+# ==============================================
+# REGRAS
+# ==============================================
+
+_CUMPRIMENTOS = r"oi+|ola|opa|eai|e ai|hey|alo|bom dia|boa tarde|boa noite|bom dia a todos|como vai"
+_SAUDACOES = rf"{_CUMPRIMENTOS}|tudo bem|tudo bom|td bem|td bom"
+_AGRADECIMENTOS = (
+    r"obrigad[oa]s?|muito obrigad[oa]|brigad[oa]|obg|vlw|valeu|grato|grata|agradeco|"
+    r"tchau|ate mais|ate logo|ate breve|falou|fica com deus|abracos?"
+)
+_CONFIRMACOES = (
+    r"ok+|okay|blz|beleza|certo|tudo certo|combinado|fechado|entendi|entendido|ta bom|ta|"
+    r"show|perfeito|otimo|legal|top"
+)
+
+_RE_TRIVIAL = re.compile(
+    rf"^(?:(?:{_SAUDACOES}|{_AGRADECIMENTOS}|{_CONFIRMACOES}|carol|por enquanto e so)\s*)+$"
+)
+# Só cumprimento ou agradecimento/despedida: nunca responde a uma pergunta do bot
+_RE_CORTESIA = re.compile(rf"^(?:(?:{_CUMPRIMENTOS}|{_AGRADECIMENTOS}|carol)\s*)+$")
+_RE_PONTUACAO = re.compile(r"[^\w\s]")
+_RE_TEM_LETRA_OU_NUMERO = re.compile(r"[^\W_]")
+_RE_NUMERO = re.compile(r"\d")
+
+
+def classificar_por_regras(texto: str) -> Optional[str]:
+    """
+    Classifica a mensagem só com regras, sem chamar modelo.
+
+    Args:
+        texto: Mensagem do cliente
+
+    Returns:
+        Optional[str]: ROTA_TRIVIAL, ROTA_AGENTE ou None (indefinido)
+
+    Example:
+        >>> classificar_por_regras("Obrigado!! 🙏")
+        'trivial'
+        >>> classificar_por_regras("Quanto custa o forro?")
+        'agente'
+    """
+    texto = (texto or "").strip()
+
+    # Só emojis/pontuação
+    if texto and not _RE_TEM_LETRA_OU_NUMERO.search(texto):
+        return ROTA_TRIVIAL
+
+    if not texto or len(texto) > MAX_CARACTERES_TRIVIAL:
+        return ROTA_AGENTE
+
+    if _RE_NUMERO.search(texto):
+        return ROTA_AGENTE
+
+    if detectar_intencoes(texto, tem_data=bool(resolver_datas(texto, datetime.now()))):
+        return ROTA_AGENTE
+
+    normalizado = " ".join(_RE_PONTUACAO.sub(" ", normalizar_texto(texto)).split())
+
+    # "Oi, tudo bem?" é saudação; qualquer outra pergunta vai para o agente
+    if _RE_TRIVIAL.match(normalizado):
+        return ROTA_TRIVIAL
+
+    if "?" in texto:
+        return ROTA_AGENTE
+
+    if len(normalizado) <= MAX_CARACTERES_CLASSIFICADOR:
+        return None
+
+    return ROTA_AGENTE
+
+
+def _pode_responder_pergunta(texto: str) -> bool:
+    """
+    True se a mensagem trivial pode ser a resposta a uma pergunta do bot.
+
+    Só cumprimentos e agradecimentos/despedidas ficam de fora; "ok",
+    "beleza", "tudo bem", "sim" ou um 👍 podem estar confirmando um
+    agendamento.
+    """
+    normalizado = " ".join(_RE_PONTUACAO.sub(" ", normalizar_texto(texto)).split())
+    return not _RE_CORTESIA.match(normalizado)
+
+
+# ==============================================
+# ESTATÍSTICAS
+# ==============================================
+
+_estatisticas: Dict[str, Dict[str, float]] = defaultdict(
+    lambda: {"mensagens": 0, "latencia_total": 0.0, "custo_total": 0.0}
+)
+
+
+def _custo(modelo: str, resposta: Any) -> float:
+    """Custo estimado (USD) de uma chamada a partir do usage_metadata."""
+    uso = getattr(resposta, "usage_metadata", None) or {}
+    preco_entrada, preco_saida = PRECOS_MODELOS.get(modelo, (0.0, 0.0))
+    return (
+        uso.get("input_tokens", 0) * preco_entrada
+        + uso.get("output_tokens", 0) * preco_saida
+    ) / 1_000_000
+
+
+def _registrar(rota: str, motivo: str, latencia: float, custo: float) -> None:
+    """Registra a decisão de roteamento no log e nos contadores."""
+    estatistica = _estatisticas[rota]
+    estatistica["mensagens"] += 1
+    estatistica["latencia_total"] += latencia
+    estatistica["custo_total"] += custo
+
+    logger.info(
+        f"🔀 Rota: {rota} ({motivo}) - latência {latencia * 1000:.0f}ms, "
+        f"custo do roteamento US$ {custo:.6f}"
+    )
+
+
+def obter_estatisticas_roteador() -> Dict[str, Dict[str, float]]:
+    """
+    Mensagens, latência média e custo por rota.
+
+    O custo da rota "agente" é só o do roteamento (classificador);
+    o custo do agente em si não é contabilizado aqui.
+
+    Example:
+        >>> obter_estatisticas_roteador()
+        {"trivial": {"mensagens": 30, "latencia_media_ms": 420.0, "custo_usd": 0.0011}}
+    """
+    resultado = {}
+    for rota, estatistica in _estatisticas.items():
+        mensagens = int(estatistica["mensagens"])
+        resultado[rota] = {
+            "mensagens": mensagens,
+            "latencia_media_ms": round(estatistica["latencia_total"] * 1000 / mensagens, 1) if mensagens else 0.0,
+            "custo_usd": round(estatistica["custo_total"], 6),
+        }
+    return resultado
+
+
+def zerar_estatisticas_roteador() -> None:
+    """Zera as estatísticas (útil em testes)."""
+    _estatisticas.clear()
+
+
+# ==============================================
+# MODELO PEQUENO
+# ==============================================
+
+_PROMPT_CLASSIFICADOR = (
+    "Você classifica mensagens de clientes de uma empresa de drywall no WhatsApp. "
+    "Responda apenas TRIVIAL se a mensagem for só saudação, agradecimento, despedida "
+    "ou reação sem pedido nenhum. Responda AGENTE para qualquer pergunta, pedido, "
+    "informação ou confirmação de algo."
+)
+
+_PROMPT_RESPOSTA = (
+    "Você é Carol, atendente da Centro-Oeste Drywall & Dry no WhatsApp "
+    "(drywall, gesso, forros e divisórias). O cliente {nome} mandou uma mensagem "
+    "de saudação ou agradecimento. Responda em no máximo duas frases curtas, "
+    "de forma simpática e natural, sem markdown, e se fizer sentido pergunte "
+    "como pode ajudar. Não invente preços, horários nem informações da empresa."
+)
+
+
+async def _classificar_com_modelo(texto: str) -> Tuple[str, float]:
+    """
+    Classifica com o modelo pequeno.
+
+    Returns:
+        Tuple[str, float]: (rota, custo em USD)
+    """
+    llm = get_chat_model(settings.router_model, temperature=0.0)
+    resposta = await llm.ainvoke([
+        SystemMessage(content=_PROMPT_CLASSIFICADOR),
+        HumanMessage(content=texto)
+    ])
+
+    rota = ROTA_TRIVIAL if "TRIVIAL" in str(resposta.content).upper() else ROTA_AGENTE
+    return rota, _custo(settings.router_model, resposta)
+
+
+async def _responder_com_modelo(texto: str, cliente_nome: str) -> Tuple[str, float]:
+    """
+    Gera a resposta curta com o modelo pequeno.
+
+    Returns:
+        Tuple[str, float]: (resposta, custo em USD)
+    """
+    llm = get_chat_model(settings.router_model, temperature=0.7)
+    resposta = await llm.ainvoke([
+        SystemMessage(content=_PROMPT_RESPOSTA.format(nome=cliente_nome or "Cliente")),
+        HumanMessage(content=texto)
+    ])
+
+    return str(resposta.content).strip(), _custo(settings.router_model, resposta)
+
+
+# ==============================================
+# HISTÓRICO
+# ==============================================
+
+def _bot_fez_pergunta(cliente_numero: str) -> bool:
+    """
+    True se a última mensagem do bot terminou em pergunta.
+
+    Nesse caso um "ok" ou "beleza" é a resposta do cliente (ex: confirmar
+    um agendamento) e precisa do agente completo. Lê só a última linha do
+    histórico (chamada síncrona: rodar fora do event loop).
+    """
+    if not settings.enable_memory_persistence or not cliente_numero:
+        return False
+
+    try:
+        from src.nodes.agent import _get_message_history
+
+        ultima = _get_message_history(cliente_numero).mensagens_recentes(1)
+        return bool(ultima) and ultima[0][1].type == "ai" and "?" in str(ultima[0][1].content)
+
+    except Exception as e:
+        logger.warning(f"Não foi possível verificar o histórico no roteador: {e}")
+        return True
+
+
+def _salvar_historico(cliente_numero: str, entrada: str, resposta: str) -> None:
+    """Persiste a troca trivial para o agente ter a conversa completa depois (síncrona)."""
+    if not settings.enable_memory_persistence or not cliente_numero:
+        return
+
+    try:
+        from src.nodes.agent import _get_message_history
+
+        history = _get_message_history(cliente_numero)
+        history.add_user_message(entrada)
+        history.add_ai_message(resposta)
+
+    except Exception as e:
+        logger.error(f"Erro ao salvar histórico no roteador: {e}")
+
+
+# ==============================================
+# NÓ DO GRAFO
+# ==============================================
+
+async def rotear_mensagem(state: AgentState) -> AgentState:
+    """
+    Decide se a mensagem vai para o agente completo ou é respondida aqui.
+
+    Mensagens triviais recebem a resposta do modelo pequeno e seguem direto
+    para a fragmentação; qualquer falha no caminho trivial escala para o
+    agente.
+
+    Args:
+        state: Estado atual do agente LangGraph
+
+    Returns:
+        AgentState: Estado com next_action PROCESSAR_AGENTE ou FRAGMENTAR_RESPOSTA
+    """
+    state["next_action"] = AcaoFluxo.PROCESSAR_AGENTE.value
+
+    texto = (state.get("texto_processado") or "").strip()
+
+    # Fila de mensagens agrupadas ou roteador desligado: sempre o agente
+    if not settings.router_enabled or not texto or len(state.get("fila_mensagens") or []) > 1:
+        return state
+
+    inicio = time.perf_counter()
+    custo = 0.0
+
+    try:
+        rota = classificar_por_regras(texto)
+        motivo = "regras"
+
+        if rota is None:
+            rota, custo = await _classificar_com_modelo(texto)
+            motivo = "classificador"
+
+        if (
+            rota == ROTA_TRIVIAL
+            and _pode_responder_pergunta(texto)
+            and await asyncio.to_thread(_bot_fez_pergunta, state.get("cliente_numero", ""))
+        ):
+            rota, motivo = ROTA_AGENTE, "resposta a pergunta do bot"
+
+        if rota == ROTA_AGENTE:
+            _registrar(ROTA_AGENTE, motivo, time.perf_counter() - inicio, custo)
+            return state
+
+        resposta, custo_resposta = await _responder_com_modelo(texto, state.get("cliente_nome", "Cliente"))
+        custo += custo_resposta
+
+        if not resposta:
+            raise ValueError("Resposta vazia do modelo pequeno")
+
+    except Exception as e:
+        logger.warning(f"Roteador falhou, escalando para o agente: {e}")
+        _registrar(ROTA_AGENTE, "erro no roteador", time.perf_counter() - inicio, custo)
+        return state
+
+    state["resposta_agente"] = resposta
+    state["messages"] = [HumanMessage(content=texto), AIMessage(content=resposta)]
+    state["next_action"] = AcaoFluxo.FRAGMENTAR_RESPOSTA.value
+
+    await asyncio.to_thread(_salvar_historico, state.get("cliente_numero", ""), texto, resposta)
+    _registrar(ROTA_TRIVIAL, motivo, time.perf_counter() - inicio, custo)
+
+    return state
+
+
+# ========== EXPORTAÇÕES ==========
+
+__all__ = [
+    "ROTA_TRIVIAL",
+    "ROTA_AGENTE",
+    "classificar_por_regras",
+    "rotear_mensagem",
+    "obter_estatisticas_roteador",
+    "zerar_estatisticas_roteador",
+]
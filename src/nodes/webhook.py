@@ -13,9 +13,14 @@ from typing import Dict, Any
 from src.models.state import AgentState, AcaoFluxo, extrair_numero_whatsapp
 from src.clients.supabase_client import SupabaseClient, criar_supabase_client
 from src.config.settings import get_settings
+from src.cache.media_store import get_media_store, eh_referencia_midia
+from src.nodes.media import _extrair_base64_do_webhook
 
 logger = logging.getLogger(__name__)
 
+# Tipos de mensagem cujo payload vai para o media store
+TIPOS_COM_MIDIA = ("audioMessage", "imageMessage", "videoMessage", "documentMessage", "stickerMessage")
+
 
 async def validar_webhook(state: AgentState) -> AgentState:
     """
@@ -43,9 +48,9 @@ async def validar_webhook(state: AgentState) -> AgentState:
         "5562999999999"
     """
     try:
-        logger.info("=" * 60)
-        logger.info("Iniciando validação do webhook")
-        logger.info("=" * 60)
+        logger.debug("=" * 60)
+        logger.debug("Iniciando validação do webhook")
+        logger.debug("=" * 60)
 
         # Extrair dados do webhook
         webhook_data = state.get("raw_webhook_data", {})
@@ -76,11 +81,11 @@ async def validar_webhook(state: AgentState) -> AgentState:
         message_type = data.get("messageType", "outros")
         message_timestamp = data.get("messageTimestamp", None)
 
-        logger.info(f"Webhook recebido:")
-        logger.info(f"  Remote JID: {remote_jid}")
-        logger.info(f"  From Me: {from_me}")
-        logger.info(f"  Message Type: {message_type}")
-        logger.info(f"  Push Name: {push_name}")
+        logger.debug("Webhook recebido:")
+        logger.debug("  Remote JID: %s", remote_jid)
+        logger.debug("  From Me: %s", from_me)
+        logger.debug("  Message Type: %s", message_type)
+        logger.debug("  Push Name: %s", push_name)
 
         # Carregar configurações para obter bot_phone_number
         settings = get_settings()
@@ -114,6 +119,18 @@ async def validar_webhook(state: AgentState) -> AgentState:
             # Para outros tipos, tentar pegar qualquer conteúdo
             mensagem_base64 = message_obj
 
+        # Mídias: mover o payload base64 para o media store e manter no
+        # estado apenas a referência (o dicionário do webhook perde o payload)
+        mensagem_media_ref = None
+        if message_type in TIPOS_COM_MIDIA:
+            base64_data, mimetype = _extrair_base64_do_webhook(webhook_data, message_type, remover=True)
+            if eh_referencia_midia(base64_data):
+                # Já desviado para o store pelo parser em streaming do endpoint
+                mensagem_media_ref = base64_data
+                get_media_store().definir_mimetype(mensagem_media_ref, mimetype)
+            elif base64_data:
+                mensagem_media_ref = get_media_store().armazenar_base64(base64_data, mimetype)
+
         # Atualizar estado com dados extraídos
         state["cliente_numero"] = cliente_numero
         state["cliente_nome"] = push_name
@@ -122,15 +139,16 @@ async def validar_webhook(state: AgentState) -> AgentState:
         state["mensagem_from_me"] = from_me
         state["mensagem_timestamp"] = message_timestamp
         state["mensagem_base64"] = mensagem_base64
+        state["mensagem_media_ref"] = mensagem_media_ref
 
         # Definir próxima ação
         state["next_action"] = AcaoFluxo.VERIFICAR_CLIENTE.value
 
         logger.info("Webhook validado com sucesso")
-        logger.info(f"  Cliente número: {cliente_numero}")
-        logger.info(f"  Cliente nome: {push_name}")
-        logger.info(f"  Tipo mensagem: {message_type}")
-        logger.info(f"  Próxima ação: {state['next_action']}")
+        logger.debug("  Cliente número: %s", cliente_numero)
+        logger.debug("  Cliente nome: %s", push_name)
+        logger.debug("  Tipo mensagem: %s", message_type)
+        logger.debug("  Próxima ação: %s", state['next_action'])
 
         return state
 
@@ -166,9 +184,9 @@ async def verificar_cliente(state: AgentState) -> AgentState:
         ...     print(f"Cliente ID: {state['cliente_id']}")
     """
     try:
-        logger.info("=" * 60)
-        logger.info("Verificando cliente no banco de dados")
-        logger.info("=" * 60)
+        logger.debug("=" * 60)
+        logger.debug("Verificando cliente no banco de dados")
+        logger.debug("=" * 60)
 
         cliente_numero = state.get("cliente_numero")
 
@@ -195,12 +213,13 @@ async def verificar_cliente(state: AgentState) -> AgentState:
         if cliente:
             # Cliente encontrado
             logger.info(f"Cliente encontrado no banco de dados")
-            logger.info(f"  ID: {cliente.get('id')}")
-            logger.info(f"  Nome: {cliente.get('nome_lead')}")
+            logger.debug("  ID: %s", cliente.get('id'))
+            logger.debug("  Nome: %s", cliente.get('nome_lead'))
 
             state["cliente_existe"] = True
             state["cliente_id"] = cliente.get("id")
             state["cliente_ultima_mensagem"] = cliente.get("updated_at")
+            state["cliente_fatos"] = cliente.get("fatos") or {}
 
             # Próxima ação: processar mídia
             state["next_action"] = AcaoFluxo.PROCESSAR_MIDIA.value
@@ -253,9 +272,9 @@ async def cadastrar_cliente(state: AgentState) -> AgentState:
         >>> print(f"Cliente cadastrado: ID {state['cliente_id']}")
     """
     try:
-        logger.info("=" * 60)
-        logger.info("Cadastrando novo cliente")
-        logger.info("=" * 60)
+        logger.debug("=" * 60)
+        logger.debug("Cadastrando novo cliente")
+        logger.debug("=" * 60)
 
         # Validar campos obrigatórios
         campos_necessarios = ["cliente_nome", "cliente_numero", "mensagem_tipo"]
@@ -279,10 +298,10 @@ async def cadastrar_cliente(state: AgentState) -> AgentState:
         elif not isinstance(message, str):
             message = str(message)
 
-        logger.info(f"Dados do novo cliente:")
-        logger.info(f"  Nome: {nome_lead}")
-        logger.info(f"  Telefone: {phone_numero}")
-        logger.info(f"  Tipo mensagem: {tipo_mensagem}")
+        logger.debug("Dados do novo cliente:")
+        logger.debug("  Nome: %s", nome_lead)
+        logger.debug("  Telefone: %s", phone_numero)
+        logger.debug("  Tipo mensagem: %s", tipo_mensagem)
 
         # Carregar configurações
         settings = get_settings()
@@ -0,0 +1,234 @@
+"""
+Índice de agendamentos por telefone do cliente.
+
+Os eventos criados por agendar_horario guardam dados estruturados em
+extendedProperties.private (telefone, nome, endereço, email, lead_id).
+Com isso, cancelamento e reagendamento localizam o evento pelo telefone
+da conversa, sem varrer uma janela de horário comparando o nome no título
+e sem extrair o telefone da descrição em texto livre.
+
+O índice em memória é alimentado pelos eventos que o bot cria/altera e
+pela sincronização da agenda (calendar_sync). Em caso de falta, a fonte
+de verdade é o próprio Calendar, consultado com o filtro
+privateExtendedProperty="telefone=<número>".
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Chave da propriedade privada usada no filtro do events.list
+PROPRIEDADE_TELEFONE = "telefone"
+
+# Janela de busca em torno do horário informado pelo cliente
+TOLERANCIA_ANTES = timedelta(hours=1)
+TOLERANCIA_DEPOIS = timedelta(hours=2)
+
+
+def normalizar_telefone(telefone: Optional[str]) -> str:
+    """
+    Mantém só os dígitos do telefone (chave do índice).
+
+    Example:
+        >>> normalizar_telefone("+55 (62) 99999-9999")
+        '5562999999999'
+    """
+    return re.sub(r"\D", "", telefone or "")
+
+
+def criar_propriedades_agendamento(
+    nome_cliente: str,
+    telefone_cliente: str,
+    email_cliente: str = "",
+    endereco: str = "",
+    lead_id: str = ""
+) -> Dict[str, Dict[str, str]]:
+    """
+    Monta o extendedProperties de um evento de agendamento.
+
+    Valores vazios são omitidos (o Calendar limita o tamanho das propriedades).
+
+    Returns:
+        Dict: {"private": {...}} pronto para o corpo do evento
+    """
+    privadas = {
+        PROPRIEDADE_TELEFONE: normalizar_telefone(telefone_cliente),
+        "nome": nome_cliente,
+        "email": email_cliente,
+        "endereco": endereco,
+        "lead_id": lead_id,
+    }
+    return {"private": {chave: valor for chave, valor in privadas.items() if valor}}
+
+
+def _campo_da_descricao(descricao: str, *rotulos: str) -> str:
+    """Extrai 'Rótulo: valor' da descrição em texto livre (eventos antigos)."""
+    for rotulo in rotulos:
+        if rotulo in descricao:
+            return descricao.split(rotulo, 1)[1].split("\n", 1)[0].strip()
+    return ""
+
+
+@dataclass
+class Agendamento:
+    """Dados de um agendamento necessários para cancelar ou remarcar."""
+
+    evento_id: str
+    inicio: datetime
+    nome: str = ""
+    telefone: str = ""
+    email: str = ""
+    endereco: str = ""
+    lead_id: str = ""
+    resumo: str = ""
+
+    @classmethod
+    def de_evento(cls, evento: Dict[str, Any]) -> Optional["Agendamento"]:
+        """
+        Constrói o agendamento a partir de um evento do Calendar.
+
+        Eventos criados antes das propriedades estruturadas caem na
+        leitura da descrição ("Telefone:", "Endereço:").
+
+        Returns:
+            Agendamento ou None se o evento não tiver horário
+        """
+        inicio = evento.get("start", {}).get("dateTime")
+        if not evento.get("id") or not inicio:
+            return None
+
+        privadas = evento.get("extendedProperties", {}).get("private", {})
+        descricao = evento.get("description", "") or ""
+        resumo = evento.get("summary", "") or ""
+
+        return cls(
+            evento_id=evento["id"],
+            inicio=datetime.fromisoformat(inicio),
+            nome=privadas.get("nome") or resumo.replace("Consulta - ", "", 1),
+            telefone=privadas.get(PROPRIEDADE_TELEFONE) or _campo_da_descricao(descricao, "Telefone:"),
+            email=privadas.get("email") or _campo_da_descricao(descricao, "Email:"),
+            endereco=privadas.get("endereco") or _campo_da_descricao(descricao, "Endereço:", "Endereco:"),
+            lead_id=privadas.get("lead_id", ""),
+            resumo=resumo
+        )
+
+
+class IndiceAgendamentos:
+    """
+    Índice telefone → agendamentos futuros do cliente.
+
+    Example:
+        >>> indice = IndiceAgendamentos()
+        >>> indice.aplicar_evento(evento_criado)
+        >>> indice.buscar("5562999999999", datetime(2025, 10, 27, 14, tzinfo=fuso))
+        Agendamento(evento_id='abc123', ...)
+    """
+
+    def __init__(self) -> None:
+        self._por_telefone: Dict[str, Dict[str, Agendamento]] = {}
+        self._telefone_do_evento: Dict[str, str] = {}
+
+    def aplicar_evento(self, evento: Dict[str, Any]) -> Optional[Agendamento]:
+        """
+        Insere/atualiza um evento no índice (ou remove, se cancelado).
+
+        Só entram eventos com a propriedade privada de telefone.
+        """
+        evento_id = evento.get("id")
+        if not evento_id:
+            return None
+
+        if evento.get("status") == "cancelled":
+            self.remover_evento(evento_id)
+            return None
+
+        privadas = evento.get("extendedProperties", {}).get("private", {})
+        telefone = normalizar_telefone(privadas.get(PROPRIEDADE_TELEFONE))
+        if not telefone:
+            return None
+
+        agendamento = Agendamento.de_evento(evento)
+        if agendamento is None:
+            return None
+
+        self.remover_evento(evento_id)
+        self._por_telefone.setdefault(telefone, {})[evento_id] = agendamento
+        self._telefone_do_evento[evento_id] = telefone
+        return agendamento
+
+    def remover_evento(self, evento_id: str) -> None:
+        """Remove um evento do índice."""
+        telefone = self._telefone_do_evento.pop(evento_id, None)
+        if telefone is None:
+            return
+
+        eventos = self._por_telefone.get(telefone, {})
+        eventos.pop(evento_id, None)
+        if not eventos:
+            self._por_telefone.pop(telefone, None)
+
+    def listar(self, telefone: str) -> List[Agendamento]:
+        """Agendamentos conhecidos do telefone, ordenados por início."""
+        eventos = self._por_telefone.get(normalizar_telefone(telefone), {})
+        return sorted(eventos.values(), key=lambda a: a.inicio)
+
+    def buscar(self, telefone: str, data: datetime) -> Optional[Agendamento]:
+        """
+        Agendamento do telefone mais próximo de `data` dentro da tolerância.
+
+        Args:
+            telefone: Telefone do cliente
+            data: Data/hora informada pelo cliente
+
+        Returns:
+            Agendamento ou None
+        """
+        candidatos = [
+            a for a in self.listar(telefone)
+            if data - TOLERANCIA_ANTES <= a.inicio <= data + TOLERANCIA_DEPOIS
+        ]
+        if not candidatos:
+            return None
+
+        return min(candidatos, key=lambda a: abs(a.inicio - data))
+
+    def limpar(self) -> None:
+        """Esvazia o índice (antes de uma sincronização completa)."""
+        self._por_telefone.clear()
+        self._telefone_do_evento.clear()
+
+    def __len__(self) -> int:
+        return len(self._telefone_do_evento)
+
+
+# ========== SINGLETON ==========
+
+_indice_agendamentos: Optional[IndiceAgendamentos] = None
+
+
+def get_indice_agendamentos() -> IndiceAgendamentos:
+    """Retorna o índice de agendamentos singleton do processo."""
+    global _indice_agendamentos
+
+    if _indice_agendamentos is None:
+        _indice_agendamentos = IndiceAgendamentos()
+
+    return _indice_agendamentos
+
+
+# ========== EXPORTAÇÕES ==========
+
+__all__ = [
+    "PROPRIEDADE_TELEFONE",
+    "normalizar_telefone",
+    "criar_propriedades_agendamento",
+    "Agendamento",
+    "IndiceAgendamentos",
+    "get_indice_agendamentos",
+]
@@ -0,0 +1,279 @@
+"""
+Motor de disponibilidade da agenda baseado na API FreeBusy do Google Calendar.
+
+Em vez de listar todos os eventos de um dia e comparar cada slot com cada
+evento, o motor:
+- consulta o FreeBusy uma única vez para o intervalo inteiro (vários dias);
+- mescla os intervalos ocupados em uma passada ordenada;
+- cruza slots e intervalos com dois ponteiros;
+- mantém um cache por dia com TTL curto, invalidado pelas operações de
+  agendamento, cancelamento e reagendamento.
+
+Quando a sincronização da agenda está ativa (src/tools/calendar_sync.py),
+o motor responde a partir do índice local, sem chamadas ao Google.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from src.clients.calendar_client import CalendarGateway
+
+if TYPE_CHECKING:
+    from src.tools.calendar_sync import IndiceOcupacao
+
+logger = logging.getLogger(__name__)
+
+Intervalo = Tuple[datetime, datetime]
+
+
+# ==============================================
+# OPERAÇÕES COM INTERVALOS
+# ==============================================
+
+def mesclar_intervalos(intervalos: Iterable[Intervalo]) -> List[Intervalo]:
+    """
+    Ordena e mescla intervalos sobrepostos ou encostados.
+
+    Example:
+        >>> mesclar_intervalos([(9h, 10h), (9h30, 11h), (14h, 15h)])
+        [(9h, 11h), (14h, 15h)]
+    """
+    mesclados: List[Intervalo] = []
+
+    for inicio, fim in sorted(intervalos):
+        if mesclados and inicio <= mesclados[-1][1]:
+            if fim > mesclados[-1][1]:
+                mesclados[-1] = (mesclados[-1][0], fim)
+        else:
+            mesclados.append((inicio, fim))
+
+    return mesclados
+
+
+def filtrar_slots_livres(slots: List[Intervalo], ocupados: List[Intervalo]) -> List[Intervalo]:
+    """
+    Retorna os slots que não se sobrepõem a nenhum intervalo ocupado.
+
+    Args:
+        slots: Slots ordenados por início
+        ocupados: Intervalos ocupados já mesclados (ordenados, sem sobreposição)
+
+    Returns:
+        List[Intervalo]: Slots livres
+    """
+    livres: List[Intervalo] = []
+    j = 0
+
+    for inicio, fim in slots:
+        while j < len(ocupados) and ocupados[j][1] <= inicio:
+            j += 1
+
+        if j == len(ocupados) or ocupados[j][0] >= fim:
+            livres.append((inicio, fim))
+
+    return livres
+
+
+def _dividir_por_dia(ocupados: List[Intervalo], fuso: ZoneInfo) -> Dict[date, List[Intervalo]]:
+    """Recorta intervalos mesclados nos limites de cada dia (no fuso da agenda)."""
+    por_dia: Dict[date, List[Intervalo]] = {}
+
+    for inicio, fim in ocupados:
+        inicio_local = inicio.astimezone(fuso)
+        fim_local = fim.astimezone(fuso)
+        dia = inicio_local.date()
+
+        while True:
+            inicio_do_dia = datetime.combine(dia, datetime.min.time(), tzinfo=fuso)
+            fim_do_dia = datetime.combine(dia + timedelta(days=1), datetime.min.time(), tzinfo=fuso)
+            trecho_inicio = max(inicio_local, inicio_do_dia)
+            trecho_fim = min(fim_local, fim_do_dia)
+
+            if trecho_inicio < trecho_fim:
+                por_dia.setdefault(dia, []).append((trecho_inicio, trecho_fim))
+
+            if fim_local <= fim_do_dia:
+                break
+            dia += timedelta(days=1)
+
+    return por_dia
+
+
+# ==============================================
+# CACHE POR DIA
+# ==============================================
+
+class CacheDisponibilidade:
+    """
+    Cache dos intervalos ocupados de cada dia, com TTL curto.
+
+    Args:
+        ttl: Tempo de vida (segundos) de cada dia em cache
+    """
+
+    def __init__(self, ttl: int = 60) -> None:
+        self.ttl = ttl
+        self._dias: Dict[date, Tuple[float, List[Intervalo]]] = {}
+
+    def obter(self, dia: date) -> Optional[List[Intervalo]]:
+        """Retorna os intervalos ocupados do dia, ou None se ausente/expirado."""
+        item = self._dias.get(dia)
+
+        if item is None:
+            return None
+
+        expira_em, ocupados = item
+        if expira_em <= time.monotonic():
+            del self._dias[dia]
+            return None
+
+        return ocupados
+
+    def armazenar(self, dia: date, ocupados: List[Intervalo]) -> None:
+        """Guarda os intervalos ocupados de um dia."""
+        self._dias[dia] = (time.monotonic() + self.ttl, ocupados)
+
+    def invalidar(self, dia: Optional[date] = None) -> None:
+        """Remove um dia do cache (ou todos, se dia for None)."""
+        if dia is None:
+            self._dias.clear()
+        else:
+            self._dias.pop(dia, None)
+
+
+# ==============================================
+# MOTOR DE DISPONIBILIDADE
+# ==============================================
+
+class MotorDisponibilidade:
+    """
+    Consulta intervalos ocupados de uma agenda via FreeBusy, com cache por dia.
+
+    Args:
+        gateway: Gateway assíncrono do Google Calendar
+        calendar_id: ID da agenda consultada
+        timezone: Fuso horário da agenda
+        ttl: TTL (segundos) do cache por dia
+        indice_local: Índice sincronizado da agenda (opcional); enquanto
+            estiver em dia, substitui o FreeBusy e o cache
+
+    Example:
+        >>> motor = MotorDisponibilidade(gateway, CALENDAR_ID, "America/Sao_Paulo")
+        >>> ocupados = await motor.ocupados_por_dia(date(2025, 10, 27), dias=5)
+    """
+
+    def __init__(
+        self,
+        gateway: CalendarGateway,
+        calendar_id: str,
+        timezone: str = "America/Sao_Paulo",
+        ttl: int = 60,
+        indice_local: Optional[IndiceOcupacao] = None
+    ) -> None:
+        self.gateway = gateway
+        self.calendar_id = calendar_id
+        self.fuso = ZoneInfo(timezone)
+        self.cache = CacheDisponibilidade(ttl=ttl)
+        self.indice_local = indice_local
+
+    async def ocupados_por_dia(self, inicio: date, dias: int = 1) -> Dict[date, List[Intervalo]]:
+        """
+        Retorna os intervalos ocupados de cada dia do período.
+
+        Dias ausentes do cache são buscados em uma única chamada FreeBusy.
+
+        Args:
+            inicio: Primeiro dia do período
+            dias: Quantidade de dias
+
+        Returns:
+            Dict[date, List[Intervalo]]: Intervalos ocupados (mesclados) por dia
+        """
+        periodo = [inicio + timedelta(days=i) for i in range(dias)]
+
+        if self.indice_local is not None and self.indice_local.pronto():
+            return {dia: self._ocupados_do_indice(dia) for dia in periodo}
+
+        resultado: Dict[date, List[Intervalo]] = {}
+        faltando: List[date] = []
+
+        for dia in periodo:
+            ocupados = self.cache.obter(dia)
+            if ocupados is None:
+                faltando.append(dia)
+            else:
+                resultado[dia] = ocupados
+
+        if faltando:
+            time_min = datetime.combine(faltando[0], datetime.min.time(), tzinfo=self.fuso)
+            time_max = datetime.combine(faltando[-1] + timedelta(days=1), datetime.min.time(), tzinfo=self.fuso)
+
+            ocupados = await self._consultar_freebusy(time_min, time_max)
+            por_dia = _dividir_por_dia(ocupados, self.fuso)
+
+            for dia in faltando:
+                resultado[dia] = por_dia.get(dia, [])
+                self.cache.armazenar(dia, resultado[dia])
+
+            logger.info(
+                f"FreeBusy consultado: {len(faltando)} dia(s), "
+                f"{len(ocupados)} intervalo(s) ocupado(s)"
+            )
+
+        return {dia: resultado[dia] for dia in periodo}
+
+    def invalidar(self, dia: Optional[date] = None) -> None:
+        """Invalida o cache de um dia (após agendar, cancelar ou remarcar)."""
+        self.cache.invalidar(dia)
+
+    def registrar_evento(self, evento: Dict[str, Any]) -> None:
+        """Aplica um evento criado/alterado pelo bot ao índice local (se houver)."""
+        if self.indice_local is not None:
+            self.indice_local.aplicar_evento(evento)
+
+    def remover_evento(self, evento_id: str) -> None:
+        """Remove do índice local um evento cancelado pelo bot (se houver)."""
+        if self.indice_local is not None:
+            self.indice_local.remover_evento(evento_id)
+
+    def _ocupados_do_indice(self, dia: date) -> List[Intervalo]:
+        """Intervalos ocupados de um dia segundo o índice sincronizado."""
+        inicio = datetime.combine(dia, datetime.min.time(), tzinfo=self.fuso)
+        fim = datetime.combine(dia + timedelta(days=1), datetime.min.time(), tzinfo=self.fuso)
+        return self.indice_local.ocupados_entre(inicio, fim)
+
+    async def _consultar_freebusy(self, time_min: datetime, time_max: datetime) -> List[Intervalo]:
+        """Faz uma chamada FreeBusy e devolve os intervalos ocupados mesclados."""
+        service = self.gateway.service
+        resposta = await self.gateway.executar(service.freebusy().query(body={
+            "timeMin": time_min.isoformat(),
+            "timeMax": time_max.isoformat(),
+            "timeZone": str(self.fuso),
+            "items": [{"id": self.calendar_id}]
+        }))
+
+        calendario = resposta.get("calendars", {}).get(self.calendar_id, {})
+
+        if calendario.get("errors"):
+            raise RuntimeError(f"FreeBusy retornou erro para a agenda: {calendario['errors']}")
+
+        return mesclar_intervalos(
+            (datetime.fromisoformat(b["start"]), datetime.fromisoformat(b["end"]))
+            for b in calendario.get("busy", [])
+        )
+
+
+# ========== EXPORTAÇÕES ==========
+
+__all__ = [
+    "Intervalo",
+    "mesclar_intervalos",
+    "filtrar_slots_livres",
+    "CacheDisponibilidade",
+    "MotorDisponibilidade",
+]
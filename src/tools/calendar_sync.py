@@ -0,0 +1,358 @@
+"""
+Sincronização incremental da agenda do Google Calendar em um índice local.
+
+O técnico também edita a agenda manualmente, então o cache com TTL do
+motor de disponibilidade pode ficar desatualizado. Este módulo mantém um
+índice em memória dos intervalos ocupados da agenda, alimentado por
+events.list incremental (syncToken): a primeira sincronização é completa e
+as seguintes trazem apenas o que mudou. Opcionalmente, um canal de push
+(events.watch) avisa o endpoint /webhook/calendar a cada alteração.
+
+Enquanto o índice está em dia, consultar_horarios responde sem nenhuma
+chamada ao Google; se a sincronização falhar, o motor volta ao FreeBusy.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+from googleapiclient.errors import HttpError
+
+from src.clients.calendar_client import CalendarGateway
+from src.tools.appointments import IndiceAgendamentos, get_indice_agendamentos
+from src.tools.availability import Intervalo, mesclar_intervalos
+
+logger = logging.getLogger(__name__)
+
+
+# ==============================================
+# ÍNDICE DE OCUPAÇÃO
+# ==============================================
+
+class IndiceOcupacao:
+    """
+    Índice em memória dos intervalos ocupados da agenda, por evento.
+
+    Args:
+        timezone: Fuso da agenda (usado em eventos de dia inteiro)
+        max_idade: Segundos desde a última sincronização para o índice
+            ainda ser considerado confiável
+    """
+
+    def __init__(self, timezone: str = "America/Sao_Paulo", max_idade: float = 120.0) -> None:
+        self.fuso = ZoneInfo(timezone)
+        self.max_idade = max_idade
+
+        self._eventos: Dict[str, Intervalo] = {}
+        self._ordenados: List[Intervalo] = []
+        self._inicios: List[datetime] = []
+        self._sujo = False
+        self._sincronizado_em: Optional[float] = None
+
+    def pronto(self) -> bool:
+        """True se o índice foi sincronizado há menos de max_idade segundos."""
+        return (
+            self._sincronizado_em is not None
+            and time.monotonic() - self._sincronizado_em <= self.max_idade
+        )
+
+    def marcar_sincronizado(self) -> None:
+        """Registra uma sincronização bem-sucedida."""
+        self._sincronizado_em = time.monotonic()
+
+    def limpar(self) -> None:
+        """Descarta todos os eventos (antes de uma sincronização completa)."""
+        self._eventos.clear()
+        self._sujo = True
+        self._sincronizado_em = None
+
+    def aplicar_evento(self, evento: Dict[str, Any]) -> None:
+        """
+        Insere, atualiza ou remove um evento do Calendar no índice.
+
+        Eventos cancelados ou marcados como "livre" (transparent) saem do índice.
+        """
+        evento_id = evento.get("id")
+        if not evento_id:
+            return
+
+        if evento.get("status") == "cancelled" or evento.get("transparency") == "transparent":
+            self.remover_evento(evento_id)
+            return
+
+        intervalo = self._intervalo_do_evento(evento)
+        if intervalo is None:
+            return
+
+        self._eventos[evento_id] = intervalo
+        self._sujo = True
+
+    def remover_evento(self, evento_id: str) -> None:
+        """Remove um evento do índice."""
+        if self._eventos.pop(evento_id, None) is not None:
+            self._sujo = True
+
+    def ocupados_entre(self, inicio: datetime, fim: datetime) -> List[Intervalo]:
+        """
+        Retorna os intervalos ocupados (mesclados) que tocam [inicio, fim).
+
+        Args:
+            inicio: Início do período
+            fim: Fim do período
+
+        Returns:
+            List[Intervalo]: Intervalos recortados ao período
+        """
+        if self._sujo:
+            self._ordenados = sorted(self._eventos.values())
+            self._inicios = [i for i, _ in self._ordenados]
+            self._sujo = False
+
+        limite = bisect.bisect_left(self._inicios, fim)
+        candidatos = (
+            (max(i, inicio), min(f, fim))
+            for i, f in self._ordenados[:limite]
+            if f > inicio
+        )
+        return mesclar_intervalos(candidatos)
+
+    def __len__(self) -> int:
+        return len(self._eventos)
+
+    def _intervalo_do_evento(self, evento: Dict[str, Any]) -> Optional[Intervalo]:
+        """Converte start/end do evento (dateTime ou date) em intervalo."""
+        inicio = evento.get("start", {})
+        fim = evento.get("end", {})
+
+        try:
+            if "dateTime" in inicio:
+                return (
+                    datetime.fromisoformat(inicio["dateTime"]),
+                    datetime.fromisoformat(fim["dateTime"])
+                )
+            if "date" in inicio:
+                return (
+                    datetime.fromisoformat(inicio["date"]).replace(tzinfo=self.fuso),
+                    datetime.fromisoformat(fim["date"]).replace(tzinfo=self.fuso)
+                )
+        except (KeyError, ValueError) as e:
+            logger.warning(f"Evento {evento.get('id')} com horário inválido: {e}")
+
+        return None
+
+
+# ==============================================
+# SINCRONIZADOR
+# ==============================================
+
+class SincronizadorCalendario:
+    """
+    Mantém um IndiceOcupacao em dia com a agenda via syncToken.
+
+    Args:
+        gateway: Gateway assíncrono do Google Calendar
+        calendar_id: ID da agenda sincronizada
+        indice: Índice local a alimentar
+        intervalo: Segundos entre sincronizações periódicas
+        agendamentos: Índice telefone → evento, alimentado pelos mesmos eventos
+
+    Example:
+        >>> sincronizador = SincronizadorCalendario(gateway, CALENDAR_ID, IndiceOcupacao())
+        >>> await sincronizador.sincronizar()
+        >>> sincronizador.indice.ocupados_entre(inicio, fim)
+    """
+
+    def __init__(
+        self,
+        gateway: CalendarGateway,
+        calendar_id: str,
+        indice: IndiceOcupacao,
+        intervalo: float = 30.0,
+        agendamentos: Optional[IndiceAgendamentos] = None
+    ) -> None:
+        self.gateway = gateway
+        self.calendar_id = calendar_id
+        self.indice = indice
+        self.intervalo = intervalo
+        self.agendamentos = agendamentos
+
+        self._sync_token: Optional[str] = None
+        self._lock = asyncio.Lock()
+        self._canal: Optional[Dict[str, Any]] = None
+
+    async def sincronizar(self) -> int:
+        """
+        Executa uma sincronização (completa na primeira vez, incremental depois).
+
+        Returns:
+            int: Quantidade de eventos recebidos do Google
+        """
+        async with self._lock:
+            try:
+                return await self._sincronizar()
+            except HttpError as e:
+                if getattr(e, "resp", None) is not None and e.resp.status == 410:
+                    # syncToken expirado: recomeçar com sincronização completa
+                    logger.warning("syncToken do Calendar expirou - refazendo sincronização completa")
+                    self._sync_token = None
+                    return await self._sincronizar()
+                raise
+
+    async def sincronizar_com_log(self) -> bool:
+        """
+        Sincroniza registrando falhas no log em vez de propagá-las.
+
+        Returns:
+            bool: True se a sincronização foi concluída
+        """
+        try:
+            await self.sincronizar()
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao sincronizar agenda: {e}")
+            return False
+
+    async def _sincronizar(self) -> int:
+        service = self.gateway.service
+        completa = self._sync_token is None
+        parametros: Dict[str, Any] = {"calendarId": self.calendar_id, "singleEvents": True}
+
+        if completa:
+            self.indice.limpar()
+            if self.agendamentos is not None:
+                self.agendamentos.limpar()
+        else:
+            parametros["syncToken"] = self._sync_token
+
+        total = 0
+        page_token = None
+
+        while True:
+            if page_token:
+                parametros["pageToken"] = page_token
+
+            resposta = await self.gateway.executar(service.events().list(**parametros))
+
+            for evento in resposta.get("items", []):
+                self.indice.aplicar_evento(evento)
+                if self.agendamentos is not None:
+                    self.agendamentos.aplicar_evento(evento)
+                total += 1
+
+            page_token = resposta.get("nextPageToken")
+            if not page_token:
+                self._sync_token = resposta.get("nextSyncToken", self._sync_token)
+                break
+
+        self.indice.marcar_sincronizado()
+        logger.info(
+            f"Agenda sincronizada ({'completa' if completa else 'incremental'}): "
+            f"{total} evento(s) recebido(s), {len(self.indice)} no índice"
+        )
+        return total
+
+    async def registrar_canal(self, endereco: str, token: Optional[str] = None, ttl: int = 86400) -> Dict[str, Any]:
+        """
+        Registra um canal de push (events.watch) para o endpoint da aplicação.
+
+        Args:
+            endereco: URL HTTPS pública de /webhook/calendar
+            token: Token devolvido pelo Google no header X-Goog-Channel-Token
+            ttl: Tempo de vida pedido para o canal (segundos)
+
+        Returns:
+            Dict: Canal criado (id, resourceId, expiration)
+        """
+        service = self.gateway.service
+        corpo = {
+            "id": uuid.uuid4().hex,
+            "type": "web_hook",
+            "address": endereco,
+            "params": {"ttl": str(ttl)}
+        }
+        if token:
+            corpo["token"] = token
+
+        self._canal = await self.gateway.executar(
+            service.events().watch(calendarId=self.calendar_id, body=corpo)
+        )
+        logger.info(f"Canal de push do Calendar registrado: {self._canal.get('id')}")
+        return self._canal
+
+    def canal_expirando(self, margem: timedelta = timedelta(hours=1)) -> bool:
+        """True se não há canal registrado ou se ele expira dentro da margem."""
+        if not self._canal or "expiration" not in self._canal:
+            return True
+
+        expira_em = datetime.fromtimestamp(int(self._canal["expiration"]) / 1000)
+        return expira_em - datetime.now() <= margem
+
+    async def executar_periodicamente(self, endereco_canal: Optional[str] = None, token: Optional[str] = None) -> None:
+        """
+        Loop de sincronização (executado como tarefa em background).
+
+        Args:
+            endereco_canal: URL de /webhook/calendar para renovar o canal de push
+            token: Token de validação do canal
+        """
+        while True:
+            sincronizado = await self.sincronizar_com_log()
+
+            if sincronizado and endereco_canal and self.canal_expirando():
+                try:
+                    await self.registrar_canal(endereco_canal, token)
+                except Exception as e:
+                    logger.error(f"Erro ao registrar canal de push do Calendar: {e}")
+
+            await asyncio.sleep(self.intervalo)
+
+
+# ========== SINGLETON ==========
+
+_sincronizador: Optional[SincronizadorCalendario] = None
+
+
+def get_sincronizador_calendario() -> SincronizadorCalendario:
+    """
+    Retorna o sincronizador da agenda usada pelas tools de agendamento.
+
+    O índice é acoplado ao motor de disponibilidade: enquanto estiver em dia,
+    consultar_horarios responde a partir dele.
+    """
+    global _sincronizador
+
+    if _sincronizador is None:
+        from src.config.settings import get_settings
+        from src.tools.scheduling import CALENDAR_ID, TIMEZONE, _get_calendar_gateway, _get_motor_disponibilidade
+
+        settings = get_settings()
+        indice = IndiceOcupacao(
+            timezone=TIMEZONE,
+            max_idade=settings.calendar_sync_interval * 3
+        )
+        _sincronizador = SincronizadorCalendario(
+            gateway=_get_calendar_gateway(),
+            calendar_id=CALENDAR_ID,
+            indice=indice,
+            intervalo=settings.calendar_sync_interval,
+            agendamentos=get_indice_agendamentos()
+        )
+        _get_motor_disponibilidade().indice_local = indice
+
+    return _sincronizador
+
+
+# ========== EXPORTAÇÕES ==========
+
+__all__ = [
+    "IndiceOcupacao",
+    "SincronizadorCalendario",
+    "get_sincronizador_calendario",
+]
@@ -13,8 +13,8 @@ from typing import Dict, Any
 
 from langchain.tools import tool
 
-from src.clients.whatsapp_client import WhatsAppClient
-from src.config.settings import get_settings
+from src.utils.idempotency import gerar_chave_idempotencia
+from src.utils.notification_outbox import get_outbox_notificacoes
 
 # Configuração de logging
 logger = logging.getLogger(__name__)
@@ -33,6 +33,9 @@ async def contatar_tecnico_tool(
     """
     Envia uma mensagem direta para o técnico sobre uma solicitação do cliente.
 
+    A mensagem é gravada no outbox de notificações e enviada em background;
+    a mesma solicitação repetida na mesma mensagem do cliente não é reenviada.
+
     Use esta ferramenta quando:
     - Cliente quer falar diretamente com o técnico
     - Situação urgente que requer atenção imediata
@@ -62,13 +65,6 @@ async def contatar_tecnico_tool(
     try:
         logger.info(f"Solicitação de contato com técnico - Cliente: {nome_cliente}")
 
-        settings = get_settings()
-        whatsapp = WhatsAppClient(
-            base_url=settings.whatsapp_api_url,
-            api_key=settings.whatsapp_api_key,
-            instance=settings.whatsapp_instance
-        )
-
         # Montar mensagem para o técnico
         mensagem_tecnico = f"""📞 SOLICITAÇÃO DE CONTATO
 
@@ -86,24 +82,20 @@ async def contatar_tecnico_tool(
 
 ⚠️ Cliente solicitou falar com você. Entre em contato o mais breve possível!"""
 
-        # Enviar mensagem para o técnico
-        resultado = await whatsapp.enviar_mensagem(
-            telefone=TELEFONE_TECNICO,
-            texto=mensagem_tecnico
+        # Enfileirar mensagem para o técnico (envio em background)
+        chave = gerar_chave_idempotencia("contatar_tecnico_tool", {
+            "telefone_cliente": telefone_cliente,
+            "assunto": assunto
+        })
+        await get_outbox_notificacoes().enfileirar(
+            mensagem_tecnico, [TELEFONE_TECNICO], tipo="contato", chave=chave
         )
 
-        if resultado:
-            logger.info(f"Solicitação de contato enviada ao técnico para cliente {nome_cliente}")
-            return {
-                "sucesso": True,
-                "mensagem": f"Perfeito! Já encaminhei sua solicitação para nosso técnico. Ele entrará em contato com você no telefone {telefone_cliente} o mais breve possível. Geralmente respondemos em até 1 hora durante horário comercial."
-            }
-        else:
-            logger.warning(f"Falha ao enviar solicitação de contato para {nome_cliente}")
-            return {
-                "sucesso": False,
-                "mensagem": "Desculpe, tive um problema ao encaminhar sua solicitação. Por favor, você pode ligar diretamente para (62) 98540-0075 e falar com nosso técnico?"
-            }
+        logger.info(f"Solicitação de contato enfileirada para o técnico - cliente {nome_cliente}")
+        return {
+            "sucesso": True,
+            "mensagem": f"Perfeito! Já encaminhei sua solicitação para nosso técnico. Ele entrará em contato com você no telefone {telefone_cliente} o mais breve possível. Geralmente respondemos em até 1 hora durante horário comercial."
+        }
 
     except Exception as e:
         logger.error(f"Erro ao contatar técnico: {e}", exc_info=True)
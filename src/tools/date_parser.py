@@ -0,0 +1,382 @@
+"""
+Interpretação determinística de expressões de data/hora em português.
+
+Resolve "amanhã à tarde", "quinta que vem às 14h", "dia 25", "30/10" e
+afins para datas concretas antes da chamada ao LLM. O agente recebe as
+datas já calculadas (dicas estruturadas) e a consulta de horários pode
+ser disparada especulativamente, economizando uma iteração ReAct na
+maioria das conversas de agendamento.
+
+Tudo é feito com expressões regulares sobre o texto normalizado (minúsculo
+e sem acentos); nenhuma chamada externa.
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional, Tuple
+
+# ==============================================
+# VOCABULÁRIO
+# ==============================================
+
+DIAS_SEMANA = {
+    "segunda": 0,
+    "terca": 1,
+    "quarta": 2,
+    "quinta": 3,
+    "sexta": 4,
+    "sabado": 5,
+    "domingo": 6,
+}
+
+NOMES_DIAS = [
+    "segunda-feira", "terça-feira", "quarta-feira", "quinta-feira",
+    "sexta-feira", "sábado", "domingo"
+]
+
+MESES = {
+    "janeiro": 1, "fevereiro": 2, "marco": 3, "abril": 4, "maio": 5, "junho": 6,
+    "julho": 7, "agosto": 8, "setembro": 9, "outubro": 10, "novembro": 11, "dezembro": 12,
+}
+
+PERIODOS = ("manha", "tarde", "noite")
+
+_DIA_SEMANA = "|".join(DIAS_SEMANA)
+_MES = "|".join(MESES)
+
+_RE_DEPOIS_DE_AMANHA = re.compile(r"\bdepois de amanha\b")
+_RE_AMANHA = re.compile(r"\bamanha\b")
+_RE_HOJE = re.compile(r"\bhoje\b")
+_RE_ESTA_SEMANA = re.compile(r"\b(?:esta|essa|nesta|nessa) semana\b")
+_RE_SEMANA_QUE_VEM = re.compile(r"\b(?:(?:na )?semana que vem|(?:na )?proxima semana)\b")
+_RE_DIA_SEMANA = re.compile(
+    rf"\b(?:(proxima|nesta|nessa|esta|essa)\s+)?({_DIA_SEMANA})(?:[- ]feira)?"
+    r"(?:\s+(que vem|da semana que vem|da proxima semana))?\b"
+)
+_RE_DATA_NUMERICA = re.compile(r"\b(\d{1,2})/(\d{1,2})(?:/(\d{2}|\d{4}))?\b")
+_RE_DATA_POR_EXTENSO = re.compile(rf"\b(\d{{1,2}}) de ({_MES})(?: de (\d{{4}}))?\b")
+_RE_DIA_DO_MES = re.compile(r"\bdia (\d{1,2})\b(?!\s*(?:/|de (?:" + _MES + r")))")
+# "rua 15 de novembro", "avenida 7 de setembro": endereço, não data
+_RE_LOGRADOURO_ANTES = re.compile(r"\b(?:rua|r\.|avenida|av\.?|praca|travessa|alameda|rodovia|estrada)\s*$")
+# Horário logo após o dia da semana: "segunda às 14h", "segunda, 9:30"
+_RE_HORA_A_SEGUIR = re.compile(r",?\s+(?:as\s+\d{1,2}\b|\d{1,2}(?::\d{2}|h\b|\s+(?:horas?|da|de)\b))")
+
+_RE_HORA_MINUTO = re.compile(r"\b(\d{1,2})(?::|h)(\d{2})\b")
+# "2 horas" sem "às" é duração ("demora 2 horas?"), não horário
+_RE_HORA = re.compile(r"\b(\d{1,2})\s*(?:h|hs|hrs?)\b")
+_RE_AS_HORA = re.compile(r"\bas (\d{1,2})\b(?!\s*/)")
+_RE_HORA_PERIODO = re.compile(r"\b(\d{1,2}) (?:horas? )?(?:da|de) (manha|tarde|noite)\b")
+_RE_MEIO_DIA = re.compile(r"\bmeio[- ]dia\b")
+_RE_PERIODO = re.compile(r"\b(manha|tarde|noite)\b")
+_RE_SAUDACAO = re.compile(r"\b(?:bom dia|boa tarde|boa noite)\b")
+
+# Período colado ao horário: "às 2 da tarde", "3h à tarde", "à tarde, às 3"
+_RE_PERIODO_APOS_HORA = re.compile(r"\s*(?:horas?\s*)?(?:da|de|a) (manha|tarde|noite)\b")
+_RE_PERIODO_ANTES_HORA = re.compile(r"\b(manha|tarde|noite),? (?:as )?$")
+
+# Horário sem período: 1h a 7h são da tarde ("às 2" = 14:00); antes de
+# HORA_MINIMA (ex.: "de manhã às 3") fica para o LLM perguntar
+HORA_MAXIMA_TARDE_IMPLICITA = 7
+HORA_MINIMA = 6
+
+
+@dataclass
+class ReferenciaData:
+    """Uma expressão de data encontrada no texto, já resolvida."""
+
+    expressao: str
+    data: date
+    dias: int = 1
+    hora: Optional[time] = None
+    periodo: Optional[str] = None
+
+    @property
+    def data_consulta(self) -> str:
+        """Data no formato aceito pelo agendamento_tool ("DD/MM/YYYY [HH:MM]")."""
+        if self.hora is not None:
+            return f"{self.data.strftime('%d/%m/%Y')} {self.hora.strftime('%H:%M')}"
+        return self.data.strftime("%d/%m/%Y")
+
+    def descrever(self) -> str:
+        """Ex: "'quinta que vem' = quinta-feira, 30/10/2025 às 14:00"."""
+        texto = f"'{self.expressao}' = {NOMES_DIAS[self.data.weekday()]}, {self.data.strftime('%d/%m/%Y')}"
+        if self.dias > 1:
+            fim = self.data + timedelta(days=self.dias - 1)
+            texto += f" até {fim.strftime('%d/%m/%Y')}"
+        if self.hora is not None:
+            texto += f" às {self.hora.strftime('%H:%M')}"
+        elif self.periodo:
+            texto += f" (período da {'manhã' if self.periodo == 'manha' else self.periodo})"
+        return texto
+
+
+def normalizar_texto(texto: str) -> str:
+    """Minúsculas, sem acentos e com espaços simples."""
+    sem_acentos = unicodedata.normalize("NFKD", texto.lower())
+    sem_acentos = "".join(c for c in sem_acentos if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", sem_acentos).strip()
+
+
+# ==============================================
+# DATAS
+# ==============================================
+
+def _proximo_dia_semana(hoje: date, dia_semana: int) -> date:
+    """Próxima ocorrência do dia da semana, estritamente depois de hoje."""
+    return hoje + timedelta(days=(dia_semana - hoje.weekday() - 1) % 7 + 1)
+
+
+def _segunda_da_semana_que_vem(hoje: date) -> date:
+    return hoje + timedelta(days=7 - hoje.weekday())
+
+
+def _data_valida(ano: int, mes: int, dia: int) -> Optional[date]:
+    try:
+        return date(ano, mes, dia)
+    except ValueError:
+        return None
+
+
+def _data_futura(hoje: date, mes: int, dia: int, ano: Optional[int] = None) -> Optional[date]:
+    """Data sem ano: este ano, ou o próximo se já passou."""
+    if ano is not None:
+        return _data_valida(ano, mes, dia)
+
+    data = _data_valida(hoje.year, mes, dia)
+    if data is not None and data < hoje:
+        data = _data_valida(hoje.year + 1, mes, dia)
+    return data
+
+
+def _encontrar_datas(texto: str, hoje: date) -> List[Tuple[int, int, date, int]]:
+    """Retorna (início, fim, data, dias) de cada expressão de data no texto normalizado."""
+    achados: List[Tuple[int, int, date, int]] = []
+
+    def adicionar(m: re.Match, data: Optional[date], dias: int = 1) -> None:
+        if data is None:
+            return
+        # Expressões mais longas têm prioridade sobre as contidas nelas
+        if any(i < m.end() and m.start() < f for i, f, _, _ in achados):
+            return
+        achados.append((m.start(), m.end(), data, dias))
+
+    for m in _RE_DEPOIS_DE_AMANHA.finditer(texto):
+        adicionar(m, hoje + timedelta(days=2))
+
+    for m in _RE_DATA_NUMERICA.finditer(texto):
+        ano = m.group(3)
+        if ano is not None and len(ano) == 2:
+            ano = f"20{ano}"
+        adicionar(m, _data_futura(hoje, int(m.group(2)), int(m.group(1)), int(ano) if ano else None))
+
+    for m in _RE_DATA_POR_EXTENSO.finditer(texto):
+        if _RE_LOGRADOURO_ANTES.search(texto[:m.start()]):
+            continue
+        ano = int(m.group(3)) if m.group(3) else None
+        adicionar(m, _data_futura(hoje, MESES[m.group(2)], int(m.group(1)), ano))
+
+    for m in _RE_DIA_SEMANA.finditer(texto):
+        # "segunda" sozinha costuma ser ordinal ("segunda opção")
+        if m.group(2) == "segunda" and not (m.group(1) or m.group(3) or "feira" in m.group(0)):
+            anterior = texto[:m.start()].split()[-1:]
+            dia_da_semana = (
+                anterior in ([], ["na"], ["de"], ["ate"], ["pra"], ["para"], ["e"], ["ou"])
+                or _RE_HORA_A_SEGUIR.match(texto, m.end())
+            )
+            if not dia_da_semana:
+                continue
+
+        data = _proximo_dia_semana(hoje, DIAS_SEMANA[m.group(2)])
+        if m.group(3) in ("da semana que vem", "da proxima semana"):
+            segunda = _segunda_da_semana_que_vem(hoje)
+            data = segunda + timedelta(days=DIAS_SEMANA[m.group(2)])
+        adicionar(m, data)
+
+    for m in _RE_SEMANA_QUE_VEM.finditer(texto):
+        adicionar(m, _segunda_da_semana_que_vem(hoje), dias=7)
+
+    for m in _RE_ESTA_SEMANA.finditer(texto):
+        adicionar(m, hoje, dias=7 - hoje.weekday())
+
+    for m in _RE_DIA_DO_MES.finditer(texto):
+        dia = int(m.group(1))
+        data = _data_futura(hoje, hoje.month, dia)
+        if data is None or (data.year, data.month) != (hoje.year, hoje.month):
+            proximo_mes = (hoje.replace(day=1) + timedelta(days=32)).replace(day=1)
+            data = _data_valida(proximo_mes.year, proximo_mes.month, dia)
+        adicionar(m, data)
+
+    for m in _RE_AMANHA.finditer(texto):
+        adicionar(m, hoje + timedelta(days=1))
+
+    for m in _RE_HOJE.finditer(texto):
+        adicionar(m, hoje)
+
+    return sorted(achados)
+
+
+# ==============================================
+# HORÁRIO E PERÍODO
+# ==============================================
+
+def _sem_saudacoes(texto: str) -> str:
+    """Apaga "bom dia", "boa tarde" e "boa noite" (não são o período pedido)."""
+    return _RE_SAUDACAO.sub(lambda m: " " * len(m.group(0)), texto)
+
+
+def _encontrar_periodo(texto: str) -> Optional[str]:
+    m = _RE_PERIODO.search(texto)
+    return m.group(1) if m else None
+
+
+def _periodo_da_hora(texto: str, m: re.Match) -> Optional[str]:
+    """Período ligado ao horário encontrado em `m` (None se estiver solto no texto)."""
+    if m.re is _RE_HORA_PERIODO:
+        return m.group(2)
+
+    depois = _RE_PERIODO_APOS_HORA.match(texto, m.end())
+    if depois:
+        return depois.group(1)
+
+    antes = _RE_PERIODO_ANTES_HORA.search(texto[:m.start()])
+    return antes.group(1) if antes else None
+
+
+def _encontrar_hora(texto: str, periodo: Optional[str] = None) -> Optional[time]:
+    """
+    Primeiro horário do texto ("14h", "14:30", "às 9", "2 da tarde", "meio-dia").
+
+    Args:
+        texto: Texto normalizado, sem datas nem saudações
+        periodo: Período mencionado em outro ponto da mensagem
+
+    Returns:
+        time: Horário, ou None se não há horário (ou ele é ambíguo)
+    """
+    if _RE_MEIO_DIA.search(texto):
+        return time(12, 0)
+
+    for padrao in (_RE_HORA_MINUTO, _RE_HORA, _RE_AS_HORA, _RE_HORA_PERIODO):
+        m = padrao.search(texto)
+        if m:
+            break
+    else:
+        return None
+
+    hora = int(m.group(1))
+    minuto = int(m.group(2)) if padrao is _RE_HORA_MINUTO else 0
+
+    # "2 da tarde" usa o período ligado ao horário; "à tarde? tipo às 2", o
+    # da mensagem; sem período, "às 2" é 14:00 (não há atendimento de madrugada)
+    periodo = _periodo_da_hora(texto, m) or periodo
+    tarde_implicita = periodo is None and 1 <= hora <= HORA_MAXIMA_TARDE_IMPLICITA
+    if hora < 12 and (periodo in ("tarde", "noite") or tarde_implicita):
+        hora += 12
+
+    if hora < HORA_MINIMA or hora > 23 or minuto > 59:
+        return None
+    return time(hora, minuto)
+
+
+# ==============================================
+# API
+# ==============================================
+
+def resolver_datas(texto: str, agora: datetime) -> List[ReferenciaData]:
+    """
+    Encontra e resolve as expressões de data de uma mensagem.
+
+    Horário e período ("às 14h", "à tarde") valem para todas as datas da
+    mensagem, que na prática costuma ter uma só. Saudações não contam como
+    período. O período ligado ao horário tem prioridade ("de manhã não
+    dá, às 2 da tarde" = 14:00); senão vale o da mensagem ("à tarde, tipo
+    às 2" = 14:00). Sem período, 1h a 7h são da tarde.
+
+    Args:
+        texto: Mensagem do cliente (texto_processado)
+        agora: Momento de referência (no fuso da agenda)
+
+    Returns:
+        List[ReferenciaData]: Datas na ordem em que aparecem, sem repetições
+
+    Example:
+        >>> resolver_datas("pode ser quinta que vem à tarde?", datetime(2025, 10, 27, 9))
+        [ReferenciaData(expressao='quinta que vem', data=date(2025, 10, 30), periodo='tarde')]
+    """
+    normalizado = normalizar_texto(texto)
+    achados = _encontrar_datas(normalizado, agora.date())
+
+    if not achados:
+        return []
+
+    # Remover as datas do texto antes de procurar o horário ("30/10" não é hora)
+    # e as saudações antes de procurar o período ("boa tarde" não é "à tarde")
+    sem_datas = normalizado
+    for inicio, fim, _, _ in reversed(achados):
+        sem_datas = sem_datas[:inicio] + " " * (fim - inicio) + sem_datas[fim:]
+    sem_datas = _sem_saudacoes(sem_datas)
+
+    periodo = _encontrar_periodo(sem_datas)
+    hora = _encontrar_hora(sem_datas, periodo)
+
+    referencias: List[ReferenciaData] = []
+    vistas = set()
+    for inicio, fim, data, dias in achados:
+        if (data, dias) in vistas:
+            continue
+        vistas.add((data, dias))
+        referencias.append(ReferenciaData(
+            expressao=normalizado[inicio:fim],
+            data=data,
+            dias=dias,
+            hora=hora if dias == 1 else None,
+            periodo=periodo
+        ))
+
+    return referencias
+
+
+def interpretar_data_hora(texto: str, agora: datetime) -> Optional[datetime]:
+    """
+    Converte uma expressão em português em um único datetime (no fuso de `agora`).
+
+    Returns:
+        datetime: Primeira data encontrada (com o horário, se houver), ou None
+    """
+    referencias = resolver_datas(texto, agora)
+    if not referencias:
+        return None
+
+    referencia = referencias[0]
+    return datetime.combine(referencia.data, referencia.hora or time(0, 0), tzinfo=agora.tzinfo)
+
+
+def formatar_dicas_datas(referencias: List[ReferenciaData]) -> str:
+    """
+    Monta o bloco de dicas para o agente.
+
+    Example:
+        >>> formatar_dicas_datas(refs)
+        "=== DATAS JÁ CALCULADAS ===\\n- 'amanha' = terça-feira, 28/10/2025 (período da tarde)"
+    """
+    if not referencias:
+        return ""
+
+    linhas = ["=== DATAS JÁ CALCULADAS (use estas, não recalcule) ==="]
+    linhas.extend(f"- {r.descrever()} -> data_consulta_reuniao=\"{r.data_consulta}\"" for r in referencias)
+    return "\n".join(linhas)
+
+
+# ========== EXPORTAÇÕES ==========
+
+__all__ = [
+    "ReferenciaData",
+    "normalizar_texto",
+    "resolver_datas",
+    "interpretar_data_hora",
+    "formatar_dicas_datas",
+]
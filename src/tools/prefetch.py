@@ -0,0 +1,256 @@
+"""
+Prefetch especulativo das tools enquanto o LLM decide o que fazer.
+
+Num turno típico o LLM primeiro decide chamar `buscar_base_conhecimento`
+ou `agendamento_tool consultar`, e só então a busca começa: a latência é
+a soma das duas. Aqui um detector de intenção por palavras-chave sobre o
+texto do cliente dispara essas buscas logo no início do turno, em paralelo
+com a primeira chamada ao LLM. Se o LLM pedir uma tool com argumentos
+compatíveis, o executor recebe o resultado já pronto (ou a tarefa em
+andamento): a latência vira max() em vez de sum().
+
+Buscas que o LLM não usou são canceladas no fim do turno e contadas como
+desperdício (contadores em /status).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from src.tools.date_parser import normalizar_texto
+
+logger = logging.getLogger(__name__)
+
+# Intenções detectadas
+INTENCAO_CONHECIMENTO = "conhecimento"
+INTENCAO_AGENDA = "agenda"
+
+_RE_CONHECIMENTO = re.compile(
+    r"\b(quanto custa|quanto fica|quanto sai|preco|precos|valor|valores|orcamento|"
+    r"voces fazem|voce faz|fazem|como funciona|garantia|material|materiais|prazo|"
+    r"metro quadrado|m2|drywall|gesso|forro|forros|divisoria|divisorias|sanca|"
+    r"atendem|atende|regiao|pagamento|parcela|pix|cartao)\b"
+)
+_RE_AGENDA = re.compile(
+    r"\b(horario|horarios|agendar|agenda|agendamento|marcar|remarcar|visita|"
+    r"disponivel|disponibilidade|vaga|vagas|livre|pode ser|consegue vir|podem vir)\b"
+)
+
+# Fração mínima dos termos da busca do LLM presentes na busca antecipada
+SOBREPOSICAO_MINIMA = 0.6
+
+_RE_TERMO = re.compile(r"\w{3,}")
+
+_contadores: Counter = Counter()
+
+
+def detectar_intencoes(texto: str, tem_data: bool = False) -> Set[str]:
+    """
+    Detecta, por palavras-chave, quais buscas o LLM provavelmente vai pedir.
+
+    Args:
+        texto: Mensagem do cliente
+        tem_data: Se a mensagem menciona alguma data (reforça agenda)
+
+    Returns:
+        Set[str]: Subconjunto de {INTENCAO_CONHECIMENTO, INTENCAO_AGENDA}
+    """
+    normalizado = normalizar_texto(texto)
+    intencoes: Set[str] = set()
+
+    if _RE_CONHECIMENTO.search(normalizado):
+        intencoes.add(INTENCAO_CONHECIMENTO)
+    if tem_data or _RE_AGENDA.search(normalizado):
+        intencoes.add(INTENCAO_AGENDA)
+
+    return intencoes
+
+
+def busca_corresponde(consulta_antecipada: str, argumentos: Dict[str, Any]) -> bool:
+    """
+    True se a busca pedida pelo LLM é a mesma (ou quase) que a antecipada.
+
+    O LLM costuma reescrever a mensagem do cliente ("Oi, quanto custa o forro
+    de gesso?" vira "preço forro de gesso"); a busca antecipada serve se a
+    maior parte dos termos pedidos já está nela.
+
+    Args:
+        consulta_antecipada: Texto usado na busca antecipada
+        argumentos: Argumentos da chamada do LLM (o retriever como tool
+            recebe o texto em `__arg1`; `query` em tools estruturadas)
+
+    Returns:
+        bool: Se o resultado antecipado pode ser entregue no lugar da busca
+    """
+    consulta_pedida = argumentos.get("__arg1") or argumentos.get("query") or ""
+    antecipada = normalizar_texto(consulta_antecipada)
+    pedida = normalizar_texto(str(consulta_pedida))
+    if not pedida:
+        return False
+    if pedida == antecipada:
+        return True
+
+    termos_pedidos = set(_RE_TERMO.findall(pedida))
+    if not termos_pedidos:
+        return False
+
+    comuns = termos_pedidos & set(_RE_TERMO.findall(antecipada))
+    return len(comuns) / len(termos_pedidos) >= SOBREPOSICAO_MINIMA
+
+
+@dataclass
+class _Prefetch:
+    ferramenta: str
+    tarefa: "asyncio.Task[Any]"
+    corresponde: Callable[[Dict[str, Any]], bool]
+    usado: bool = False
+
+
+class PrefetchEspeculativo:
+    """
+    Tarefas especulativas de um turno do agente.
+
+    Example:
+        >>> prefetch = PrefetchEspeculativo()
+        >>> prefetch.iniciar("buscar_base_conhecimento", retriever.ainvoke(texto))
+        >>> ...
+        >>> encontrado, resultado = await prefetch.obter("buscar_base_conhecimento", args)
+        >>> prefetch.encerrar()
+    """
+
+    def __init__(self) -> None:
+        self._itens: List[_Prefetch] = []
+
+    def iniciar(
+        self,
+        ferramenta: str,
+        corrotina: Awaitable[Any],
+        corresponde: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ) -> "asyncio.Task[Any]":
+        """
+        Dispara uma busca especulativa.
+
+        Args:
+            ferramenta: Nome da tool cujo resultado está sendo antecipado
+            corrotina: A busca em si
+            corresponde: Decide se os argumentos pedidos pelo LLM batem com
+                a busca antecipada (padrão: qualquer chamada da tool)
+
+        Returns:
+            asyncio.Task: Tarefa da busca
+        """
+        tarefa = asyncio.ensure_future(corrotina)
+        self._itens.append(_Prefetch(ferramenta, tarefa, corresponde or (lambda _: True)))
+        _contadores[(ferramenta, "iniciado")] += 1
+        return tarefa
+
+    def tarefa(self, ferramenta: str) -> Optional["asyncio.Task[Any]"]:
+        """Tarefa ainda não usada de uma tool (para inspecionar antes do LLM)."""
+        for item in self._itens:
+            if item.ferramenta == ferramenta and not item.usado:
+                return item.tarefa
+        return None
+
+    def consumir(self, ferramenta: str) -> Optional[Any]:
+        """
+        Resultado de um prefetch já concluído com sucesso, sem chamada de tool.
+
+        Usado para colocar o resultado direto no contexto do LLM.
+
+        Returns:
+            Any: Resultado, ou None se não há prefetch concluído da tool
+        """
+        for item in self._itens:
+            if item.usado or item.ferramenta != ferramenta or not item.tarefa.done():
+                continue
+            if item.tarefa.cancelled() or item.tarefa.exception() is not None:
+                continue
+
+            item.usado = True
+            _contadores[(ferramenta, "usado")] += 1
+            return item.tarefa.result()
+
+        return None
+
+    async def obter(self, ferramenta: str, argumentos: Dict[str, Any]) -> Tuple[bool, Any]:
+        """
+        Resultado antecipado para uma chamada de tool, se houver.
+
+        Cada prefetch atende uma única chamada. Se a busca antecipada falhou,
+        retorna (False, None) e o executor chama a tool normalmente.
+
+        Returns:
+            Tuple[bool, Any]: (encontrado, resultado)
+        """
+        for item in self._itens:
+            if item.usado or item.ferramenta != ferramenta or item.tarefa.cancelled():
+                continue
+            if not item.corresponde(argumentos):
+                continue
+
+            item.usado = True
+            try:
+                resultado = await item.tarefa
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Prefetch de {ferramenta} falhou, executando a tool: {e}")
+                _contadores[(ferramenta, "falhou")] += 1
+                return False, None
+
+            _contadores[(ferramenta, "usado")] += 1
+            logger.info(f"⚡ Resultado antecipado usado para {ferramenta}")
+            return True, resultado
+
+        return False, None
+
+    def encerrar(self) -> None:
+        """Cancela e contabiliza os prefetches que o LLM não usou."""
+        for item in self._itens:
+            if item.usado:
+                continue
+
+            _contadores[(item.ferramenta, "desperdicado")] += 1
+            if not item.tarefa.done():
+                item.tarefa.cancel()
+            elif not item.tarefa.cancelled():
+                item.tarefa.exception()  # Evita "exception was never retrieved"
+
+        self._itens.clear()
+
+
+def obter_contadores_prefetch() -> Dict[str, Dict[str, int]]:
+    """
+    Contadores de prefetch por tool.
+
+    Example:
+        >>> obter_contadores_prefetch()
+        {"agendamento_tool": {"iniciado": 10, "usado": 7, "desperdicado": 3}}
+    """
+    resultado: Dict[str, Dict[str, int]] = {}
+    for (ferramenta, situacao), total in _contadores.items():
+        resultado.setdefault(ferramenta, {})[situacao] = total
+    return resultado
+
+
+def zerar_contadores_prefetch() -> None:
+    """Zera os contadores (útil em testes)."""
+    _contadores.clear()
+
+
+# ========== EXPORTAÇÕES ==========
+
+__all__ = [
+    "INTENCAO_CONHECIMENTO",
+    "INTENCAO_AGENDA",
+    "detectar_intencoes",
+    "busca_corresponde",
+    "PrefetchEspeculativo",
+    "obter_contadores_prefetch",
+    "zerar_contadores_prefetch",
+]
@@ -0,0 +1,265 @@
+"""
+Reserva temporária (lease) de horários durante o agendamento.
+
+agendar_horario faz "verifica e insere": events.list no horário e depois
+events.insert. Duas conversas simultâneas podem ver o mesmo horário livre
+e as duas agendarem. A reserva fecha essa janela: antes da verificação o
+horário é reservado com um token e TTL curto; só quem tem a reserva segue
+para o insert, e a reserva é liberada ao final (com sucesso ou erro). O
+TTL garante a liberação mesmo se o processo morrer no meio.
+
+A reserva cobre todas as células de `resolucao` minutos que o atendimento
+ocupa, não só o minuto de início: "14:00" e "14:30" (de uma hora cada)
+disputam a célula das 14:30 e só um deles consegue. As células são
+tomadas todas ou nenhuma.
+
+Dois backends com a mesma interface:
+- memória: um único processo (padrão, --workers 1);
+- Redis (script Lua que toma todas as células com PX + liberação atômica
+  por token): vários workers/réplicas.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+# Toma todas as células ou nenhuma (ARGV: token, TTL em ms)
+_SCRIPT_RESERVAR = """
+for _, chave in ipairs(KEYS) do
+    if redis.call("exists", chave) == 1 then
+        return 0
+    end
+end
+for _, chave in ipairs(KEYS) do
+    redis.call("set", chave, ARGV[1], "PX", ARGV[2])
+end
+return 1
+"""
+
+# Libera só as células que ainda pertencem ao token (não apaga reserva alheia)
+_SCRIPT_LIBERAR = """
+local liberadas = 0
+for _, chave in ipairs(KEYS) do
+    if redis.call("get", chave) == ARGV[1] then
+        liberadas = liberadas + redis.call("del", chave)
+    end
+end
+return liberadas
+"""
+
+_EPOCA = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _chaves_slot(inicio: datetime, fim: datetime, resolucao: int) -> List[str]:
+    """
+    Chaves das células de `resolucao` minutos que [inicio, fim) ocupa.
+
+    As células são alinhadas em UTC, independentes do fuso em que o horário
+    foi informado. Dois intervalos que se sobrepõem têm ao menos uma célula
+    em comum, qualquer que seja o alinhamento deles.
+    """
+    minuto_inicio = math.floor((inicio - _EPOCA).total_seconds() / 60)
+    minuto_fim = math.ceil((fim - _EPOCA).total_seconds() / 60)
+    primeira = minuto_inicio // resolucao
+    ultima = max(primeira, math.ceil(minuto_fim / resolucao) - 1)
+
+    return [
+        (_EPOCA + timedelta(minutes=celula * resolucao)).strftime("%Y%m%dT%H%M")
+        for celula in range(primeira, ultima + 1)
+    ]
+
+
+# ==============================================
+# BACKEND EM MEMÓRIA
+# ==============================================
+
+class ReservaHorariosMemoria:
+    """
+    Reservas de horário em memória (um processo).
+
+    Args:
+        ttl: Duração máxima (segundos) de uma reserva
+        resolucao: Tamanho (minutos) das células reservadas
+    """
+
+    def __init__(self, ttl: int = 30, resolucao: int = 30) -> None:
+        self.ttl = ttl
+        self.resolucao = resolucao
+        self._reservas: Dict[str, Tuple[str, float]] = {}
+
+    def _ocupada(self, chave: str, agora: float) -> bool:
+        atual = self._reservas.get(chave)
+        return atual is not None and atual[1] > agora
+
+    async def reservar(self, inicio: datetime, fim: datetime, dono: str = "") -> Optional[str]:
+        """
+        Reserva o horário, se nenhuma de suas células estiver reservada.
+
+        Args:
+            inicio: Início do horário
+            fim: Fim do horário
+            dono: Identificação de quem reserva (só para log)
+
+        Returns:
+            str: Token da reserva, ou None se o horário já está reservado
+        """
+        chaves = _chaves_slot(inicio, fim, self.resolucao)
+        agora = time.monotonic()
+
+        if any(self._ocupada(chave, agora) for chave in chaves):
+            logger.info(f"Horário {chaves[0]} já reservado - pedido de {dono or 'desconhecido'} recusado")
+            return None
+
+        token = uuid.uuid4().hex
+        for chave in chaves:
+            self._reservas[chave] = (token, agora + self.ttl)
+        return token
+
+    async def liberar(self, inicio: datetime, fim: datetime, token: str) -> None:
+        """Libera a reserva (somente as células de que o token ainda é dono)."""
+        for chave in _chaves_slot(inicio, fim, self.resolucao):
+            atual = self._reservas.get(chave)
+            if atual is not None and atual[0] == token:
+                del self._reservas[chave]
+
+    async def reservados(self, intervalos: Iterable[Tuple[datetime, datetime]]) -> Set[datetime]:
+        """Retorna o início dos intervalos informados que colidem com alguma reserva."""
+        agora = time.monotonic()
+
+        return {
+            inicio for inicio, fim in intervalos
+            if any(self._ocupada(chave, agora) for chave in _chaves_slot(inicio, fim, self.resolucao))
+        }
+
+
+# ==============================================
+# BACKEND REDIS
+# ==============================================
+
+class ReservaHorariosRedis:
+    """
+    Reservas de horário no Redis, compartilhadas entre workers.
+
+    Se o Redis estiver indisponível, a reserva é concedida (com aviso no log):
+    a verificação events.list antes do insert continua valendo.
+
+    As chaves de uma agenda têm a mesma hash tag (`{calendar_id}`), para que
+    o script que toma várias células rode também em Redis Cluster.
+
+    Args:
+        redis_client: Cliente Redis assíncrono
+        calendar_id: Agenda (compõe o prefixo das chaves)
+        ttl: Duração máxima (segundos) de uma reserva
+        resolucao: Tamanho (minutos) das células reservadas
+    """
+
+    def __init__(self, redis_client: Redis, calendar_id: str = "", ttl: int = 30, resolucao: int = 30) -> None:
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self.resolucao = resolucao
+        self.prefixo = f"reserva:slot:{{{calendar_id}}}:"
+
+    def _chaves(self, inicio: datetime, fim: datetime) -> List[str]:
+        return [self.prefixo + chave for chave in _chaves_slot(inicio, fim, self.resolucao)]
+
+    async def reservar(self, inicio: datetime, fim: datetime, dono: str = "") -> Optional[str]:
+        """Reserva todas as células do horário em um script; None se alguma já estiver reservada."""
+        token = uuid.uuid4().hex
+        chaves = self._chaves(inicio, fim)
+
+        try:
+            ok = await self.redis_client.eval(_SCRIPT_RESERVAR, len(chaves), *chaves, token, self.ttl * 1000)
+        except RedisError as e:
+            logger.warning(f"Redis indisponível para reservar horário: {e}")
+            return token
+
+        if not ok:
+            logger.info(f"Horário {chaves[0]} já reservado - pedido de {dono or 'desconhecido'} recusado")
+            return None
+
+        return token
+
+    async def liberar(self, inicio: datetime, fim: datetime, token: str) -> None:
+        """Libera a reserva atomicamente (somente as células de que o token ainda é dono)."""
+        chaves = self._chaves(inicio, fim)
+
+        try:
+            await self.redis_client.eval(_SCRIPT_LIBERAR, len(chaves), *chaves, token)
+        except RedisError as e:
+            # O TTL libera a reserva de qualquer forma
+            logger.warning(f"Erro ao liberar reserva de horário: {e}")
+
+    async def reservados(self, intervalos: Iterable[Tuple[datetime, datetime]]) -> Set[datetime]:
+        """Retorna o início dos intervalos informados que colidem com alguma reserva (um MGET)."""
+        chaves_por_inicio = {inicio: self._chaves(inicio, fim) for inicio, fim in intervalos}
+        chaves = sorted({chave for lista in chaves_por_inicio.values() for chave in lista})
+        if not chaves:
+            return set()
+
+        try:
+            valores = await self.redis_client.mget(chaves)
+        except RedisError as e:
+            logger.warning(f"Erro ao consultar reservas de horário: {e}")
+            return set()
+
+        ocupadas = {chave for chave, valor in zip(chaves, valores) if valor is not None}
+        return {inicio for inicio, lista in chaves_por_inicio.items() if ocupadas.intersection(lista)}
+
+
+# ========== SINGLETON ==========
+
+_reserva_horarios = None
+
+
+def get_reserva_horarios(calendar_id: str = "", resolucao: int = 30):
+    """
+    Retorna o gerenciador de reservas configurado em SLOT_RESERVATION_BACKEND.
+
+    Args:
+        calendar_id: Agenda cujos horários são reservados (usado na criação)
+        resolucao: Tamanho (minutos) das células reservadas (usado na criação)
+
+    Returns:
+        ReservaHorariosMemoria ou ReservaHorariosRedis
+    """
+    global _reserva_horarios
+
+    if _reserva_horarios is None:
+        from src.config.settings import get_settings
+
+        settings = get_settings()
+
+        if settings.slot_reservation_backend == "redis":
+            from src.clients.redis_client import get_redis_compartilhado
+
+            _reserva_horarios = ReservaHorariosRedis(
+                get_redis_compartilhado(),
+                calendar_id=calendar_id,
+                ttl=settings.slot_reservation_ttl,
+                resolucao=resolucao
+            )
+        else:
+            _reserva_horarios = ReservaHorariosMemoria(ttl=settings.slot_reservation_ttl, resolucao=resolucao)
+
+        logger.info(f"Reserva de horários: backend {settings.slot_reservation_backend}")
+
+    return _reserva_horarios
+
+
+# ========== EXPORTAÇÕES ==========
+
+__all__ = [
+    "ReservaHorariosMemoria",
+    "ReservaHorariosRedis",
+    "get_reserva_horarios",
+]
@@ -14,15 +14,26 @@ Data: 2025-10-21
 import os
 import logging
 from datetime import datetime, timedelta
-from typing import Literal, Optional, Dict, List, Any
+from typing import Literal, Optional, Dict, List, Any, Tuple
 from zoneinfo import ZoneInfo
 
 from langchain.tools import tool
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
-from src.clients.whatsapp_client import WhatsAppClient
+from src.clients.calendar_client import CalendarGateway, get_calendar_gateway
+from src.tools.availability import Intervalo, MotorDisponibilidade
+from src.tools.date_parser import interpretar_data_hora
+from src.tools.slot_grid import GradeHorarios, RegraExpediente, criar_grade_horarios
+from src.tools.reservations import get_reserva_horarios
+from src.tools.appointments import (
+    PROPRIEDADE_TELEFONE,
+    Agendamento,
+    criar_propriedades_agendamento,
+    get_indice_agendamentos,
+    normalizar_telefone,
+)
+from src.utils.idempotency import gerar_chave_idempotencia, obter_lead_atual
+from src.utils.notification_outbox import get_outbox_notificacoes
 from src.config.settings import get_settings
 
 # Configuração de logging
@@ -41,7 +52,18 @@ TIMEZONE = 'America/Sao_Paulo'
 # Configurações de horário comercial
 HORARIO_INICIO = 8  # 8h
 HORARIO_FIM = 18    # 18h
-DURACAO_CONSULTA = 1  # 1 hora
+DURACAO_CONSULTA = 1  # 1 hora (aceita frações, ex: 1.5)
+
+# Exceções ao horário comercial por dia da semana (0 = segunda ... 6 = domingo)
+# Ex: {5: (8, 12), 6: None} -> sábado só de manhã, domingo sem atendimento
+EXPEDIENTE_POR_DIA: Dict[int, Optional[Tuple[float, float]]] = {}
+
+# Períodos do dia para filtros "manhã"/"tarde" (minutos após a meia-noite)
+PERIODO_MANHA = (0, 12 * 60)
+PERIODO_TARDE = (12 * 60, HORARIO_FIM * 60)
+
+# Janela da busca por "próximo horário livre"
+DIAS_BUSCA_PROXIMO_HORARIO = 30
 
 # Configuração do técnico - Novo número internacional
 TELEFONE_TECNICO_PRINCIPAL = os.getenv('TELEFONE_TECNICO', '14372591659')
@@ -60,75 +82,68 @@ TELEFONE_TECNICO = TELEFONES_TECNICOS[0] if TELEFONES_TECNICOS else '14372591659
 
 logger.info(f"📞 Sistema de notificação configurado com {len(TELEFONES_TECNICOS)} número(s)")
 
+# Motor de disponibilidade (criado na primeira consulta)
+_motor_disponibilidade: Optional[MotorDisponibilidade] = None
 
-def _get_calendar_service() -> Any:
-    """
-    Obtém o serviço do Google Calendar autenticado via Service Account.
+# Grade de horários (criada na primeira consulta)
+_grade_horarios: Optional[GradeHorarios] = None
 
-    Returns:
-        Resource: Serviço do Google Calendar
 
-    Raises:
-        FileNotFoundError: Se o arquivo de credenciais não for encontrado
-        Exception: Erros de autenticação
+def _get_calendar_gateway() -> CalendarGateway:
     """
-    if not os.path.exists(SERVICE_ACCOUNT_FILE):
-        raise FileNotFoundError(
-            f"Arquivo de credenciais da Service Account não encontrado: {SERVICE_ACCOUNT_FILE}"
-        )
-
-    try:
-        # Carregar credenciais da Service Account
-        credentials = service_account.Credentials.from_service_account_file(
-            SERVICE_ACCOUNT_FILE,
-            scopes=SCOPES
-        )
-        logger.info("Service Account carregada com sucesso")
+    Obtém o gateway assíncrono do Google Calendar.
 
-        # Criar serviço do Google Calendar
-        service = build('calendar', 'v3', credentials=credentials)
-        logger.info("Serviço do Google Calendar inicializado")
+    Todas as chamadas à API passam por ele para não bloquear o event loop.
+    O serviço e as credenciais são singletons do processo (carregados na
+    primeira chamada ou no startup da aplicação).
 
-        return service
-
-    except Exception as e:
-        logger.error(f"Erro ao autenticar com Service Account: {e}")
-        raise
+    Returns:
+        CalendarGateway: Gateway com pool de threads e timeout
+    """
+    return get_calendar_gateway(SERVICE_ACCOUNT_FILE, SCOPES)
 
 
 def _parsear_data(data_str: str) -> datetime:
     """
     Converte string de data para objeto datetime.
 
+    Tenta, nesta ordem: ISO 8601 (fromisoformat, cobre data, data+hora e
+    offset), formatos brasileiros DD/MM/YYYY [HH:MM] e, por último,
+    expressões em português ("amanhã 14h", "quinta que vem").
+
     Args:
-        data_str: Data no formato ISO 8601 ou variações
+        data_str: Data no formato ISO 8601, DD/MM/YYYY ou por extenso
 
     Returns:
-        datetime: Objeto datetime parseado
+        datetime: Objeto datetime parseado (no fuso da agenda se não informado)
 
     Raises:
         ValueError: Se o formato da data for inválido
     """
-    formatos = [
-        '%Y-%m-%dT%H:%M:%S%z',
-        '%Y-%m-%dT%H:%M:%S',
-        '%Y-%m-%d %H:%M:%S',
-        '%Y-%m-%d',
-        '%d/%m/%Y %H:%M',
-        '%d/%m/%Y'
-    ]
+    fuso = ZoneInfo(TIMEZONE)
+    data_str = data_str.strip()
 
-    for formato in formatos:
-        try:
-            dt = datetime.strptime(data_str, formato)
-            # Se não tem timezone, adiciona o timezone padrão
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=ZoneInfo(TIMEZONE))
-            return dt
-        except ValueError:
-            continue
+    dt = None
+    try:
+        dt = datetime.fromisoformat(data_str)
+    except ValueError:
+        for formato in ('%d/%m/%Y %H:%M', '%d/%m/%Y'):
+            try:
+                dt = datetime.strptime(data_str, formato)
+                break
+            except ValueError:
+                continue
+
+    if dt is None:
+        dt = interpretar_data_hora(data_str, datetime.now(fuso))
 
-    raise ValueError(f"Formato de data inválido: {data_str}")
+    if dt is None:
+        raise ValueError(f"Formato de data inválido: {data_str}")
+
+    # Se não tem timezone, adiciona o timezone padrão
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=fuso)
+    return dt
 
 
 def _validar_data_futura(data: datetime) -> bool:
@@ -145,6 +160,19 @@ def _validar_data_futura(data: datetime) -> bool:
     return data > agora
 
 
+def _gerar_intervalos_slots(data_referencia: datetime) -> List[Intervalo]:
+    """
+    Gera os slots de atendimento de um dia como intervalos (inicio, fim).
+
+    Args:
+        data_referencia: Data para gerar os slots
+
+    Returns:
+        List[Intervalo]: Slots ordenados por horário
+    """
+    return _get_grade_horarios().slots_do_dia(data_referencia.date())
+
+
 def _gerar_slots_horario(data_referencia: datetime) -> List[Dict[str, str]]:
     """
     Gera lista de slots de horário disponíveis para um dia.
@@ -155,22 +183,196 @@ def _gerar_slots_horario(data_referencia: datetime) -> List[Dict[str, str]]:
     Returns:
         List[Dict]: Lista de slots com inicio e fim
     """
-    slots = []
-    data_base = data_referencia.replace(hour=HORARIO_INICIO, minute=0, second=0, microsecond=0)
+    return [
+        {"inicio": inicio.isoformat(), "fim": fim.isoformat()}
+        for inicio, fim in _gerar_intervalos_slots(data_referencia)
+    ]
+
+
+def _get_grade_horarios() -> GradeHorarios:
+    """
+    Obtém a grade de horários (expediente por dia da semana e duração).
+
+    Returns:
+        GradeHorarios: Grade singleton montada das constantes deste módulo
+    """
+    global _grade_horarios
+
+    if _grade_horarios is None:
+        _grade_horarios = criar_grade_horarios(
+            HORARIO_INICIO,
+            HORARIO_FIM,
+            DURACAO_CONSULTA,
+            expediente_por_dia=EXPEDIENTE_POR_DIA,
+            timezone=TIMEZONE
+        )
 
-    hora_atual = HORARIO_INICIO
-    while hora_atual < HORARIO_FIM:
-        inicio = data_base.replace(hour=hora_atual)
-        fim = inicio + timedelta(hours=DURACAO_CONSULTA)
+    return _grade_horarios
 
-        slots.append({
-            "inicio": inicio.isoformat(),
-            "fim": fim.isoformat()
-        })
 
-        hora_atual += DURACAO_CONSULTA
+def _get_reservas():
+    """
+    Obtém as reservas de horário da agenda, em células da grade.
+
+    Returns:
+        ReservaHorariosMemoria ou ReservaHorariosRedis
+    """
+    return get_reserva_horarios(CALENDAR_ID, resolucao=_get_grade_horarios().resolucao)
 
-    return slots
+
+async def _proximo_horario_livre(
+    a_partir: datetime,
+    periodo: Optional[RegraExpediente] = None,
+    dias: int = DIAS_BUSCA_PROXIMO_HORARIO
+) -> Optional[Intervalo]:
+    """
+    Primeiro horário livre (e não reservado) depois de `a_partir`.
+
+    Uma única consulta de ocupação cobre a janela inteira; a busca em si
+    é feita nos bitmaps da grade, dia a dia, parando no primeiro achado.
+
+    Args:
+        a_partir: Momento a partir do qual procurar
+        periodo: Restringir a manhã/tarde (minutos após a meia-noite)
+        dias: Quantos dias olhar à frente
+
+    Returns:
+        Intervalo: (inicio, fim) do slot, ou None se não houver na janela
+    """
+    ocupados_por_dia = await _get_motor_disponibilidade().ocupados_por_dia(
+        a_partir.astimezone(ZoneInfo(TIMEZONE)).date(), dias=dias
+    )
+    reservas = _get_reservas()
+
+    candidatos = _get_grade_horarios().iterar_livres(ocupados_por_dia, a_partir=a_partir, periodo=periodo)
+    for candidato in candidatos:
+        if not await reservas.reservados([candidato]):
+            return candidato
+
+    return None
+
+
+def _get_motor_disponibilidade() -> MotorDisponibilidade:
+    """
+    Obtém o motor de disponibilidade (FreeBusy + cache por dia) da agenda.
+
+    Returns:
+        MotorDisponibilidade: Motor singleton para CALENDAR_ID
+    """
+    global _motor_disponibilidade
+
+    if _motor_disponibilidade is None:
+        _motor_disponibilidade = MotorDisponibilidade(
+            gateway=_get_calendar_gateway(),
+            calendar_id=CALENDAR_ID,
+            timezone=TIMEZONE,
+            ttl=get_settings().calendar_cache_ttl
+        )
+
+    return _motor_disponibilidade
+
+
+async def _localizar_agendamento(
+    gateway: CalendarGateway,
+    nome_cliente: str,
+    telefone_cliente: str,
+    data: datetime
+) -> Optional[Agendamento]:
+    """
+    Localiza o agendamento do cliente próximo à data informada.
+
+    Ordem de busca:
+    1. Índice telefone → evento (nenhuma chamada ao Google)
+    2. events.list filtrado por privateExtendedProperty=telefone
+    3. Eventos antigos, sem propriedades: nome no título em uma janela de ±1-2h
+
+    Args:
+        gateway: Gateway do Google Calendar
+        nome_cliente: Nome do cliente (usado só para eventos antigos)
+        telefone_cliente: Telefone da conversa
+        data: Data/hora informada pelo cliente
+
+    Returns:
+        Agendamento ou None se não encontrado
+    """
+    indice = get_indice_agendamentos()
+    telefone = normalizar_telefone(telefone_cliente)
+    service = gateway.service
+
+    inicio_busca = data - timedelta(hours=1)
+    fim_busca = data + timedelta(hours=2)
+
+    if telefone:
+        agendamento = indice.buscar(telefone, data)
+        if agendamento is not None:
+            logger.info(f"Agendamento localizado pelo índice: {agendamento.evento_id}")
+            return agendamento
+
+        resultado = await gateway.executar(service.events().list(
+            calendarId=CALENDAR_ID,
+            privateExtendedProperty=f"{PROPRIEDADE_TELEFONE}={telefone}",
+            timeMin=inicio_busca.isoformat(),
+            timeMax=fim_busca.isoformat(),
+            singleEvents=True
+        ))
+
+        for evento in resultado.get('items', []):
+            indice.aplicar_evento(evento)
+
+        agendamento = indice.buscar(telefone, data)
+        if agendamento is not None:
+            return agendamento
+
+    # Eventos criados antes das propriedades estruturadas
+    events_result = await gateway.executar(service.events().list(
+        calendarId=CALENDAR_ID,
+        timeMin=inicio_busca.isoformat(),
+        timeMax=fim_busca.isoformat(),
+        singleEvents=True,
+        orderBy='startTime'
+    ))
+
+    for evento in events_result.get('items', []):
+        privadas = evento.get('extendedProperties', {}).get('private', {})
+        if PROPRIEDADE_TELEFONE in privadas:
+            continue
+        if nome_cliente and nome_cliente.lower() in evento.get('summary', '').lower():
+            logger.info(f"Agendamento antigo localizado pelo nome: {evento['id']}")
+            return Agendamento.de_evento(evento)
+
+    return None
+
+
+def _evento_inexistente(erro: HttpError) -> bool:
+    """True se o Calendar respondeu que o evento não existe mais (404/410)."""
+    return getattr(erro, 'resp', None) is not None and erro.resp.status in (404, 410)
+
+
+async def _inserir_evento(gateway: CalendarGateway, evento: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Insere o evento; se ele tem ID próprio e já existe (409), devolve o existente.
+
+    É o que torna o agendamento idempotente: a segunda inserção com o mesmo
+    ID não cria outro evento.
+    """
+    try:
+        return await gateway.executar(gateway.service.events().insert(
+            calendarId=CALENDAR_ID,
+            body=evento
+        ))
+    except HttpError as e:
+        if 'id' not in evento or getattr(e, 'resp', None) is None or e.resp.status != 409:
+            raise
+
+        existente = await gateway.executar(gateway.service.events().get(
+            calendarId=CALENDAR_ID,
+            eventId=evento['id']
+        ))
+        if existente.get('status') == 'cancelled':
+            raise
+
+        logger.info(f"Evento {evento['id']} já havia sido criado (chamada repetida)")
+        return existente
 
 
 async def _notificar_tecnico(
@@ -178,15 +380,16 @@ async def _notificar_tecnico(
     telefone_cliente: str,
     endereco: str,
     data_inicio: datetime,
-    tipo_servico: str = "visita/orçamento"
-) -> bool:
+    tipo_servico: str = "visita/orçamento",
+    chave: Optional[str] = None
+) -> Optional[str]:
     """
-    Envia notificação WhatsApp para o técnico sobre novo agendamento.
+    Enfileira a notificação WhatsApp de novo agendamento para os técnicos.
 
-    Sistema com fallback automático:
-    - Tenta múltiplos números em ordem de prioridade
-    - Não bloqueia o agendamento se notificação falhar
-    - Loga detalhadamente cada tentativa
+    O envio acontece em background pelo outbox de notificações:
+    - Todos os números de TELEFONES_TECNICOS recebem ao mesmo tempo
+    - Cada número tem retry próprio; o status fica na tabela de entregas
+    - Nunca bloqueia nem atrasa o agendamento do cliente
 
     Args:
         nome_cliente: Nome completo do cliente
@@ -194,19 +397,12 @@ async def _notificar_tecnico(
         endereco: Endereço completo do serviço
         data_inicio: Data e hora do agendamento
         tipo_servico: Tipo de serviço (padrão: "visita/orçamento")
+        chave: Chave de idempotência da notificação (repetições não reenviam)
 
     Returns:
-        bool: True se enviou com sucesso, False caso contrário
-        IMPORTANTE: Sempre retorna True no final para não bloquear agendamento
+        str: ID da notificação no outbox, ou None se não foi possível enfileirar
     """
     try:
-        settings = get_settings()
-        whatsapp = WhatsAppClient(
-            base_url=settings.whatsapp_api_url,
-            api_key=settings.whatsapp_api_key,
-            instance=settings.whatsapp_instance
-        )
-
         # Formatar data/hora em português
         data_formatada = data_inicio.strftime("%d/%m/%Y")
         hora_formatada = data_inicio.strftime("%H:%M")
@@ -238,75 +434,19 @@ async def _notificar_tecnico(
 
 ⚠️ Lembre-se de confirmar presença com o cliente!"""
 
-        # Tentar enviar para cada técnico até conseguir
-        sucesso = False
-
-        for i, telefone in enumerate(TELEFONES_TECNICOS, 1):
-            if not telefone:
-                continue
-
-            try:
-                logger.info(f"📤 Tentativa {i}/{len(TELEFONES_TECNICOS)}: Notificando técnico {telefone}")
-
-                resultado = await whatsapp.enviar_mensagem(
-                    telefone=telefone,
-                    texto=mensagem
-                )
-
-                if resultado:
-                    logger.info(f"✅ Técnico notificado com sucesso: {telefone}")
-                    sucesso = True
-                    break  # Sucesso! Não precisa tentar outros números
-                else:
-                    logger.warning(f"⚠️ Resposta vazia ao enviar para {telefone}")
-
-            except Exception as e:
-                error_msg = str(e).lower()
-
-                # Diagnóstico específico do erro
-                if "exists" in error_msg and "false" in error_msg:
-                    logger.warning(f"❌ Número {telefone} não existe no WhatsApp")
-                elif "400" in error_msg or "bad request" in error_msg:
-                    logger.warning(f"❌ Requisição inválida para {telefone}: {e}")
-                else:
-                    logger.warning(f"⚠️ Erro desconhecido ao enviar para {telefone}: {e}")
-
-                # Continuar para próximo número
-                continue
-
-        if not sucesso:
-            # Nenhum número funcionou
-            logger.error(f"""
-╔════════════════════════════════════════════════════════════╗
-║  ❌ FALHA NA NOTIFICAÇÃO DO TÉCNICO                       ║
-╚════════════════════════════════════════════════════════════╝
-
-Números tentados: {TELEFONES_TECNICOS}
-Cliente: {nome_cliente}
-Horário: {data_formatada} às {hora_formatada}
-
-⚠️  AÇÃO NECESSÁRIA:
-1. Verificar se os números dos técnicos estão corretos
-2. Confirmar que os números têm WhatsApp ativo
-3. Verificar logs da Evolution API
-4. Atualizar variável de ambiente TELEFONE_TECNICO se necessário
-
-ℹ️  O AGENDAMENTO FOI CRIADO COM SUCESSO no Google Calendar.
-   Apenas a notificação ao técnico falhou.
-""")
-
-        # IMPORTANTE: Sempre retorna True para não bloquear o agendamento do cliente
-        return True
+        return await get_outbox_notificacoes().enfileirar(
+            mensagem, TELEFONES_TECNICOS, tipo="agendamento", chave=chave
+        )
 
     except Exception as e:
-        logger.error(f"❌ Erro crítico ao notificar técnico: {e}", exc_info=True)
-        # Retorna True para não bloquear o agendamento do cliente
-        return True
+        logger.error(f"❌ Erro ao enfileirar notificação do técnico: {e}", exc_info=True)
+        return None
 
 
 async def consultar_horarios(
     data_referencia: str,
-    informacao_extra: str = ""
+    informacao_extra: str = "",
+    dias: int = 1
 ) -> Dict[str, Any]:
     """
     Consulta horários disponíveis no Google Calendar.
@@ -314,6 +454,7 @@ async def consultar_horarios(
     Args:
         data_referencia: Data para consultar (formato ISO ou DD/MM/YYYY)
         informacao_extra: Contexto adicional como "período da tarde"
+        dias: Quantidade de dias a partir de data_referencia (ex: 7 para a semana)
 
     Returns:
         Dict: {
@@ -321,7 +462,8 @@ async def consultar_horarios(
             "mensagem": str,
             "dados": {
                 "horarios": List[Dict],
-                "data_referencia": str
+                "data_referencia": str,
+                "horarios_por_dia": Dict[str, List[Dict]]  # apenas se dias > 1
             }
         }
     """
@@ -339,73 +481,66 @@ async def consultar_horarios(
                 "dados": {}
             }
 
-        # Obter serviço do calendar
-        service = _get_calendar_service()
+        # Intervalos ocupados de todo o período em uma única consulta FreeBusy
+        motor = _get_motor_disponibilidade()
+        ocupados_por_dia = await motor.ocupados_por_dia(data.date(), dias=dias)
+
+        informacao = informacao_extra.lower()
+        periodo = None
+        if "tarde" in informacao:
+            periodo = PERIODO_TARDE
+        elif "manha" in informacao or "manhã" in informacao:
+            periodo = PERIODO_MANHA
+        agora = datetime.now(ZoneInfo(TIMEZONE))
+
+        # Inícios livres de todos os dias calculados nos bitmaps da grade
+        livres_por_dia = _get_grade_horarios().livres_por_dia(
+            ocupados_por_dia, a_partir=agora, periodo=periodo
+        )
+
+        # Horários sendo agendados neste momento por outras conversas
+        reservados = await _get_reservas().reservados(
+            slot for livres in livres_por_dia.values() for slot in livres
+        )
 
-        # Definir período de busca (dia inteiro)
-        inicio_dia = data.replace(hour=0, minute=0, second=0, microsecond=0)
-        fim_dia = inicio_dia + timedelta(days=1)
+        horarios_por_dia: Dict[str, List[Dict[str, str]]] = {}
+        slots_disponiveis: List[Dict[str, str]] = []
 
-        # Buscar eventos existentes
-        events_result = service.events().list(
-            calendarId=CALENDAR_ID,
-            timeMin=inicio_dia.isoformat(),
-            timeMax=fim_dia.isoformat(),
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
-
-        eventos = events_result.get('items', [])
-        logger.info(f"Encontrados {len(eventos)} eventos agendados")
-
-        # Gerar todos os slots possíveis
-        todos_slots = _gerar_slots_horario(data)
-
-        # Filtrar slots ocupados
-        slots_disponiveis = []
-        for slot in todos_slots:
-            slot_inicio = datetime.fromisoformat(slot['inicio'])
-            slot_fim = datetime.fromisoformat(slot['fim'])
-
-            # Verificar se slot está livre
-            ocupado = False
-            for evento in eventos:
-                evento_inicio = datetime.fromisoformat(
-                    evento['start'].get('dateTime', evento['start'].get('date'))
-                )
-                evento_fim = datetime.fromisoformat(
-                    evento['end'].get('dateTime', evento['end'].get('date'))
-                )
-
-                # Verifica sobreposição
-                if not (slot_fim <= evento_inicio or slot_inicio >= evento_fim):
-                    ocupado = True
-                    break
-
-            if not ocupado and _validar_data_futura(slot_inicio):
-                slots_disponiveis.append(slot)
-
-        # Filtrar por período se especificado
-        if "tarde" in informacao_extra.lower():
-            slots_disponiveis = [
-                s for s in slots_disponiveis
-                if 12 <= datetime.fromisoformat(s['inicio']).hour < 18
-            ]
-        elif "manha" in informacao_extra.lower() or "manhã" in informacao_extra.lower():
-            slots_disponiveis = [
-                s for s in slots_disponiveis
-                if datetime.fromisoformat(s['inicio']).hour < 12
+        for dia, livres in livres_por_dia.items():
+            horarios_dia = [
+                {"inicio": inicio.isoformat(), "fim": fim.isoformat()}
+                for inicio, fim in livres
+                if inicio not in reservados
             ]
 
+            horarios_por_dia[dia.strftime("%d/%m/%Y")] = horarios_dia
+            slots_disponiveis.extend(horarios_dia)
+
         logger.info(f"Encontrados {len(slots_disponiveis)} horários disponíveis")
 
+        dados = {
+            "horarios": slots_disponiveis,
+            "data_referencia": data.strftime("%d/%m/%Y")
+        }
+        if dias > 1:
+            dados["horarios_por_dia"] = horarios_por_dia
+
+        mensagem = f"Encontrados {len(slots_disponiveis)} horários disponíveis"
+
+        # Nada livre no período: sugerir o próximo horário livre depois dele
+        if not slots_disponiveis:
+            fim_periodo = datetime.combine(
+                max(ocupados_por_dia) + timedelta(days=1), datetime.min.time(), tzinfo=ZoneInfo(TIMEZONE)
+            )
+            proximo = await _proximo_horario_livre(max(fim_periodo, agora), periodo=periodo)
+            if proximo:
+                dados["proximo_horario"] = {"inicio": proximo[0].isoformat(), "fim": proximo[1].isoformat()}
+                mensagem += f". Próximo horário livre: {proximo[0].strftime('%d/%m/%Y às %H:%M')}"
+
         return {
             "sucesso": True,
-            "mensagem": f"Encontrados {len(slots_disponiveis)} horários disponíveis",
-            "dados": {
-                "horarios": slots_disponiveis,
-                "data_referencia": data.strftime("%d/%m/%Y")
-            }
+            "mensagem": mensagem,
+            "dados": dados
         }
 
     except ValueError as e:
@@ -443,17 +578,28 @@ async def agendar_horario(
     telefone_cliente: str,
     email_cliente: str,
     data_consulta_reuniao: str,
-    informacao_extra: str = ""
+    informacao_extra: str = "",
+    lead_id: str = "",
+    chave_idempotencia: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     Agenda um novo compromisso no Google Calendar.
 
+    Telefone, endereço e lead ficam em extendedProperties.private do evento,
+    para que cancelamentos e remarcações localizem o evento pelo telefone.
+
+    Com chave_idempotencia, a chave vira o ID do evento: repetir a chamada
+    (mesma mensagem processada de novo) devolve o evento já criado em vez
+    de duplicá-lo.
+
     Args:
         nome_cliente: Nome completo do cliente
         telefone_cliente: Telefone do cliente com DDD
         email_cliente: Email do cliente
         data_consulta_reuniao: Data/hora do agendamento
         informacao_extra: Informações adicionais para a descrição
+        lead_id: ID do cliente no Supabase (opcional)
+        chave_idempotencia: Chave hexadecimal da chamada (ver utils.idempotency)
 
     Returns:
         Dict: {
@@ -481,86 +627,121 @@ async def agendar_horario(
                 "dados": {}
             }
 
+        if not _get_grade_horarios().cabe_no_expediente(data_inicio):
+            return {
+                "sucesso": False,
+                "mensagem": "Horário fora do expediente de atendimento. Por favor, escolha outro horário.",
+                "dados": {}
+            }
+
         # Calcular fim (início + duração)
         data_fim = data_inicio + timedelta(hours=DURACAO_CONSULTA)
 
         # Obter serviço do calendar
-        service = _get_calendar_service()
+        gateway = _get_calendar_gateway()
+        service = gateway.service
 
-        # Verificar se horário está disponível
-        events_result = service.events().list(
-            calendarId=CALENDAR_ID,
-            timeMin=data_inicio.isoformat(),
-            timeMax=data_fim.isoformat(),
-            singleEvents=True
-        ).execute()
+        # Reservar o horário antes de verificar e inserir: duas conversas
+        # simultâneas não conseguem agendar o mesmo horário
+        reservas = _get_reservas()
+        token_reserva = await reservas.reservar(data_inicio, data_fim, dono=telefone_cliente)
 
-        if events_result.get('items', []):
-            logger.warning("Horário já está ocupado")
+        if token_reserva is None:
             return {
                 "sucesso": False,
-                "mensagem": "Horário já está ocupado. Por favor, escolha outro horário.",
+                "mensagem": "Este horário está sendo agendado por outro cliente neste momento. Por favor, escolha outro horário.",
                 "dados": {}
             }
 
-        # Criar evento
-        evento = {
-            'summary': f'Consulta - {nome_cliente}',
-            'description': f"""Cliente: {nome_cliente}
+        try:
+            # Verificar se horário está disponível
+            events_result = await gateway.executar(service.events().list(
+                calendarId=CALENDAR_ID,
+                timeMin=data_inicio.isoformat(),
+                timeMax=data_fim.isoformat(),
+                singleEvents=True
+            ))
+
+            # O próprio evento (chamada repetida) não conta como conflito
+            conflitos = [
+                e for e in events_result.get('items', [])
+                if not chave_idempotencia or e.get('id') != chave_idempotencia
+            ]
+
+            if conflitos:
+                logger.warning("Horário já está ocupado")
+                return {
+                    "sucesso": False,
+                    "mensagem": "Horário já está ocupado. Por favor, escolha outro horário.",
+                    "dados": {}
+                }
+
+            # Extrair endereço de informacao_extra se disponível
+            endereco = "Endereço a confirmar"
+            if informacao_extra:
+                # Procurar por endereço na informação extra
+                if "endereço:" in informacao_extra.lower() or "endereco:" in informacao_extra.lower():
+                    partes = informacao_extra.split(":")
+                    if len(partes) > 1:
+                        endereco = partes[1].strip()
+                elif informacao_extra and len(informacao_extra) > 10:
+                    # Se informacao_extra parece ser um endereço
+                    endereco = informacao_extra
+
+            # Criar evento
+            evento = {
+                'summary': f'Consulta - {nome_cliente}',
+                'description': f"""Cliente: {nome_cliente}
 Telefone: {telefone_cliente}
 Email: {email_cliente}
 
 {informacao_extra}""",
-            'start': {
-                'dateTime': data_inicio.isoformat(),
-                'timeZone': TIMEZONE,
-            },
-            'end': {
-                'dateTime': data_fim.isoformat(),
-                'timeZone': TIMEZONE,
-            },
-            'reminders': {
-                'useDefault': False,
-                'overrides': [
-                    {'method': 'email', 'minutes': 24 * 60},  # 1 dia antes
-                    {'method': 'popup', 'minutes': 60},  # 1 hora antes
-                ],
-            },
-        }
-
-        # Inserir evento no calendar
-        evento_criado = service.events().insert(
-            calendarId=CALENDAR_ID,
-            body=evento
-        ).execute()
-
-        logger.info(f"Evento criado com sucesso: {evento_criado['id']}")
-
-        # Notificar técnico sobre o novo agendamento
-        # Extrair endereço de informacao_extra se disponível
-        endereco = "Endereço a confirmar"
-        if informacao_extra:
-            # Procurar por endereço na informação extra
-            if "endereço:" in informacao_extra.lower() or "endereco:" in informacao_extra.lower():
-                partes = informacao_extra.split(":")
-                if len(partes) > 1:
-                    endereco = partes[1].strip()
-            elif informacao_extra and len(informacao_extra) > 10:
-                # Se informacao_extra parece ser um endereço
-                endereco = informacao_extra
-
-        # Tentar enviar notificação (não bloqueia se falhar)
-        try:
-            await _notificar_tecnico(
-                nome_cliente=nome_cliente,
-                telefone_cliente=telefone_cliente,
-                endereco=endereco,
-                data_inicio=data_inicio,
-                tipo_servico="Visita/Orçamento"
-            )
-        except Exception as e:
-            logger.warning(f"Não foi possível notificar técnico: {e}")
-            # Não falha o agendamento se a notificação falhar
+                'start': {
+                    'dateTime': data_inicio.isoformat(),
+                    'timeZone': TIMEZONE,
+                },
+                'end': {
+                    'dateTime': data_fim.isoformat(),
+                    'timeZone': TIMEZONE,
+                },
+                'reminders': {
+                    'useDefault': False,
+                    'overrides': [
+                        {'method': 'email', 'minutes': 24 * 60},  # 1 dia antes
+                        {'method': 'popup', 'minutes': 60},  # 1 hora antes
+                    ],
+                },
+                'extendedProperties': criar_propriedades_agendamento(
+                    nome_cliente=nome_cliente,
+                    telefone_cliente=telefone_cliente,
+                    email_cliente=email_cliente,
+                    endereco=endereco if endereco != "Endereço a confirmar" else "",
+                    lead_id=lead_id
+                ),
+            }
+            if chave_idempotencia:
+                evento['id'] = chave_idempotencia
+
+            # Inserir evento no calendar
+            evento_criado = await _inserir_evento(gateway, evento)
+
+            logger.info(f"Evento criado com sucesso: {evento_criado['id']}")
+            motor = _get_motor_disponibilidade()
+            motor.invalidar(data_inicio.date())
+            motor.registrar_evento(evento_criado)
+            get_indice_agendamentos().aplicar_evento(evento_criado)
+        finally:
+            await reservas.liberar(data_inicio, data_fim, token_reserva)
+
+        # Notificar técnico sobre o novo agendamento (em background)
+        await _notificar_tecnico(
+            nome_cliente=nome_cliente,
+            telefone_cliente=telefone_cliente,
+            endereco=endereco,
+            data_inicio=data_inicio,
+            tipo_servico="Visita/Orçamento",
+            chave=f"agendamento:{evento_criado['id']}"
+        )
 
         return {
             "sucesso": True,
@@ -598,14 +779,16 @@ Email: {email_cliente}
 
 async def cancelar_horario(
     nome_cliente: str,
-    data_consulta_reuniao: str
+    data_consulta_reuniao: str,
+    telefone_cliente: str = ""
 ) -> Dict[str, Any]:
     """
     Cancela um agendamento existente no Google Calendar.
 
     Args:
-        nome_cliente: Nome do cliente para buscar o evento
+        nome_cliente: Nome do cliente (busca de eventos antigos)
         data_consulta_reuniao: Data/hora do agendamento a cancelar
+        telefone_cliente: Telefone da conversa (localiza o evento diretamente)
 
     Returns:
         Dict: {
@@ -621,30 +804,14 @@ async def cancelar_horario(
         data_busca = _parsear_data(data_consulta_reuniao)
 
         # Obter serviço do calendar
-        service = _get_calendar_service()
+        gateway = _get_calendar_gateway()
+        service = gateway.service
+        indice = get_indice_agendamentos()
 
         # Buscar evento
-        inicio_busca = data_busca - timedelta(hours=1)
-        fim_busca = data_busca + timedelta(hours=2)
+        agendamento = await _localizar_agendamento(gateway, nome_cliente, telefone_cliente, data_busca)
 
-        events_result = service.events().list(
-            calendarId=CALENDAR_ID,
-            timeMin=inicio_busca.isoformat(),
-            timeMax=fim_busca.isoformat(),
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
-
-        eventos = events_result.get('items', [])
-
-        # Procurar evento do cliente
-        evento_encontrado = None
-        for evento in eventos:
-            if nome_cliente.lower() in evento.get('summary', '').lower():
-                evento_encontrado = evento
-                break
-
-        if not evento_encontrado:
+        if not agendamento:
             logger.warning(f"Evento não encontrado para {nome_cliente}")
             return {
                 "sucesso": False,
@@ -652,32 +819,34 @@ async def cancelar_horario(
                 "dados": {}
             }
 
-        # Extrair telefone da descrição do evento
-        descricao = evento_encontrado.get('description', '')
-        telefone_cliente = ""
-        try:
-            if 'Telefone:' in descricao:
-                telefone_cliente = descricao.split('Telefone:')[1].split('\n')[0].strip()
-        except:
-            telefone_cliente = "não informado"
+        telefone_cliente = agendamento.telefone or telefone_cliente or "não informado"
 
         # Deletar evento
-        service.events().delete(
-            calendarId=CALENDAR_ID,
-            eventId=evento_encontrado['id']
-        ).execute()
+        try:
+            await gateway.executar(service.events().delete(
+                calendarId=CALENDAR_ID,
+                eventId=agendamento.evento_id
+            ))
+        except HttpError as e:
+            if not _evento_inexistente(e):
+                raise
+            # Evento removido direto na agenda: o índice estava desatualizado
+            indice.remover_evento(agendamento.evento_id)
+            logger.warning(f"Evento {agendamento.evento_id} já não existe no Calendar")
+            return {
+                "sucesso": False,
+                "mensagem": f"Não foi encontrado agendamento para {nome_cliente} nesta data",
+                "dados": {}
+            }
 
-        logger.info(f"Evento cancelado com sucesso: {evento_encontrado['id']}")
+        logger.info(f"Evento cancelado com sucesso: {agendamento.evento_id}")
+        indice.remover_evento(agendamento.evento_id)
+        motor = _get_motor_disponibilidade()
+        motor.invalidar(agendamento.inicio.date())
+        motor.remover_evento(agendamento.evento_id)
 
         # Notificar técnico sobre o cancelamento
         try:
-            settings = get_settings()
-            whatsapp = WhatsAppClient(
-                base_url=settings.whatsapp_api_url,
-                api_key=settings.whatsapp_api_key,
-                instance=settings.whatsapp_instance
-            )
-
             # Formatar data/hora
             data_formatada = data_busca.strftime("%d/%m/%Y")
             hora_formatada = data_busca.strftime("%H:%M")
@@ -705,19 +874,18 @@ async def cancelar_horario(
 
 ⚠️ O cliente cancelou este agendamento."""
 
-            await whatsapp.enviar_mensagem(
-                telefone=TELEFONE_TECNICO,
-                texto=mensagem
+            await get_outbox_notificacoes().enfileirar(
+                mensagem, TELEFONES_TECNICOS, tipo="cancelamento",
+                chave=f"cancelamento:{agendamento.evento_id}"
             )
-            logger.info(f"Notificação de cancelamento enviada ao técnico")
         except Exception as e:
-            logger.warning(f"Não foi possível notificar técnico sobre cancelamento: {e}")
+            logger.warning(f"Não foi possível enfileirar notificação de cancelamento: {e}")
 
         return {
             "sucesso": True,
             "mensagem": f"Agendamento de {nome_cliente} cancelado com sucesso. Notificações enviadas.",
             "dados": {
-                "evento_cancelado": evento_encontrado.get('summary', ''),
+                "evento_cancelado": agendamento.resumo,
                 "data": data_busca.strftime('%d/%m/%Y às %H:%M')
             }
         }
@@ -759,7 +927,7 @@ async def atualizar_horario(
         nome_cliente: Nome do cliente
         data_consulta_antiga: Data/hora atual do agendamento
         data_consulta_nova: Nova data/hora desejada
-        telefone_cliente: Novo telefone (opcional)
+        telefone_cliente: Telefone da conversa (localiza o evento diretamente)
         email_cliente: Novo email (opcional)
 
     Returns:
@@ -784,31 +952,22 @@ async def atualizar_horario(
                 "dados": {}
             }
 
+        if not _get_grade_horarios().cabe_no_expediente(data_nova):
+            return {
+                "sucesso": False,
+                "mensagem": "Novo horário fora do expediente de atendimento. Por favor, escolha outro horário.",
+                "dados": {}
+            }
+
         # Obter serviço do calendar
-        service = _get_calendar_service()
+        gateway = _get_calendar_gateway()
+        service = gateway.service
+        indice = get_indice_agendamentos()
 
         # Buscar evento existente
-        inicio_busca = data_antiga - timedelta(hours=1)
-        fim_busca = data_antiga + timedelta(hours=2)
-
-        events_result = service.events().list(
-            calendarId=CALENDAR_ID,
-            timeMin=inicio_busca.isoformat(),
-            timeMax=fim_busca.isoformat(),
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
+        agendamento = await _localizar_agendamento(gateway, nome_cliente, telefone_cliente, data_antiga)
 
-        eventos = events_result.get('items', [])
-
-        # Procurar evento do cliente
-        evento_encontrado = None
-        for evento in eventos:
-            if nome_cliente.lower() in evento.get('summary', '').lower():
-                evento_encontrado = evento
-                break
-
-        if not evento_encontrado:
+        if not agendamento:
             logger.warning(f"Evento não encontrado para {nome_cliente}")
             return {
                 "sucesso": False,
@@ -819,83 +978,90 @@ async def atualizar_horario(
         # Verificar disponibilidade do novo horário
         data_nova_fim = data_nova + timedelta(hours=DURACAO_CONSULTA)
 
-        eventos_conflito = service.events().list(
-            calendarId=CALENDAR_ID,
-            timeMin=data_nova.isoformat(),
-            timeMax=data_nova_fim.isoformat(),
-            singleEvents=True
-        ).execute()
-
-        # Ignora o próprio evento na verificação
-        conflito = [e for e in eventos_conflito.get('items', [])
-                   if e['id'] != evento_encontrado['id']]
+        # Reservar o novo horário durante a verificação e a alteração
+        reservas = _get_reservas()
+        token_reserva = await reservas.reservar(data_nova, data_nova_fim, dono=telefone_cliente)
 
-        if conflito:
-            logger.warning("Novo horário já está ocupado")
+        if token_reserva is None:
             return {
                 "sucesso": False,
-                "mensagem": "Novo horário já está ocupado. Por favor, escolha outro horário.",
+                "mensagem": "Este horário está sendo agendado por outro cliente neste momento. Por favor, escolha outro horário.",
                 "dados": {}
             }
 
-        # Atualizar evento
-        evento_encontrado['start'] = {
-            'dateTime': data_nova.isoformat(),
-            'timeZone': TIMEZONE,
-        }
-        evento_encontrado['end'] = {
-            'dateTime': data_nova_fim.isoformat(),
-            'timeZone': TIMEZONE,
-        }
+        try:
+            eventos_conflito = await gateway.executar(service.events().list(
+                calendarId=CALENDAR_ID,
+                timeMin=data_nova.isoformat(),
+                timeMax=data_nova_fim.isoformat(),
+                singleEvents=True
+            ))
+
+            # Ignora o próprio evento na verificação
+            conflito = [e for e in eventos_conflito.get('items', [])
+                       if e['id'] != agendamento.evento_id]
+
+            if conflito:
+                logger.warning("Novo horário já está ocupado")
+                return {
+                    "sucesso": False,
+                    "mensagem": "Novo horário já está ocupado. Por favor, escolha outro horário.",
+                    "dados": {}
+                }
 
-        # Atualizar descrição se fornecidos novos dados
-        if telefone_cliente or email_cliente:
-            descricao = evento_encontrado.get('description', '')
-            if telefone_cliente:
-                descricao = descricao.replace(
-                    descricao.split('Telefone: ')[1].split('\n')[0],
-                    telefone_cliente
-                )
-            if email_cliente:
-                descricao = descricao.replace(
-                    descricao.split('Email: ')[1].split('\n')[0],
-                    email_cliente
-                )
-            evento_encontrado['description'] = descricao
-
-        # Atualizar no calendar
-        evento_atualizado = service.events().update(
-            calendarId=CALENDAR_ID,
-            eventId=evento_encontrado['id'],
-            body=evento_encontrado
-        ).execute()
+            # Atualizar só o horário (e os dados estruturados do cliente)
+            alteracoes: Dict[str, Any] = {
+                'start': {
+                    'dateTime': data_nova.isoformat(),
+                    'timeZone': TIMEZONE,
+                },
+                'end': {
+                    'dateTime': data_nova_fim.isoformat(),
+                    'timeZone': TIMEZONE,
+                },
+                'extendedProperties': criar_propriedades_agendamento(
+                    nome_cliente=agendamento.nome or nome_cliente,
+                    telefone_cliente=telefone_cliente or agendamento.telefone,
+                    email_cliente=(
+                        email_cliente if email_cliente and email_cliente != "sememail@gmail.com"
+                        else agendamento.email
+                    ),
+                    endereco=agendamento.endereco,
+                    lead_id=agendamento.lead_id
+                ),
+            }
 
-        logger.info(f"Evento atualizado com sucesso: {evento_atualizado['id']}")
+            # Atualizar no calendar
+            try:
+                evento_atualizado = await gateway.executar(service.events().patch(
+                    calendarId=CALENDAR_ID,
+                    eventId=agendamento.evento_id,
+                    body=alteracoes
+                ))
+            except HttpError as e:
+                if not _evento_inexistente(e):
+                    raise
+                indice.remover_evento(agendamento.evento_id)
+                logger.warning(f"Evento {agendamento.evento_id} já não existe no Calendar")
+                return {
+                    "sucesso": False,
+                    "mensagem": f"Não foi encontrado agendamento para {nome_cliente} nesta data",
+                    "dados": {}
+                }
+
+            logger.info(f"Evento atualizado com sucesso: {evento_atualizado['id']}")
+            indice.aplicar_evento(evento_atualizado)
+            motor = _get_motor_disponibilidade()
+            motor.invalidar(agendamento.inicio.date())
+            motor.invalidar(data_nova.date())
+            motor.registrar_evento(evento_atualizado)
+        finally:
+            await reservas.liberar(data_nova, data_nova_fim, token_reserva)
 
         # Notificar técnico sobre o reagendamento
         try:
-            # Extrair telefone e endereço da descrição
-            descricao = evento_encontrado.get('description', '')
-            telefone = telefone_cliente if telefone_cliente else ""
-            endereco = "Endereço a confirmar"
-
-            try:
-                if 'Telefone:' in descricao and not telefone:
-                    telefone = descricao.split('Telefone:')[1].split('\n')[0].strip()
-                if 'Endereço:' in descricao or 'Endereco:' in descricao:
-                    if 'Endereço:' in descricao:
-                        endereco = descricao.split('Endereço:')[1].split('\n')[0].strip()
-                    elif 'Endereco:' in descricao:
-                        endereco = descricao.split('Endereco:')[1].split('\n')[0].strip()
-            except:
-                pass
-
-            settings = get_settings()
-            whatsapp = WhatsAppClient(
-                base_url=settings.whatsapp_api_url,
-                api_key=settings.whatsapp_api_key,
-                instance=settings.whatsapp_instance
-            )
+            telefone = telefone_cliente or agendamento.telefone
+            endereco = agendamento.endereco or "Endereço a confirmar"
 
             # Formatar datas
             data_antiga_formatada = data_antiga.strftime("%d/%m/%Y às %H:%M")
@@ -929,13 +1095,12 @@ async def atualizar_horario(
 
 ⚠️ Lembre-se de confirmar presença com o cliente!"""
 
-            await whatsapp.enviar_mensagem(
-                telefone=TELEFONE_TECNICO,
-                texto=mensagem
+            await get_outbox_notificacoes().enfileirar(
+                mensagem, TELEFONES_TECNICOS, tipo="reagendamento",
+                chave=f"reagendamento:{evento_atualizado['id']}:{data_nova.isoformat()}"
             )
-            logger.info(f"Notificação de reagendamento enviada ao técnico")
         except Exception as e:
-            logger.warning(f"Não foi possível notificar técnico sobre reagendamento: {e}")
+            logger.warning(f"Não foi possível enfileirar notificação de reagendamento: {e}")
 
         return {
             "sucesso": True,
@@ -1001,6 +1166,7 @@ async def agendamento_tool(
                  - "atualizar": Mudar data/hora de agendamento
         informacao_extra: Contexto adicional como:
                          - "período da tarde" / "período da manhã"
+                         - "essa semana" (consulta 7 dias a partir da data)
                          - "urgente"
                          - Nova data para atualização (formato: "nova_data:DD/MM/YYYY HH:MM")
 
@@ -1043,7 +1209,8 @@ async def agendamento_tool(
         if intencao == "consultar":
             resultado = await consultar_horarios(
                 data_referencia=data_consulta_reuniao,
-                informacao_extra=informacao_extra
+                informacao_extra=informacao_extra,
+                dias=7 if "semana" in informacao_extra.lower() else 1
             )
 
         elif intencao == "agendar":
@@ -1052,13 +1219,22 @@ async def agendamento_tool(
                 telefone_cliente=telefone_cliente,
                 email_cliente=email_cliente,
                 data_consulta_reuniao=data_consulta_reuniao,
-                informacao_extra=informacao_extra
+                informacao_extra=informacao_extra,
+                lead_id=obter_lead_atual() or "",
+                # Só quem e quando: ao reprocessar a mensagem o LLM pode
+                # reescrever nome/informacao_extra, mas o agendamento é o mesmo
+                chave_idempotencia=gerar_chave_idempotencia("agendamento_tool", {
+                    "intencao": intencao,
+                    "telefone_cliente": telefone_cliente,
+                    "data_consulta_reuniao": data_consulta_reuniao
+                })
             )
 
         elif intencao == "cancelar":
             resultado = await cancelar_horario(
                 nome_cliente=nome_cliente,
-                data_consulta_reuniao=data_consulta_reuniao
+                data_consulta_reuniao=data_consulta_reuniao,
+                telefone_cliente=telefone_cliente
             )
 
         elif intencao == "atualizar":
@@ -0,0 +1,273 @@
+"""
+Grade de horários de atendimento em bitmaps.
+
+Cada dia é representado por um inteiro em que o bit `i` é a célula de
+`resolucao` minutos que começa em `i * resolucao` minutos após a
+meia-noite (no fuso da agenda). A partir disso:
+- expediente e inícios de slot de cada dia da semana são máscaras
+  pré-computadas uma única vez (o "molde" do dia);
+- os intervalos ocupados são rasterizados uma vez por dia;
+- os inícios livres saem de operações de bits: cabem `duracao` minutos
+  livres a partir da célula `i` se os bits i..i+n-1 estão todos livres.
+
+Com isso, "próximo horário livre nos próximos 30 dias" é uma passada de
+AND/SHIFT por dia, sem gerar nem reparsear strings ISO.
+"""
+
+from __future__ import annotations
+
+import math
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from src.tools.availability import Intervalo
+
+# (início, fim) do expediente em minutos após a meia-noite
+RegraExpediente = Tuple[int, int]
+
+MINUTOS_DIA = 24 * 60
+
+
+def _bits(inicio: int, fim: int) -> int:
+    """Máscara com as células [inicio, fim) ligadas."""
+    if fim <= inicio:
+        return 0
+    return ((1 << (fim - inicio)) - 1) << inicio
+
+
+class GradeHorarios:
+    """
+    Molde de slots por dia da semana e cálculo de horários livres em bits.
+
+    Args:
+        expediente: Regra por dia da semana (0 = segunda ... 6 = domingo);
+            None ou ausente = dia sem atendimento
+        duracao: Duração do atendimento em minutos
+        passo: Intervalo entre inícios de slot em minutos (padrão: a duração)
+        timezone: Fuso horário da agenda
+
+    Example:
+        >>> grade = GradeHorarios({d: (8 * 60, 18 * 60) for d in range(5)}, duracao=90, passo=30)
+        >>> livres = grade.horarios_livres(date(2030, 1, 2), ocupados)
+    """
+
+    def __init__(
+        self,
+        expediente: Dict[int, Optional[RegraExpediente]],
+        duracao: int = 60,
+        passo: Optional[int] = None,
+        timezone: str = "America/Sao_Paulo"
+    ) -> None:
+        if duracao <= 0:
+            raise ValueError("A duração do atendimento deve ser positiva")
+
+        self.duracao = duracao
+        self.passo = passo or duracao
+        self.fuso = ZoneInfo(timezone)
+
+        regras = {d: r for d, r in expediente.items() if r is not None}
+        for inicio, fim in regras.values():
+            if not 0 <= inicio < fim <= MINUTOS_DIA:
+                raise ValueError(f"Expediente inválido: {inicio}-{fim}")
+
+        # Maior célula que representa todos os limites exatamente
+        self.resolucao = math.gcd(
+            self.duracao, self.passo, MINUTOS_DIA,
+            *(limite for regra in regras.values() for limite in regra)
+        )
+        self.celulas = self.duracao // self.resolucao
+
+        self._expediente: List[int] = [0] * 7
+        self._inicios: List[int] = [0] * 7
+
+        for dia_semana, (inicio, fim) in regras.items():
+            self._expediente[dia_semana] = _bits(inicio // self.resolucao, fim // self.resolucao)
+
+            inicios = 0
+            for minuto in range(inicio, fim - self.duracao + 1, self.passo):
+                inicios |= 1 << (minuto // self.resolucao)
+            self._inicios[dia_semana] = inicios
+
+    # ========== CONVERSÕES ==========
+
+    def _meia_noite(self, dia: date) -> datetime:
+        return datetime.combine(dia, datetime.min.time(), tzinfo=self.fuso)
+
+    def _minutos(self, dia: date, momento: datetime) -> float:
+        """Minutos de `momento` após a meia-noite de `dia` (limitado ao dia)."""
+        minutos = (momento.astimezone(self.fuso) - self._meia_noite(dia)).total_seconds() / 60
+        return min(max(minutos, 0), MINUTOS_DIA)
+
+    def _intervalo(self, dia: date, celula: int) -> Intervalo:
+        inicio = self._meia_noite(dia) + timedelta(minutes=celula * self.resolucao)
+        return inicio, inicio + timedelta(minutes=self.duracao)
+
+    # ========== OPERAÇÕES EM BITS ==========
+
+    def rasterizar(self, dia: date, ocupados: Iterable[Intervalo]) -> int:
+        """Bitmap das células do dia tocadas por algum intervalo ocupado."""
+        bits = 0
+        for inicio, fim in ocupados:
+            primeira = math.floor(self._minutos(dia, inicio) / self.resolucao)
+            ultima = math.ceil(self._minutos(dia, fim) / self.resolucao)
+            bits |= _bits(primeira, ultima)
+        return bits
+
+    def inicios_livres(
+        self,
+        dia: date,
+        ocupados: Iterable[Intervalo] = (),
+        a_partir: Optional[datetime] = None,
+        periodo: Optional[RegraExpediente] = None
+    ) -> int:
+        """
+        Bitmap dos inícios de slot livres do dia.
+
+        Args:
+            dia: Dia consultado
+            ocupados: Intervalos ocupados do dia
+            a_partir: Só inícios estritamente depois deste momento
+            periodo: Só inícios dentro deste trecho (minutos após a meia-noite)
+
+        Returns:
+            int: Bit i ligado = slot livre começando na célula i
+        """
+        dia_semana = dia.weekday()
+        livre = self._expediente[dia_semana] & ~self.rasterizar(dia, ocupados)
+
+        # Janela deslizante: bit i fica ligado se as células i..i+n-1 estão livres
+        janela, largura = livre, 1
+        while largura < self.celulas:
+            deslocamento = min(largura, self.celulas - largura)
+            janela &= janela >> deslocamento
+            largura += deslocamento
+
+        bits = janela & self._inicios[dia_semana]
+
+        if a_partir is not None:
+            minutos = (a_partir.astimezone(self.fuso) - self._meia_noite(dia)).total_seconds() / 60
+            if minutos >= MINUTOS_DIA:
+                return 0
+            if minutos >= 0:
+                bits &= ~_bits(0, math.floor(minutos / self.resolucao) + 1)
+
+        if periodo is not None:
+            bits &= _bits(math.ceil(periodo[0] / self.resolucao), math.ceil(periodo[1] / self.resolucao))
+
+        return bits
+
+    def _para_intervalos(self, dia: date, bits: int) -> Iterator[Intervalo]:
+        """Converte os bits ligados (do menor para o maior) em slots."""
+        while bits:
+            menor = bits & -bits
+            yield self._intervalo(dia, menor.bit_length() - 1)
+            bits ^= menor
+
+    # ========== API ==========
+
+    def cabe_no_expediente(self, inicio: datetime) -> bool:
+        """True se um atendimento começando em `inicio` fica inteiro dentro do expediente."""
+        dia = inicio.astimezone(self.fuso).date()
+        minuto = self._minutos(dia, inicio)
+        necessario = _bits(
+            math.floor(minuto / self.resolucao),
+            math.ceil((minuto + self.duracao) / self.resolucao)
+        )
+        return minuto + self.duracao <= MINUTOS_DIA and necessario & ~self._expediente[dia.weekday()] == 0
+
+    def slots_do_dia(self, dia: date) -> List[Intervalo]:
+        """Todos os slots do expediente do dia (sem considerar ocupação)."""
+        return list(self._para_intervalos(dia, self._inicios[dia.weekday()]))
+
+    def horarios_livres(
+        self,
+        dia: date,
+        ocupados: Iterable[Intervalo] = (),
+        a_partir: Optional[datetime] = None,
+        periodo: Optional[RegraExpediente] = None
+    ) -> List[Intervalo]:
+        """Slots livres do dia, em ordem."""
+        return list(self._para_intervalos(dia, self.inicios_livres(dia, ocupados, a_partir, periodo)))
+
+    def livres_por_dia(
+        self,
+        ocupados_por_dia: Dict[date, List[Intervalo]],
+        a_partir: Optional[datetime] = None,
+        periodo: Optional[RegraExpediente] = None
+    ) -> Dict[date, List[Intervalo]]:
+        """Slots livres de cada dia do período."""
+        return {
+            dia: self.horarios_livres(dia, ocupados, a_partir, periodo)
+            for dia, ocupados in ocupados_por_dia.items()
+        }
+
+    def iterar_livres(
+        self,
+        ocupados_por_dia: Dict[date, List[Intervalo]],
+        a_partir: Optional[datetime] = None,
+        periodo: Optional[RegraExpediente] = None
+    ) -> Iterator[Intervalo]:
+        """Slots livres do período em ordem cronológica, calculados sob demanda."""
+        for dia in sorted(ocupados_por_dia):
+            yield from self._para_intervalos(
+                dia, self.inicios_livres(dia, ocupados_por_dia[dia], a_partir, periodo)
+            )
+
+    def proximo_livre(
+        self,
+        ocupados_por_dia: Dict[date, List[Intervalo]],
+        a_partir: Optional[datetime] = None,
+        periodo: Optional[RegraExpediente] = None
+    ) -> Optional[Intervalo]:
+        """Primeiro slot livre do período, ou None."""
+        return next(self.iterar_livres(ocupados_por_dia, a_partir, periodo), None)
+
+
+def criar_grade_horarios(
+    horario_inicio: float,
+    horario_fim: float,
+    duracao_horas: float,
+    expediente_por_dia: Optional[Dict[int, Optional[Tuple[float, float]]]] = None,
+    passo_horas: Optional[float] = None,
+    timezone: str = "America/Sao_Paulo"
+) -> GradeHorarios:
+    """
+    Cria a grade a partir de horas (como as constantes de scheduling.py).
+
+    Args:
+        horario_inicio: Início padrão do expediente (ex: 8)
+        horario_fim: Fim padrão do expediente (ex: 18)
+        duracao_horas: Duração do atendimento (ex: 1 ou 1.5)
+        expediente_por_dia: Exceções por dia da semana, em horas
+            (ex: {5: (8, 12), 6: None} = sábado meio período, domingo fechado)
+        passo_horas: Intervalo entre inícios (padrão: a duração)
+        timezone: Fuso horário da agenda
+
+    Returns:
+        GradeHorarios: Grade pronta para uso
+    """
+    def minutos(horas: float) -> int:
+        return int(round(horas * 60))
+
+    regras: Dict[int, Optional[RegraExpediente]] = {
+        d: (minutos(horario_inicio), minutos(horario_fim)) for d in range(7)
+    }
+    for dia_semana, regra in (expediente_por_dia or {}).items():
+        regras[dia_semana] = None if regra is None else (minutos(regra[0]), minutos(regra[1]))
+
+    return GradeHorarios(
+        regras,
+        duracao=minutos(duracao_horas),
+        passo=minutos(passo_horas) if passo_horas else None,
+        timezone=timezone
+    )
+
+
+# ========== EXPORTAÇÕES ==========
+
+__all__ = [
+    "RegraExpediente",
+    "GradeHorarios",
+    "criar_grade_horarios",
+]
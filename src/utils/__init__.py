@@ -0,0 +1,36 @@
+"""
+Utilitários de infraestrutura (parse de webhooks, outbox de notificações, etc).
+"""
+
+from .webhook_stream import CAMPOS_MIDIA, ParserWebhookStreaming, parsear_webhook_streaming
+from .webhook_filter import (
+    EVENTO_MENSAGEM,
+    pre_filtrar_webhook,
+    registrar_evento,
+    obter_contadores_eventos,
+    zerar_contadores_eventos,
+)
+from .notification_outbox import (
+    OutboxNotificacoes,
+    get_outbox_notificacoes,
+    fechar_outbox_notificacoes,
+)
+from .outbox_storage import ArmazenamentoOutboxMemoria, ArmazenamentoOutboxRedis
+from .idempotency import gerar_chave_idempotencia
+
+__all__ = [
+    "CAMPOS_MIDIA",
+    "ParserWebhookStreaming",
+    "parsear_webhook_streaming",
+    "EVENTO_MENSAGEM",
+    "pre_filtrar_webhook",
+    "registrar_evento",
+    "obter_contadores_eventos",
+    "zerar_contadores_eventos",
+    "OutboxNotificacoes",
+    "get_outbox_notificacoes",
+    "fechar_outbox_notificacoes",
+    "ArmazenamentoOutboxMemoria",
+    "ArmazenamentoOutboxRedis",
+    "gerar_chave_idempotencia",
+]
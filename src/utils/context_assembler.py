@@ -0,0 +1,398 @@
+"""
+Montagem do contexto do agente com orçamento de tokens.
+
+O prompt de cada chamada ao LLM é formado por segmentos (system prompt,
+mensagem atual, histórico, documentos do RAG, resultados de tools), cada
+um com uma prioridade. O orçamento é distribuído em ordem de prioridade:
+segmentos mais importantes entram inteiros, os menos importantes são
+cortados item a item (mensagens mais antigas do histórico, documentos
+menos relevantes do RAG) e, se preciso, truncados.
+
+Tokens são contados com tiktoken (mesma codificação do gpt-4o). A
+codificação é carregada no startup da aplicação, fora do event loop (o
+tiktoken baixa o arquivo na primeira vez). Enquanto ela não está
+disponível, usa a estimativa de ~4 caracteres por token, e uma nova
+tentativa de carga é feita em background a cada INTERVALO_NOVA_CARGA.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Prioridades (menor = mais importante)
+PRIORIDADE_SISTEMA = 0
+PRIORIDADE_MENSAGEM = 1
+PRIORIDADE_HISTORICO = 2
+PRIORIDADE_RAG = 3
+PRIORIDADE_FERRAMENTAS = 4
+
+# Codificação usada pelo gpt-4o / gpt-4o-mini
+CODIFICACAO = "o200k_base"
+
+# Estimativa quando o tokenizer não está disponível
+CARACTERES_POR_TOKEN = 4
+
+# Intervalo (segundos) entre tentativas de carregar a codificação
+INTERVALO_NOVA_CARGA = 300
+
+# Item truncado só entra se sobrarem pelo menos estes tokens
+MIN_TOKENS_TRUNCADO = 32
+
+MARCA_TRUNCADO = " [...]"
+
+
+# ==============================================
+# TOKENIZER
+# ==============================================
+
+_codificador: Any = None
+_proxima_carga = 0.0
+_trava_carga = threading.Lock()
+
+
+def carregar_codificador() -> bool:
+    """
+    Carrega a codificação do tiktoken (pode baixar o arquivo: bloqueante).
+
+    Chamado no startup da aplicação via asyncio.to_thread. Uma falha não é
+    definitiva: a próxima tentativa fica liberada depois de
+    INTERVALO_NOVA_CARGA segundos.
+
+    Returns:
+        bool: True se o codificador está disponível
+    """
+    global _codificador, _proxima_carga
+
+    with _trava_carga:
+        if _codificador is not None:
+            return True
+
+        try:
+            import tiktoken
+
+            _codificador = tiktoken.get_encoding(CODIFICACAO)
+            logger.info(f"Codificação {CODIFICACAO} carregada")
+            return True
+        except Exception as e:
+            _proxima_carga = time.monotonic() + INTERVALO_NOVA_CARGA
+            logger.warning(f"tiktoken indisponível, estimando tokens por caracteres: {e}")
+            return False
+
+
+def _get_codificador() -> Any:
+    """
+    Codificador tiktoken do processo (None se ainda indisponível).
+
+    Dentro do event loop nunca carrega na hora: agenda a carga em uma
+    thread e devolve None (estimativa) até ela terminar.
+    """
+    global _proxima_carga
+
+    if _codificador is not None or time.monotonic() < _proxima_carga or _trava_carga.locked():
+        return _codificador
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        carregar_codificador()
+        return _codificador
+
+    # Uma carga por vez: as chamadas seguintes usam a estimativa até ela terminar
+    _proxima_carga = time.monotonic() + INTERVALO_NOVA_CARGA
+    loop.run_in_executor(None, carregar_codificador)
+    return None
+
+
+def contar_tokens(texto: str) -> int:
+    """
+    Conta os tokens de um texto.
+
+    Example:
+        >>> contar_tokens("Bom dia!")
+        3
+    """
+    if not texto:
+        return 0
+
+    codificador = _get_codificador()
+    if codificador is not None:
+        return len(codificador.encode(texto, disallowed_special=()))
+
+    return -(-len(texto) // CARACTERES_POR_TOKEN)
+
+
+def truncar_tokens(texto: str, max_tokens: int) -> str:
+    """
+    Corta o texto para caber em `max_tokens` (incluindo a marca de corte).
+
+    Returns:
+        str: Texto original se já cabe, senão o início do texto + " [...]"
+    """
+    if max_tokens <= 0:
+        return ""
+    if contar_tokens(texto) <= max_tokens:
+        return texto
+
+    disponivel = max(max_tokens - contar_tokens(MARCA_TRUNCADO), 1)
+
+    codificador = _get_codificador()
+    if codificador is not None:
+        cortado = codificador.decode(codificador.encode(texto, disallowed_special=())[:disponivel])
+    else:
+        cortado = texto[:disponivel * CARACTERES_POR_TOKEN]
+
+    return cortado.rstrip() + MARCA_TRUNCADO
+
+
+# ==============================================
+# RESULTADOS DE TOOLS
+# ==============================================
+
+def _compactar(valor: Any) -> Any:
+    """Remove campos vazios de dicts/listas aninhados."""
+    if isinstance(valor, dict):
+        return {
+            chave: _compactar(item) for chave, item in valor.items()
+            if item not in (None, "", [], {})
+        }
+    if isinstance(valor, (list, tuple)):
+        return [_compactar(item) for item in valor]
+    return valor
+
+
+def resumir_resultado(resultado: Any) -> List[str]:
+    """
+    Converte o resultado de uma tool em itens de texto compactos.
+
+    - Documentos do RAG: um item por documento, só o conteúdo (sem metadados)
+    - Dicts/listas: JSON compacto sem campos vazios
+    - Outros: str()
+
+    Returns:
+        List[str]: Itens prontos para um segmento do contexto
+    """
+    if isinstance(resultado, (list, tuple)) and resultado and all(
+        hasattr(item, "page_content") for item in resultado
+    ):
+        return [str(item.page_content).strip() for item in resultado]
+
+    if isinstance(resultado, (dict, list, tuple)):
+        return [json.dumps(_compactar(resultado), ensure_ascii=False, separators=(",", ":"), default=str)]
+
+    return [str(resultado)]
+
+
+# ==============================================
+# MONTADOR
+# ==============================================
+
+@dataclass
+class Segmento:
+    """
+    Parte do contexto com prioridade própria.
+
+    Attributes:
+        nome: Identificador (aparece no relatório)
+        prioridade: Menor = entra primeiro no orçamento
+        itens: Textos do segmento (ex: uma mensagem do histórico por item)
+        cabecalho: Linha antes dos itens (omitida se nenhum item couber)
+        manter_recentes: Se True, corta os primeiros itens (histórico);
+            se False, corta os últimos (documentos em ordem de relevância)
+        max_tokens_item: Limite por item (itens maiores são truncados)
+        obrigatorio: Nunca é cortado (ex: mensagem atual do cliente)
+    """
+    nome: str
+    prioridade: int
+    itens: List[str] = field(default_factory=list)
+    cabecalho: str = ""
+    manter_recentes: bool = False
+    max_tokens_item: Optional[int] = None
+    obrigatorio: bool = False
+
+
+@dataclass
+class ContextoMontado:
+    """Resultado da montagem: texto final e contagem de tokens por segmento."""
+    texto: str
+    tokens: Dict[str, int]
+    tokens_originais: Dict[str, int]
+    orcamento: int
+
+    @property
+    def total(self) -> int:
+        return sum(self.tokens.values())
+
+    @property
+    def cortados(self) -> Dict[str, int]:
+        """Tokens removidos por segmento (só os que foram cortados)."""
+        return {
+            nome: self.tokens_originais[nome] - self.tokens[nome]
+            for nome in self.tokens
+            if self.tokens_originais[nome] > self.tokens[nome]
+        }
+
+    def resumo(self) -> Dict[str, Any]:
+        """Relatório para log/estado."""
+        return {
+            "total": self.total,
+            "orcamento": self.orcamento,
+            "segmentos": dict(self.tokens),
+            "cortados": self.cortados,
+        }
+
+
+class MontadorContexto:
+    """
+    Monta o texto de entrada do LLM dentro de um orçamento de tokens.
+
+    Args:
+        orcamento: Máximo de tokens do prompt (system + entrada)
+
+    Example:
+        >>> montador = MontadorContexto(6000)
+        >>> montador.reservar("sistema", system_prompt)
+        >>> montador.adicionar("historico", PRIORIDADE_HISTORICO, linhas, manter_recentes=True)
+        >>> montador.adicionar("mensagem", PRIORIDADE_MENSAGEM, [texto], obrigatorio=True)
+        >>> contexto = montador.montar()
+        >>> contexto.texto, contexto.resumo()
+    """
+
+    def __init__(self, orcamento: int) -> None:
+        self.orcamento = orcamento
+        self._reservados: Dict[str, int] = {}
+        self._segmentos: Dict[str, Segmento] = {}
+
+    def reservar(self, nome: str, texto: str) -> int:
+        """
+        Desconta do orçamento um texto enviado à parte (ex: system prompt).
+
+        Returns:
+            int: Tokens reservados
+        """
+        self._reservados[nome] = contar_tokens(texto)
+        return self._reservados[nome]
+
+    def adicionar(
+        self,
+        nome: str,
+        prioridade: int,
+        itens: List[str],
+        cabecalho: str = "",
+        manter_recentes: bool = False,
+        max_tokens_item: Optional[int] = None,
+        obrigatorio: bool = False
+    ) -> Segmento:
+        """
+        Adiciona itens a um segmento (criando-o na primeira vez).
+
+        Segmentos aparecem no texto final na ordem em que foram criados,
+        independente da prioridade.
+        """
+        segmento = self._segmentos.get(nome)
+        if segmento is None:
+            segmento = Segmento(
+                nome=nome,
+                prioridade=prioridade,
+                cabecalho=cabecalho,
+                manter_recentes=manter_recentes,
+                max_tokens_item=max_tokens_item,
+                obrigatorio=obrigatorio
+            )
+            self._segmentos[nome] = segmento
+
+        segmento.itens.extend(item for item in itens if item and item.strip())
+        return segmento
+
+    def _encaixar(self, segmento: Segmento, restante: int) -> List[str]:
+        """Itens do segmento que cabem em `restante` tokens."""
+        itens = [
+            truncar_tokens(item, segmento.max_tokens_item) if segmento.max_tokens_item else item
+            for item in segmento.itens
+        ]
+        if segmento.manter_recentes:
+            itens.reverse()
+
+        restante -= contar_tokens(segmento.cabecalho)
+        escolhidos: List[str] = []
+
+        for item in itens:
+            tokens = contar_tokens(item)
+            if tokens <= restante:
+                escolhidos.append(item)
+                restante -= tokens
+                continue
+
+            if restante >= MIN_TOKENS_TRUNCADO:
+                escolhidos.append(truncar_tokens(item, restante))
+            break
+
+        if segmento.manter_recentes:
+            escolhidos.reverse()
+
+        return escolhidos
+
+    def _texto(self, segmento: Segmento, itens: List[str]) -> str:
+        if not itens:
+            return ""
+        corpo = "\n".join(itens)
+        return f"{segmento.cabecalho}\n{corpo}" if segmento.cabecalho else corpo
+
+    def montar(self) -> ContextoMontado:
+        """
+        Distribui o orçamento por prioridade e monta o texto final.
+
+        Returns:
+            ContextoMontado: Texto de entrada e contagem de tokens
+        """
+        restante = self.orcamento - sum(self._reservados.values())
+        escolhidos: Dict[str, List[str]] = {}
+
+        for segmento in sorted(self._segmentos.values(), key=lambda s: s.prioridade):
+            itens = list(segmento.itens) if segmento.obrigatorio else self._encaixar(segmento, restante)
+            escolhidos[segmento.nome] = itens
+            restante -= contar_tokens(self._texto(segmento, itens))
+
+        partes = []
+        tokens: Dict[str, int] = dict(self._reservados)
+        tokens_originais: Dict[str, int] = dict(self._reservados)
+
+        for segmento in self._segmentos.values():
+            texto = self._texto(segmento, escolhidos[segmento.nome])
+            tokens[segmento.nome] = contar_tokens(texto)
+            tokens_originais[segmento.nome] = contar_tokens(self._texto(segmento, segmento.itens))
+
+            if texto:
+                partes.append(texto)
+
+        return ContextoMontado(
+            texto="\n\n".join(partes),
+            tokens=tokens,
+            tokens_originais=tokens_originais,
+            orcamento=self.orcamento
+        )
+
+
+# ========== EXPORTAÇÕES ==========
+
+__all__ = [
+    "PRIORIDADE_SISTEMA",
+    "PRIORIDADE_MENSAGEM",
+    "PRIORIDADE_HISTORICO",
+    "PRIORIDADE_RAG",
+    "PRIORIDADE_FERRAMENTAS",
+    "carregar_codificador",
+    "contar_tokens",
+    "truncar_tokens",
+    "resumir_resultado",
+    "Segmento",
+    "ContextoMontado",
+    "MontadorContexto",
+]
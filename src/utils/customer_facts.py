@@ -0,0 +1,314 @@
+"""
+Fatos estruturados do cliente (nome, endereço, email, período, serviço).
+
+Em vez de o LLM reler o histórico procurando o endereço ou o email a cada
+turno, esses dados ficam em um registro por lead (coluna `fatos` da
+tabela `leads`), carregado junto com o cliente em `verificar_cliente` e
+injetado no prompt em poucas linhas.
+
+O registro é atualizado incrementalmente, sem chamada extra ao modelo:
+- regexes sobre a mensagem do cliente (email, endereço, "meu nome é",
+  período preferido, tipo de serviço);
+- argumentos das tools (o nome e o endereço usados num agendamento são
+  a fonte mais confiável).
+
+A gravação no Supabase acontece em background, fora do caminho crítico.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from src.tools.date_parser import normalizar_texto
+
+logger = logging.getLogger(__name__)
+
+# Campos do registro, na ordem em que aparecem no prompt
+CAMPOS_FATOS: Dict[str, str] = {
+    "nome": "Nome",
+    "endereco": "Endereço",
+    "email": "Email",
+    "periodo_preferido": "Período preferido",
+    "tipo_servico": "Serviço de interesse",
+}
+
+# Email genérico que o agente usa quando o cliente não informou
+EMAIL_GENERICO = "sememail@gmail.com"
+
+_RE_EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_RE_ENDERECO = re.compile(
+    r"\b(?:rua|r\.|avenida|av\.?|alameda|travessa|rodovia|estrada|quadra|qd\.?|"
+    r"setor|condom[ií]nio|residencial|bairro)\s+([^\n?!]{3,100})",
+    re.IGNORECASE
+)
+_RE_NOME = re.compile(
+    r"\b(?:meu nome (?:e|é)|me chamo)\s+([^\W\d_]+(?:\s+[^\W\d_]+){0,4})",
+    re.IGNORECASE
+)
+# "sou o ..." / "aqui é a ..." costuma ser um papel ("sou o síndico"): só vale
+# com nome próprio (maiúscula) que não seja um papel
+_RE_NOME_APRESENTACAO = re.compile(
+    r"\b(?i:aqui (?:e|é) (?:o|a)|sou (?:o|a))\s+([^\W\d_]+(?:\s+[^\W\d_]+){0,4})"
+)
+_PAPEIS = {
+    "sindico", "sindica", "subsindico", "subsindica", "gerente", "responsavel", "dono", "dona",
+    "proprietario", "proprietaria", "morador", "moradora", "inquilino", "inquilina",
+    "zelador", "zeladora", "porteiro", "porteira", "administrador", "administradora",
+    "engenheiro", "engenheira", "arquiteto", "arquiteta", "mestre", "encarregado",
+    "encarregada", "pedreiro", "tecnico", "tecnica", "corretor", "corretora", "secretario",
+    "secretaria", "socio", "socia", "diretor", "diretora", "comprador", "compradora",
+    "marido", "esposa", "esposo", "mulher", "filho", "filha", "pai", "mae", "irmao", "irma",
+    "cliente", "vizinho", "vizinha", "mesmo", "mesma", "unico", "unica",
+}
+_PALAVRAS_FIM_NOME = {
+    "e", "moro", "meu", "minha", "tenho", "quero", "gostaria", "preciso", "queria",
+    "estou", "to", "tô", "do", "da", "de", "pode", "vou", "sou", "aqui", "boa", "bom",
+} | _PAPEIS
+_CONECTORES_NOME = {"da", "de", "do", "das", "dos"}
+_RE_PERIODO = re.compile(
+    r"\b(?:(?:so|prefiro)\s+(?:(?:de|pela|a|na)\s+)?|(?:de|pela|a|na parte da|no periodo da|no turno da)\s+)"
+    r"(manha|tarde)\b"
+)
+# "não quero de manhã", "de manhã não dá": período recusado, não preferido
+_RE_NEGACAO_ANTES = re.compile(r"\bnao\b[^,.;!?]*$")
+_RE_NEGACAO_DEPOIS = re.compile(r"\s*(?:eu\s+)?nao\b")
+_SERVICOS: Dict[str, str] = {
+    r"\bdrywall\b": "drywall",
+    r"\bgesso\b": "gesso",
+    r"\bforros?\b": "forro",
+    r"\bdivisorias?\b": "divisória",
+    r"\bsancas?\b": "sanca",
+}
+
+
+# ==============================================
+# EXTRAÇÃO
+# ==============================================
+
+def _extrair_nome(texto: str) -> Optional[str]:
+    """Nome dito pelo cliente ("meu nome é ...", "me chamo ...", "aqui é o João")."""
+    encontrado = _RE_NOME.search(texto)
+    if not encontrado:
+        encontrado = _RE_NOME_APRESENTACAO.search(texto)
+        if not encontrado or not encontrado.group(1)[0].isupper():
+            return None
+
+    palavras = []
+    for palavra in encontrado.group(1).split():
+        minuscula = normalizar_texto(palavra)
+        if minuscula in _PALAVRAS_FIM_NOME and not (palavras and minuscula in _CONECTORES_NOME):
+            break
+        palavras.append(palavra)
+
+    # Conector solto no fim ("João da") não faz parte do nome
+    while palavras and palavras[-1].lower() in _CONECTORES_NOME:
+        palavras.pop()
+
+    if not palavras:
+        return None
+
+    return " ".join(p if p.lower() in _CONECTORES_NOME else p.capitalize() for p in palavras)
+
+
+def _extrair_endereco(texto: str) -> Optional[str]:
+    """Primeiro trecho com cara de endereço (precisa ter número)."""
+    for encontrado in _RE_ENDERECO.finditer(texto):
+        # Termina no fim da frase ("Rua 10, 123. Prefiro de manhã")
+        resto = re.split(r"\.\s+(?=[^\W\d_]{2})", encontrado.group(1))[0]
+        endereco = (texto[encontrado.start():encontrado.start(1)] + resto).strip(" .,;")
+        if re.search(r"\d", endereco):
+            return endereco
+    return None
+
+
+def _extrair_periodo(normalizado: str) -> Optional[str]:
+    """Período preferido; menções negadas são ignoradas e a última menção vale."""
+    periodo = None
+    for encontrado in _RE_PERIODO.finditer(normalizado):
+        if _RE_NEGACAO_ANTES.search(normalizado, 0, encontrado.start()):
+            continue
+        if _RE_NEGACAO_DEPOIS.match(normalizado, encontrado.end()):
+            continue
+        periodo = "manhã" if encontrado.group(1) == "manha" else "tarde"
+    return periodo
+
+
+def extrair_fatos_texto(texto: str) -> Dict[str, str]:
+    """
+    Extrai fatos de uma mensagem do cliente.
+
+    Example:
+        >>> extrair_fatos_texto("Me chamo ana souza, moro na Rua 10, 123. Prefiro de manhã")
+        {'nome': 'Ana Souza', 'endereco': 'Rua 10, 123', 'periodo_preferido': 'manhã'}
+    """
+    if not texto:
+        return {}
+
+    fatos: Dict[str, str] = {}
+    normalizado = normalizar_texto(texto)
+
+    nome = _extrair_nome(texto)
+    if nome:
+        fatos["nome"] = nome
+
+    endereco = _extrair_endereco(texto)
+    if endereco:
+        fatos["endereco"] = endereco
+
+    for email in _RE_EMAIL.findall(texto):
+        if email.lower() != EMAIL_GENERICO:
+            fatos["email"] = email.lower()
+            break
+
+    periodo = _extrair_periodo(normalizado)
+    if periodo:
+        fatos["periodo_preferido"] = periodo
+
+    servicos = [nome_servico for padrao, nome_servico in _SERVICOS.items() if re.search(padrao, normalizado)]
+    if servicos:
+        fatos["tipo_servico"] = ", ".join(servicos)
+
+    return fatos
+
+
+def extrair_fatos_ferramenta(ferramenta: str, argumentos: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Extrai fatos dos argumentos de uma chamada de tool.
+
+    Só agendamentos e contatos com o técnico são usados: neles o LLM já
+    confirmou os dados com o cliente.
+    """
+    fatos: Dict[str, str] = {}
+
+    if ferramenta == "agendamento_tool" and argumentos.get("intencao") in ("agendar", "atualizar", "reagendar"):
+        informacao = str(argumentos.get("informacao_extra") or "")
+        endereco = re.search(r"endere[cç]o:\s*([^\n]+)", informacao, re.IGNORECASE)
+        if endereco:
+            fatos["endereco"] = endereco.group(1).strip(" .,;")
+
+        email = str(argumentos.get("email_cliente") or "").strip().lower()
+        if email and email != EMAIL_GENERICO and _RE_EMAIL.fullmatch(email):
+            fatos["email"] = email
+
+    if ferramenta in ("agendamento_tool", "contatar_tecnico_tool"):
+        nome = str(argumentos.get("nome_cliente") or "").strip()
+        if nome and nome.lower() != "cliente":
+            fatos["nome"] = nome
+
+    return fatos
+
+
+# ==============================================
+# REGISTRO
+# ==============================================
+
+def mesclar_fatos(
+    atuais: Dict[str, Any],
+    novos: Dict[str, str],
+    preservar: Iterable[str] = ()
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    Atualiza o registro com fatos novos (valores novos substituem os antigos).
+
+    Tipos de serviço se acumulam em vez de substituir.
+
+    Args:
+        atuais: Registro atual
+        novos: Fatos extraídos
+        preservar: Campos que só são preenchidos se ainda estiverem vazios
+            (ex: o nome tirado da mensagem por regex não substitui o que
+            veio de uma tool ou do registro do lead)
+
+    Returns:
+        Tuple[Dict, bool]: (registro atualizado, se mudou)
+    """
+    mesclados = dict(atuais or {})
+
+    for campo, valor in novos.items():
+        if campo not in CAMPOS_FATOS or not valor:
+            continue
+
+        if campo in preservar and mesclados.get(campo):
+            continue
+
+        if campo == "tipo_servico" and mesclados.get(campo):
+            existentes = [s.strip() for s in str(mesclados[campo]).split(",")]
+            valor = ", ".join(existentes + [s for s in valor.split(", ") if s not in existentes])
+
+        mesclados[campo] = valor
+
+    return mesclados, mesclados != (atuais or {})
+
+
+def formatar_fatos(fatos: Dict[str, Any]) -> str:
+    """
+    Linhas compactas para o prompt ("" se não há fatos).
+
+    Example:
+        >>> print(formatar_fatos({"nome": "Ana Souza", "endereco": "Rua 10, 123"}))
+        === DADOS JÁ INFORMADOS PELO CLIENTE (não pergunte de novo) ===
+        - Nome: Ana Souza
+        - Endereço: Rua 10, 123
+    """
+    linhas = [f"- {rotulo}: {fatos[campo]}" for campo, rotulo in CAMPOS_FATOS.items() if fatos.get(campo)]
+    if not linhas:
+        return ""
+    return "\n".join(["=== DADOS JÁ INFORMADOS PELO CLIENTE (não pergunte de novo) ==="] + linhas)
+
+
+# ==============================================
+# PERSISTÊNCIA
+# ==============================================
+
+_gravacoes: Set[asyncio.Task] = set()
+
+
+def _gravar_fatos(cliente_id: str, fatos: Dict[str, Any]) -> None:
+    from src.clients.supabase_client import get_supabase_client
+
+    get_supabase_client().table("leads").update({"fatos": fatos}).eq("id", cliente_id).execute()
+    logger.info(f"Fatos do cliente {cliente_id} atualizados: {sorted(fatos)}")
+
+
+async def _gravar_em_background(cliente_id: str, fatos: Dict[str, Any]) -> None:
+    try:
+        await asyncio.to_thread(_gravar_fatos, cliente_id, fatos)
+    except Exception as e:
+        logger.error(f"Erro ao salvar fatos do cliente {cliente_id}: {e}")
+
+
+def salvar_fatos(cliente_id: Optional[str], fatos: Dict[str, Any]) -> None:
+    """
+    Grava o registro de fatos do lead em background (não bloqueia).
+
+    Args:
+        cliente_id: ID do lead (sem ID, não grava)
+        fatos: Registro completo
+    """
+    if not cliente_id:
+        return
+
+    tarefa = asyncio.create_task(_gravar_em_background(cliente_id, fatos))
+    _gravacoes.add(tarefa)
+    tarefa.add_done_callback(_gravacoes.discard)
+
+
+def gravacoes_pendentes() -> int:
+    """Gravações de fatos ainda em andamento (para as métricas)."""
+    return len(_gravacoes)
+
+
+# ========== EXPORTAÇÕES ==========
+
+__all__ = [
+    "CAMPOS_FATOS",
+    "extrair_fatos_texto",
+    "extrair_fatos_ferramenta",
+    "mesclar_fatos",
+    "formatar_fatos",
+    "salvar_fatos",
+    "gravacoes_pendentes",
+]
@@ -0,0 +1,109 @@
+"""
+Chaves de idempotência para efeitos colaterais das tools.
+
+Quando a mesma mensagem do WhatsApp é processada de novo (reentrega do
+webhook, retry do grafo), o agente tende a chamar as mesmas tools com os
+mesmos argumentos. A chave derivada de (mensagem_id, tool, argumentos) é
+igual nas duas execuções, e é ela que evita evento duplicado no Calendar
+ou técnico notificado duas vezes.
+
+O mensagem_id em processamento fica em uma ContextVar, definida pelo nó
+do agente antes de executar as tools. O cliente (lead) da conversa fica
+em outra, para as tools que o registram junto do efeito (ex: o evento do
+Calendar).
+"""
+
+import hashlib
+import json
+from contextvars import ContextVar, Token
+from typing import Any, Dict, Optional
+
+_mensagem_atual: ContextVar[Optional[str]] = ContextVar("mensagem_atual", default=None)
+_lead_atual: ContextVar[Optional[str]] = ContextVar("lead_atual", default=None)
+
+
+def definir_mensagem_atual(mensagem_id: Optional[str]) -> Token:
+    """
+    Define o ID da mensagem em processamento no contexto atual.
+
+    Returns:
+        Token: Para restaurar o valor anterior com resetar_mensagem_atual
+    """
+    return _mensagem_atual.set(mensagem_id or None)
+
+
+def resetar_mensagem_atual(token: Token) -> None:
+    """Restaura o mensagem_id anterior."""
+    _mensagem_atual.reset(token)
+
+
+def obter_mensagem_atual() -> Optional[str]:
+    """ID da mensagem em processamento (None fora de uma execução do agente)."""
+    return _mensagem_atual.get()
+
+
+def definir_lead_atual(lead_id: Optional[Any]) -> Token:
+    """
+    Define o ID do cliente (lead) da conversa no contexto atual.
+
+    Returns:
+        Token: Para restaurar o valor anterior com resetar_lead_atual
+    """
+    return _lead_atual.set(str(lead_id) if lead_id else None)
+
+
+def resetar_lead_atual(token: Token) -> None:
+    """Restaura o lead anterior."""
+    _lead_atual.reset(token)
+
+
+def obter_lead_atual() -> Optional[str]:
+    """ID do cliente da conversa (None fora de uma execução do agente)."""
+    return _lead_atual.get()
+
+
+def gerar_chave_idempotencia(
+    ferramenta: str,
+    argumentos: Dict[str, Any],
+    mensagem_id: Optional[str] = None
+) -> Optional[str]:
+    """
+    Gera a chave de idempotência de uma chamada de tool.
+
+    Args:
+        ferramenta: Nome da tool (ou do efeito, ex: "notificacao:agendamento")
+        argumentos: Argumentos da chamada
+        mensagem_id: ID da mensagem; padrão é o do contexto atual
+
+    Returns:
+        str: 32 caracteres hexadecimais, ou None se não há mensagem em contexto
+             (nesse caso não há como reconhecer uma repetição)
+
+    Example:
+        >>> gerar_chave_idempotencia("agendamento_tool", {"acao": "agendar"}, "3EB0A1")
+        '5c1e...'
+    """
+    mensagem_id = mensagem_id or obter_mensagem_atual()
+    if not mensagem_id:
+        return None
+
+    conteudo = json.dumps(
+        [mensagem_id, ferramenta, argumentos],
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()[:32]
+
+
+# ========== EXPORTAÇÕES ==========
+
+__all__ = [
+    "definir_mensagem_atual",
+    "resetar_mensagem_atual",
+    "obter_mensagem_atual",
+    "definir_lead_atual",
+    "resetar_lead_atual",
+    "obter_lead_atual",
+    "gerar_chave_idempotencia",
+]
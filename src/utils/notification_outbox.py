@@ -0,0 +1,400 @@
+"""
+Outbox assíncrono de notificações para os técnicos.
+
+As tools de agendamento enfileiram a notificação e retornam logo após a
+escrita no Calendar; a resposta ao cliente não espera chamadas HTTP à
+Evolution API que não têm nada a ver com ele.
+
+A fila fica em um armazenamento (memória ou Redis Streams, ver
+outbox_storage). Um relay em background lê a fila e envia cada notificação
+para todos os destinatários ao mesmo tempo (fan-out concorrente), com retry
+por destinatário e backoff exponencial. A notificação só é confirmada na
+fila depois do envio: se o processo morrer no meio, ela é reivindicada e
+reprocessada (pelo menos uma vez), pulando quem já recebeu. O resultado de
+cada entrega fica na tabela de status (notificação × destinatário),
+exposta em /status.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+import httpx
+
+from src.utils.outbox_storage import ArmazenamentoOutboxMemoria, ArmazenamentoOutboxRedis, Notificacao
+
+logger = logging.getLogger(__name__)
+
+# Status de entrega
+STATUS_PENDENTE = "pendente"
+STATUS_ENVIADO = "enviado"
+STATUS_FALHOU = "falhou"
+
+Enviador = Callable[[str, str], Awaitable[Any]]
+
+
+@dataclass
+class Entrega:
+    """Linha da tabela de status: uma notificação para um destinatário."""
+
+    notificacao_id: str
+    destinatario: str
+    tipo: str
+    status: str = STATUS_PENDENTE
+    tentativas: int = 0
+    ultimo_erro: Optional[str] = None
+    atualizada_em: float = field(default_factory=time.time)
+
+
+def _erro_permanente(erro: Exception) -> bool:
+    """Erros que não adianta repetir (número inválido, requisição recusada)."""
+    if isinstance(erro, ValueError):
+        return True
+    if isinstance(erro, httpx.HTTPStatusError):
+        return 400 <= erro.response.status_code < 500 and erro.response.status_code != 429
+    return False
+
+
+class OutboxNotificacoes:
+    """
+    Fila de notificações com entrega concorrente e retry por destinatário.
+
+    Args:
+        enviar: Corrotina (telefone, texto) que envia a mensagem
+        armazenamento: Onde a fila fica (padrão: memória)
+        max_tentativas: Tentativas por destinatário
+        backoff_base: Espera (segundos) antes da 2ª tentativa; dobra a cada falha
+        max_entregas: Máximo de linhas mantidas na tabela de status
+        ociosidade: Segundos sem confirmação para uma notificação lida ser reivindicada
+
+    Example:
+        >>> outbox = OutboxNotificacoes(whatsapp.enviar_mensagem)
+        >>> outbox.iniciar()
+        >>> await outbox.enfileirar("Novo agendamento...", ["5562999999999"], tipo="agendamento")
+    """
+
+    def __init__(
+        self,
+        enviar: Enviador,
+        armazenamento=None,
+        max_tentativas: int = 3,
+        backoff_base: float = 2.0,
+        max_entregas: int = 1000,
+        ociosidade: float = 60.0
+    ) -> None:
+        self.enviar = enviar
+        self.armazenamento = armazenamento or ArmazenamentoOutboxMemoria()
+        self.max_tentativas = max_tentativas
+        self.backoff_base = backoff_base
+        self.max_entregas = max_entregas
+        self.ociosidade = ociosidade
+
+        self._worker: Optional[asyncio.Task] = None
+        self._em_andamento: Set[asyncio.Task] = set()
+        self._processando: Set[str] = set()
+        self._entregas: Dict[tuple, Entrega] = {}
+
+    # ========== CICLO DE VIDA ==========
+
+    def iniciar(self) -> None:
+        """Inicia o relay no event loop atual (idempotente)."""
+        loop = asyncio.get_running_loop()
+
+        if self._worker is not None and not self._worker.done() and self._worker.get_loop() is loop:
+            return
+
+        if self._worker is None or self._worker.get_loop() is not loop:
+            self._em_andamento = set()
+            self._processando = set()
+        self._worker = loop.create_task(self._consumir())
+        logger.info("Outbox de notificações iniciado")
+
+    async def parar(self, timeout: float = 10.0) -> None:
+        """
+        Aguarda as entregas pendentes (até o timeout) e encerra o relay.
+
+        O que não for entregue continua no armazenamento (no Redis, é
+        reivindicado quando o bot voltar).
+
+        Args:
+            timeout: Tempo máximo (segundos) para drenar a fila
+        """
+        if self._worker is None:
+            return
+
+        try:
+            await asyncio.wait_for(self.aguardar(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Outbox encerrado com notificações pendentes")
+
+        self._worker.cancel()
+        for tarefa in list(self._em_andamento):
+            tarefa.cancel()
+        await asyncio.gather(self._worker, *self._em_andamento, return_exceptions=True)
+        self._worker = None
+
+        await self.armazenamento.fechar()
+
+    async def aguardar(self, intervalo: float = 0.01) -> None:
+        """Aguarda até todas as notificações enfileiradas serem confirmadas."""
+        while self._em_andamento or await self.armazenamento.pendentes():
+            if self._worker is None or self._worker.done():
+                return
+            await asyncio.sleep(intervalo)
+
+    # ========== API ==========
+
+    async def enfileirar(
+        self,
+        texto: str,
+        destinatarios: List[str],
+        tipo: str = "geral",
+        chave: Optional[str] = None
+    ) -> str:
+        """
+        Grava a notificação no outbox e retorna sem esperar o envio.
+
+        Args:
+            texto: Mensagem
+            destinatarios: Telefones que devem receber
+            tipo: Categoria (agendamento, cancelamento, reagendamento, ...)
+            chave: Chave de idempotência; repetir a chave não gera novo envio
+
+        Returns:
+            str: ID da notificação (a própria chave, se informada)
+        """
+        destinatarios = list(dict.fromkeys(d for d in destinatarios if d))
+        notificacao = Notificacao(
+            id=chave or uuid.uuid4().hex,
+            texto=texto,
+            destinatarios=destinatarios,
+            tipo=tipo
+        )
+
+        self.iniciar()
+
+        if not await self.armazenamento.adicionar(notificacao):
+            logger.info(f"Notificação {tipo} {notificacao.id} já estava no outbox (repetição ignorada)")
+            return notificacao.id
+
+        for destinatario in destinatarios:
+            self._registrar(Entrega(notificacao.id, destinatario, tipo))
+
+        logger.info(f"Notificação {tipo} enfileirada para {len(destinatarios)} destinatário(s): {notificacao.id}")
+        return notificacao.id
+
+    def obter_entregas(self, notificacao_id: Optional[str] = None) -> List[Entrega]:
+        """Linhas da tabela de status (de uma notificação ou todas)."""
+        return [
+            e for e in self._entregas.values()
+            if notificacao_id is None or e.notificacao_id == notificacao_id
+        ]
+
+    def resumo(self) -> Dict[str, Any]:
+        """
+        Contagem de entregas por status (para /status).
+
+        Example:
+            >>> outbox.resumo()
+            {"em_andamento": 0, "entregas": {"enviado": 12, "falhou": 1}}
+        """
+        por_status: Dict[str, int] = {}
+        for entrega in self._entregas.values():
+            por_status[entrega.status] = por_status.get(entrega.status, 0) + 1
+
+        return {
+            "em_andamento": len(self._processando),
+            "entregas": por_status
+        }
+
+    # ========== WORKER ==========
+
+    async def _consumir(self, bloqueio: float = 1.0) -> None:
+        """Lê o armazenamento, disparando cada notificação em uma tarefa própria."""
+        ultima_reivindicacao = 0.0
+
+        while True:
+            try:
+                await self.armazenamento.preparar()
+
+                lote: List[Notificacao] = []
+                if time.monotonic() - ultima_reivindicacao >= self.ociosidade / 2:
+                    ultima_reivindicacao = time.monotonic()
+                    lote.extend(await self.armazenamento.reivindicar(self.ociosidade))
+                lote.extend(await self.armazenamento.ler(bloqueio=bloqueio))
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Erro ao ler o outbox de notificações: {e}")
+                await asyncio.sleep(bloqueio)
+                continue
+
+            for notificacao in lote:
+                if notificacao.id in self._processando:
+                    continue
+
+                self._processando.add(notificacao.id)
+                tarefa = asyncio.create_task(self._processar(notificacao))
+                self._em_andamento.add(tarefa)
+                tarefa.add_done_callback(self._em_andamento.discard)
+
+    async def _processar(self, notificacao: Notificacao) -> None:
+        """Entrega para todos os destinatários em paralelo e confirma no armazenamento."""
+        try:
+            ja_enviados = await self.armazenamento.enviados(notificacao)
+            restantes = [d for d in notificacao.destinatarios if d not in ja_enviados]
+
+            resultados = await asyncio.gather(
+                *(self._entregar(notificacao, d) for d in restantes),
+                return_exceptions=True
+            )
+
+            enviados = len(ja_enviados) + sum(1 for r in resultados if r is True)
+            if notificacao.destinatarios and not enviados:
+                logger.error(
+                    f"❌ Notificação {notificacao.tipo} {notificacao.id} não foi entregue a nenhum "
+                    f"destinatário: {notificacao.destinatarios}. Verifique os números dos técnicos "
+                    f"(TELEFONE_TECNICO) e a Evolution API."
+                )
+
+            # Confirmar mesmo com falhas: as tentativas já se esgotaram e o
+            # resultado está na tabela de status. Só fica pendente o que foi
+            # interrompido no meio (queda do processo).
+            await self.armazenamento.confirmar(notificacao)
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Erro ao processar notificação {notificacao.id}: {e}", exc_info=True)
+        finally:
+            self._processando.discard(notificacao.id)
+
+    async def _entregar(self, notificacao: Notificacao, destinatario: str) -> bool:
+        """Envia para um destinatário, com retry e backoff exponencial."""
+        entrega = self._entregas.get((notificacao.id, destinatario)) or self._registrar(
+            Entrega(notificacao.id, destinatario, notificacao.tipo)
+        )
+
+        for tentativa in range(1, self.max_tentativas + 1):
+            entrega.tentativas = tentativa
+            try:
+                resultado = await self.enviar(destinatario, notificacao.texto)
+                if not resultado:
+                    raise RuntimeError("resposta vazia da API")
+
+                self._atualizar(entrega, STATUS_ENVIADO)
+                await self.armazenamento.marcar_enviado(notificacao, destinatario)
+                logger.info(f"✅ Notificação {notificacao.id} entregue a {destinatario}")
+                return True
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if entrega.status == STATUS_ENVIADO:
+                    # Enviado, mas falhou ao registrar: não reenviar
+                    logger.warning(f"Entrega a {destinatario} não registrada no outbox: {e}")
+                    return True
+
+                entrega.ultimo_erro = str(e)
+                permanente = _erro_permanente(e)
+                logger.warning(
+                    f"⚠️ Falha ao notificar {destinatario} "
+                    f"(tentativa {tentativa}/{self.max_tentativas}): {e}"
+                )
+
+                if permanente or tentativa == self.max_tentativas:
+                    break
+
+                await asyncio.sleep(self.backoff_base * 2 ** (tentativa - 1))
+
+        self._atualizar(entrega, STATUS_FALHOU)
+        return False
+
+    def _registrar(self, entrega: Entrega) -> Entrega:
+        """Adiciona uma linha à tabela, descartando as mais antigas se cheia."""
+        self._entregas[(entrega.notificacao_id, entrega.destinatario)] = entrega
+
+        while len(self._entregas) > self.max_entregas:
+            del self._entregas[next(iter(self._entregas))]
+
+        return entrega
+
+    @staticmethod
+    def _atualizar(entrega: Entrega, status: str) -> None:
+        entrega.status = status
+        entrega.atualizada_em = time.time()
+
+
+# ========== SINGLETON ==========
+
+_outbox: Optional[OutboxNotificacoes] = None
+
+
+def get_outbox_notificacoes() -> OutboxNotificacoes:
+    """
+    Retorna o outbox de notificações do processo.
+
+    O armazenamento segue OUTBOX_BACKEND (memoria ou redis). O envio usa
+    um único WhatsAppClient (conexões reaproveitadas).
+    """
+    global _outbox
+
+    if _outbox is None:
+        from src.clients.whatsapp_client import WhatsAppClient
+        from src.config.settings import get_settings
+
+        settings = get_settings()
+        whatsapp = WhatsAppClient(
+            base_url=settings.whatsapp_api_url,
+            api_key=settings.whatsapp_api_key,
+            instance=settings.whatsapp_instance
+        )
+
+        if settings.outbox_backend == "redis":
+            from src.clients.redis_client import get_redis_compartilhado
+
+            armazenamento = ArmazenamentoOutboxRedis(
+                get_redis_compartilhado(),
+                stream=settings.outbox_stream,
+                consumidor=f"{socket.gethostname()}-{os.getpid()}",
+                ttl_chaves=settings.outbox_idempotency_ttl
+            )
+        else:
+            armazenamento = ArmazenamentoOutboxMemoria()
+
+        _outbox = OutboxNotificacoes(
+            enviar=lambda telefone, texto: whatsapp.enviar_mensagem(telefone=telefone, texto=texto),
+            armazenamento=armazenamento,
+            max_tentativas=settings.max_retries
+        )
+        logger.info(f"Outbox de notificações: backend {settings.outbox_backend}")
+
+    return _outbox
+
+
+async def fechar_outbox_notificacoes() -> None:
+    """Drena e encerra o outbox (chamado no shutdown da aplicação)."""
+    if _outbox is not None:
+        await _outbox.parar()
+
+
+# ========== EXPORTAÇÕES ==========
+
+__all__ = [
+    "STATUS_PENDENTE",
+    "STATUS_ENVIADO",
+    "STATUS_FALHOU",
+    "Notificacao",
+    "Entrega",
+    "OutboxNotificacoes",
+    "get_outbox_notificacoes",
+    "fechar_outbox_notificacoes",
+]
@@ -0,0 +1,290 @@
+"""
+Armazenamento do outbox de notificações.
+
+O outbox precisa de uma fila que sobreviva ao processo: se o bot morrer
+entre o agendamento e o envio ao técnico, a notificação continua lá e é
+entregue quando o worker voltar (entrega "pelo menos uma vez").
+
+Dois backends com a mesma interface:
+- memória: fila local (desenvolvimento e testes; perde-se no restart);
+- Redis Streams: XADD + grupo de consumidores; a mensagem só sai da
+  pendência com XACK após a entrega, e mensagens abandonadas por um
+  worker que morreu são reivindicadas com XAUTOCLAIM.
+
+Nos dois, a chave de idempotência impede enfileirar a mesma notificação
+duas vezes, e os destinatários já atendidos ficam registrados para que o
+reprocessamento não reenvie a quem já recebeu.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+logger = logging.getLogger(__name__)
+
+# Chave de idempotência e XADD no mesmo script: não existe chave gravada
+# sem a entrada no stream (se o XADD falhar, a chave é apagada).
+# KEYS: chave, stream; ARGV: TTL da chave (s), notificação serializada
+_SCRIPT_ADICIONAR = """
+if not redis.call("set", KEYS[1], 1, "NX", "EX", ARGV[1]) then
+    return false
+end
+local ok, entrada = pcall(redis.call, "xadd", KEYS[2], "*", "dados", ARGV[2])
+if not ok then
+    redis.call("del", KEYS[1])
+    return redis.error_reply(entrada.err or tostring(entrada))
+end
+return entrada
+"""
+
+
+@dataclass
+class Notificacao:
+    """Notificação a ser entregue a um ou mais destinatários."""
+
+    id: str
+    texto: str
+    destinatarios: List[str]
+    tipo: str = "geral"
+    criada_em: float = field(default_factory=time.time)
+
+    # ID da entrada no stream (apenas no backend Redis)
+    entrada: Optional[str] = None
+
+    def serializar(self) -> str:
+        dados = asdict(self)
+        dados.pop("entrada")
+        return json.dumps(dados, ensure_ascii=False)
+
+    @classmethod
+    def desserializar(cls, dados: str, entrada: Optional[str] = None) -> "Notificacao":
+        return cls(**json.loads(dados), entrada=entrada)
+
+
+# ==============================================
+# BACKEND EM MEMÓRIA
+# ==============================================
+
+class ArmazenamentoOutboxMemoria:
+    """
+    Fila local do outbox (não persiste entre reinícios).
+
+    Args:
+        max_chaves: Quantas chaves de idempotência são lembradas (as mais antigas saem primeiro)
+    """
+
+    def __init__(self, max_chaves: int = 10000) -> None:
+        self._fila: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._chaves: "OrderedDict[str, None]" = OrderedDict()
+        self._nao_confirmadas: Set[str] = set()
+        self._lidas: Dict[str, Tuple[Notificacao, float]] = {}
+        self._enviados: Dict[str, Set[str]] = {}
+        self.max_chaves = max_chaves
+
+    async def preparar(self) -> None:
+        """Cria a fila no event loop atual (migrando o que estava na fila anterior)."""
+        loop = asyncio.get_running_loop()
+        if self._fila is not None and self._loop is loop:
+            return
+
+        anterior, self._fila, self._loop = self._fila, asyncio.Queue(), loop
+        while anterior is not None and not anterior.empty():
+            self._fila.put_nowait(anterior.get_nowait())
+
+    async def adicionar(self, notificacao: Notificacao) -> bool:
+        """Enfileira; False se a chave já foi enfileirada antes."""
+        if notificacao.id in self._chaves:
+            return False
+
+        await self.preparar()
+        self._chaves[notificacao.id] = None
+        while len(self._chaves) > self.max_chaves:
+            self._chaves.popitem(last=False)
+
+        self._nao_confirmadas.add(notificacao.id)
+        self._fila.put_nowait(notificacao)
+        return True
+
+    async def ler(self, bloqueio: float = 1.0, maximo: int = 10) -> List[Notificacao]:
+        """Retorna até `maximo` notificações, esperando até `bloqueio` segundos pela primeira."""
+        await self.preparar()
+
+        try:
+            primeira = await asyncio.wait_for(self._fila.get(), timeout=bloqueio)
+        except asyncio.TimeoutError:
+            return []
+
+        lote = [primeira]
+        while len(lote) < maximo and not self._fila.empty():
+            lote.append(self._fila.get_nowait())
+
+        agora = time.monotonic()
+        for notificacao in lote:
+            self._lidas[notificacao.id] = (notificacao, agora)
+
+        return lote
+
+    async def reivindicar(self, ociosidade: float, maximo: int = 10) -> List[Notificacao]:
+        """Notificações lidas e não confirmadas há mais de `ociosidade` segundos."""
+        agora = time.monotonic()
+        abandonadas = [
+            n for n, lida_em in self._lidas.values()
+            if agora - lida_em > ociosidade
+        ][:maximo]
+
+        for notificacao in abandonadas:
+            self._lidas[notificacao.id] = (notificacao, agora)
+
+        return abandonadas
+
+    async def confirmar(self, notificacao: Notificacao) -> None:
+        """Remove a notificação da pendência (todas as entregas concluídas)."""
+        self._nao_confirmadas.discard(notificacao.id)
+        self._lidas.pop(notificacao.id, None)
+        self._enviados.pop(notificacao.id, None)
+
+    async def marcar_enviado(self, notificacao: Notificacao, destinatario: str) -> None:
+        self._enviados.setdefault(notificacao.id, set()).add(destinatario)
+
+    async def enviados(self, notificacao: Notificacao) -> Set[str]:
+        return set(self._enviados.get(notificacao.id, set()))
+
+    async def pendentes(self) -> int:
+        """Notificações enfileiradas e ainda não confirmadas."""
+        return len(self._nao_confirmadas)
+
+    async def fechar(self) -> None:
+        pass
+
+
+# ==============================================
+# BACKEND REDIS STREAMS
+# ==============================================
+
+class ArmazenamentoOutboxRedis:
+    """
+    Outbox persistente em um Redis Stream com grupo de consumidores.
+
+    Args:
+        redis_client: Cliente Redis assíncrono (decode_responses=True)
+        stream: Nome do stream
+        grupo: Grupo de consumidores (workers do relay)
+        consumidor: Nome deste worker dentro do grupo
+        ttl_chaves: Tempo (segundos) que as chaves de idempotência são lembradas
+    """
+
+    def __init__(
+        self,
+        redis_client: Redis,
+        stream: str = "outbox:notificacoes",
+        grupo: str = "relay",
+        consumidor: str = "worker",
+        ttl_chaves: int = 7 * 24 * 3600
+    ) -> None:
+        self.redis_client = redis_client
+        self.stream = stream
+        self.grupo = grupo
+        self.consumidor = consumidor
+        self.ttl_chaves = ttl_chaves
+
+    def _chave(self, sufixo: str) -> str:
+        return f"{self.stream}:{sufixo}"
+
+    async def preparar(self) -> None:
+        """Cria o stream e o grupo de consumidores, se ainda não existirem."""
+        try:
+            await self.redis_client.xgroup_create(self.stream, self.grupo, id="0", mkstream=True)
+            logger.info(f"Grupo {self.grupo} criado no stream {self.stream}")
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def adicionar(self, notificacao: Notificacao) -> bool:
+        """XADD protegido pela chave de idempotência (SET NX), atômicos em um script."""
+        entrada = await self.redis_client.eval(
+            _SCRIPT_ADICIONAR,
+            2,
+            self._chave(f"chave:{notificacao.id}"),
+            self.stream,
+            self.ttl_chaves,
+            notificacao.serializar()
+        )
+        if entrada is None:
+            return False
+
+        notificacao.entrada = entrada
+        return True
+
+    async def ler(self, bloqueio: float = 1.0, maximo: int = 10) -> List[Notificacao]:
+        """XREADGROUP de entradas novas para este consumidor."""
+        resposta = await self.redis_client.xreadgroup(
+            self.grupo,
+            self.consumidor,
+            {self.stream: ">"},
+            count=maximo,
+            block=int(bloqueio * 1000)
+        )
+        return [
+            Notificacao.desserializar(campos["dados"], entrada=entrada)
+            for _, entradas in resposta or []
+            for entrada, campos in entradas
+        ]
+
+    async def reivindicar(self, ociosidade: float, maximo: int = 10) -> List[Notificacao]:
+        """XAUTOCLAIM de entradas pendentes de workers que pararam de responder."""
+        resposta = await self.redis_client.xautoclaim(
+            self.stream,
+            self.grupo,
+            self.consumidor,
+            min_idle_time=int(ociosidade * 1000),
+            start_id="0-0",
+            count=maximo
+        )
+        entradas = resposta[1] if len(resposta) > 1 else []
+        return [
+            Notificacao.desserializar(campos["dados"], entrada=entrada)
+            for entrada, campos in entradas
+            if campos
+        ]
+
+    async def confirmar(self, notificacao: Notificacao) -> None:
+        """XACK + XDEL: a notificação sai do stream depois de processada."""
+        if notificacao.entrada:
+            await self.redis_client.xack(self.stream, self.grupo, notificacao.entrada)
+            await self.redis_client.xdel(self.stream, notificacao.entrada)
+        await self.redis_client.delete(self._chave(f"enviados:{notificacao.id}"))
+
+    async def marcar_enviado(self, notificacao: Notificacao, destinatario: str) -> None:
+        chave = self._chave(f"enviados:{notificacao.id}")
+        await self.redis_client.sadd(chave, destinatario)
+        await self.redis_client.expire(chave, self.ttl_chaves)
+
+    async def enviados(self, notificacao: Notificacao) -> Set[str]:
+        return set(await self.redis_client.smembers(self._chave(f"enviados:{notificacao.id}")))
+
+    async def pendentes(self) -> int:
+        """Entradas ainda no stream (não confirmadas)."""
+        return await self.redis_client.xlen(self.stream)
+
+    async def fechar(self) -> None:
+        # O pool pertence a quem criou o cliente (ver get_redis_compartilhado)
+        pass
+
+
+# ========== EXPORTAÇÕES ==========
+
+__all__ = [
+    "Notificacao",
+    "ArmazenamentoOutboxMemoria",
+    "ArmazenamentoOutboxRedis",
+]
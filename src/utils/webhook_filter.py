@@ -0,0 +1,115 @@
+"""
+Pré-filtro barato para webhooks da Evolution API.
+
+A Evolution envia muitos eventos que o bot não processa (presence.update,
+messages.update, chats.upsert, ...). Para esses, basta olhar o campo
+"event" no começo do corpo e responder, sem parsear o JSON inteiro.
+O mesmo vale para mensagens enviadas pelo próprio bot (key.fromMe = true).
+
+Os contadores por tipo de evento ficam disponíveis em /status.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Único evento que segue para o grafo
+EVENTO_MENSAGEM = "messages.upsert"
+
+# Só os primeiros bytes do corpo são inspecionados
+TAMANHO_PREFIXO = 4096
+
+_RE_EVENTO = re.compile(rb'"event"\s*:\s*"([^"\\]{1,64})"')
+_RE_FROM_ME = re.compile(rb'"fromMe"\s*:\s*(true|false)')
+_RE_MENSAGEM = re.compile(rb'"message"\s*:')
+
+# Motivos de descarte
+MOTIVO_EVENTO = "evento_ignorado"
+MOTIVO_FROM_ME = "mensagem_propria"
+
+_contadores: Counter = Counter()
+
+
+def pre_filtrar_webhook(prefixo: bytes) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Decide se um webhook pode ser descartado olhando só o início do corpo.
+
+    Args:
+        prefixo: Primeiro pedaço do corpo da requisição
+
+    Returns:
+        Tupla (evento, motivo_descarte). evento é None se não estava no
+        prefixo; motivo_descarte é None quando o webhook deve ser parseado.
+
+    Example:
+        >>> pre_filtrar_webhook(b'{"event": "presence.update", "data": {}}')
+        ('presence.update', 'evento_ignorado')
+    """
+    fim = min(len(prefixo), TAMANHO_PREFIXO)
+
+    m = _RE_EVENTO.search(prefixo, 0, fim)
+    if m is None:
+        return None, None
+
+    evento = m.group(1).decode("utf-8", "replace")
+
+    if evento != EVENTO_MENSAGEM:
+        return evento, MOTIVO_EVENTO
+
+    # fromMe só vale se vier antes do objeto "message" (key vem primeiro no
+    # payload da Evolution; mensagens citadas dentro de message são ignoradas)
+    m_from_me = _RE_FROM_ME.search(prefixo, 0, fim)
+    if m_from_me is not None and m_from_me.group(1) == b"true":
+        m_mensagem = _RE_MENSAGEM.search(prefixo, 0, fim)
+        if m_mensagem is None or m_from_me.start() < m_mensagem.start():
+            return evento, MOTIVO_FROM_ME
+
+    return evento, None
+
+
+def registrar_evento(evento: Optional[str], resultado: str) -> None:
+    """
+    Incrementa o contador de um tipo de evento.
+
+    Args:
+        evento: Nome do evento (ex: "presence.update")
+        resultado: "processado" ou o motivo do descarte
+    """
+    _contadores[(evento or "desconhecido", resultado)] += 1
+
+
+def obter_contadores_eventos() -> Dict[str, Dict[str, int]]:
+    """
+    Retorna os contadores agrupados por evento.
+
+    Example:
+        >>> obter_contadores_eventos()
+        {"presence.update": {"evento_ignorado": 42}, "messages.upsert": {"processado": 7}}
+    """
+    resultado: Dict[str, Dict[str, int]] = {}
+    for (evento, motivo), total in _contadores.items():
+        resultado.setdefault(evento, {})[motivo] = total
+    return resultado
+
+
+def zerar_contadores_eventos() -> None:
+    """Zera os contadores (útil em testes)."""
+    _contadores.clear()
+
+
+# ========== EXPORTAÇÕES ==========
+
+__all__ = [
+    "EVENTO_MENSAGEM",
+    "MOTIVO_EVENTO",
+    "MOTIVO_FROM_ME",
+    "pre_filtrar_webhook",
+    "registrar_evento",
+    "obter_contadores_eventos",
+    "zerar_contadores_eventos",
+]
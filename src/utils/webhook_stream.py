@@ -0,0 +1,343 @@
+"""
+Parser incremental do corpo dos webhooks da Evolution API.
+
+Webhooks de áudio, vídeo e documento trazem a mídia inline em base64, às
+vezes dezenas de MB. Com `await request.json()` o corpo inteiro vira bytes,
+depois uma str Python enorme dentro do dicionário, tudo ao mesmo tempo.
+
+Este parser lê o corpo em pedaços e copia para um "envelope" apenas o JSON
+pequeno (event, key, messageType, pushName, ...). O valor dos campos de
+mídia ("base64", "media", "mediaData") é decodificado à medida que chega e
+escrito direto no media store; no envelope fica só a referência
+("media:<uuid>"), que _extrair_base64_do_webhook reconhece.
+
+Valores desses campos que não são base64 (uma URL, um texto qualquer)
+ficam no envelope como vieram, como faria o json.loads; para isso os
+primeiros _MAX_BRUTO bytes de cada valor são guardados até a decisão.
+"""
+
+from __future__ import annotations
+
+import binascii
+import json
+import logging
+import re
+from typing import Any, AsyncIterable, Dict, List, Optional, Tuple
+
+from src.cache.media_store import EscritaMidia, MediaStore, get_media_store
+
+logger = logging.getLogger(__name__)
+
+# Chaves cujo valor string é o payload da mídia
+CAMPOS_MIDIA = frozenset({b"base64", b"media", b"mediaData"})
+
+# Chaves maiores que isso não interessam (só guardamos nomes curtos)
+_MAX_TAMANHO_CHAVE = 32
+
+_RE_ESTRUTURA = re.compile(rb'[":,{}\[\]]')
+
+# Até este tamanho o valor bruto é mantido: se não for base64, volta ao envelope
+_MAX_BRUTO = 64 * 1024
+
+_ALFABETO_BASE64 = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+_NAO_BASE64 = bytes(c for c in range(256) if c not in _ALFABETO_BASE64)
+_RE_NAO_BASE64 = re.compile(rb"[^A-Za-z0-9+/=]")
+
+
+def _fim_de_trecho(pedaco: bytes, i: int) -> int:
+    """
+    Posição da próxima aspa ou barra invertida (ou -1).
+
+    Usa bytes.find (memchr) em vez de regex: dentro de um base64 de vários
+    MB isso é uma ordem de grandeza mais rápido.
+    """
+    aspa = pedaco.find(b'"', i)
+    barra = pedaco.find(b"\\", i, aspa if aspa >= 0 else len(pedaco))
+    return barra if barra >= 0 else aspa
+
+
+class ParserWebhookStreaming:
+    """
+    Parser de JSON em streaming que desvia os campos de mídia para o store.
+
+    Args:
+        store: Media store de destino (padrão: singleton)
+
+    Example:
+        >>> parser = ParserWebhookStreaming()
+        >>> for pedaco in pedacos:
+        ...     parser.alimentar(pedaco)
+        >>> webhook_data = parser.finalizar()
+    """
+
+    def __init__(self, store: Optional[MediaStore] = None) -> None:
+        self._store = store or get_media_store()
+        self._envelope = bytearray()
+
+        # Estado léxico
+        self._em_string = False
+        self._escape = False
+        self._chave_atual = bytearray()
+        self._chave_valida = True
+        self._ultima_string: Optional[bytes] = None
+        self._chave_pendente: Optional[bytes] = None
+
+        # Campo de mídia sendo decodificado
+        self._escrita: Optional[EscritaMidia] = None
+        self._resto_base64 = b""
+        self._bruto: Optional[bytearray] = None
+
+        self.referencias: List[str] = []
+
+    def alimentar(self, pedaco: bytes) -> None:
+        """Processa mais um pedaço do corpo da requisição."""
+        i = 0
+        n = len(pedaco)
+
+        while i < n:
+            if self._escrita is not None:
+                i = self._consumir_midia(pedaco, i)
+            elif self._em_string:
+                i = self._consumir_string(pedaco, i)
+            else:
+                i = self._consumir_estrutura(pedaco, i)
+
+    def finalizar(self) -> Dict[str, Any]:
+        """
+        Conclui o parse e retorna o dicionário do webhook (sem os payloads).
+
+        Raises:
+            json.JSONDecodeError: Se o corpo não for um JSON válido
+        """
+        if self._escrita is not None or self._em_string:
+            self.descartar()
+            raise json.JSONDecodeError("String não terminada", self._envelope.decode("utf-8", "replace"), len(self._envelope))
+
+        try:
+            return json.loads(bytes(self._envelope))
+        except json.JSONDecodeError:
+            self.descartar()
+            raise
+
+    def descartar(self) -> None:
+        """Libera as mídias já gravadas (corpo inválido ou requisição rejeitada)."""
+        if self._escrita is not None:
+            self._escrita.descartar()
+            self._escrita = None
+            self._bruto = None
+
+        for ref in self.referencias:
+            self._store.remover(ref)
+        self.referencias.clear()
+
+    # ========== ESTADOS DO PARSER ==========
+
+    def _consumir_estrutura(self, pedaco: bytes, i: int) -> int:
+        """Fora de strings: procura o próximo caractere estrutural."""
+        m = _RE_ESTRUTURA.search(pedaco, i)
+
+        if m is None:
+            self._envelope += pedaco[i:]
+            return len(pedaco)
+
+        j = m.start()
+        self._envelope += pedaco[i:j]
+        c = pedaco[j:j + 1]
+
+        if c == b'"':
+            if self._chave_pendente in CAMPOS_MIDIA:
+                # Valor de campo de mídia: decodificar direto para o store
+                self._envelope += b'"'
+                self._escrita = self._store.criar_escrita()
+                self._resto_base64 = b""
+                self._bruto = bytearray()
+            else:
+                self._envelope += c
+                self._em_string = True
+                self._chave_atual = bytearray()
+                self._chave_valida = True
+            self._chave_pendente = None
+            return j + 1
+
+        self._envelope += c
+
+        if c == b":":
+            self._chave_pendente = self._ultima_string
+        else:
+            self._chave_pendente = None
+        self._ultima_string = None
+
+        return j + 1
+
+    def _consumir_string(self, pedaco: bytes, i: int) -> int:
+        """Dentro de uma string comum: copia até a aspa de fechamento."""
+        if self._escape:
+            self._escape = False
+            self._envelope += pedaco[i:i + 1]
+            self._chave_valida = False
+            return i + 1
+
+        pos = _fim_de_trecho(pedaco, i)
+        fim = pos if pos >= 0 else len(pedaco)
+        trecho = pedaco[i:fim]
+
+        self._envelope += trecho
+        if self._chave_valida:
+            self._chave_atual += trecho
+            if len(self._chave_atual) > _MAX_TAMANHO_CHAVE:
+                self._chave_valida = False
+
+        if pos < 0:
+            return len(pedaco)
+
+        self._envelope += pedaco[fim:fim + 1]
+
+        if pedaco[fim:fim + 1] == b"\\":
+            self._escape = True
+            return fim + 1
+
+        self._em_string = False
+        self._ultima_string = bytes(self._chave_atual) if self._chave_valida else None
+        return fim + 1
+
+    def _consumir_midia(self, pedaco: bytes, i: int) -> int:
+        """Dentro do valor base64: decodifica em blocos de 4 caracteres."""
+        if self._escape:
+            # Único escape esperado em base64 é "\/"; quebras de linha são ignoradas
+            self._escape = False
+            c = pedaco[i:i + 1]
+            if c == b"/":
+                self._decodificar(b"/", bruto=b"\\/")
+            elif self._bruto is not None:
+                self._bruto += b"\\" + c
+                if c not in (b"n", b"r"):
+                    self._midia_como_texto()
+            return i + 1
+
+        pos = _fim_de_trecho(pedaco, i)
+        fim = pos if pos >= 0 else len(pedaco)
+        self._decodificar(pedaco[i:fim])
+
+        if self._escrita is None:
+            # Não era base64: o resto do valor segue como string comum
+            return fim
+
+        if pos < 0:
+            return len(pedaco)
+
+        if pedaco[fim:fim + 1] == b"\\":
+            self._escape = True
+            return fim + 1
+
+        self._concluir_midia()
+        if self._em_string:
+            return fim
+        return fim + 1
+
+    def _decodificar(self, trecho: bytes, bruto: Optional[bytes] = None) -> None:
+        """Decodifica o base64 disponível e escreve no store."""
+        if self._bruto is not None:
+            self._bruto += trecho if bruto is None else bruto
+            if _RE_NAO_BASE64.search(trecho):
+                self._midia_como_texto()
+                return
+            if len(self._bruto) > _MAX_BRUTO:
+                self._bruto = None
+
+        dados = self._resto_base64 + trecho if self._resto_base64 else trecho
+        corte = len(dados) - len(dados) % 4
+        if corte:
+            try:
+                self._escrita.escrever(binascii.a2b_base64(dados[:corte]))
+            except binascii.Error:
+                if self._bruto is not None:
+                    self._midia_como_texto()
+                    return
+                # Valor grande demais para voltar ao envelope: ignora o que não é base64
+                dados = dados.translate(None, _NAO_BASE64)
+                corte = len(dados) - len(dados) % 4
+                self._escrita.escrever(binascii.a2b_base64(dados[:corte]))
+        self._resto_base64 = dados[corte:]
+
+    def _midia_como_texto(self) -> None:
+        """Desiste da decodificação: descarta a escrita e devolve o valor bruto ao envelope."""
+        self._escrita.descartar()
+        self._escrita = None
+        self._envelope += self._bruto
+        self._bruto = None
+        self._resto_base64 = b""
+
+        self._em_string = True
+        self._chave_atual = bytearray()
+        self._chave_valida = False
+
+    def _concluir_midia(self) -> None:
+        """Fecha o campo de mídia e deixa a referência no envelope."""
+        if self._resto_base64:
+            resto = self._resto_base64 + b"=" * (-len(self._resto_base64) % 4)
+            try:
+                self._escrita.escrever(binascii.a2b_base64(resto))
+            except binascii.Error:
+                if self._bruto is not None:
+                    self._midia_como_texto()
+                    return
+                logger.warning("Base64 de mídia truncado: último bloco ignorado")
+            self._resto_base64 = b""
+
+        ref = self._escrita.concluir()
+        self._escrita = None
+        self._bruto = None
+
+        if ref:
+            self.referencias.append(ref)
+            self._envelope += ref.encode("ascii")
+        self._envelope += b'"'
+
+
+async def parsear_webhook_streaming(
+    pedacos: AsyncIterable[bytes],
+    store: Optional[MediaStore] = None,
+    prefixo: bytes = b""
+) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Lê o corpo do webhook em streaming, desviando mídias para o store.
+
+    Args:
+        pedacos: Iterável assíncrono de bytes (ex: request.stream())
+        store: Media store de destino (padrão: singleton)
+        prefixo: Bytes já lidos do corpo antes da chamada (ex: pelo pré-filtro)
+
+    Returns:
+        Tupla (webhook_data, referencias_de_midia)
+
+    Raises:
+        json.JSONDecodeError: Se o corpo não for um JSON válido
+
+    Example:
+        >>> webhook_data, refs = await parsear_webhook_streaming(request.stream())
+    """
+    parser = ParserWebhookStreaming(store)
+
+    try:
+        parser.alimentar(prefixo)
+        async for pedaco in pedacos:
+            parser.alimentar(pedaco)
+    except Exception:
+        parser.descartar()
+        raise
+
+    webhook_data = parser.finalizar()
+
+    if parser.referencias:
+        logger.info(f"Webhook com {len(parser.referencias)} midia(s) desviada(s) para o media store")
+
+    return webhook_data, parser.referencias
+
+
+# ========== EXPORTAÇÕES ==========
+
+__all__ = [
+    "CAMPOS_MIDIA",
+    "ParserWebhookStreaming",
+    "parsear_webhook_streaming",
+]
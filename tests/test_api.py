@@ -62,6 +62,33 @@ def test_status_endpoint():
     assert "instance" in data["bot"]
 
 
+@pytest.mark.unit
+def test_metrics_endpoint():
+    """Testa endpoint /metrics (formato Prometheus)."""
+    from main import app
+    client = TestClient(app)
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "atendimento_grafos_em_andamento" in response.text
+    assert 'atendimento_fila_background{fila="resumos_conversa"}' in response.text
+
+
+@pytest.mark.unit
+def test_metrics_nos_endpoint():
+    """Testa endpoint /metrics/nos (latência por nó e rastro por mensagem)."""
+    from main import app
+    client = TestClient(app)
+
+    data = client.get("/metrics/nos").json()
+    assert "nos" in data and "mensagens" in data
+
+    data = client.get("/metrics/nos", params={"mensagem_id": "desconhecida"}).json()
+    assert data == {"mensagem_id": "desconhecida", "etapas": []}
+
+
 # ==============================================
 # TESTES DE WEBHOOK
 # ==============================================
@@ -123,6 +150,35 @@ def test_webhook_mensagem_propria(webhook_data_texto):
     assert data["status"] in ["ignored", "accepted"]
 
 
+@pytest.mark.unit
+def test_webhook_pre_filtro_conta_eventos():
+    """Eventos descartados no pré-filtro aparecem nos contadores de /status."""
+    from main import app
+    from utils.webhook_filter import zerar_contadores_eventos
+    zerar_contadores_eventos()
+    client = TestClient(app)
+
+    for _ in range(3):
+        response = client.post("/webhook/whatsapp", json={"event": "presence.update", "data": {}})
+        assert response.json()["status"] == "ignored"
+
+    data = client.get("/status").json()
+    assert data["webhook_eventos"]["presence.update"]["evento_ignorado"] == 3
+
+
+@pytest.mark.unit
+def test_pre_filtro_from_me():
+    """fromMe da key descarta; fromMe de mensagem citada não."""
+    from utils.webhook_filter import pre_filtrar_webhook
+
+    proprio = b'{"event": "messages.upsert", "data": {"key": {"fromMe": true}, "message": {}}}'
+    citado = b'{"event": "messages.upsert", "data": {"key": {"id": "1"}, "message": {"ctx": {"fromMe": true}}}}'
+
+    assert pre_filtrar_webhook(proprio) == ("messages.upsert", "mensagem_propria")
+    assert pre_filtrar_webhook(citado) == ("messages.upsert", None)
+    assert pre_filtrar_webhook(b'{"data": {}}') == (None, None)
+
+
 # ==============================================
 # TESTES DE TEST MESSAGE
 # ==============================================
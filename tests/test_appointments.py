@@ -0,0 +1,191 @@
+"""
+Testes do índice de agendamentos por telefone.
+
+Testa:
+- criar_propriedades_agendamento / Agendamento.de_evento
+- IndiceAgendamentos (busca por telefone e horário)
+- cancelar_horario / atualizar_horario localizando o evento pelo índice
+- agendamento_tool gravando o lead da conversa no evento
+"""
+
+import pytest
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+from zoneinfo import ZoneInfo
+
+# Adicionar src ao path
+src_path = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from tools.appointments import Agendamento, IndiceAgendamentos, criar_propriedades_agendamento
+
+FUSO = ZoneInfo("America/Sao_Paulo")
+
+
+def _evento(evento_id: str, inicio: datetime, nome: str, telefone: str, **extra) -> dict:
+    return {
+        "id": evento_id,
+        "summary": f"Consulta - {nome}",
+        "start": {"dateTime": inicio.isoformat()},
+        "end": {"dateTime": (inicio + timedelta(hours=1)).isoformat()},
+        "extendedProperties": criar_propriedades_agendamento(nome, telefone, endereco="Rua A, 10"),
+        **extra
+    }
+
+
+# ==============================================
+# TESTES DO ÍNDICE
+# ==============================================
+
+@pytest.mark.unit
+def test_propriedades_e_evento_antigo():
+    """Propriedades omitem vazios; eventos antigos caem na descrição."""
+    props = criar_propriedades_agendamento("Ana Souza", "+55 (62) 99999-0001")
+
+    assert props == {"private": {"telefone": "5562999990001", "nome": "Ana Souza"}}
+
+    antigo = Agendamento.de_evento({
+        "id": "x",
+        "summary": "Consulta - João",
+        "description": "Cliente: João\nTelefone: 5562988887777\nEmail: j@x.com\n\nEndereço: Rua B",
+        "start": {"dateTime": "2030-01-02T14:00:00-03:00"}
+    })
+
+    assert antigo.telefone == "5562988887777"
+    assert antigo.endereco == "Rua B"
+    assert antigo.nome == "João"
+
+
+@pytest.mark.unit
+def test_indice_distingue_clientes_com_mesmo_nome():
+    """Dois 'João' no mesmo horário são separados pelo telefone."""
+    indice = IndiceAgendamentos()
+    inicio = datetime(2030, 1, 2, 14, tzinfo=FUSO)
+    indice.aplicar_evento(_evento("a", inicio, "João Silva", "5562911111111"))
+    indice.aplicar_evento(_evento("b", inicio, "João Souza", "5562922222222"))
+
+    assert indice.buscar("+55 (62) 92222-2222", inicio + timedelta(minutes=30)).evento_id == "b"
+    assert indice.buscar("5562911111111", inicio + timedelta(hours=3)) is None
+
+    indice.aplicar_evento({"id": "a", "status": "cancelled"})
+
+    assert indice.listar("5562911111111") == []
+    assert len(indice) == 1
+
+
+# ==============================================
+# TESTES DAS TOOLS
+# ==============================================
+
+class _GatewayFalso:
+    """Registra as requisições montadas e responde conforme o método."""
+
+    def __init__(self):
+        self.chamadas = []
+        self.service = MagicMock()
+        eventos = self.service.events.return_value
+        eventos.list.side_effect = lambda **kw: ("list", kw)
+        eventos.delete.side_effect = lambda **kw: ("delete", kw)
+        eventos.patch.side_effect = lambda **kw: ("patch", kw)
+        eventos.insert.side_effect = lambda **kw: ("insert", kw)
+
+    async def executar(self, requisicao):
+        metodo, kw = requisicao
+        self.chamadas.append(metodo)
+
+        if metodo == "insert":
+            return {"id": kw["body"].get("id", "novo"), **kw["body"]}
+        if metodo == "patch":
+            inicio = datetime.fromisoformat(kw["body"]["start"]["dateTime"])
+            evento = _evento(kw["eventId"], inicio, "João Souza", "5562922222222")
+            evento["extendedProperties"] = kw["body"]["extendedProperties"]
+            return evento
+
+        return {"items": []}
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_cancelar_e_atualizar_pelo_indice():
+    """Com o evento no índice, cancelar é um delete e remarcar é um patch direto."""
+    import src.tools.scheduling as scheduling
+
+    inicio = (datetime.now(FUSO) + timedelta(days=3)).replace(hour=14, minute=0, second=0, microsecond=0)
+    indice = IndiceAgendamentos()
+    indice.aplicar_evento(_evento("a", inicio, "João Silva", "5562911111111"))
+    indice.aplicar_evento(_evento("b", inicio, "João Souza", "5562922222222"))
+
+    gateway = _GatewayFalso()
+    outbox = MagicMock()
+    outbox.enfileirar = AsyncMock()
+
+    with patch.object(scheduling, "_get_calendar_gateway", return_value=gateway), \
+         patch.object(scheduling, "get_indice_agendamentos", return_value=indice), \
+         patch.object(scheduling, "_motor_disponibilidade", MagicMock()), \
+         patch.object(scheduling, "get_outbox_notificacoes", return_value=outbox):
+
+        nova = inicio + timedelta(days=1)
+        resultado = await scheduling.atualizar_horario(
+            nome_cliente="João",
+            data_consulta_antiga=inicio.strftime("%d/%m/%Y %H:%M"),
+            data_consulta_nova=nova.strftime("%d/%m/%Y %H:%M"),
+            telefone_cliente="5562922222222"
+        )
+
+        assert resultado["sucesso"] is True
+        assert resultado["dados"]["evento_id"] == "b"
+        # Só a verificação de conflito + patch (sem varrer a janela antiga)
+        assert gateway.chamadas == ["list", "patch"]
+        assert indice.buscar("5562922222222", nova).evento_id == "b"
+
+        gateway.chamadas.clear()
+        resultado = await scheduling.cancelar_horario(
+            nome_cliente="João",
+            data_consulta_reuniao=inicio.strftime("%d/%m/%Y %H:%M"),
+            telefone_cliente="5562911111111"
+        )
+
+        assert resultado["sucesso"] is True
+        assert gateway.chamadas == ["delete"]
+        assert [c.kwargs["tipo"] for c in outbox.enfileirar.call_args_list] == ["reagendamento", "cancelamento"]
+        assert indice.listar("5562911111111") == []
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_agendar_grava_lead_da_conversa():
+    """O cliente_id da conversa (em contexto) vai para extendedProperties.private do evento."""
+    import src.tools.scheduling as scheduling
+    from src.tools.reservations import ReservaHorariosMemoria
+    from src.utils.idempotency import definir_lead_atual, resetar_lead_atual
+
+    inicio = (datetime.now(FUSO) + timedelta(days=3)).replace(hour=14, minute=0, second=0, microsecond=0)
+    gateway = _GatewayFalso()
+    grade = MagicMock()
+    grade.cabe_no_expediente.return_value = True
+
+    with patch.object(scheduling, "_get_calendar_gateway", return_value=gateway), \
+         patch.object(scheduling, "_get_grade_horarios", return_value=grade), \
+         patch.object(scheduling, "_get_reservas", return_value=ReservaHorariosMemoria()), \
+         patch.object(scheduling, "_get_motor_disponibilidade", MagicMock()), \
+         patch.object(scheduling, "get_indice_agendamentos", return_value=IndiceAgendamentos()), \
+         patch.object(scheduling, "_notificar_tecnico", AsyncMock()):
+
+        token = definir_lead_atual(42)
+        try:
+            resultado = await scheduling.agendamento_tool.ainvoke({
+                "nome_cliente": "Ana Souza",
+                "telefone_cliente": "5562999990001",
+                "email_cliente": "",
+                "data_consulta_reuniao": inicio.strftime("%d/%m/%Y %H:%M"),
+                "intencao": "agendar",
+            })
+        finally:
+            resetar_lead_atual(token)
+
+    assert resultado["sucesso"] is True
+    assert gateway.chamadas == ["list", "insert"]
+    evento = gateway.service.events.return_value.insert.call_args.kwargs["body"]
+    assert evento["extendedProperties"]["private"]["lead_id"] == "42"
@@ -0,0 +1,101 @@
+"""
+Testes do motor de disponibilidade (FreeBusy + cache por dia).
+
+Testa:
+- mesclar_intervalos / filtrar_slots_livres
+- MotorDisponibilidade (uma chamada por período, cache e invalidação)
+"""
+
+import pytest
+import sys
+from datetime import date, datetime
+from pathlib import Path
+from unittest.mock import MagicMock
+from zoneinfo import ZoneInfo
+
+# Adicionar src ao path
+src_path = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from tools.availability import MotorDisponibilidade, filtrar_slots_livres, mesclar_intervalos
+
+FUSO = ZoneInfo("America/Sao_Paulo")
+
+
+def _h(dia: int, hora: int, minuto: int = 0) -> datetime:
+    return datetime(2030, 1, dia, hora, minuto, tzinfo=FUSO)
+
+
+class _GatewayFalso:
+    """Gateway que responde FreeBusy a partir de uma lista fixa de intervalos."""
+
+    def __init__(self, busy):
+        self.busy = busy
+        self.chamadas = []
+        self.service = MagicMock()
+        self.service.freebusy.return_value.query.side_effect = lambda body: body
+
+    async def executar(self, body):
+        self.chamadas.append(body)
+        return {"calendars": {"agenda": {"busy": [
+            {"start": inicio.isoformat(), "end": fim.isoformat()} for inicio, fim in self.busy
+        ]}}}
+
+
+# ==============================================
+# TESTES DE INTERVALOS
+# ==============================================
+
+@pytest.mark.unit
+def test_mesclar_intervalos():
+    """Intervalos sobrepostos e encostados viram um só."""
+    mesclados = mesclar_intervalos([(_h(1, 14), _h(1, 15)), (_h(1, 9), _h(1, 10)), (_h(1, 9, 30), _h(1, 11)), (_h(1, 11), _h(1, 12))])
+
+    assert mesclados == [(_h(1, 9), _h(1, 12)), (_h(1, 14), _h(1, 15))]
+
+
+@pytest.mark.unit
+def test_filtrar_slots_livres():
+    """Slots que encostam no intervalo ocupado continuam livres."""
+    slots = [(_h(1, h), _h(1, h + 1)) for h in range(8, 12)]
+    livres = filtrar_slots_livres(slots, [(_h(1, 9, 30), _h(1, 10))])
+
+    assert [inicio.hour for inicio, _ in livres] == [8, 10, 11]
+
+
+# ==============================================
+# TESTES DE MotorDisponibilidade
+# ==============================================
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_motor_semana_em_uma_chamada():
+    """Cinco dias são consultados com um único FreeBusy e depois vêm do cache."""
+    gateway = _GatewayFalso([(_h(2, 9), _h(2, 10)), (_h(3, 23), _h(4, 1))])
+    motor = MotorDisponibilidade(gateway, "agenda", ttl=60)
+
+    ocupados = await motor.ocupados_por_dia(date(2030, 1, 1), dias=5)
+    await motor.ocupados_por_dia(date(2030, 1, 2), dias=3)
+
+    assert len(gateway.chamadas) == 1
+    assert ocupados[date(2030, 1, 1)] == []
+    assert ocupados[date(2030, 1, 2)] == [(_h(2, 9), _h(2, 10))]
+    # Evento que atravessa a meia-noite é dividido entre os dois dias
+    assert ocupados[date(2030, 1, 3)] == [(_h(3, 23), _h(4, 0))]
+    assert ocupados[date(2030, 1, 4)] == [(_h(4, 0), _h(4, 1))]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_motor_invalidacao():
+    """Invalidar um dia força nova consulta apenas para ele."""
+    gateway = _GatewayFalso([])
+    motor = MotorDisponibilidade(gateway, "agenda", ttl=60)
+
+    await motor.ocupados_por_dia(date(2030, 1, 1), dias=3)
+    motor.invalidar(date(2030, 1, 2))
+    await motor.ocupados_por_dia(date(2030, 1, 1), dias=3)
+
+    assert len(gateway.chamadas) == 2
+    assert gateway.chamadas[1]["timeMin"].startswith("2030-01-02T00:00:00")
+    assert gateway.chamadas[1]["timeMax"].startswith("2030-01-03T00:00:00")
@@ -0,0 +1,115 @@
+"""
+Testes do cliente Google Calendar compartilhado.
+
+Testa:
+- get_calendar_service (credenciais e discovery carregados uma vez)
+- CalendarGateway (execução fora do event loop, com timeout)
+"""
+
+import asyncio
+import time
+import pytest
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+# Adicionar src ao path
+src_path = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from clients import calendar_client
+
+
+@pytest.fixture
+def calendar_mockado(tmp_path, monkeypatch):
+    """Substitui credenciais e build() por mocks contáveis."""
+    arquivo = tmp_path / "credentials.json"
+    arquivo.write_text("{}")
+
+    carregar = MagicMock(return_value=MagicMock(name="credenciais"))
+    build = MagicMock(return_value=MagicMock(name="service"))
+    monkeypatch.setattr(calendar_client.service_account.Credentials, "from_service_account_file", carregar)
+    monkeypatch.setattr(calendar_client, "build", build)
+
+    calendar_client.limpar_calendar_service()
+    yield str(arquivo), carregar, build
+    calendar_client.limpar_calendar_service()
+
+
+# ==============================================
+# TESTES DE get_calendar_service
+# ==============================================
+
+@pytest.mark.unit
+def test_service_construido_uma_vez(calendar_mockado):
+    """Chamadas repetidas reaproveitam credenciais e serviço."""
+    arquivo, carregar, build = calendar_mockado
+
+    primeiro = calendar_client.get_calendar_service(arquivo)
+    segundo = calendar_client.get_calendar_service(arquivo)
+
+    assert primeiro is segundo
+    carregar.assert_called_once()
+    build.assert_called_once()
+    assert build.call_args.kwargs["static_discovery"] is True
+
+
+@pytest.mark.unit
+def test_service_sem_credenciais(tmp_path):
+    """Arquivo ausente levanta FileNotFoundError."""
+    calendar_client.limpar_calendar_service()
+
+    with pytest.raises(FileNotFoundError):
+        calendar_client.get_calendar_service(str(tmp_path / "nao_existe.json"))
+
+
+# ==============================================
+# TESTES DE CalendarGateway
+# ==============================================
+
+class _RequisicaoLenta:
+    """Imita uma HttpRequest da googleapiclient com I/O bloqueante."""
+
+    def __init__(self, segundos: float, resposta=None):
+        self.segundos = segundos
+        self.resposta = resposta
+
+    def execute(self, http=None):
+        time.sleep(self.segundos)
+        return self.resposta
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    gateway = calendar_client.CalendarGateway(max_workers=2, timeout=0.5)
+    monkeypatch.setattr(gateway, "_http_da_thread", lambda: None)
+    yield gateway
+    gateway.fechar()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_gateway_nao_bloqueia_event_loop(gateway):
+    """Enquanto o Calendar responde, outras corrotinas continuam rodando."""
+    batidas = 0
+
+    async def batimento():
+        nonlocal batidas
+        while True:
+            batidas += 1
+            await asyncio.sleep(0.01)
+
+    tarefa = asyncio.create_task(batimento())
+    resposta = await gateway.executar(_RequisicaoLenta(0.2, {"items": []}))
+    tarefa.cancel()
+
+    assert resposta == {"items": []}
+    assert batidas >= 5
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_gateway_timeout(gateway):
+    """Requisições lentas demais levantam CalendarTimeoutError."""
+    with pytest.raises(calendar_client.CalendarTimeoutError):
+        await gateway.executar(_RequisicaoLenta(1.0))
@@ -0,0 +1,195 @@
+"""
+Testes da sincronização incremental da agenda (syncToken + índice local).
+
+Testa:
+- IndiceOcupacao (eventos com horário, dia inteiro, cancelados e livres)
+- SincronizadorCalendario contra um Calendar falso (completa, incremental, 410)
+- MotorDisponibilidade respondendo pelo índice sem chamar o Google
+"""
+
+import pytest
+import sys
+from datetime import date, datetime
+from pathlib import Path
+from unittest.mock import MagicMock
+from zoneinfo import ZoneInfo
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+# Adicionar src ao path
+src_path = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from tools.availability import MotorDisponibilidade
+from tools.calendar_sync import IndiceOcupacao, SincronizadorCalendario
+
+FUSO = ZoneInfo("America/Sao_Paulo")
+
+
+def _h(dia: int, hora: int, minuto: int = 0) -> datetime:
+    return datetime(2030, 1, dia, hora, minuto, tzinfo=FUSO)
+
+
+def _evento(evento_id: str, inicio: datetime, fim: datetime, **extra) -> dict:
+    return {
+        "id": evento_id,
+        "status": "confirmed",
+        "start": {"dateTime": inicio.isoformat()},
+        "end": {"dateTime": fim.isoformat()},
+        **extra
+    }
+
+
+class _CalendarFalso:
+    """
+    Calendar em memória com a semântica de syncToken do events.list.
+
+    Cada alteração ganha uma versão; o syncToken é a última versão vista.
+    """
+
+    def __init__(self, tamanho_pagina: int = 2):
+        self.tamanho_pagina = tamanho_pagina
+        self.eventos = {}
+        self.versao = 0
+        self.chamadas = []
+        self.tokens_invalidos = set()
+
+        self.service = MagicMock()
+        self.service.events.return_value.list.side_effect = lambda **kw: ("list", kw)
+        self.service.freebusy.return_value.query.side_effect = lambda body: ("freebusy", body)
+
+    def gravar(self, evento: dict) -> None:
+        self.versao += 1
+        self.eventos[evento["id"]] = (self.versao, evento)
+
+    def cancelar(self, evento_id: str) -> None:
+        self.versao += 1
+        self.eventos[evento_id] = (self.versao, {"id": evento_id, "status": "cancelled"})
+
+    async def executar(self, requisicao):
+        metodo, parametros = requisicao
+        self.chamadas.append((metodo, dict(parametros) if isinstance(parametros, dict) else parametros))
+
+        if metodo != "list":
+            raise AssertionError("O índice não deveria consultar o FreeBusy")
+
+        token = parametros.get("syncToken")
+        if token in self.tokens_invalidos:
+            raise HttpError(httplib2.Response({"status": 410}), b"Sync token is no longer valid")
+
+        desde = int(token) if token else 0
+        itens = [
+            evento for versao, evento in sorted(self.eventos.values(), key=lambda item: item[0])
+            if versao > desde and (token or evento.get("status") != "cancelled")
+        ]
+
+        inicio = int(parametros.get("pageToken") or 0)
+        pagina = itens[inicio:inicio + self.tamanho_pagina]
+        resposta = {"items": pagina}
+
+        if inicio + self.tamanho_pagina < len(itens):
+            resposta["nextPageToken"] = str(inicio + self.tamanho_pagina)
+        else:
+            resposta["nextSyncToken"] = str(self.versao)
+
+        return resposta
+
+
+# ==============================================
+# TESTES DE IndiceOcupacao
+# ==============================================
+
+@pytest.mark.unit
+def test_indice_eventos_e_recorte():
+    """Eventos são recortados ao período; cancelados e livres saem do índice."""
+    indice = IndiceOcupacao()
+    indice.aplicar_evento(_evento("a", _h(2, 9), _h(2, 10)))
+    indice.aplicar_evento(_evento("b", _h(2, 9, 30), _h(2, 11)))
+    indice.aplicar_evento(_evento("c", _h(2, 23), _h(3, 1)))
+    indice.aplicar_evento(_evento("d", _h(2, 14), _h(2, 15), transparency="transparent"))
+    indice.aplicar_evento({"id": "dia", "start": {"date": "2030-01-04"}, "end": {"date": "2030-01-05"}})
+
+    assert indice.ocupados_entre(_h(2, 0), _h(3, 0)) == [(_h(2, 9), _h(2, 11)), (_h(2, 23), _h(3, 0))]
+    assert indice.ocupados_entre(_h(4, 0), _h(5, 0)) == [(_h(4, 0), _h(5, 0))]
+
+    indice.aplicar_evento({"id": "a", "status": "cancelled"})
+
+    assert indice.ocupados_entre(_h(2, 0), _h(2, 12)) == [(_h(2, 9, 30), _h(2, 11))]
+
+
+# ==============================================
+# TESTES DE SincronizadorCalendario
+# ==============================================
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_sincronizacao_completa_e_incremental():
+    """A primeira sincronização pagina tudo; as seguintes usam o syncToken."""
+    calendar = _CalendarFalso(tamanho_pagina=2)
+    for i, hora in enumerate((8, 10, 13, 15)):
+        calendar.gravar(_evento(f"e{i}", _h(2, hora), _h(2, hora + 1)))
+
+    sincronizador = SincronizadorCalendario(calendar, "agenda", IndiceOcupacao())
+
+    assert await sincronizador.sincronizar() == 4
+    assert len(calendar.chamadas) == 2
+    assert "syncToken" not in calendar.chamadas[0][1]
+    assert sincronizador.indice.pronto()
+
+    # Técnico edita a agenda manualmente
+    calendar.cancelar("e0")
+    calendar.gravar(_evento("e1", _h(2, 11), _h(2, 12)))
+    calendar.chamadas.clear()
+
+    assert await sincronizador.sincronizar() == 2
+    assert calendar.chamadas[0][1]["syncToken"] == "4"
+    assert sincronizador.indice.ocupados_entre(_h(2, 0), _h(3, 0)) == [
+        (_h(2, 11), _h(2, 12)), (_h(2, 13), _h(2, 14)), (_h(2, 15), _h(2, 16))
+    ]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_sync_token_expirado_refaz_completa():
+    """Resposta 410 descarta o token e refaz a sincronização completa."""
+    calendar = _CalendarFalso()
+    calendar.gravar(_evento("e0", _h(2, 9), _h(2, 10)))
+
+    sincronizador = SincronizadorCalendario(calendar, "agenda", IndiceOcupacao())
+    await sincronizador.sincronizar()
+
+    calendar.tokens_invalidos.add("1")
+    calendar.gravar(_evento("e1", _h(2, 14), _h(2, 15)))
+
+    assert await sincronizador.sincronizar() == 2
+    assert len(sincronizador.indice) == 2
+
+
+# ==============================================
+# TESTES DE INTEGRAÇÃO COM O MOTOR
+# ==============================================
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_motor_responde_pelo_indice_sem_google():
+    """Com o índice em dia, o motor não faz chamadas ao Google."""
+    calendar = _CalendarFalso()
+    calendar.gravar(_evento("e0", _h(2, 9), _h(2, 10)))
+
+    indice = IndiceOcupacao(timezone="America/Sao_Paulo")
+    await SincronizadorCalendario(calendar, "agenda", indice).sincronizar()
+    calendar.chamadas.clear()
+
+    motor = MotorDisponibilidade(calendar, "agenda", indice_local=indice)
+    ocupados = await motor.ocupados_por_dia(date(2030, 1, 1), dias=7)
+
+    assert calendar.chamadas == []
+    assert ocupados[date(2030, 1, 2)] == [(_h(2, 9), _h(2, 10))]
+    assert ocupados[date(2030, 1, 3)] == []
+
+    # Evento criado pelo bot entra no índice antes da próxima sincronização
+    motor.registrar_evento(_evento("novo", _h(3, 14), _h(3, 15)))
+    ocupados = await motor.ocupados_por_dia(date(2030, 1, 3))
+
+    assert ocupados[date(2030, 1, 3)] == [(_h(3, 14), _h(3, 15))]
@@ -0,0 +1,126 @@
+"""
+Testes do montador de contexto com orçamento de tokens.
+
+Testa:
+- Contagem e truncamento de tokens
+- Prioridades: mensagem atual inteira, histórico perde as mais antigas,
+  RAG perde os documentos menos relevantes
+- Compactação dos resultados de tools
+- Carga da codificação fora do event loop, com nova tentativa após falha
+"""
+
+import asyncio
+import pytest
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from langchain_core.documents import Document
+
+# Adicionar src ao path
+src_path = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from utils.context_assembler import (
+    PRIORIDADE_FERRAMENTAS,
+    PRIORIDADE_HISTORICO,
+    PRIORIDADE_MENSAGEM,
+    PRIORIDADE_RAG,
+    MontadorContexto,
+    contar_tokens,
+    resumir_resultado,
+    truncar_tokens,
+)
+
+
+def _texto(palavra: str, repeticoes: int) -> str:
+    return " ".join([palavra] * repeticoes)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_codificador_carregado_fora_do_event_loop():
+    """No event loop a carga vai para uma thread; uma falha não é definitiva."""
+    import utils.context_assembler as context_assembler
+
+    tiktoken = MagicMock()
+    tiktoken.get_encoding.side_effect = [OSError("sem rede"), MagicMock()]
+
+    with patch.dict(sys.modules, {"tiktoken": tiktoken}), \
+         patch.object(context_assembler, "_codificador", None), \
+         patch.object(context_assembler, "_proxima_carga", 0.0):
+
+        # Chamada no event loop estima na hora e agenda a carga
+        assert contar_tokens("Bom dia!") == 2
+        for _ in range(100):
+            if tiktoken.get_encoding.call_count:
+                break
+            await asyncio.sleep(0.01)
+        assert tiktoken.get_encoding.call_count == 1
+        assert context_assembler._get_codificador() is None
+
+        # Passado o intervalo, a carga é tentada de novo e passa a valer
+        context_assembler._proxima_carga = 0.0
+        assert await asyncio.to_thread(context_assembler.carregar_codificador) is True
+        assert context_assembler._get_codificador() is not None
+
+
+@pytest.mark.unit
+def test_truncar_tokens():
+    """Texto truncado cabe no limite e termina com a marca de corte."""
+    texto = _texto("drywall", 200)
+
+    truncado = truncar_tokens(texto, 50)
+
+    assert contar_tokens(truncado) <= 50
+    assert truncado.endswith("[...]")
+    assert truncar_tokens("curto", 50) == "curto"
+
+
+@pytest.mark.unit
+def test_orcamento_respeita_prioridades():
+    """Sob pressão, mensagem atual fica inteira; histórico e RAG são cortados."""
+    mensagem = "Quanto custa forro de gesso para uma sala de 20m2?"
+    historico = [f"Cliente: mensagem antiga {i} " + _texto("bla", 40) for i in range(10)]
+    documentos = [f"Documento {i}: " + _texto("gesso", 150) for i in range(5)]
+
+    montador = MontadorContexto(600)
+    montador.reservar("sistema", _texto("regra", 100))
+    montador.adicionar("historico", PRIORIDADE_HISTORICO, historico,
+                       cabecalho="=== HISTÓRICO ===", manter_recentes=True)
+    montador.adicionar("mensagem", PRIORIDADE_MENSAGEM, [mensagem], obrigatorio=True)
+    montador.adicionar("rag", PRIORIDADE_RAG, documentos, max_tokens_item=100)
+    montador.adicionar("ferramentas", PRIORIDADE_FERRAMENTAS, ["[Resultado de agendamento_tool]: {}"])
+
+    contexto = montador.montar()
+
+    assert contexto.total <= 600
+    assert mensagem in contexto.texto
+    # Histórico: as mais recentes ficam, as mais antigas saem
+    assert "mensagem antiga 9" in contexto.texto
+    assert "mensagem antiga 0" not in contexto.texto
+    assert "historico" in contexto.cortados
+    # Segmentos aparecem na ordem de criação, não de prioridade
+    assert contexto.texto.index("=== HISTÓRICO ===") < contexto.texto.index(mensagem)
+    assert set(contexto.resumo()["segmentos"]) == {"sistema", "historico", "mensagem", "rag", "ferramentas"}
+
+
+@pytest.mark.unit
+def test_sem_pressao_nada_e_cortado_e_resultados_compactados():
+    """Com orçamento folgado tudo entra; documentos perdem metadados e dicts perdem vazios."""
+    itens_rag = resumir_resultado([
+        Document(page_content="Forro de gesso: R$ 80/m2", metadata={"id": 1, "embedding": [0.1] * 50}),
+        Document(page_content="Garantia de 1 ano", metadata={"id": 2})
+    ])
+    itens_tool = resumir_resultado({"sucesso": True, "dados": {"horarios": [], "proximo": None}, "mensagem": "ok"})
+
+    assert itens_rag == ["Forro de gesso: R$ 80/m2", "Garantia de 1 ano"]
+    assert itens_tool == ['{"sucesso":true,"dados":{},"mensagem":"ok"}']
+
+    montador = MontadorContexto(8000)
+    montador.adicionar("mensagem", PRIORIDADE_MENSAGEM, ["oi"], obrigatorio=True)
+    montador.adicionar("rag", PRIORIDADE_RAG, itens_rag, cabecalho="[Resultado de buscar_base_conhecimento]:")
+    contexto = montador.montar()
+
+    assert contexto.cortados == {}
+    assert contexto.texto == "oi\n\n[Resultado de buscar_base_conhecimento]:\nForro de gesso: R$ 80/m2\nGarantia de 1 ano"
@@ -0,0 +1,105 @@
+"""
+Testes dos fatos estruturados do cliente.
+
+Testa:
+- Extração por regex da mensagem (nome, endereço, email, período, serviço)
+- Período negado ("não quero de manhã") não vira preferência; a última menção vale
+- Papéis ("sou o síndico") não viram nome
+- Extração dos argumentos das tools
+- Mescla incremental, formatação para o prompt e gravação em background
+"""
+
+import asyncio
+import pytest
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+# Adicionar src ao path
+src_path = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from utils.customer_facts import (
+    extrair_fatos_ferramenta,
+    extrair_fatos_texto,
+    formatar_fatos,
+    mesclar_fatos,
+)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("texto, esperado", [
+    (
+        "Me chamo ana souza, moro na Rua 10, 123. Prefiro de manhã",
+        {"nome": "Ana Souza", "endereco": "Rua 10, 123", "periodo_preferido": "manhã"}
+    ),
+    (
+        "meu nome é João da Silva e quero um forro de gesso",
+        {"nome": "João da Silva", "tipo_servico": "gesso, forro"}
+    ),
+    ("Meu email: Joao@Gmail.com", {"email": "joao@gmail.com"}),
+    ("Quadra 12 lote 5, Setor Bueno", {"endereco": "Quadra 12 lote 5, Setor Bueno"}),
+    ("estou na rua agora, amanhã te respondo", {}),
+    ("Aqui é o João, do apartamento 302", {"nome": "João"}),
+    ("Sou o síndico", {}),
+    ("Aqui é o gerente do prédio", {}),
+    ("sou a responsável pela obra", {}),
+    ("Sou a Maria, síndica do prédio", {"nome": "Maria"}),
+    ("não quero de manhã, só a tarde", {"periodo_preferido": "tarde"}),
+    ("só à tarde", {"periodo_preferido": "tarde"}),
+    ("de manhã não dá", {}),
+    ("pode ser de manhã... ou melhor, a tarde", {"periodo_preferido": "tarde"}),
+])
+def test_extrair_fatos_texto(texto, esperado):
+    """Regexes pegam os fatos sem falsos positivos óbvios ("amanhã" não é manhã)."""
+    assert extrair_fatos_texto(texto) == esperado
+
+
+@pytest.mark.unit
+def test_extrair_fatos_ferramenta():
+    """Agendamento fornece nome, endereço e email; email genérico e consultas são ignorados."""
+    fatos = extrair_fatos_ferramenta("agendamento_tool", {
+        "intencao": "agendar",
+        "nome_cliente": "Ana Souza",
+        "email_cliente": "sememail@gmail.com",
+        "informacao_extra": "Endereço: Rua A, 10, Setor Oeste"
+    })
+
+    assert fatos == {"nome": "Ana Souza", "endereco": "Rua A, 10, Setor Oeste"}
+    assert extrair_fatos_ferramenta("agendamento_tool", {"intencao": "consultar", "nome_cliente": "Cliente"}) == {}
+    assert extrair_fatos_ferramenta("buscar_base_conhecimento", {"query": "preço"}) == {}
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_mesclar_formatar_e_salvar():
+    """Valores novos substituem, serviços acumulam; registro vira poucas linhas e é gravado em background."""
+    import src.utils.customer_facts as customer_facts
+
+    fatos, mudou = mesclar_fatos(
+        {"nome": "Ana", "tipo_servico": "forro", "endereco": "Rua A, 1"},
+        {"endereco": "Rua B, 2", "tipo_servico": "gesso, forro"}
+    )
+
+    assert mudou is True
+    assert fatos == {"nome": "Ana", "tipo_servico": "forro, gesso", "endereco": "Rua B, 2"}
+    assert mesclar_fatos(fatos, {"nome": "Ana"}) == (fatos, False)
+    assert mesclar_fatos(fatos, {"nome": "Síndico"}, preservar=("nome",)) == (fatos, False)
+    assert mesclar_fatos({}, {"nome": "João"}, preservar=("nome",)) == ({"nome": "João"}, True)
+    assert formatar_fatos(fatos).splitlines() == [
+        "=== DADOS JÁ INFORMADOS PELO CLIENTE (não pergunte de novo) ===",
+        "- Nome: Ana",
+        "- Endereço: Rua B, 2",
+        "- Serviço de interesse: forro, gesso",
+    ]
+    assert formatar_fatos({}) == ""
+
+    supabase = MagicMock()
+    with patch("src.clients.supabase_client.get_supabase_client", return_value=supabase):
+        customer_facts.salvar_fatos("lead-1", fatos)
+        customer_facts.salvar_fatos(None, fatos)  # sem lead, não grava
+        await asyncio.gather(*customer_facts._gravacoes)
+
+    supabase.table.assert_called_once_with("leads")
+    supabase.table.return_value.update.assert_called_once_with({"fatos": fatos})
+    supabase.table.return_value.update.return_value.eq.assert_called_once_with("id", "lead-1")
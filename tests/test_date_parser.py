@@ -0,0 +1,96 @@
+"""
+Testes da interpretação de datas em português.
+
+Testa:
+- Expressões relativas (hoje, amanhã, dia da semana, semana que vem)
+- Datas numéricas e por extenso, horário e período
+- Falsos positivos comuns ("segunda opção", datas inválidas)
+- Saudações e durações não viram período nem horário
+- Horário sem período ("às 2" é à tarde) e endereços que parecem datas
+"""
+
+import pytest
+import sys
+from datetime import date, datetime, time
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+# Adicionar src ao path
+src_path = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from tools.date_parser import formatar_dicas_datas, interpretar_data_hora, resolver_datas
+
+# Segunda-feira, 27/10/2025, 9h
+AGORA = datetime(2025, 10, 27, 9, tzinfo=ZoneInfo("America/Sao_Paulo"))
+
+
+def _resolver(texto):
+    return [(r.data, r.dias, r.hora, r.periodo) for r in resolver_datas(texto, AGORA)]
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("texto, esperado", [
+    ("Pode ser amanhã à tarde?", [(date(2025, 10, 28), 1, None, "tarde")]),
+    ("depois de amanhã de manhã", [(date(2025, 10, 29), 1, None, "manha")]),
+    ("quinta que vem às 14h", [(date(2025, 10, 30), 1, time(14), None)]),
+    ("sexta da semana que vem", [(date(2025, 11, 7), 1, None, None)]),
+    ("na segunda 2 da tarde", [(date(2025, 11, 3), 1, time(14), "tarde")]),
+    ("semana que vem", [(date(2025, 11, 3), 7, None, None)]),
+    ("tem horário dia 25?", [(date(2025, 11, 25), 1, None, None)]),
+    ("dia 3 de novembro 10:30", [(date(2025, 11, 3), 1, time(10, 30), None)]),
+    ("30/10 as 9", [(date(2025, 10, 30), 1, time(9), None)]),
+    ("hoje meio-dia", [(date(2025, 10, 27), 1, time(12), None)]),
+])
+def test_expressoes_resolvidas(texto, esperado):
+    """Expressões comuns viram datas concretas, com horário e período."""
+    assert _resolver(texto) == esperado
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("texto, esperado", [
+    ("Boa tarde! Pode ser amanhã às 9?", [(date(2025, 10, 28), 1, time(9), None)]),
+    ("boa noite, quinta às 8 da manhã", [(date(2025, 10, 30), 1, time(8), "manha")]),
+    ("Bom dia! amanhã à tarde, às 3", [(date(2025, 10, 28), 1, time(15), "tarde")]),
+    ("sexta 2 horas da tarde", [(date(2025, 10, 31), 1, time(14), "tarde")]),
+    ("demora 2 horas? pode ser sexta", [(date(2025, 10, 31), 1, None, None)]),
+    ("sexta às 14 horas", [(date(2025, 10, 31), 1, time(14), None)]),
+])
+def test_saudacoes_e_duracoes(texto, esperado):
+    """Saudação não é período; o período só desloca o horário ligado a ele; duração não é horário."""
+    assert _resolver(texto) == esperado
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("texto, esperado", [
+    ("pode ser amanhã à tarde? tipo às 2", [(date(2025, 10, 28), 1, time(14), "tarde")]),
+    ("sexta as 3 pode?", [(date(2025, 10, 31), 1, time(15), None)]),
+    ("sexta às 9", [(date(2025, 10, 31), 1, time(9), None)]),
+    ("amanhã de manhã às 3", [(date(2025, 10, 28), 1, None, "manha")]),
+    ("de manhã não dá, amanhã às 2 da tarde", [(date(2025, 10, 28), 1, time(14), "manha")]),
+    ("segunda às 14h", [(date(2025, 11, 3), 1, time(14), None)]),
+    ("segunda, 9:30", [(date(2025, 11, 3), 1, time(9, 30), None)]),
+    ("moro na rua 15 de novembro, amanhã pode?", [(date(2025, 10, 28), 1, None, None)]),
+    ("Avenida 7 de Setembro, 120. Dia 30?", [(date(2025, 10, 30), 1, None, None)]),
+])
+def test_horario_sem_periodo_e_enderecos(texto, esperado):
+    """Hora solta usa o período da mensagem ou vira tarde; "segunda" no início é dia; endereço não é data."""
+    assert _resolver(texto) == esperado
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("texto", ["a segunda opção é melhor", "31/02", "oi, tudo bem?"])
+def test_sem_datas(texto):
+    """Ordinais, datas inválidas e mensagens sem data não geram referências."""
+    assert resolver_datas(texto, AGORA) == []
+
+
+@pytest.mark.unit
+def test_dicas_e_data_hora():
+    """As dicas trazem a data pronta para a tool; interpretar_data_hora devolve datetime no fuso."""
+    dicas = formatar_dicas_datas(resolver_datas("amanhã 15h", AGORA))
+
+    assert "terça-feira, 28/10/2025 às 15:00" in dicas
+    assert 'data_consulta_reuniao="28/10/2025 15:00"' in dicas
+    assert interpretar_data_hora("amanhã 15h", AGORA) == datetime(2025, 10, 28, 15, tzinfo=AGORA.tzinfo)
+    assert interpretar_data_hora("quando puder", AGORA) is None
@@ -0,0 +1,101 @@
+"""
+Testes para o cache de descrições de imagem.
+
+Testa:
+- calcular_chave_imagem (hash perceptual)
+- ImageDescriptionCache (busca exata, aproximada e TTL)
+"""
+
+import io
+import time
+import pytest
+import sys
+from pathlib import Path
+
+# Adicionar src ao path
+src_path = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from cache.image_cache import ImageDescriptionCache, calcular_chave_imagem, distancia_hamming
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _gerar_imagem(formato: str = "PNG", tamanho=(200, 150), qualidade: int = 95) -> bytes:
+    """Gera uma imagem com gradiente e um retângulo para os testes."""
+    img = Image.new("RGB", tamanho)
+    for x in range(tamanho[0]):
+        for y in range(tamanho[1]):
+            img.putpixel((x, y), ((x * 255) // tamanho[0], (y * 255) // tamanho[1], 120))
+    for x in range(tamanho[0] // 4, tamanho[0] // 2):
+        for y in range(tamanho[1] // 4, tamanho[1] // 2):
+            img.putpixel((x, y), (255, 255, 255))
+
+    buffer = io.BytesIO()
+    if formato == "JPEG":
+        img.save(buffer, format=formato, quality=qualidade)
+    else:
+        img.save(buffer, format=formato)
+    return buffer.getvalue()
+
+
+# ==============================================
+# TESTES DE calcular_chave_imagem
+# ==============================================
+
+@pytest.mark.unit
+def test_chave_recompressao_proxima():
+    """Recompressões da mesma imagem devem gerar hashes próximos."""
+    chave_png = calcular_chave_imagem(_gerar_imagem("PNG"))
+    chave_jpeg = calcular_chave_imagem(_gerar_imagem("JPEG", tamanho=(400, 300), qualidade=40))
+
+    assert isinstance(chave_png, int)
+    assert distancia_hamming(chave_png, chave_jpeg) <= 6
+
+
+@pytest.mark.unit
+def test_chave_bytes_invalidos_usa_sha256():
+    """Bytes que não são imagem caem no fallback SHA-256."""
+    chave = calcular_chave_imagem(b"nao sou uma imagem")
+
+    assert isinstance(chave, str)
+    assert chave.startswith("sha256:")
+
+
+# ==============================================
+# TESTES DE ImageDescriptionCache
+# ==============================================
+
+@pytest.mark.unit
+def test_cache_busca_aproximada():
+    """Hash a poucos bits de distância deve acertar o cache."""
+    cache = ImageDescriptionCache(ttl=60, max_entries=10, max_distance=4)
+    cache.armazenar(0b1111_0000, "te enviei uma imagem que mostra uma parede")
+
+    assert cache.buscar(0b1111_0001) == "te enviei uma imagem que mostra uma parede"
+    assert cache.buscar(0b0000_1111) is None
+    assert cache.estatisticas()["hits"] == 1
+
+
+@pytest.mark.unit
+def test_cache_expira_por_ttl(monkeypatch):
+    """Entradas expiradas não devem ser retornadas."""
+    cache = ImageDescriptionCache(ttl=60, max_entries=10, max_distance=0)
+    cache.armazenar("sha256:abc", "descricao")
+
+    agora = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: agora + 61)
+
+    assert cache.buscar("sha256:abc") is None
+
+
+@pytest.mark.unit
+def test_cache_respeita_max_entries():
+    """Entradas mais antigas são descartadas ao exceder o limite."""
+    cache = ImageDescriptionCache(ttl=60, max_entries=2, max_distance=0)
+    cache.armazenar(1, "um")
+    cache.armazenar(2, "dois")
+    cache.armazenar(4, "quatro")
+
+    assert cache.buscar(1) is None
+    assert cache.buscar(4) == "quatro"
@@ -0,0 +1,144 @@
+"""
+Testes da configuração de logging.
+
+Testa:
+- Formatador JSON com mensagem_id, trace_id e exceção
+- Correlação por mensagem (contextvar) e amostragem de DEBUG por mensagem
+- Handler em fila: o registro não é formatado na thread de quem loga
+- configurar_logging não sobrescreve handlers existentes
+"""
+
+import pytest
+import json
+import logging
+import queue
+import sys
+from pathlib import Path
+
+# Adicionar src ao path
+src_path = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from src.config.logging_config import (
+    FiltroAmostragemDebug,
+    FiltroCorrelacao,
+    FormatadorJSON,
+    _QueueHandlerSemFormatacao,
+    configurar_logging,
+    definir_mensagem_log,
+)
+
+
+def _registro(nivel=logging.INFO, msg="Cliente %s", args=("João",), exc_info=None):
+    return logging.LogRecord("src.nodes.agent", nivel, __file__, 10, msg, args, exc_info)
+
+
+@pytest.fixture(autouse=True)
+def limpar_mensagem():
+    definir_mensagem_log(None)
+    yield
+    definir_mensagem_log(None)
+
+
+@pytest.mark.unit
+def test_formatador_json_campos():
+    """Uma linha JSON com os campos de correlação."""
+    definir_mensagem_log("3EB0ABC")
+    registro = _registro()
+    FiltroCorrelacao().filter(registro)
+
+    linha = json.loads(FormatadorJSON().format(registro))
+
+    assert linha["nivel"] == "INFO"
+    assert linha["logger"] == "src.nodes.agent"
+    assert linha["msg"] == "Cliente João"
+    assert linha["mensagem_id"] == "3EB0ABC"
+    assert "trace_id" not in linha
+    assert linha["ts"].endswith("+00:00")
+
+
+@pytest.mark.unit
+def test_formatador_json_excecao():
+    """Exceções vão no campo exc."""
+    try:
+        raise ValueError("falhou")
+    except ValueError:
+        registro = _registro(nivel=logging.ERROR, msg="erro", args=(), exc_info=sys.exc_info())
+
+    linha = json.loads(FormatadorJSON().format(registro))
+
+    assert "ValueError: falhou" in linha["exc"]
+    assert "mensagem_id" not in linha
+
+
+@pytest.mark.unit
+def test_correlacao_com_trace():
+    """Com um span ativo, o trace_id entra no registro."""
+    pytest.importorskip("opentelemetry.sdk")
+    from opentelemetry.sdk.trace import TracerProvider
+
+    tracer = TracerProvider().get_tracer("teste")
+    with tracer.start_as_current_span("webhook") as span:
+        registro = _registro()
+        FiltroCorrelacao().filter(registro)
+
+    assert registro.trace_id == format(span.get_span_context().trace_id, "032x")
+
+
+@pytest.mark.unit
+def test_amostragem_debug_por_mensagem():
+    """A decisão é a mesma para todas as linhas da mesma mensagem."""
+    filtro = FiltroAmostragemDebug(0.5)
+
+    decisoes = {}
+    for indice in range(200):
+        mensagem_id = f"MSG{indice}"
+        definir_mensagem_log(mensagem_id)
+        resultados = {filtro.filter(_registro(nivel=logging.DEBUG)) for _ in range(5)}
+        assert len(resultados) == 1
+        decisoes[mensagem_id] = resultados.pop()
+
+    assert 40 < sum(decisoes.values()) < 160
+
+    # INFO e acima nunca são descartados
+    assert filtro.filter(_registro(nivel=logging.INFO))
+
+
+@pytest.mark.unit
+def test_amostragem_debug_extremos():
+    """Taxa 1.0 mantém tudo; 0.0 descarta todo DEBUG."""
+    definir_mensagem_log("MSG1")
+
+    assert FiltroAmostragemDebug(1.0).filter(_registro(nivel=logging.DEBUG))
+    assert not FiltroAmostragemDebug(0.0).filter(_registro(nivel=logging.DEBUG))
+    assert FiltroAmostragemDebug(0.0).filter(_registro(nivel=logging.WARNING))
+
+
+@pytest.mark.unit
+def test_fila_nao_formata_na_thread_de_quem_loga():
+    """O registro vai para a fila com msg e args intactos."""
+    fila = queue.SimpleQueue()
+    handler = _QueueHandlerSemFormatacao(fila)
+
+    registro = _registro()
+    handler.handle(registro)
+
+    enfileirado = fila.get_nowait()
+    assert enfileirado is registro
+    assert enfileirado.msg == "Cliente %s"
+    assert enfileirado.args == ("João",)
+    assert not hasattr(enfileirado, "message")
+
+
+@pytest.mark.unit
+def test_configurar_logging_respeita_handlers_existentes():
+    """Como basicConfig, não mexe em um root logger já configurado."""
+    raiz = logging.getLogger()
+    handler = logging.NullHandler()
+    raiz.addHandler(handler)
+    try:
+        handlers_antes = list(raiz.handlers)
+        configurar_logging(nivel="DEBUG", formato="json", arquivo=None)
+        assert raiz.handlers == handlers_antes
+    finally:
+        raiz.removeHandler(handler)
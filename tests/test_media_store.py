@@ -0,0 +1,195 @@
+"""
+Testes para o store de mídias do webhook.
+
+Testa:
+- MediaStore (memória, despejo para disco e TTL)
+- validar_webhook movendo o payload base64 para o store
+- ParserWebhookStreaming (parse incremental do corpo do webhook)
+- processar_mensagem libera as mídias da mensagem ao terminar
+"""
+
+import base64
+import json
+import time
+import pytest
+import sys
+from pathlib import Path
+
+# Adicionar src ao path
+src_path = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from cache.media_store import MediaStore
+from nodes.webhook import validar_webhook
+from utils.webhook_stream import ParserWebhookStreaming
+
+
+# ==============================================
+# TESTES DE MediaStore
+# ==============================================
+
+@pytest.mark.unit
+def test_store_armazena_e_remove(tmp_path):
+    """Mídia armazenada deve ser materializada e liberada após remover."""
+    store = MediaStore(max_memory_bytes=1024, spill_dir=str(tmp_path), ttl=60)
+    ref = store.armazenar_base64(base64.b64encode(b"audio").decode(), "audio/ogg")
+
+    assert ref.startswith("media:")
+    assert store.obter(ref) == (b"audio", "audio/ogg")
+
+    store.remover(ref)
+
+    assert store.obter(ref) is None
+    assert store.estatisticas()["bytes_em_memoria"] == 0
+
+
+@pytest.mark.unit
+def test_store_despeja_para_disco(tmp_path):
+    """Acima do limite de memória, as mídias mais antigas vão para disco."""
+    store = MediaStore(max_memory_bytes=10, spill_dir=str(tmp_path), ttl=60)
+    ref_antiga = store.armazenar(b"123456", "image/jpeg")
+    ref_nova = store.armazenar(b"abcdef", "image/jpeg")
+
+    estatisticas = store.estatisticas()
+    assert estatisticas["em_disco"] == 1
+    assert estatisticas["bytes_em_memoria"] == 6
+    assert store.obter(ref_antiga) == (b"123456", "image/jpeg")
+    assert store.obter(ref_nova) == (b"abcdef", "image/jpeg")
+
+    store.remover(ref_antiga)
+
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.unit
+def test_store_expira_por_ttl(tmp_path, monkeypatch):
+    """Mídias não consumidas expiram após o TTL."""
+    store = MediaStore(max_memory_bytes=1024, spill_dir=str(tmp_path), ttl=60)
+    ref = store.armazenar(b"audio", "audio/ogg")
+
+    agora = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: agora + 61)
+
+    assert store.obter(ref) is None
+
+
+# ==============================================
+# TESTES DE validar_webhook COM MÍDIA
+# ==============================================
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_validar_webhook_guarda_apenas_referencia(webhook_data_audio):
+    """O payload sai do webhook e do estado; fica só a referência."""
+    # Os nós importam via pacote "src", então o singleton é o de src.cache
+    from src.cache.media_store import get_media_store
+
+    audio = webhook_data_audio["body"]["data"]["message"]["audioMessage"]
+    audio["base64"] = base64.b64encode(b"bytes do audio").decode()
+
+    result = await validar_webhook({"raw_webhook_data": webhook_data_audio, "next_action": ""})
+
+    assert "base64" not in result["mensagem_base64"]
+    assert "base64" not in result["raw_webhook_data"]["body"]["data"]["message"]["audioMessage"]
+
+    midia = get_media_store().obter(result["mensagem_media_ref"])
+    assert midia == (b"bytes do audio", "audio/ogg; codecs=opus")
+
+
+# ==============================================
+# TESTES DE ParserWebhookStreaming
+# ==============================================
+
+def _parsear_em_pedacos(corpo: bytes, store: MediaStore, tamanho_pedaco: int) -> dict:
+    parser = ParserWebhookStreaming(store)
+    for i in range(0, len(corpo), tamanho_pedaco):
+        parser.alimentar(corpo[i:i + tamanho_pedaco])
+    return parser.finalizar(), parser.referencias
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("tamanho_pedaco", [1, 3, 7, 4096])
+def test_parser_desvia_midia_para_store(tmp_path, tamanho_pedaco):
+    """O base64 vai para o store; o envelope mantém os demais campos."""
+    store = MediaStore(max_memory_bytes=1024, spill_dir=str(tmp_path), ttl=60)
+    audio = bytes(range(256)) * 8  # maior que o limite: escrita segue direto para disco
+    payload = {
+        "event": "messages.upsert",
+        "data": {
+            "key": {"remoteJid": "5562999999999@s.whatsapp.net", "fromMe": False},
+            "pushName": "Jo\u00e3o \"Teste\"",
+            "messageType": "audioMessage",
+            "message": {"audioMessage": {"base64": base64.b64encode(audio).decode(), "mimetype": "audio/ogg"}},
+        },
+    }
+    # Alguns serializadores escapam "/" dentro do base64
+    corpo = json.dumps(payload).replace("/", "\\/").encode()
+
+    webhook_data, refs = _parsear_em_pedacos(corpo, store, tamanho_pedaco)
+
+    audio_msg = webhook_data["data"]["message"]["audioMessage"]
+    assert audio_msg["base64"] == refs[0]
+    assert audio_msg["mimetype"] == "audio/ogg"
+    assert webhook_data["data"]["pushName"] == payload["data"]["pushName"]
+    assert store.obter(refs[0])[0] == audio
+    assert store.estatisticas()["em_disco"] == 1
+
+
+@pytest.mark.unit
+def test_parser_json_invalido_descarta_midias(tmp_path):
+    """Corpo truncado levanta erro e não deixa mídia órfã no store."""
+    store = MediaStore(max_memory_bytes=1024, spill_dir=str(tmp_path), ttl=60)
+    corpo = b'{"data": {"media": "' + base64.b64encode(b"x" * 100) + b'"}, "event": '
+
+    with pytest.raises(json.JSONDecodeError):
+        _parsear_em_pedacos(corpo, store, 16)
+
+    assert store.estatisticas()["entradas"] == 0
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("tamanho_pedaco", [1, 5, 4096])
+@pytest.mark.parametrize("valor", [
+    "not base64 at all!",
+    "abcde",
+    r"https:\/\/mmg.whatsapp.net\/v\/t62.7118-24\/foto.enc",
+    r'texto com \"aspas\" e \u00e9',
+])
+def test_parser_mantem_valor_que_nao_e_base64(tmp_path, tamanho_pedaco, valor):
+    """Campo de mídia que não é base64 fica no envelope como o json.loads leria; nada vai para o store."""
+    store = MediaStore(max_memory_bytes=1024, spill_dir=str(tmp_path), ttl=60)
+    corpo = ('{"data": {"imageMessage": {"media": "' + valor + '", "caption": "oi"}}, "event": "x"}').encode()
+
+    webhook_data, refs = _parsear_em_pedacos(corpo, store, tamanho_pedaco)
+
+    assert webhook_data == json.loads(corpo)
+    assert refs == []
+    assert store.estatisticas()["entradas"] == 0
+
+
+# ==============================================
+# LIBERAÇÃO APÓS O PROCESSAMENTO
+# ==============================================
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+@pytest.mark.parametrize("erro", [None, RuntimeError("falha no grafo")])
+async def test_processar_mensagem_libera_midias(erro):
+    """Vídeo/documento não têm nó que consuma a mídia: o processamento a libera no fim."""
+    from unittest.mock import AsyncMock, patch
+
+    import src.main as main
+    from src.cache.media_store import get_media_store
+
+    store = get_media_store()
+    desviada = store.armazenar_base64(base64.b64encode(b"video").decode(), "video/mp4")
+    do_estado = store.armazenar_base64(base64.b64encode(b"pdf").decode(), "application/pdf")
+
+    ainvoke = AsyncMock(side_effect=erro, return_value={"mensagem_media_ref": do_estado})
+    with patch.object(main.grafo_atendimento, "ainvoke", ainvoke):
+        await main.processar_mensagem({"raw_webhook_data": {}}, referencias_midia=[desviada])
+
+    assert store.obter(desviada) is None
+    if erro is None:
+        assert store.obter(do_estado) is None
+    store.remover(do_estado)
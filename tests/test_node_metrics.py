@@ -0,0 +1,101 @@
+"""
+Testes da latência por etapa do grafo.
+
+Testa:
+- Nós síncronos e assíncronos continuam com o mesmo tipo depois de instrumentados
+- Duração, resultado, bytes escritos e rastro por mensagem_id
+- Exceções são contadas como erro e propagadas
+"""
+
+import asyncio
+import inspect
+import pytest
+import sys
+from pathlib import Path
+
+# Adicionar src ao path
+src_path = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+
+@pytest.fixture
+def metricas():
+    import src.monitoring.node_metrics as node_metrics
+
+    metricas = node_metrics.get_metricas_nos()
+    metricas.zerar()
+    yield metricas
+    metricas.zerar()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_instrumentar_nos_registra_etapas(metricas):
+    """Cada execução entra nos agregados do nó e no rastro da mensagem."""
+    from src.monitoring.node_metrics import instrumentar_no
+
+    def validar(state):
+        state["mensagem_id"] = "MSG1"
+        return state
+
+    async def agente(state):
+        await asyncio.sleep(0.01)
+        state["resposta_agente"] = "Olá! Como posso ajudar?"
+        return state
+
+    def fragmentar(state):
+        state["erro"] = "resposta vazia"
+        return state
+
+    validar_inst = instrumentar_no("validar_webhook", validar)
+    agente_inst = instrumentar_no("processar_agente", agente)
+    fragmentar_inst = instrumentar_no("fragmentar_resposta", fragmentar)
+
+    assert not inspect.iscoroutinefunction(validar_inst)
+    assert inspect.iscoroutinefunction(agente_inst)
+
+    state = validar_inst({"mensagem_id": "", "raw_webhook_data": {"x": 1}})
+    state = await agente_inst(state)
+    fragmentar_inst(state)
+
+    resumo = metricas.resumo()
+
+    assert resumo["nos"]["processar_agente"]["p50_ms"] >= 10
+    assert resumo["nos"]["processar_agente"]["bytes_saida_medio"] == len("Olá! Como posso ajudar?")
+    assert resumo["nos"]["fragmentar_resposta"]["erros"] == 1
+    assert [(e["no"], e["resultado"]) for e in metricas.rastro("MSG1")] == [
+        ("validar_webhook", "ok"),
+        ("processar_agente", "ok"),
+        ("fragmentar_resposta", "erro"),
+    ]
+    assert resumo["mensagens"][0]["mensagem_id"] == "MSG1"
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_excecao_conta_como_erro(metricas):
+    """A exceção do nó é propagada e registrada como erro."""
+    from src.monitoring.node_metrics import instrumentar_no
+
+    async def quebra(state):
+        raise RuntimeError("falhou")
+
+    with pytest.raises(RuntimeError):
+        await instrumentar_no("verificar_cliente", quebra)({"mensagem_id": "MSG2"})
+
+    assert metricas.resumo()["nos"]["verificar_cliente"]["erros"] == 1
+    assert metricas.rastro("MSG2")[0]["resultado"] == "erro"
+
+
+@pytest.mark.unit
+def test_rastros_limitados():
+    """Só as últimas mensagens mantêm rastro."""
+    from src.monitoring.node_metrics import MetricasNos
+
+    metricas = MetricasNos(max_rastros=2)
+    for i in range(3):
+        metricas.registrar("processar_texto", 1.0, "ok", mensagem_id=f"M{i}")
+
+    assert metricas.rastro("M0") == []
+    assert [m["mensagem_id"] for m in metricas.resumo()["mensagens"]] == ["M2", "M1"]
+    assert metricas.resumo()["nos"]["processar_texto"]["execucoes"] == 3
@@ -0,0 +1,171 @@
+"""
+Testes do outbox de notificações dos técnicos.
+
+Testa:
+- enfileirar retorna sem esperar o envio
+- Fan-out concorrente para todos os destinatários
+- Retry por destinatário e erros permanentes
+- Chave de idempotência (repetição não reenvia)
+- Reprocessamento após queda pula quem já recebeu
+- Comandos do backend Redis Streams
+"""
+
+import asyncio
+import pytest
+import sys
+import time
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+# Adicionar src ao path
+src_path = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from utils.idempotency import definir_mensagem_atual, gerar_chave_idempotencia, resetar_mensagem_atual
+from utils.notification_outbox import STATUS_ENVIADO, STATUS_FALHOU, OutboxNotificacoes
+from utils.outbox_storage import ArmazenamentoOutboxMemoria, ArmazenamentoOutboxRedis, Notificacao
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_fan_out_concorrente():
+    """Dois técnicos recebem ao mesmo tempo; enfileirar não espera o envio."""
+    enviados = []
+
+    async def enviar(telefone, texto):
+        await asyncio.sleep(0.1)
+        enviados.append(telefone)
+        return {"key": {"id": "x"}}
+
+    outbox = OutboxNotificacoes(enviar)
+
+    inicio = time.perf_counter()
+    notificacao_id = await outbox.enfileirar("Novo agendamento", ["111", "222", "111"], tipo="agendamento")
+    assert time.perf_counter() - inicio < 0.05
+
+    await outbox.aguardar()
+
+    assert time.perf_counter() - inicio < 0.18
+    assert sorted(enviados) == ["111", "222"]
+    assert {e.status for e in outbox.obter_entregas(notificacao_id)} == {STATUS_ENVIADO}
+    assert outbox.resumo() == {"em_andamento": 0, "entregas": {STATUS_ENVIADO: 2}}
+
+    await outbox.parar()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_retry_por_destinatario():
+    """Falha transitória é repetida; erro permanente não; um destinatário não afeta o outro."""
+    chamadas = {"111": 0, "222": 0}
+
+    async def enviar(telefone, texto):
+        chamadas[telefone] += 1
+        if telefone == "111" and chamadas[telefone] < 3:
+            raise ConnectionError("timeout")
+        if telefone == "222":
+            raise ValueError("número inválido")
+        return {"ok": True}
+
+    outbox = OutboxNotificacoes(enviar, max_tentativas=3, backoff_base=0.001)
+    notificacao_id = await outbox.enfileirar("Cancelamento", ["111", "222"], tipo="cancelamento")
+    await outbox.aguardar()
+
+    entregas = {e.destinatario: e for e in outbox.obter_entregas(notificacao_id)}
+
+    assert entregas["111"].status == STATUS_ENVIADO
+    assert entregas["111"].tentativas == 3
+    assert entregas["222"].status == STATUS_FALHOU
+    assert entregas["222"].tentativas == 1
+    assert entregas["222"].ultimo_erro == "número inválido"
+
+    await outbox.parar()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_chave_idempotencia_nao_reenvia():
+    """A mesma chamada de tool na mesma mensagem gera a mesma chave e um único envio."""
+    enviados = []
+
+    async def enviar(telefone, texto):
+        enviados.append(telefone)
+        return {"ok": True}
+
+    token = definir_mensagem_atual("3EB0A1")
+    try:
+        chave = gerar_chave_idempotencia("contatar_tecnico_tool", {"assunto": "orçamento", "telefone": "5562"})
+        assert chave == gerar_chave_idempotencia("contatar_tecnico_tool", {"telefone": "5562", "assunto": "orçamento"})
+    finally:
+        resetar_mensagem_atual(token)
+
+    assert gerar_chave_idempotencia("contatar_tecnico_tool", {"assunto": "orçamento"}) is None
+    assert chave != gerar_chave_idempotencia("contatar_tecnico_tool", {"assunto": "orçamento", "telefone": "5562"}, "3EB0A2")
+
+    outbox = OutboxNotificacoes(enviar)
+    assert await outbox.enfileirar("Contato", ["111"], chave=chave) == chave
+    await outbox.aguardar()
+    assert await outbox.enfileirar("Contato", ["111"], chave=chave) == chave
+    await outbox.aguardar()
+
+    assert enviados == ["111"]
+    await outbox.parar()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_reprocessamento_pula_enviados():
+    """Notificação lida e não confirmada (queda do worker) é reivindicada sem reenviar a quem recebeu."""
+    armazenamento = ArmazenamentoOutboxMemoria()
+    notificacao = Notificacao(id="n1", texto="Novo agendamento", destinatarios=["111", "222"])
+
+    # Worker anterior: leu, entregou ao 111 e caiu antes de confirmar
+    assert await armazenamento.adicionar(notificacao) is True
+    assert await armazenamento.ler(bloqueio=0.1) == [notificacao]
+    await armazenamento.marcar_enviado(notificacao, "111")
+
+    enviados = []
+
+    async def enviar(telefone, texto):
+        enviados.append(telefone)
+        return {"ok": True}
+
+    outbox = OutboxNotificacoes(enviar, armazenamento=armazenamento, ociosidade=0)
+    outbox.iniciar()
+    await outbox.aguardar()
+
+    assert enviados == ["222"]
+    assert await armazenamento.pendentes() == 0
+    await outbox.parar()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_armazenamento_redis_comandos():
+    """Redis Streams: SET NX + XADD em um script, XREADGROUP lê, XACK/XDEL confirmam."""
+    redis = MagicMock()
+    redis.eval = AsyncMock(side_effect=["1-0", None])
+    redis.xreadgroup = AsyncMock()
+    redis.xack = AsyncMock()
+    redis.xdel = AsyncMock()
+    redis.delete = AsyncMock()
+
+    armazenamento = ArmazenamentoOutboxRedis(redis, stream="outbox:teste", consumidor="w1", ttl_chaves=60)
+    notificacao = Notificacao(id="k1", texto="Oi", destinatarios=["111"], tipo="contato")
+
+    assert await armazenamento.adicionar(notificacao) is True
+    assert notificacao.entrada == "1-0"
+    script, quantidade, chave, stream, ttl, dados = redis.eval.call_args.args
+    assert "NX" in script and "xadd" in script and "del" in script
+    assert (quantidade, chave, stream, ttl) == (2, "outbox:teste:chave:k1", "outbox:teste", 60)
+    assert await armazenamento.adicionar(notificacao) is False
+
+    redis.xreadgroup.return_value = [["outbox:teste", [("1-0", {"dados": dados})]]]
+    [lida] = await armazenamento.ler(bloqueio=0.5)
+    assert (lida.id, lida.entrada, lida.destinatarios, lida.tipo) == ("k1", "1-0", ["111"], "contato")
+    assert redis.xreadgroup.call_args.args == ("relay", "w1", {"outbox:teste": ">"})
+    assert redis.xreadgroup.call_args.kwargs["block"] == 500
+
+    await armazenamento.confirmar(lida)
+    redis.xack.assert_awaited_once_with("outbox:teste", "relay", "1-0")
+    redis.xdel.assert_awaited_once_with("outbox:teste", "1-0")
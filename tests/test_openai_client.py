@@ -0,0 +1,80 @@
+"""
+Testes do registro de clientes OpenAI compartilhados.
+
+Testa:
+- Pools HTTP únicos por processo (async e sync)
+- ChatOpenAI/embeddings cacheados e presos aos pools compartilhados
+- Timeout por modelo (AGENT_TIMEOUT no agente)
+- fechar_clientes_openai fecha os pools e esvazia os caches
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Adicionar src ao path
+src_path = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+import src.clients.openai_client as openai_client
+
+
+@pytest.fixture
+async def registro(monkeypatch):
+    """Registro limpo, com chave de API de teste."""
+    monkeypatch.setattr(openai_client.get_settings(), "openai_api_key", "sk-teste")
+    await openai_client.fechar_clientes_openai()
+    yield openai_client
+    await openai_client.fechar_clientes_openai()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_pools_e_clientes_compartilhados(registro):
+    """Todos os clientes usam os mesmos dois pools HTTP."""
+    pool_async = registro.get_http_async_client()
+    pool_sync = registro.get_http_sync_client()
+
+    assert registro.get_http_async_client() is pool_async
+    assert registro.get_http_sync_client() is pool_sync
+    assert registro.get_openai_client() is registro.get_openai_client()
+    assert registro.get_openai_client()._client is pool_async
+    assert registro.get_openai_sync_client()._client is pool_sync
+
+    llm = registro.get_chat_model("gpt-4o-mini")
+    assert llm.http_async_client is pool_async
+    assert llm.http_client is pool_sync
+    assert registro.get_embeddings().http_async_client is pool_async
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_modelos_cacheados_por_configuracao(registro):
+    """Mesma configuração devolve a mesma instância; timeout próprio gera outra."""
+    settings = registro.get_settings()
+
+    padrao = registro.get_chat_model("gpt-4o-mini", temperature=0.2)
+    agente = registro.get_chat_model("gpt-4o-mini", temperature=0.2, timeout=120)
+
+    assert registro.get_chat_model("gpt-4o-mini", temperature=0.2) is padrao
+    assert registro.get_chat_model("gpt-4o-mini", temperature=0.2, timeout=120) is agente
+    assert registro.get_chat_model("gpt-4o-mini", temperature=0.9) is not padrao
+    assert padrao.request_timeout == settings.openai_timeout
+    assert agente.request_timeout == 120
+    assert registro.get_embeddings() is registro.get_embeddings()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_fechar_clientes_openai(registro):
+    """Fechar encerra os pools e esvazia os caches; o próximo uso recria tudo."""
+    pool_async = registro.get_http_async_client()
+    pool_sync = registro.get_http_sync_client()
+    llm = registro.get_chat_model("gpt-4o-mini")
+
+    await registro.fechar_clientes_openai()
+
+    assert pool_async.is_closed and pool_sync.is_closed
+    assert registro.get_http_async_client() is not pool_async
+    assert registro.get_chat_model("gpt-4o-mini") is not llm
+    assert registro.get_chat_model("gpt-4o-mini").http_async_client is registro.get_http_async_client()
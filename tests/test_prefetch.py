@@ -0,0 +1,119 @@
+"""
+Testes do prefetch especulativo das tools.
+
+Testa:
+- Detector de intenção por palavras-chave
+- Resultado antecipado entregue ao executor (uma vez, só se os argumentos batem)
+- Busca antecipada da base de conhecimento só para a mesma consulta
+- Cancelamento e contagem dos prefetches não usados
+"""
+
+import asyncio
+import pytest
+import sys
+import time
+from pathlib import Path
+
+# Adicionar src ao path
+src_path = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from tools.prefetch import (
+    INTENCAO_AGENDA,
+    INTENCAO_CONHECIMENTO,
+    PrefetchEspeculativo,
+    busca_corresponde,
+    detectar_intencoes,
+    obter_contadores_prefetch,
+    zerar_contadores_prefetch,
+)
+
+
+@pytest.mark.unit
+def test_detectar_intencoes():
+    """Preço aciona a base de conhecimento; horário ou data acionam a agenda."""
+    assert detectar_intencoes("Quanto custa o forro de gesso?") == {INTENCAO_CONHECIMENTO}
+    assert detectar_intencoes("Tem horário disponível?") == {INTENCAO_AGENDA}
+    assert detectar_intencoes("pode ser amanhã?", tem_data=True) == {INTENCAO_AGENDA}
+    assert detectar_intencoes("Oi, bom dia!") == set()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_resultado_antecipado_em_paralelo():
+    """A busca roda junto com o 'LLM': a latência é o máximo, não a soma; cada prefetch atende uma chamada."""
+    zerar_contadores_prefetch()
+    prefetch = PrefetchEspeculativo()
+
+    async def buscar():
+        await asyncio.sleep(0.1)
+        return {"sucesso": True, "dados": {"horarios": ["14:00"]}}
+
+    inicio = time.perf_counter()
+    prefetch.iniciar("agendamento_tool", buscar(), corresponde=lambda args: args.get("intencao") == "consultar")
+    await asyncio.sleep(0.1)  # primeira chamada ao LLM
+
+    assert await prefetch.obter("agendamento_tool", {"intencao": "agendar"}) == (False, None)
+    encontrado, resultado = await prefetch.obter("agendamento_tool", {"intencao": "consultar"})
+
+    assert time.perf_counter() - inicio < 0.18
+    assert encontrado and resultado["dados"]["horarios"] == ["14:00"]
+    assert await prefetch.obter("agendamento_tool", {"intencao": "consultar"}) == (False, None)
+
+    prefetch.encerrar()
+    assert obter_contadores_prefetch() == {"agendamento_tool": {"iniciado": 1, "usado": 1}}
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_prefetch_nao_usado_e_cancelado():
+    """Prefetch que o LLM não pediu é cancelado e contado como desperdício; falha cai na tool."""
+    zerar_contadores_prefetch()
+    prefetch = PrefetchEspeculativo()
+
+    async def falhar():
+        raise RuntimeError("supabase fora")
+
+    lenta = prefetch.iniciar("buscar_base_conhecimento", asyncio.sleep(10))
+    prefetch.iniciar("agendamento_tool", falhar())
+
+    assert await prefetch.obter("agendamento_tool", {}) == (False, None)
+
+    prefetch.encerrar()
+    await asyncio.sleep(0)
+
+    assert lenta.cancelled()
+    assert obter_contadores_prefetch() == {
+        "buscar_base_conhecimento": {"iniciado": 1, "desperdicado": 1},
+        "agendamento_tool": {"iniciado": 1, "falhou": 1},
+    }
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_busca_antecipada_so_para_a_mesma_consulta():
+    """A busca antecipada só atende o LLM se ele pedir (quase) o mesmo texto; senão a tool roda."""
+    mensagem = "Oi, quanto custa o forro de gesso?"
+
+    assert busca_corresponde(mensagem, {"__arg1": "oi, quanto custa o FORRO de gesso?"})
+    assert busca_corresponde(mensagem, {"__arg1": "quanto custa forro gesso"})
+    assert busca_corresponde(mensagem, {"query": "preço forro de gesso"})
+    assert not busca_corresponde(mensagem, {"__arg1": "área de atendimento em Anápolis"})
+    assert not busca_corresponde(mensagem, {})
+
+    prefetch = PrefetchEspeculativo()
+
+    async def buscar():
+        return ["documento sobre forro de gesso"]
+
+    prefetch.iniciar(
+        "buscar_base_conhecimento",
+        buscar(),
+        corresponde=lambda argumentos: busca_corresponde(mensagem, argumentos)
+    )
+
+    assert await prefetch.obter("buscar_base_conhecimento", {"__arg1": "garantia do drywall"}) == (False, None)
+    encontrado, resultado = await prefetch.obter("buscar_base_conhecimento", {"__arg1": "custo forro de gesso"})
+    assert encontrado and resultado == ["documento sobre forro de gesso"]
+
+    prefetch.encerrar()
@@ -0,0 +1,96 @@
+"""
+Testes das métricas Prometheus.
+
+Testa:
+- Callback do LangChain: latência, tokens e erros por modelo
+- Event hooks do Supabase: operação por tabela/RPC e erros HTTP
+- Operação da Evolution API e exposição no formato Prometheus
+"""
+
+import pytest
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from uuid import uuid4
+
+import httpx
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+# Adicionar src ao path
+src_path = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from src.monitoring.prometheus_metrics import (
+    REGISTRO,
+    CallbackMetricasLLM,
+    gerar_metricas,
+    instrumentar_supabase,
+    medir_chamada,
+    operacao_evolution,
+)
+
+
+def _valor(nome, **rotulos):
+    return REGISTRO.get_sample_value(nome, rotulos) or 0
+
+
+@pytest.mark.unit
+def test_callback_llm_registra_latencia_tokens_e_erros():
+    """Cada chamada observa duração e tokens de entrada/saída; falhas contam erro."""
+    callback = CallbackMetricasLLM("modelo-teste")
+    chamadas = _valor("atendimento_llm_duracao_segundos_count", modelo="modelo-teste")
+    tokens = _valor("atendimento_llm_tokens_sum", modelo="modelo-teste", tipo="entrada")
+
+    run_id = uuid4()
+    callback.on_chat_model_start({}, [[]], run_id=run_id)
+    mensagem = AIMessage(
+        content="Olá!",
+        usage_metadata={"input_tokens": 1200, "output_tokens": 30, "total_tokens": 1230}
+    )
+    callback.on_llm_end(LLMResult(generations=[[ChatGeneration(message=mensagem)]]), run_id=run_id)
+
+    erro_id = uuid4()
+    callback.on_chat_model_start({}, [[]], run_id=erro_id)
+    callback.on_llm_error(RuntimeError("timeout"), run_id=erro_id)
+
+    assert _valor("atendimento_llm_duracao_segundos_count", modelo="modelo-teste") == chamadas + 1
+    assert _valor("atendimento_llm_tokens_sum", modelo="modelo-teste", tipo="entrada") == tokens + 1200
+    assert _valor("atendimento_llm_erros_total", modelo="modelo-teste") >= 1
+    assert callback._inicios == {}
+
+
+@pytest.mark.unit
+def test_supabase_instrumentado_por_tabela():
+    """Consultas viram `<MÉTODO> <tabela>`; respostas >= 400 contam como erro."""
+    def responder(requisicao):
+        return httpx.Response(500 if "rpc" in requisicao.url.path else 200, json=[])
+
+    sessao = httpx.Client(transport=httpx.MockTransport(responder))
+    instrumentar_supabase(SimpleNamespace(postgrest=SimpleNamespace(session=sessao)))
+
+    rotulos_leads = {"servico": "supabase", "operacao": "GET leads"}
+    rotulos_rpc = {"servico": "supabase", "operacao": "POST rpc/carregar_contexto_conversa"}
+    antes_leads = _valor("atendimento_chamada_externa_duracao_segundos_count", **rotulos_leads)
+    antes_erros = _valor("atendimento_chamada_externa_erros_total", **rotulos_rpc)
+
+    sessao.get("http://supabase.local/rest/v1/leads?telefone=eq.5562999990001")
+    sessao.post("http://supabase.local/rest/v1/rpc/carregar_contexto_conversa", json={})
+
+    assert _valor("atendimento_chamada_externa_duracao_segundos_count", **rotulos_leads) == antes_leads + 1
+    assert _valor("atendimento_chamada_externa_erros_total", **rotulos_rpc) == antes_erros + 1
+
+
+@pytest.mark.unit
+def test_medir_chamada_e_exposicao():
+    """Exceções contam como erro e são propagadas; saída no formato Prometheus."""
+    rotulos = {"servico": "openai", "operacao": "whisper"}
+    antes = _valor("atendimento_chamada_externa_erros_total", **rotulos)
+
+    with pytest.raises(ValueError):
+        with medir_chamada("openai", "whisper"):
+            raise ValueError("áudio inválido")
+
+    assert _valor("atendimento_chamada_externa_erros_total", **rotulos) == antes + 1
+    assert operacao_evolution("https://evo.local/message/sendText/instancia") == "message/sendText"
+    assert b"# TYPE atendimento_primeira_resposta_segundos histogram" in gerar_metricas()
@@ -0,0 +1,246 @@
+"""
+Testes da reserva temporária de horários.
+
+Testa:
+- ReservaHorariosMemoria (exclusividade, liberação por token, expiração)
+- Horários sobrepostos com inícios diferentes disputam as mesmas células
+- ReservaHorariosRedis (script de reserva com PX / liberação atômica / MGET)
+- agendar_horario concorrente: só uma conversa agenda o mesmo horário
+- agendar_horario concorrente com horários sobrepostos (14:00 e 14:30)
+- agendar_horario repetido com a mesma chave de idempotência não duplica
+"""
+
+import asyncio
+import pytest
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+from zoneinfo import ZoneInfo
+
+from googleapiclient.errors import HttpError
+
+# Adicionar src ao path
+src_path = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from tools.reservations import ReservaHorariosMemoria, ReservaHorariosRedis
+
+FUSO = ZoneInfo("America/Sao_Paulo")
+HORARIO = datetime(2030, 1, 2, 14, tzinfo=FUSO)
+FIM = HORARIO + timedelta(hours=1)
+SEGUINTE = (FIM, FIM + timedelta(hours=1))
+
+
+# ==============================================
+# TESTES DOS BACKENDS
+# ==============================================
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_reserva_memoria_exclusiva():
+    """Segunda reserva é recusada; só o dono libera; o mesmo horário em UTC colide."""
+    reservas = ReservaHorariosMemoria(ttl=30)
+
+    token = await reservas.reservar(HORARIO, FIM, dono="a")
+    assert token is not None
+    assert await reservas.reservar(HORARIO.astimezone(ZoneInfo("UTC")), FIM, dono="b") is None
+    assert await reservas.reservados([(HORARIO, FIM), SEGUINTE]) == {HORARIO}
+
+    await reservas.liberar(HORARIO, FIM, "token-de-outro")
+    assert await reservas.reservar(HORARIO, FIM) is None
+
+    await reservas.liberar(HORARIO, FIM, token)
+    assert await reservas.reservar(HORARIO, FIM) is not None
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_reserva_memoria_horarios_sobrepostos():
+    """14:00-15:00 bloqueia 14:30-15:30, mas não 15:00-16:00; a recusa não reserva nada."""
+    reservas = ReservaHorariosMemoria(ttl=30, resolucao=30)
+    meia = HORARIO + timedelta(minutes=30)
+
+    token = await reservas.reservar(HORARIO, FIM)
+    assert await reservas.reservar(meia, meia + timedelta(hours=1)) is None
+    assert await reservas.reservar(HORARIO - timedelta(minutes=30), meia) is None
+    assert await reservas.reservados([(meia, meia + timedelta(hours=1)), SEGUINTE]) == {meia}
+
+    # Tudo ou nada: a tentativa recusada não deixou a célula das 15:00 tomada
+    token_seguinte = await reservas.reservar(*SEGUINTE)
+    assert token_seguinte is not None
+
+    await reservas.liberar(HORARIO, FIM, token)
+    await reservas.liberar(*SEGUINTE, token_seguinte)
+    assert await reservas.reservar(meia, meia + timedelta(hours=1)) is not None
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_reserva_memoria_expira():
+    """Reserva abandonada deixa de valer após o TTL."""
+    reservas = ReservaHorariosMemoria(ttl=0)
+
+    assert await reservas.reservar(HORARIO, FIM) is not None
+    assert await reservas.reservar(HORARIO, FIM) is not None
+    assert await reservas.reservados([(HORARIO, FIM)]) == set()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_reserva_redis_comandos():
+    """Reserva todas as células em um script com PX; liberação compara o token no servidor."""
+    redis = MagicMock()
+    redis.eval = AsyncMock(side_effect=[1, 0, 2])
+    redis.mget = AsyncMock(return_value=[b"tok", None, None])
+
+    reservas = ReservaHorariosRedis(redis, calendar_id="agenda", ttl=30, resolucao=30)
+
+    token = await reservas.reservar(HORARIO, FIM)
+    script, quantidade, *argumentos = redis.eval.call_args.args
+    assert "PX" in script
+    assert quantidade == 2
+    assert argumentos == [
+        "reserva:slot:{agenda}:20300102T1700",
+        "reserva:slot:{agenda}:20300102T1730",
+        token,
+        30000,
+    ]
+
+    assert await reservas.reservar(HORARIO, FIM) is None
+
+    await reservas.liberar(HORARIO, FIM, token)
+    assert redis.eval.call_args.args[1:] == (2, *argumentos[:2], token)
+
+    meia = HORARIO + timedelta(minutes=30)
+    assert await reservas.reservados([(meia, meia + timedelta(hours=1)), SEGUINTE]) == {meia}
+    assert redis.mget.call_args.args[0] == [
+        "reserva:slot:{agenda}:20300102T1730",
+        "reserva:slot:{agenda}:20300102T1800",
+        "reserva:slot:{agenda}:20300102T1830",
+    ]
+
+
+# ==============================================
+# TESTE DE CONCORRÊNCIA
+# ==============================================
+
+class _GatewayLento:
+    """Calendar falso em que a verificação demora (abre a janela da corrida)."""
+
+    def __init__(self):
+        self.eventos = []
+        self.service = MagicMock()
+        eventos = self.service.events.return_value
+        eventos.list.side_effect = lambda **kw: ("list", kw)
+        eventos.insert.side_effect = lambda **kw: ("insert", kw)
+        eventos.get.side_effect = lambda **kw: ("get", kw)
+
+    async def executar(self, requisicao):
+        metodo, kw = requisicao
+        await asyncio.sleep(0.01)
+
+        if metodo == "list":
+            return {"items": list(self.eventos)}
+
+        if metodo == "get":
+            return next(e for e in self.eventos if e["id"] == kw["eventId"])
+
+        if any(e["id"] == kw["body"].get("id") for e in self.eventos):
+            raise HttpError(MagicMock(status=409), b"duplicate")
+
+        evento = dict(kw["body"], id=kw["body"].get("id", f"e{len(self.eventos)}"))
+        self.eventos.append(evento)
+        return evento
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_agendamentos_concorrentes_mesmo_horario():
+    """Duas conversas agendando o mesmo horário: apenas uma consegue."""
+    import src.tools.scheduling as scheduling
+
+    inicio = (datetime.now(FUSO) + timedelta(days=2)).replace(hour=10, minute=0, second=0, microsecond=0)
+    gateway = _GatewayLento()
+
+    with patch.object(scheduling, "_get_calendar_gateway", return_value=gateway), \
+         patch.object(scheduling, "get_reserva_horarios", return_value=ReservaHorariosMemoria()), \
+         patch.object(scheduling, "_motor_disponibilidade", MagicMock()), \
+         patch.object(scheduling, "_notificar_tecnico", AsyncMock()):
+
+        resultados = await asyncio.gather(*[
+            scheduling.agendar_horario(
+                nome_cliente=nome,
+                telefone_cliente=telefone,
+                email_cliente="sememail@gmail.com",
+                data_consulta_reuniao=inicio.strftime("%d/%m/%Y %H:%M")
+            )
+            for nome, telefone in (("Ana", "5562911111111"), ("Bia", "5562922222222"))
+        ])
+
+    assert sorted(r["sucesso"] for r in resultados) == [False, True]
+    assert len(gateway.eventos) == 1
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_agendamentos_concorrentes_horarios_sobrepostos():
+    """14:00 e 14:30 ao mesmo tempo: os atendimentos se sobrepõem, apenas um é agendado."""
+    import src.tools.scheduling as scheduling
+
+    inicio = (datetime.now(FUSO) + timedelta(days=2)).replace(hour=14, minute=0, second=0, microsecond=0)
+    gateway = _GatewayLento()
+
+    with patch.object(scheduling, "_get_calendar_gateway", return_value=gateway), \
+         patch.object(scheduling, "get_reserva_horarios", return_value=ReservaHorariosMemoria()), \
+         patch.object(scheduling, "_motor_disponibilidade", MagicMock()), \
+         patch.object(scheduling, "_notificar_tecnico", AsyncMock()):
+
+        resultados = await asyncio.gather(*[
+            scheduling.agendar_horario(
+                nome_cliente=nome,
+                telefone_cliente=telefone,
+                email_cliente="sememail@gmail.com",
+                data_consulta_reuniao=horario.strftime("%d/%m/%Y %H:%M")
+            )
+            for nome, telefone, horario in (
+                ("Ana", "5562911111111", inicio),
+                ("Bia", "5562922222222", inicio + timedelta(minutes=30)),
+            )
+        ])
+
+    assert sorted(r["sucesso"] for r in resultados) == [False, True]
+    assert len(gateway.eventos) == 1
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_agendamento_repetido_mesma_chave():
+    """Reprocessar a mesma mensagem devolve o evento já criado, sem duplicar nem renotificar."""
+    import src.tools.scheduling as scheduling
+
+    inicio = (datetime.now(FUSO) + timedelta(days=2)).replace(hour=15, minute=0, second=0, microsecond=0)
+    gateway = _GatewayLento()
+    notificar = AsyncMock()
+    chave = "0123456789abcdef0123456789abcdef"
+
+    with patch.object(scheduling, "_get_calendar_gateway", return_value=gateway), \
+         patch.object(scheduling, "get_reserva_horarios", return_value=ReservaHorariosMemoria()), \
+         patch.object(scheduling, "_motor_disponibilidade", MagicMock()), \
+         patch.object(scheduling, "_notificar_tecnico", notificar):
+
+        resultados = [
+            await scheduling.agendar_horario(
+                nome_cliente="Ana",
+                telefone_cliente="5562911111111",
+                email_cliente="sememail@gmail.com",
+                data_consulta_reuniao=inicio.strftime("%d/%m/%Y %H:%M"),
+                chave_idempotencia=chave
+            )
+            for _ in range(2)
+        ]
+
+    assert [r["sucesso"] for r in resultados] == [True, True]
+    assert [r["dados"]["evento_id"] for r in resultados] == [chave, chave]
+    assert len(gateway.eventos) == 1
+    assert {c.kwargs["chave"] for c in notificar.call_args_list} == {f"agendamento:{chave}"}
@@ -0,0 +1,152 @@
+"""
+Testes do roteador de mensagens triviais.
+
+Testa:
+- Classificação por regras (saudações, emojis, perguntas, intenções)
+- Resposta do modelo pequeno sem passar pelo agente
+- Escalonamento: classificador, "ok" ou "beleza" respondendo pergunta do bot, falhas
+"""
+
+import pytest
+import sys
+import threading
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from langchain_core.messages import AIMessage
+
+# Adicionar src ao path
+src_path = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from nodes.router import ROTA_AGENTE, ROTA_TRIVIAL, classificar_por_regras
+from models.state import AcaoFluxo
+
+
+def _modelo(*conteudos: str) -> MagicMock:
+    """ChatOpenAI falso que responde os conteúdos em ordem, com uso de tokens."""
+    llm = MagicMock()
+    llm.ainvoke = AsyncMock(side_effect=[
+        AIMessage(
+            content=c,
+            usage_metadata={"input_tokens": 100, "output_tokens": 20, "total_tokens": 120}
+        )
+        for c in conteudos
+    ])
+    return llm
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("texto, rota", [
+    ("ok", ROTA_TRIVIAL),
+    ("Obrigado!! 🙏", ROTA_TRIVIAL),
+    ("👍👍", ROTA_TRIVIAL),
+    ("Oi Carol, tudo bem?", ROTA_TRIVIAL),
+    ("valeu, até mais!", ROTA_TRIVIAL),
+    ("Quanto custa o forro?", ROTA_AGENTE),
+    ("amanhã às 14h", ROTA_AGENTE),
+    ("tem horário livre?", ROTA_AGENTE),
+    ("quero fazer o orçamento de uma parede para a sala", ROTA_AGENTE),
+    ("sim", None),
+])
+def test_classificar_por_regras(texto, rota):
+    """Regras decidem os casos óbvios; mensagens curtas ambíguas ficam indefinidas."""
+    assert classificar_por_regras(texto) == rota
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_mensagem_trivial_respondida_pelo_modelo_pequeno():
+    """Saudação não passa pelo agente: resposta curta e segue para a fragmentação."""
+    import src.nodes.router as router
+
+    router.zerar_estatisticas_roteador()
+    llm = _modelo("Bom dia, Ana! Como posso te ajudar hoje?")
+
+    with patch.object(router, "get_chat_model", return_value=llm), \
+         patch.object(router.settings, "enable_memory_persistence", False):
+        state = await router.rotear_mensagem({
+            "texto_processado": "Bom dia!",
+            "cliente_nome": "Ana",
+            "cliente_numero": "5562999990001"
+        })
+
+    assert state["next_action"] == AcaoFluxo.FRAGMENTAR_RESPOSTA.value
+    assert state["resposta_agente"] == "Bom dia, Ana! Como posso te ajudar hoje?"
+    # Regras decidiram: só a chamada de resposta, sem tools
+    assert llm.ainvoke.await_count == 1
+
+    estatisticas = router.obter_estatisticas_roteador()
+    assert estatisticas["trivial"]["mensagens"] == 1
+    assert estatisticas["trivial"]["custo_usd"] == pytest.approx((100 * 0.15 + 20 * 0.60) / 1_000_000)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_escalonamento_para_o_agente():
+    """Classificador, confirmação de pergunta do bot e falhas escalam para o agente."""
+    import src.nodes.router as router
+
+    router.zerar_estatisticas_roteador()
+
+    # Ambígua: o classificador decide
+    with patch.object(router, "get_chat_model", return_value=_modelo("AGENTE")):
+        state = await router.rotear_mensagem({"texto_processado": "sim"})
+    assert state["next_action"] == AcaoFluxo.PROCESSAR_AGENTE.value
+    assert "resposta_agente" not in state
+
+    # "ok" depois de "Posso confirmar para amanhã às 14h?" é uma confirmação
+    # (só a última linha do histórico, lida fora do event loop)
+    threads = []
+
+    def ultima_mensagem(limite):
+        threads.append(threading.get_ident())
+        return [(7, AIMessage(content="Posso confirmar para amanhã às 14h?"))]
+
+    historico = MagicMock()
+    historico.mensagens_recentes.side_effect = ultima_mensagem
+    llm = _modelo()
+    with patch.object(router, "get_chat_model", return_value=llm), \
+         patch.object(router.settings, "enable_memory_persistence", True), \
+         patch("src.nodes.agent._get_message_history", return_value=historico):
+        state = await router.rotear_mensagem({"texto_processado": "ok", "cliente_numero": "5562999990001"})
+    assert state["next_action"] == AcaoFluxo.PROCESSAR_AGENTE.value
+    llm.ainvoke.assert_not_awaited()
+    historico.mensagens_recentes.assert_called_once_with(1)
+    assert threads and threads[0] != threading.get_ident()
+
+    # Falha do modelo pequeno
+    llm = MagicMock()
+    llm.ainvoke = AsyncMock(side_effect=RuntimeError("timeout"))
+    with patch.object(router, "get_chat_model", return_value=llm), \
+         patch.object(router.settings, "enable_memory_persistence", False):
+        state = await router.rotear_mensagem({"texto_processado": "obrigado"})
+    assert state["next_action"] == AcaoFluxo.PROCESSAR_AGENTE.value
+
+    assert router.obter_estatisticas_roteador()["agente"]["mensagens"] == 3
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+@pytest.mark.parametrize("texto, rota", [
+    ("beleza", AcaoFluxo.PROCESSAR_AGENTE),
+    ("tudo certo", AcaoFluxo.PROCESSAR_AGENTE),
+    ("fechado!", AcaoFluxo.PROCESSAR_AGENTE),
+    ("👍", AcaoFluxo.PROCESSAR_AGENTE),
+    ("bom dia", AcaoFluxo.FRAGMENTAR_RESPOSTA),
+    ("obrigado!", AcaoFluxo.FRAGMENTAR_RESPOSTA),
+])
+async def test_resposta_trivial_a_pergunta_do_bot(texto, rota):
+    """Depois de uma pergunta do bot, só cumprimentos e agradecimentos ficam no modelo pequeno."""
+    import src.nodes.router as router
+
+    historico = MagicMock()
+    historico.mensagens_recentes.return_value = [(7, AIMessage(content="Posso agendar amanhã às 14h?"))]
+
+    with patch.object(router, "get_chat_model", return_value=_modelo("De nada!")), \
+         patch.object(router.settings, "enable_memory_persistence", True), \
+         patch.object(router, "_salvar_historico"), \
+         patch("src.nodes.agent._get_message_history", return_value=historico):
+        state = await router.rotear_mensagem({"texto_processado": texto, "cliente_numero": "5562999990001"})
+
+    assert state["next_action"] == rota.value
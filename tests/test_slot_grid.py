@@ -0,0 +1,86 @@
+"""
+Testes da grade de horários em bitmaps.
+
+Testa:
+- Equivalência com filtrar_slots_livres na grade padrão (8h-18h, 1h)
+- Duração variável com passo menor que a duração
+- Regras por dia da semana, filtros de horário/período e próximo livre
+"""
+
+import pytest
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+# Adicionar src ao path
+src_path = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from tools.availability import filtrar_slots_livres, mesclar_intervalos
+from tools.slot_grid import GradeHorarios, criar_grade_horarios
+
+FUSO = ZoneInfo("America/Sao_Paulo")
+
+# 2030-01-07 é uma segunda-feira
+SEGUNDA = date(2030, 1, 7)
+
+
+def _h(dia: date, hora: int, minuto: int = 0) -> datetime:
+    return datetime(dia.year, dia.month, dia.day, hora, minuto, tzinfo=FUSO)
+
+
+@pytest.mark.unit
+def test_grade_padrao_equivale_ao_filtro_de_intervalos():
+    """Na grade de 1h os bitmaps dão o mesmo resultado da comparação intervalo a intervalo."""
+    grade = criar_grade_horarios(8, 18, 1)
+    ocupados = mesclar_intervalos([
+        (_h(SEGUNDA, 9, 30), _h(SEGUNDA, 10)),
+        (_h(SEGUNDA, 13), _h(SEGUNDA, 15)),
+        (_h(SEGUNDA, 17, 59), _h(SEGUNDA, 19)),
+        (_h(SEGUNDA, 6), _h(SEGUNDA, 8))
+    ])
+
+    slots = grade.slots_do_dia(SEGUNDA)
+    assert [inicio.hour for inicio, _ in slots] == list(range(8, 18))
+    assert grade.horarios_livres(SEGUNDA, ocupados) == filtrar_slots_livres(slots, ocupados)
+    assert [inicio.hour for inicio, _ in grade.horarios_livres(SEGUNDA, ocupados)] == [8, 10, 11, 12, 15, 16]
+
+
+@pytest.mark.unit
+def test_duracao_variavel_com_passo_menor():
+    """Atendimento de 90 min a cada 30 min só começa onde cabem 90 min livres."""
+    grade = GradeHorarios({0: (8 * 60, 12 * 60)}, duracao=90, passo=30)
+    ocupados = [(_h(SEGUNDA, 10), _h(SEGUNDA, 10, 30))]
+
+    livres = grade.horarios_livres(SEGUNDA, ocupados)
+
+    assert grade.resolucao == 30
+    assert [(i.strftime("%H:%M"), f.strftime("%H:%M")) for i, f in livres] == [
+        ("08:00", "09:30"), ("08:30", "10:00"), ("10:30", "12:00")
+    ]
+
+
+@pytest.mark.unit
+def test_regras_por_dia_filtros_e_proximo_livre():
+    """Sábado meio período, domingo fechado; filtros de 'agora' e período; próximo livre."""
+    grade = criar_grade_horarios(8, 18, 1, expediente_por_dia={5: (8, 12), 6: None})
+    sabado, domingo = SEGUNDA + timedelta(days=5), SEGUNDA + timedelta(days=6)
+
+    assert [i.hour for i, _ in grade.slots_do_dia(sabado)] == [8, 9, 10, 11]
+    assert grade.slots_do_dia(domingo) == []
+    assert grade.cabe_no_expediente(_h(sabado, 11)) is True
+    assert grade.cabe_no_expediente(_h(sabado, 11, 30)) is False
+    assert grade.cabe_no_expediente(_h(domingo, 9)) is False
+
+    livres = grade.horarios_livres(SEGUNDA, a_partir=_h(SEGUNDA, 14, 10), periodo=(12 * 60, 18 * 60))
+    assert [i.hour for i, _ in livres] == [15, 16, 17]
+
+    # Sábado cheio, domingo fechado: próximo livre é segunda às 8h
+    ocupados_por_dia = {
+        sabado: [(_h(sabado, 0), _h(sabado, 23))],
+        domingo: [],
+        SEGUNDA + timedelta(days=7): [(_h(SEGUNDA + timedelta(days=7), 7), _h(SEGUNDA + timedelta(days=7), 8))]
+    }
+    assert grade.proximo_livre(ocupados_por_dia, a_partir=_h(sabado, 9))[0] == _h(SEGUNDA + timedelta(days=7), 8)
+    assert grade.proximo_livre({domingo: []}) is None
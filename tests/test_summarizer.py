@@ -0,0 +1,165 @@
+"""
+Testes do resumo incremental das conversas.
+
+Testa:
+- Só as mensagens fora da janela recente entram no resumo (em lotes)
+- Conversa longa sem resumo é incorporada em rodadas de tamanho limitado
+- Pedidos durante uma atualização viram uma nova rodada, sem bloquear
+- Resumo + últimas mensagens em uma consulta (RPC) e fallback
+"""
+
+import asyncio
+import pytest
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+# Adicionar src ao path
+src_path = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from history.summarizer import ResumidorConversas
+from history.supabase_history import SupabaseChatMessageHistory
+
+
+class _HistoricoFalso:
+    """Histórico em memória com a mesma interface usada pelo resumidor."""
+
+    def __init__(self, total: int):
+        self.linhas = [
+            (i, HumanMessage(content=f"cliente {i}") if i % 2 else AIMessage(content=f"carol {i}"))
+            for i in range(1, total + 1)
+        ]
+        self.resumo = ("", 0)
+
+    def obter_resumo(self):
+        return self.resumo
+
+    def mensagens_desde(self, ultima_id, limite=None):
+        return [linha for linha in self.linhas if linha[0] > ultima_id][:limite]
+
+    def salvar_resumo(self, resumo, ultima_id):
+        self.resumo = (resumo, ultima_id)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_resumo_incorpora_so_mensagens_fora_da_janela():
+    """Com janela 6 e lote 4: 9 mensagens não resumem; 12 resumem as 6 mais antigas."""
+    historico = _HistoricoFalso(9)
+    chamadas = []
+
+    async def resumir(anterior, mensagens):
+        chamadas.append((anterior, [m.content for m in mensagens]))
+        return f"resumo até {mensagens[-1].content}"
+
+    resumidor = ResumidorConversas(lambda _: historico, resumir, janela=6, lote_minimo=4)
+
+    assert await resumidor.atualizar("s") is False
+    assert chamadas == []
+
+    historico.linhas += _HistoricoFalso(12).linhas[9:]
+    assert await resumidor.atualizar("s") is True
+    assert historico.resumo == ("resumo até carol 6", 6)
+
+    # Próxima rodada parte do resumo anterior e só das mensagens novas
+    historico.linhas += _HistoricoFalso(16).linhas[12:]
+    assert await resumidor.atualizar("s") is True
+    assert chamadas[-1] == ("resumo até carol 6", ["cliente 7", "carol 8", "cliente 9", "carol 10"])
+    assert historico.resumo[1] == 10
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_atraso_longo_resumido_em_rodadas():
+    """130 mensagens sem resumo: rodadas de até 50, cada uma salva; falha no meio não perde o avanço."""
+    historico = _HistoricoFalso(130)
+    rodadas = []
+
+    async def resumir(anterior, mensagens):
+        rodadas.append(len(mensagens))
+        if len(rodadas) == 2:
+            raise RuntimeError("modelo fora")
+        return f"resumo até {mensagens[-1].content}"
+
+    resumidor = ResumidorConversas(lambda _: historico, resumir, janela=6, lote_minimo=4, lote_maximo=50)
+
+    with pytest.raises(RuntimeError):
+        await resumidor.atualizar("s")
+    assert historico.resumo == ("resumo até carol 50", 50)
+
+    assert await resumidor.atualizar("s") is True
+    assert rodadas == [50, 50, 50, 24]
+    assert historico.resumo == ("resumo até carol 124", 124)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_agendar_nao_bloqueia_e_agrupa_pedidos():
+    """agendar retorna na hora; pedidos durante a atualização geram só mais uma rodada."""
+    historico = _HistoricoFalso(20)
+    liberar = asyncio.Event()
+    rodadas = []
+
+    async def resumir(anterior, mensagens):
+        rodadas.append(len(mensagens))
+        await liberar.wait()
+        return "resumo"
+
+    resumidor = ResumidorConversas(lambda _: historico, resumir, janela=6, lote_minimo=1)
+
+    resumidor.agendar("s")
+    await asyncio.sleep(0.05)
+    resumidor.agendar("s")
+    resumidor.agendar("s")
+    historico.linhas += _HistoricoFalso(22).linhas[20:]
+
+    liberar.set()
+    await asyncio.wait_for(resumidor.aguardar(), timeout=2)
+
+    # 1ª rodada: 14 antigas; 2ª (agrupando os dois pedidos): as 2 que saíram da janela
+    assert rodadas == [14, 2]
+    assert historico.resumo == ("resumo", 16)
+
+
+@pytest.mark.unit
+def test_carregar_contexto_rpc_e_fallback():
+    """Usa carregar_contexto_conversa; se a função não existir, faz as consultas separadas."""
+    historico = SupabaseChatMessageHistory.__new__(SupabaseChatMessageHistory)
+    historico.session_id = "5562999990001"
+    historico.table_name = "message_history"
+    historico.summary_table_name = "conversation_summaries"
+    historico.supabase = MagicMock()
+
+    historico.supabase.rpc.return_value.execute.return_value.data = {
+        "resumo": "- Endereço: Rua A, 10",
+        "mensagens": [
+            {"type": "human", "data": {"content": "oi"}},
+            {"type": "ai", "data": {"content": "Olá!"}}
+        ]
+    }
+
+    resumo, mensagens = historico.carregar_contexto(10)
+
+    assert resumo == "- Endereço: Rua A, 10"
+    assert [(m.type, m.content) for m in mensagens] == [("human", "oi"), ("ai", "Olá!")]
+    historico.supabase.rpc.assert_called_once_with(
+        "carregar_contexto_conversa", {"p_session_id": "5562999990001", "p_limite": 10}
+    )
+
+    # Função SQL ausente: últimas mensagens (desc + limit, devolvidas em ordem) e resumo vazio
+    historico.supabase.rpc.side_effect = Exception("function not found")
+    tabela = historico.supabase.table.return_value
+    consulta = tabela.select.return_value.eq.return_value
+    consulta.order.return_value.limit.return_value.execute.return_value.data = [
+        {"id": 2, "message": {"type": "ai", "data": {"content": "Olá!"}}},
+        {"id": 1, "message": {"type": "human", "data": {"content": "oi"}}}
+    ]
+    consulta.limit.return_value.execute.return_value.data = []
+
+    resumo, mensagens = historico.carregar_contexto(10)
+
+    assert resumo == ""
+    assert [m.content for m in mensagens] == ["oi", "Olá!"]
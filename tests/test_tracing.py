@@ -0,0 +1,105 @@
+"""
+Testes do tracing OpenTelemetry.
+
+Testa:
+- Sem provider configurado, spans são no-op e nada muda no fluxo
+- Com provider: webhook -> processar_mensagem -> nós -> chamadas externas
+  no mesmo trace, tokens do LLM e uma tentativa por span na Evolution API
+"""
+
+import pytest
+import sys
+from pathlib import Path
+from uuid import uuid4
+
+import httpx
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+# Adicionar src ao path
+src_path = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+pytest.importorskip("opentelemetry.sdk")
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+
+@pytest.fixture
+def spans(monkeypatch):
+    """Tracer do módulo apontando para um provider em memória."""
+    import src.monitoring.tracing as tracing
+
+    exportador = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exportador))
+    monkeypatch.setattr(tracing, "_tracer", provider.get_tracer("teste"))
+
+    yield exportador
+    provider.shutdown()
+
+
+@pytest.mark.unit
+def test_sem_provider_spans_sao_noop():
+    """Sem configurar_tracing, iniciar_span devolve um span que não grava nada."""
+    from src.monitoring.tracing import iniciar_span
+
+    with iniciar_span("processar_mensagem", mensagem_id="MSG1") as span:
+        assert not span.is_recording()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_trace_da_mensagem_continua_no_background(spans):
+    """Nó, chamada ao LLM e tentativas da Evolution API são filhos do trace do webhook."""
+    from src.clients.whatsapp_client import WhatsAppClient
+    from src.monitoring.node_metrics import instrumentar_no
+    from src.monitoring.tracing import CallbackTracingLLM, SpanKind, contexto_atual, iniciar_span
+
+    tentativas = []
+
+    def responder(requisicao):
+        tentativas.append(requisicao)
+        return httpx.Response(500 if len(tentativas) == 1 else 201, json={"key": {"id": "X"}})
+
+    whatsapp = WhatsAppClient("http://evo.local", "chave", "instancia", max_retries=2)
+    whatsapp.client = httpx.AsyncClient(transport=httpx.MockTransport(responder))
+    whatsapp.retry_delay = 0
+
+    callback = CallbackTracingLLM("modelo-teste")
+
+    async def enviar(state):
+        run_id = uuid4()
+        callback.on_chat_model_start({}, [[]], run_id=run_id)
+        mensagem = AIMessage(content="Oi!", usage_metadata={"input_tokens": 900, "output_tokens": 12, "total_tokens": 912})
+        callback.on_llm_end(LLMResult(generations=[[ChatGeneration(message=mensagem)]]), run_id=run_id)
+
+        await whatsapp.enviar_mensagem("5562999990001", "Oi!")
+        return state
+
+    with iniciar_span("webhook_whatsapp", SpanKind.SERVER):
+        contexto = contexto_atual()
+
+    # Background: mesmo trace, a partir do contexto capturado no webhook
+    with iniciar_span("processar_mensagem", contexto=contexto):
+        await instrumentar_no("enviar_respostas", enviar)({"mensagem_id": "MSG1"})
+
+    por_nome = {}
+    for span in spans.get_finished_spans():
+        por_nome.setdefault(span.name, []).append(span)
+
+    webhook = por_nome["webhook_whatsapp"][0]
+    no = por_nome["enviar_respostas"][0]
+    llm = por_nome["openai chat modelo-teste"][0]
+    envios = por_nome["evolution message/sendText"]
+
+    assert {s.context.trace_id for s in spans.get_finished_spans()} == {webhook.context.trace_id}
+    assert por_nome["processar_mensagem"][0].parent.span_id == webhook.context.span_id
+    assert llm.parent.span_id == no.context.span_id
+    assert llm.attributes["gen_ai.usage.input_tokens"] == 900
+    assert no.attributes["mensagem_id"] == "MSG1"
+    assert [s.attributes["tentativa"] for s in envios] == [1, 2]
+    assert [s.attributes["http.response.status_code"] for s in envios] == [500, 201]
+    assert not envios[0].status.is_ok and envios[1].status.is_ok